@@ -0,0 +1,57 @@
+"""
+Production server settings for gunicorn.
+
+Usage:
+    gunicorn src.app:app          # picks this file up from the project root
+    GUNICORN_THREADS=16 gunicorn -c gunicorn.conf.py src.app:app
+
+The app is imported once in the master (preload_app) and its read-only data
+is shared copy-on-write by the workers; every worker then opens its own
+database and Claude connections and warms up in post_fork, reporting 503 on
+/health until it is done.
+
+One worker is the default. The webhook deduplicator, partial transcripts,
+speculative answers and the /metrics registry live in the worker's memory,
+so a Twilio retry, the partials of a turn and the final turn must all reach
+the same process. Only raise WEB_CONCURRENCY (or run several instances)
+behind routing that keeps a call on one worker, keyed on CallSid; without
+it those features silently miss and /metrics shows a single worker.
+"""
+
+import os
+import time
+
+# Read by src/app.py at import: leave thread start-up to post_fork
+os.environ['SERVER_PRELOAD'] = 'true'
+
+bind = os.getenv('BIND', f"0.0.0.0:{os.getenv('PORT', 5000)}")
+# Per-call state is per process: see above before raising this
+workers = int(os.getenv('WEB_CONCURRENCY', 1))
+# Turns mostly wait on Claude, so each worker serves several at once
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+preload_app = True
+# Twilio gives up on a webhook after 15 seconds
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 20
+keepalive = 5
+# Recycle workers now and then to bound memory growth (jitter avoids all at once)
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = max_requests // 10
+accesslog = '-'
+errorlog = '-'
+
+
+def when_ready(server):
+    """Master, after the app was imported: load the shared data before the first fork."""
+    from src import app as app_module
+    start = time.perf_counter()
+    app_module.preload()
+    server.log.info(f"Preloaded shared data in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+def post_fork(server, worker):
+    """Worker, right after fork: own connections and threads, then warm up."""
+    from src import app as app_module
+    app_module.post_fork()
+    server.log.info(f"Worker {worker.pid} warming up")
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Items/sec of /api/chat/batch against the same messages sent as single
+/api/chat requests. Partner traffic is simulated from the chat scripts in
+tests/fixtures/sample_calls.json: every simulated user replays one script
+(with the script's week and language), so several users ask the same
+question. The model is the deterministic stub from benchmark_replay.
+
+Modes:
+    sequential  one /api/chat request at a time, as partners forward today
+    threads     single /api/chat requests from --concurrency threads
+    batch       the same items in /api/chat/batch requests of --batch-size
+
+Usage:
+    python scripts/benchmark_chat_batch.py --users 50 --llm-latency-ms 500
+    python scripts/benchmark_chat_batch.py --users 50 --vary-weeks   # fewer identical prompts
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add project root to path for imports
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from benchmark_replay import DEFAULT_FIXTURES, StubClaudeClient, load_calls
+
+
+def build_items(calls, users, prefix, vary_weeks=False):
+    """Batch items (in conversation order per user) for `users` simulated partner users."""
+    scripts = [call for call in calls if call['channel'] == 'chat']
+    items = []
+    for i in range(users):
+        call = scripts[i % len(scripts)]
+        week = 4 + (i * 7) % 37 if vary_weeks else call['pregnancy_week']
+        context = {'pregnancy_week': week, 'language': call['language']}
+        for turn in call['turns']:
+            items.append({'user_id': f"{prefix}-{i}", 'message': turn['message'], 'context': context})
+    return items
+
+
+def as_chat_body(item):
+    body = dict(item['context'])
+    body.update(user_id=item['user_id'], message=item['message'])
+    return body
+
+
+def run_sequential(client, items):
+    for item in items:
+        response = client.post('/api/chat', json=as_chat_body(item))
+        assert response.status_code == 200, response.get_json()
+
+
+def run_threads(app_module, items, concurrency):
+    # One thread per user slice, so a user's messages stay in order
+    by_user = {}
+    for item in items:
+        by_user.setdefault(item['user_id'], []).append(item)
+    users = list(by_user.values())
+
+    def worker(slice_):
+        client = app_module.app.test_client()
+        for user_items in slice_:
+            run_sequential(client, user_items)
+
+    threads = [threading.Thread(target=worker, args=(users[i::concurrency],)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def run_batches(client, items, batch_size):
+    shared = 0
+    for start in range(0, len(items), batch_size):
+        response = client.post('/api/chat/batch', json={'items': items[start:start + batch_size]})
+        body = response.get_json()
+        assert response.status_code == 200 and not body['failed'], body
+        shared += body['shared_answers']
+    return shared
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixtures', default=str(DEFAULT_FIXTURES))
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help='Threads for the threads mode and CHAT_BATCH_CONCURRENCY')
+    parser.add_argument('--llm-latency-ms', type=float, default=500.0)
+    parser.add_argument('--vary-weeks', action='store_true',
+                        help='Give every user a different week, so few prompts are identical')
+    parser.add_argument('--modes', default='sequential,threads,batch')
+    parser.add_argument('--output', help='Write the results as JSON')
+    args = parser.parse_args()
+
+    os.environ.setdefault('CALL_LOG_ENABLED', 'false')
+    os.environ.setdefault('SPECULATION_ENABLED', 'false')
+    os.environ.setdefault('CONFIG_HOT_RELOAD', 'false')
+    os.environ.setdefault('DATABASE_PATH', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+    os.environ['CHAT_BATCH_CONCURRENCY'] = str(args.concurrency)
+    os.environ.setdefault('CHAT_BATCH_MAX_ITEMS', str(max(args.batch_size, 100)))
+    import logging
+    from src import app as app_module
+
+    app_module.app.logger.setLevel(logging.WARNING)
+    stub = StubClaudeClient(latency_ms=args.llm_latency_ms)
+    app_module.test_screening.client = stub
+    client = app_module.app.test_client()
+    calls = load_calls(args.fixtures)
+
+    results = {}
+    for mode in args.modes.split(','):
+        # Fresh users per mode, so every mode replays the same conversations
+        items = build_items(calls, args.users, f"bench-{mode}", args.vary_weeks)
+        model_calls = stub.calls
+        shared = 0
+        start = time.perf_counter()
+        if mode == 'sequential':
+            run_sequential(client, items)
+        elif mode == 'threads':
+            run_threads(app_module, items, args.concurrency)
+        elif mode == 'batch':
+            shared = run_batches(client, items, args.batch_size)
+        else:
+            parser.error(f"Unknown mode: {mode}")
+        seconds = time.perf_counter() - start
+        results[mode] = {
+            'items': len(items),
+            'seconds': round(seconds, 3),
+            'items_per_sec': round(len(items) / seconds, 2),
+            'model_calls': stub.calls - model_calls,
+            'shared_answers': shared
+        }
+
+    print(f"{args.users} users, LLM stub {args.llm_latency_ms:.0f} ms, concurrency {args.concurrency}, "
+          f"batch size {args.batch_size}{', varied weeks' if args.vary_weeks else ''}\n")
+    print(f"{'mode':12} {'items':>6} {'seconds':>9} {'items/s':>9} {'model calls':>12} {'shared':>7}")
+    for mode, row in results.items():
+        print(f"{mode:12} {row['items']:>6} {row['seconds']:>9.2f} {row['items_per_sec']:>9.2f} "
+              f"{row['model_calls']:>12} {row['shared_answers']:>7}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+"""
+Replay benchmark for the Flask endpoints.
+Replays the call scripts in tests/fixtures/sample_calls.json through the Flask
+test client against a deterministic stub LLM (or a recorded cassette of real
+Claude answers) and writes latency, throughput and allocation figures per
+endpoint and per stage to a JSON file.
+
+Usage:
+    python scripts/benchmark_replay.py --iterations 50 --llm-latency-ms 0
+    python scripts/benchmark_replay.py --output bench_new.json --compare bench_old.json
+    python scripts/benchmark_replay.py --partials --compare bench_results.json
+    python scripts/benchmark_replay.py --cassette data/cassettes/bench.jsonl --record-cassette
+    python scripts/benchmark_replay.py --cassette data/cassettes/bench.jsonl --cassette-latency-scale 1
+"""
+
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add project root to path for imports
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+DEFAULT_FIXTURES = project_root / 'tests' / 'fixtures' / 'sample_calls.json'
+
+
+class StubClaudeClient:
+    """
+    Deterministic stand-in for anthropic.Anthropic.
+    The same prompt always produces the same answer and the same delay, so two
+    runs differ only by the code under test.
+    """
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.messages = self
+        self.calls = 0
+
+    def create(self, model=None, max_tokens=1024, system='', messages=None, **kwargs):
+        self.calls += 1
+        prompt = messages[-1]['content'] if messages else ''
+        if not isinstance(prompt, str):
+            prompt = json.dumps(prompt, ensure_ascii=False, default=str)
+        digest = hashlib.sha256(prompt.encode('utf-8')).digest()
+
+        delay_ms = self.latency_ms + self.jitter_ms * (digest[0] / 255.0)
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000)
+
+        text = (
+            "At this stage the most important checks are your blood pressure, "
+            "hemoglobin and urine test. They help us catch anemia and "
+            f"pre-eclampsia early. (ref {digest.hex()[:8]})"
+        )
+        return SimpleNamespace(
+            id=f"msg_stub_{digest.hex()[:16]}",
+            model=model,
+            stop_reason='end_turn',
+            content=[SimpleNamespace(type='text', text=text)],
+            usage=SimpleNamespace(
+                input_tokens=(len(system or '') + len(prompt)) // 4,
+                output_tokens=len(text) // 4,
+                cache_read_input_tokens=0,
+                cache_creation_input_tokens=0
+            )
+        )
+
+
+def load_calls(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['calls']
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(samples_ms):
+    total_ms = sum(samples_ms)
+    return {
+        'count': len(samples_ms),
+        'mean_ms': round(total_ms / len(samples_ms), 4) if samples_ms else 0.0,
+        'p50_ms': round(percentile(samples_ms, 50), 4),
+        'p95_ms': round(percentile(samples_ms, 95), 4),
+        'p99_ms': round(percentile(samples_ms, 99), 4),
+        'max_ms': round(max(samples_ms), 4) if samples_ms else 0.0,
+        'requests_per_sec': round(len(samples_ms) / (total_ms / 1000), 2) if total_ms else 0.0
+    }
+
+
+def partial_transcripts(speech):
+    """Growing prefixes of a transcript, one per word, as partialResultCallback delivers them."""
+    words = speech.split()
+    return [' '.join(words[:count]) for count in range(1, len(words) + 1)]
+
+
+class Replayer:
+    def __init__(self, app_module, calls, partials=False):
+        self.app_module = app_module
+        self.client = app_module.app.test_client()
+        self.calls = calls
+        self.partials = partials
+        self.endpoint_ms = {}
+        self.stage_ms = {}
+        self._turn_infos = []
+
+        # Capture the turn_info dict of every handled turn; the app adds its own
+        # stages (context_fetch, twiml_generation) to the same dict afterwards.
+        use_case = app_module.test_screening
+        original_handle = use_case.handle
+
+        def handle(user_input, context, turn_info=None):
+            if turn_info is None:
+                turn_info = {}
+            self._turn_infos.append(turn_info)
+            return original_handle(user_input, context, turn_info)
+
+        use_case.handle = handle
+
+    def _post(self, endpoint, **kwargs):
+        start = time.perf_counter()
+        response = self.client.post(endpoint, **kwargs)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if response.status_code >= 400:
+            raise RuntimeError(f"{endpoint} returned {response.status_code}: {response.data[:200]}")
+        self.endpoint_ms.setdefault(endpoint, []).append(elapsed_ms)
+        return response
+
+    def _collect_stages(self):
+        for turn_info in self._turn_infos:
+            for stage, seconds in turn_info.get('stages', {}).items():
+                self.stage_ms.setdefault(stage, []).append(seconds * 1000)
+        self._turn_infos.clear()
+
+    def replay_once(self, iteration):
+        for call in self.calls:
+            if call['channel'] == 'voice':
+                self._replay_voice(call, iteration)
+            else:
+                self._replay_chat(call, iteration)
+        self._collect_stages()
+
+    def _replay_voice(self, call, iteration):
+        call_sid = f"CA{iteration:06d}{call['id']}"
+        self._post('/voice/incoming', data={'CallSid': call_sid, 'language': call['language']})
+
+        # Known callers already have their week on record
+        if call.get('pregnancy_week') is not None:
+            self.app_module.call_contexts[call_sid]['pregnancy_week'] = call['pregnancy_week']
+
+        for turn in call['turns']:
+            if self.partials:
+                for sequence, text in enumerate(partial_transcripts(turn['speech']), 1):
+                    self._post('/voice/partial', data={
+                        'CallSid': call_sid,
+                        'UnstableSpeechResult': text,
+                        'SequenceNumber': str(sequence)
+                    })
+            self._post('/voice/process', data={
+                'CallSid': call_sid,
+                'SpeechResult': turn['speech'],
+                'Confidence': str(turn.get('confidence', 0.9))
+            })
+        self.app_module.call_contexts.pop(call_sid, None)
+
+    def _replay_chat(self, call, iteration):
+        user_id = f"{call['user_id']}_{iteration}"
+        for turn in call['turns']:
+            body = {
+                'message': turn['message'],
+                'user_id': user_id,
+                'language': call['language'],
+                'name': call.get('name', 'there')
+            }
+            if call.get('pregnancy_week') is not None:
+                body['pregnancy_week'] = call['pregnancy_week']
+            self._post('/api/chat', json=body)
+        self.app_module.user_contexts.pop(user_id, None)
+
+    def reset(self):
+        self.endpoint_ms.clear()
+        self.stage_ms.clear()
+        self._turn_infos.clear()
+
+    def close(self):
+        """Remove the handle() wrapper installed on the use case."""
+        self.app_module.test_screening.__dict__.pop('handle', None)
+
+
+def measure_allocations(app_module, calls, stub, iterations, partials=False):
+    """
+    Re-run the replay under tracemalloc and report the peak bytes allocated
+    per request (by endpoint) and per stage call. Timings from this pass are
+    discarded because tracing slows everything down.
+    """
+    from src.use_cases import test_screening as test_screening_module
+
+    stage_peaks = {}
+    endpoint_peaks = {}
+    running_peak = [0]
+
+    def traced(stage, fn):
+        def wrapper(*args, **kwargs):
+            current, peak = tracemalloc.get_traced_memory()
+            running_peak[0] = max(running_peak[0], peak)
+            tracemalloc.reset_peak()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                after, stage_peak = tracemalloc.get_traced_memory()
+                running_peak[0] = max(running_peak[0], stage_peak)
+                stage_peaks.setdefault(stage, []).append(stage_peak - current)
+        return wrapper
+
+    originals = [
+        (test_screening_module, 'get_tests_for_week'),
+        (app_module.test_screening, '_format_tests_for_prompt'),
+        (stub, 'create'),
+        (app_module.twilio_voice, 'generate_response'),
+    ]
+    saved = [(owner, name, getattr(owner, name)) for owner, name in originals]
+    test_screening_module.get_tests_for_week = traced('knowledge_lookup', test_screening_module.get_tests_for_week)
+    app_module.test_screening._format_tests_for_prompt = traced(
+        'prompt_build', app_module.test_screening._format_tests_for_prompt)
+    stub.create = traced('llm_call', stub.create)
+    app_module.twilio_voice.generate_response = traced(
+        'twiml_generation', app_module.twilio_voice.generate_response)
+
+    replayer = Replayer(app_module, calls, partials)
+    original_post = replayer.client.post
+
+    def traced_post(endpoint, **kwargs):
+        tracemalloc.reset_peak()
+        start_bytes = tracemalloc.get_traced_memory()[0]
+        running_peak[0] = 0
+        response = original_post(endpoint, **kwargs)
+        peak = max(running_peak[0], tracemalloc.get_traced_memory()[1])
+        endpoint_peaks.setdefault(endpoint, []).append(peak - start_bytes)
+        return response
+
+    replayer.client.post = traced_post
+    tracemalloc.start()
+    try:
+        for iteration in range(iterations):
+            replayer.replay_once(1000000 + iteration)
+    finally:
+        tracemalloc.stop()
+        replayer.close()
+        for owner, name, original in saved:
+            if inspect.ismodule(owner):
+                setattr(owner, name, original)
+            else:
+                # Instance attributes shadowed the class methods; remove them
+                owner.__dict__.pop(name, None)
+
+    def mean_kb(values):
+        return round(sum(values) / len(values) / 1024, 2) if values else 0.0
+
+    return (
+        {endpoint: mean_kb(values) for endpoint, values in endpoint_peaks.items()},
+        {stage: mean_kb(values) for stage, values in stage_peaks.items()}
+    )
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=project_root, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return 'unknown'
+
+
+def cassette_client(path, record=False, latency_scale=0.0):
+    """
+    Claude client answering from a cassette. With record=True, requests that
+    are not in the cassette go to the live API (ANTHROPIC_API_KEY) and are
+    recorded; otherwise a miss raises CassetteMiss.
+    """
+    from src.demo.demo_handler import Cassette, CassetteClient
+
+    live = None
+    if record:
+        from anthropic import Anthropic
+        live = Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
+    return CassetteClient(Cassette(path), client=live, on_miss='record' if record else 'error',
+                          latency_scale=latency_scale)
+
+
+def run_benchmark(fixtures=DEFAULT_FIXTURES, iterations=50, warmup=3, llm_latency_ms=0.0,
+                  llm_jitter_ms=0.0, allocation_iterations=3, partials=False, cassette=None,
+                  record_cassette=False, cassette_latency_scale=0.0):
+    """
+    Replay every fixture call `iterations` times and return the results dict.
+    With partials=True every voice turn is preceded by word-by-word
+    /voice/partial callbacks, as Twilio sends while the caller speaks.
+    With a cassette path the model answers come from recorded Claude
+    responses instead of the stub (see src/demo/demo_handler.py).
+    """
+    os.environ.setdefault('CALL_LOG_ENABLED', 'false')
+    os.environ.setdefault('DATABASE_PATH', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+    import logging
+    from src import app as app_module
+
+    app_module.app.logger.setLevel(logging.WARNING)
+    if cassette:
+        stub = cassette_client(cassette, record_cassette, cassette_latency_scale)
+    else:
+        stub = StubClaudeClient(latency_ms=llm_latency_ms, jitter_ms=llm_jitter_ms)
+    app_module.test_screening.client = stub
+    calls = load_calls(fixtures)
+
+    replayer = Replayer(app_module, calls, partials)
+    for iteration in range(warmup):
+        replayer.replay_once(iteration)
+    replayer.reset()
+
+    wall_start = time.perf_counter()
+    for iteration in range(iterations):
+        replayer.replay_once(warmup + iteration)
+    wall_seconds = time.perf_counter() - wall_start
+    replayer.close()
+
+    endpoint_alloc, stage_alloc = measure_allocations(app_module, calls, stub, allocation_iterations, partials)
+
+    cassette_stats = None
+    if cassette:
+        stub.close()
+        cassette_stats = stub.stats()
+        # A miss was answered by the fallback, so the timings are not comparable
+        if cassette_stats['misses'] and not record_cassette:
+            raise RuntimeError(f"{cassette_stats['misses']} requests were not in {cassette}; "
+                               f"re-record it with --record-cassette")
+
+    endpoints = {}
+    for endpoint, samples in sorted(replayer.endpoint_ms.items()):
+        endpoints[endpoint] = summarize(samples)
+        endpoints[endpoint]['alloc_peak_kb'] = endpoint_alloc.get(endpoint, 0.0)
+
+    stages = {}
+    for stage, samples in sorted(replayer.stage_ms.items()):
+        stages[stage] = summarize(samples)
+        stages[stage].pop('requests_per_sec')
+        stages[stage]['alloc_peak_kb'] = stage_alloc.get(stage, 0.0)
+
+    total_requests = sum(len(samples) for samples in replayer.endpoint_ms.values())
+    return {
+        'meta': {
+            'revision': git_revision(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'fixtures': str(Path(fixtures).name),
+            'iterations': iterations,
+            'llm_latency_ms': llm_latency_ms,
+            'llm_jitter_ms': llm_jitter_ms,
+            'partials': partials,
+            'cassette': str(cassette) if cassette else None,
+            'cassette_latency_scale': cassette_latency_scale if cassette else None,
+            'cassette_stats': cassette_stats
+        },
+        'overall': {
+            'requests': total_requests,
+            'wall_seconds': round(wall_seconds, 3),
+            'requests_per_sec': round(total_requests / wall_seconds, 2) if wall_seconds else 0.0
+        },
+        'endpoints': endpoints,
+        'stages': stages
+    }
+
+
+def print_report(results):
+    meta = results['meta']
+    if meta.get('cassette'):
+        llm = f"cassette {meta['cassette']} x{meta['cassette_latency_scale']} timing"
+    else:
+        llm = f"stub LLM {meta['llm_latency_ms']}ms +{meta['llm_jitter_ms']}ms jitter"
+    print(f"Replay benchmark @ {meta['revision']} ({meta['iterations']} iterations, {llm}"
+          f"{', partial results' if meta.get('partials') else ''})")
+    print(f"Overall: {results['overall']['requests']} requests, "
+          f"{results['overall']['requests_per_sec']} req/s\n")
+
+    header = f"{'':24} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9} {'peak KB':>9}"
+    print(header)
+    print('-' * len(header))
+    for endpoint, row in results['endpoints'].items():
+        print(f"{endpoint:24} {row['count']:>6} {row['p50_ms']:>9.3f} {row['p95_ms']:>9.3f} "
+              f"{row['p99_ms']:>9.3f} {row['requests_per_sec']:>9.1f} {row['alloc_peak_kb']:>9.1f}")
+    print()
+    for stage, row in results['stages'].items():
+        print(f"  stage {stage:18} {row['count']:>6} {row['p50_ms']:>9.3f} {row['p95_ms']:>9.3f} "
+              f"{row['p99_ms']:>9.3f} {'':>9} {row['alloc_peak_kb']:>9.1f}")
+
+
+def print_comparison(baseline, results):
+    """Print p50/p99 deltas of results against a previous results file."""
+    print(f"\nComparison against {baseline['meta']['revision']} ({baseline['meta']['timestamp']}):")
+    for section in ('endpoints', 'stages'):
+        for name, row in results[section].items():
+            old = baseline.get(section, {}).get(name)
+            if not old:
+                print(f"  {name:28} (new)")
+                continue
+            deltas = []
+            for key in ('p50_ms', 'p99_ms'):
+                change = (row[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+                deltas.append(f"{key} {old[key]:.3f} -> {row[key]:.3f} ({change:+.1f}%)")
+            print(f"  {name:28} " + ', '.join(deltas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay recorded calls through the Flask app.')
+    parser.add_argument('--fixtures', default=str(DEFAULT_FIXTURES))
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--llm-latency-ms', type=float, default=0.0)
+    parser.add_argument('--llm-jitter-ms', type=float, default=0.0)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help='Previous results file to diff against')
+    parser.add_argument('--partials', action='store_true',
+                        help='Send partialResultCallback requests before each final transcript')
+    parser.add_argument('--cassette', help='Answer from this recorded cassette instead of the stub LLM')
+    parser.add_argument('--record-cassette', action='store_true',
+                        help='Call the live API for requests missing from --cassette and record them')
+    parser.add_argument('--cassette-latency-scale', type=float, default=0.0,
+                        help='Replay delay as a fraction of the recorded time (0 = instant)')
+    args = parser.parse_args()
+
+    results = run_benchmark(
+        fixtures=args.fixtures,
+        iterations=args.iterations,
+        warmup=args.warmup,
+        llm_latency_ms=args.llm_latency_ms,
+        llm_jitter_ms=args.llm_jitter_ms,
+        partials=args.partials,
+        cassette=args.cassette,
+        record_cassette=args.record_cassette,
+        cassette_latency_scale=args.cassette_latency_scale
+    )
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+
+    print_report(results)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            print_comparison(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
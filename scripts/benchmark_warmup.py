@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+First-request latency and per-worker memory, with and without preload/warmup.
+Mimics gunicorn's process model with os.fork(): 'cold' workers import the app
+themselves and serve immediately; 'warm' workers are forked from a master that
+imported and preloaded the app, and run the post-fork warmup first. Each
+worker replays the same voice turn against the stub LLM and reports its first,
+second and steady-state latency plus USS/PSS from /proc/self/smaps_rollup.
+
+Usage:
+    python scripts/benchmark_warmup.py --workers 4 --requests 1000
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project root to path for imports
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from benchmark_replay import StubClaudeClient, percentile
+
+
+def memory_kb():
+    """Unique (private) and proportional set size of this process, in KB."""
+    fields = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'uss_kb': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0),
+        'pss_kb': fields.get('Pss', 0)
+    }
+
+
+def serve(app_module, requests):
+    """Replay one known caller's voice turn `requests` times; returns latencies in ms."""
+    client = app_module.app.test_client()
+    samples = []
+    for i in range(requests):
+        call_sid = f"CA{os.getpid()}{i:08d}"
+        start = time.perf_counter()
+        client.post('/voice/incoming', data={'CallSid': call_sid, 'language': 'english'})
+        app_module.call_contexts[call_sid]['pregnancy_week'] = 20
+        client.post('/voice/process', data={
+            'CallSid': call_sid, 'SpeechResult': 'What tests do I need right now?', 'Confidence': '0.92'
+        })
+        samples.append((time.perf_counter() - start) * 1000)
+        app_module.call_contexts.pop(call_sid, None)
+    return samples
+
+
+def run_worker(mode, app_module, requests, pipe):
+    if mode == 'cold':
+        from src import app as app_module
+        app_module.test_screening.client = StubClaudeClient()
+        warmup_ms = 0.0
+    else:
+        start = time.perf_counter()
+        app_module.post_fork()
+        while app_module.warmup_state['status'] != 'ready':
+            time.sleep(0.001)
+        warmup_ms = (time.perf_counter() - start) * 1000
+
+    samples = serve(app_module, requests)
+    result = {
+        'warmup_ms': warmup_ms,
+        'first_ms': samples[0],
+        'second_ms': samples[1],
+        'p50_ms': percentile(samples[len(samples) // 2:], 50)
+    }
+    result.update(memory_kb())
+    os.write(pipe, json.dumps(result).encode())
+    os._exit(0)
+
+
+def fork_workers(mode, app_module, workers, requests):
+    results = []
+    for _ in range(workers):
+        read_end, write_end = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_end)
+            try:
+                run_worker(mode, app_module, requests, write_end)
+            finally:
+                os._exit(1)
+        os.close(write_end)
+        with os.fdopen(read_end) as f:
+            payload = f.read()
+        os.waitpid(pid, 0)
+        results.append(json.loads(payload))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare cold and preloaded+warmed workers.')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=1000)
+    args = parser.parse_args()
+
+    os.environ['SERVER_PRELOAD'] = 'true'
+    os.environ.setdefault('CALL_LOG_ENABLED', 'false')
+    os.environ.setdefault('SPECULATION_ENABLED', 'false')
+    os.environ.setdefault('CONFIG_HOT_RELOAD', 'false')
+    os.environ.setdefault('USAGE_LOG_DIR', tempfile.mkdtemp())
+    os.environ.setdefault('DATABASE_PATH', os.path.join(tempfile.mkdtemp(), 'warmup.db'))
+
+    # Cold workers fork from an empty master, so they run before the app is imported here
+    reports = {'cold': fork_workers('cold', None, args.workers, args.requests)}
+
+    import logging
+    from src import app as app_module
+    app_module.app.logger.setLevel(logging.WARNING)
+    app_module.test_screening.client = StubClaudeClient()
+    start = time.perf_counter()
+    app_module.preload()
+    preload_ms = (time.perf_counter() - start) * 1000
+    reports['warm'] = fork_workers('warm', app_module, args.workers, args.requests)
+
+    print(f"{args.workers} workers x {args.requests} voice turns each (preload in master: {preload_ms:.1f} ms)\n")
+    header = f"{'':6} {'warmup ms':>10} {'1st ms':>9} {'2nd ms':>9} {'p50 ms':>9} {'USS MB':>9} {'PSS MB':>9}"
+    print(header)
+    print('-' * len(header))
+    for mode, results in reports.items():
+        def mean(key):
+            return statistics.mean(result[key] for result in results)
+        print(f"{mode:6} {mean('warmup_ms'):>10.1f} {mean('first_ms'):>9.2f} {mean('second_ms'):>9.2f} "
+              f"{mean('p50_ms'):>9.3f} {mean('uss_kb') / 1024:>9.1f} {mean('pss_kb') / 1024:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Local fake of the Anthropic Messages API for load and fault-injection tests.
+Point the app at it with ANTHROPIC_BASE_URL=http://127.0.0.1:<port>.
+
+Latency is drawn from a log-normal distribution (median + sigma), which is a
+reasonable fit for LLM response times: most answers cluster around the median
+with a long right tail.
+
+Usage:
+    python scripts/fake_anthropic.py --port 8089 --median-ms 1500 --sigma 0.4
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeAnthropicConfig:
+    def __init__(self, median_ms=1500.0, sigma=0.4, max_ms=30000.0, error_rate=0.0,
+                 error_status=529, hang_rate=0.0, hang_ms=60000.0, seed=None):
+        """
+        Args:
+            median_ms (float): Median response latency
+            sigma (float): Log-normal shape; 0.4 gives p99 ~2.5x the median
+            max_ms (float): Latency cap
+            error_rate (float): Fraction of requests answered with error_status
+            error_status (int): HTTP status for injected errors (529 = overloaded)
+            hang_rate (float): Fraction of requests that stall for hang_ms
+            hang_ms (float): Stall duration for hung requests
+            seed (int): Random seed for reproducible runs
+        """
+        self.median_ms = median_ms
+        self.sigma = sigma
+        self.max_ms = max_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.hang_rate = hang_rate
+        self.hang_ms = hang_ms
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def update(self, **settings):
+        """Change settings at runtime (also exposed as POST /_control)."""
+        with self.lock:
+            for key, value in settings.items():
+                if hasattr(self, key) and key not in ('random', 'lock'):
+                    setattr(self, key, type(getattr(self, key))(value))
+
+    def next_outcome(self):
+        """Return (delay_seconds, error_status or None) for one request."""
+        with self.lock:
+            self.requests += 1
+            roll = self.random.random()
+            if roll < self.error_rate:
+                self.errors += 1
+                delay = min(self.random.lognormvariate(0, self.sigma) * self.median_ms * 0.1, self.max_ms)
+                return delay / 1000, self.error_status
+            if roll < self.error_rate + self.hang_rate:
+                return self.hang_ms / 1000, None
+            delay = min(self.random.lognormvariate(0, self.sigma) * self.median_ms, self.max_ms)
+            return delay / 1000, None
+
+
+def _make_handler(config):
+    class FakeAnthropicHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, body):
+            payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            try:
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.send_header('request-id', f"req_fake_{uuid.uuid4().hex[:12]}")
+                self.end_headers()
+                self.wfile.write(payload)
+            except (BrokenPipeError, ConnectionResetError):
+                # The client timed out on a hung request and hung up
+                self.close_connection = True
+
+        def do_GET(self):
+            if self.path.startswith('/_stats'):
+                self._send_json(200, {'requests': config.requests, 'errors': config.errors})
+            else:
+                self._send_json(404, {'type': 'error', 'error': {'type': 'not_found_error', 'message': self.path}})
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            raw = self.rfile.read(length) if length else b'{}'
+            try:
+                body = json.loads(raw or b'{}')
+            except ValueError:
+                body = {}
+
+            if self.path.startswith('/_control'):
+                config.update(**body)
+                self._send_json(200, {'ok': True})
+                return
+
+            if not self.path.startswith('/v1/messages'):
+                self._send_json(404, {'type': 'error', 'error': {'type': 'not_found_error', 'message': self.path}})
+                return
+
+            delay, error_status = config.next_outcome()
+            time.sleep(delay)
+
+            if error_status:
+                self._send_json(error_status, {
+                    'type': 'error',
+                    'error': {'type': 'overloaded_error', 'message': 'Injected fault'}
+                })
+                return
+
+            prompt_chars = len(json.dumps(body.get('messages', []), ensure_ascii=False))
+            prompt_chars += len(json.dumps(body.get('system', ''), ensure_ascii=False))
+            text = (
+                "At this stage your blood pressure, hemoglobin and urine tests are the most "
+                "important. They help find anemia and pre-eclampsia early, so please go to "
+                "your nearest health centre for your next check-up."
+            )
+            self._send_json(200, {
+                'id': f"msg_fake_{uuid.uuid4().hex[:20]}",
+                'type': 'message',
+                'role': 'assistant',
+                'model': body.get('model', 'claude-fake'),
+                'content': [{'type': 'text', 'text': text}],
+                'stop_reason': 'end_turn',
+                'stop_sequence': None,
+                'usage': {
+                    'input_tokens': prompt_chars // 4,
+                    'output_tokens': min(len(text) // 4, body.get('max_tokens', 1024)),
+                    'cache_creation_input_tokens': 0,
+                    'cache_read_input_tokens': 0
+                }
+            })
+
+    return FakeAnthropicHandler
+
+
+def start_fake_anthropic(port=0, config=None):
+    """
+    Start the fake server on a background thread.
+
+    Args:
+        port (int): Port to bind on 127.0.0.1 (0 picks a free one)
+        config (FakeAnthropicConfig): Latency/fault settings
+
+    Returns:
+        tuple: (server, base_url); call server.shutdown() to stop it
+    """
+    config = config or FakeAnthropicConfig()
+    server = ThreadingHTTPServer(('127.0.0.1', port), _make_handler(config))
+    server.daemon_threads = True
+    server.config = config
+    thread = threading.Thread(target=server.serve_forever, name='fake-anthropic', daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a local fake Anthropic Messages API.')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--median-ms', type=float, default=1500.0)
+    parser.add_argument('--sigma', type=float, default=0.4)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--hang-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    config = FakeAnthropicConfig(
+        median_ms=args.median_ms, sigma=args.sigma,
+        error_rate=args.error_rate, hang_rate=args.hang_rate, seed=args.seed
+    )
+    server, base_url = start_fake_anthropic(args.port, config)
+    print(f"Fake Anthropic API listening on {base_url} (set ANTHROPIC_BASE_URL={base_url})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
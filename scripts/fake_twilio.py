@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Local fake of the Twilio REST API for integration tests and benchmarks.
+Implements just enough of the Messages resource for the bulk SMS sender,
+including the account's messages-per-second limit (HTTP 429, code 20429), and
+of the Calls resource for the reminder call dialer: calls-per-second limit,
+simulated ringing/answer/hang-up, StatusCallback POSTs when a call ends, and
+counts of the peak number of live calls and of numbers dialled twice at once.
+Lists are paged newest first with next_page_uri, and messages stay queued
+(no date_sent), as they are on Twilio until the carrier takes them.
+
+Usage:
+    python scripts/fake_twilio.py --port 8090 --mps 100 --latency-ms 40
+"""
+
+import argparse
+import heapq
+import json
+import random
+import re
+import threading
+import time
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+MESSAGES_PATH = re.compile(r'^/2010-04-01/Accounts/(?P<account>[^/]+)/Messages\.json$')
+CALLS_PATH = re.compile(r'^/2010-04-01/Accounts/(?P<account>[^/]+)/Calls\.json$')
+CALL_PATH = re.compile(r'^/2010-04-01/Accounts/(?P<account>[^/]+)/Calls/(?P<sid>CA[0-9a-f]+)\.json$')
+
+FINAL_CALL_STATUSES = ('completed', 'busy', 'no-answer', 'failed', 'canceled')
+
+
+class FakeTwilioState:
+    def __init__(self, mps=100.0, latency_ms=40.0, jitter_ms=20.0, error_rate=0.0, seed=None,
+                 cps=1.0, ring_ms=3000.0, talk_ms=60000.0, no_answer_rate=0.3, busy_rate=0.05,
+                 accepted_error_rate=0.0):
+        """
+        Args:
+            mps (float): Messages per second accepted before answering 429
+            latency_ms (float): Base API latency
+            jitter_ms (float): Uniform extra latency
+            error_rate (float): Fraction of requests answered with HTTP 500
+            accepted_error_rate (float): Fraction of requests that create the
+                message or call and are still answered with HTTP 500
+            cps (float): Calls created per second before answering 429
+            ring_ms (float): Ringing time before an answered call is picked up
+                (an unanswered call rings three times as long)
+            talk_ms (float): Mean length of an answered call (+/- 50%)
+            no_answer_rate (float): Fraction of calls nobody picks up
+            busy_rate (float): Fraction of calls that get a busy signal
+        """
+        self.mps = mps
+        self.cps = cps
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.accepted_error_rate = accepted_error_rate
+        self.ring_ms = ring_ms
+        self.talk_ms = talk_ms
+        self.no_answer_rate = no_answer_rate
+        self.busy_rate = busy_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.messages = []
+        self.by_to = {}
+        self.rejected_429 = 0
+        self.windows = {}  # limit name -> [window start, requests in window]
+
+        self.calls = {}  # sid -> call
+        self.calls_by_to = {}
+        self.live_by_to = {}  # number -> live calls to it
+        self.live = 0
+        self.peak_live = 0
+        self.double_dials = 0
+        self.callbacks_sent = 0
+        self._endings = []  # heap of (ends at, sid)
+        self._calls_changed = threading.Condition(self.lock)
+        self._callbacks = ThreadPoolExecutor(max_workers=16, thread_name_prefix='fake-twilio-callback')
+        threading.Thread(target=self._end_calls, name='fake-twilio-calls', daemon=True).start()
+
+    def admit(self, kind='messages'):
+        """Fixed one-second window rate limit, like an account MPS or CPS cap."""
+        limit = self.cps if kind == 'calls' else self.mps
+        with self.lock:
+            now = time.monotonic()
+            window = self.windows.setdefault(kind, [now, 0])
+            if now - window[0] >= 1.0:
+                window[0] = now
+                window[1] = 0
+            if window[1] >= limit:
+                self.rejected_429 += 1
+                return False
+            window[1] += 1
+            return True
+
+    def delay(self):
+        with self.lock:
+            return (self.latency_ms + self.random.random() * self.jitter_ms) / 1000
+
+    def fail(self, rate=None):
+        with self.lock:
+            return self.random.random() < (self.error_rate if rate is None else rate)
+
+    def store_message(self, account, form):
+        now = datetime.now(timezone.utc)
+        message = {
+            'sid': f"SM{uuid.uuid4().hex}",
+            'account_sid': account,
+            'to': form.get('To'),
+            'from': form.get('From'),
+            'messaging_service_sid': form.get('MessagingServiceSid'),
+            'body': form.get('Body'),
+            'status': 'queued',
+            'date_created': now.strftime('%a, %d %b %Y %H:%M:%S +0000'),
+            'date_sent': None
+        }
+        with self.lock:
+            self.messages.append(message)
+            self.by_to.setdefault(message['to'], []).append(message)
+        return message
+
+    def create_call(self, account, form):
+        """Start a simulated call; it rings, then is answered, busy or unanswered."""
+        now = time.time()
+        with self.lock:
+            roll = self.random.random()
+            if roll < self.busy_rate:
+                outcome, ring, talk = 'busy', self.ring_ms / 4, 0.0
+            elif roll < self.busy_rate + self.no_answer_rate:
+                outcome, ring, talk = 'no-answer', self.ring_ms * 3, 0.0
+            else:
+                outcome, ring, talk = 'completed', self.ring_ms, self.talk_ms * (0.5 + self.random.random())
+            call = {
+                'sid': f"CA{uuid.uuid4().hex}",
+                'account_sid': account,
+                'to': form.get('To'),
+                'from': form.get('From'),
+                'status': 'queued',
+                'direction': 'outbound-api',
+                'duration': None,
+                'date_created': datetime.fromtimestamp(now, timezone.utc).strftime('%a, %d %b %Y %H:%M:%S +0000'),
+                'start_time': datetime.fromtimestamp(now, timezone.utc).strftime('%a, %d %b %Y %H:%M:%S +0000'),
+                '_start_date': datetime.fromtimestamp(now, timezone.utc).strftime('%Y-%m-%d'),
+                '_outcome': outcome,
+                '_answered_at': now + ring / 1000 if outcome == 'completed' else None,
+                '_ends_at': now + (ring + talk) / 1000,
+                '_status_callback': form.get('StatusCallback')
+            }
+            self.calls[call['sid']] = call
+            self.calls_by_to.setdefault(call['to'], []).append(call)
+            if self.live_by_to.get(call['to']):
+                self.double_dials += 1
+            self.live_by_to[call['to']] = self.live_by_to.get(call['to'], 0) + 1
+            self.live += 1
+            self.peak_live = max(self.peak_live, self.live)
+            heapq.heappush(self._endings, (call['_ends_at'], call['sid']))
+            self._calls_changed.notify()
+        return call
+
+    def call_status(self, call, now=None):
+        """Status of a call as Twilio would report it right now (lock held)."""
+        if call['status'] in FINAL_CALL_STATUSES:
+            return call['status']
+        now = now or time.time()
+        if call['_answered_at'] is not None and now >= call['_answered_at']:
+            return 'in-progress'
+        return 'ringing'
+
+    def _end_calls(self):
+        """Hang up calls when their time is up and send their StatusCallback."""
+        while True:
+            with self.lock:
+                while not self._endings or self._endings[0][0] > time.time():
+                    self._calls_changed.wait(self._endings[0][0] - time.time() if self._endings else None)
+                _, sid = heapq.heappop(self._endings)
+                call = self.calls[sid]
+                call['status'] = call['_outcome']
+                call['duration'] = str(int(call['_ends_at'] - call['_answered_at'])) \
+                    if call['_answered_at'] is not None else '0'
+                self.live -= 1
+                self.live_by_to[call['to']] -= 1
+                callback = call['_status_callback']
+            if callback:
+                self._callbacks.submit(self._send_status_callback, callback, call)
+
+    def _send_status_callback(self, url, call):
+        data = urlencode({'CallSid': call['sid'], 'CallStatus': call['status'], 'CallDuration': call['duration'],
+                          'To': call['to'], 'From': call['from'], 'Direction': call['direction']}).encode('utf-8')
+        try:
+            urllib.request.urlopen(url, data=data, timeout=5).close()
+            with self.lock:
+                self.callbacks_sent += 1
+        except OSError:
+            pass
+
+    def duplicates(self):
+        """Number of (to, body) pairs that were accepted more than once."""
+        with self.lock:
+            seen = {}
+            for message in self.messages:
+                key = (message['to'], message['body'])
+                seen[key] = seen.get(key, 0) + 1
+        return sum(count - 1 for count in seen.values() if count > 1)
+
+    def reset(self):
+        with self.lock:
+            self.messages = []
+            self.by_to = {}
+            self.rejected_429 = 0
+            self.peak_live = self.live
+            self.double_dials = 0
+
+
+def _public(message):
+    return {key: value for key, value in message.items() if not key.startswith('_')}
+
+
+def _day(rfc2822):
+    return datetime.strptime(rfc2822, '%a, %d %b %Y %H:%M:%S +0000').strftime('%Y-%m-%d')
+
+
+def _page(path, query, items):
+    """One page of a list, newest first, and the next page's URI (None on the last page)."""
+    size = int(query.get('PageSize', 50))
+    number = int(query.get('Page', 0))
+    newest_first = items[::-1]
+    page = newest_first[number * size:(number + 1) * size]
+    if (number + 1) * size >= len(newest_first):
+        return page, None
+    return page, f"{path}?{urlencode(dict(query, Page=number + 1))}"
+
+
+def _public_call(state, call):
+    with state.lock:
+        return dict(_public(call), status=state.call_status(call))
+
+
+def _make_handler(state):
+    class FakeTwilioHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, body, headers=None):
+            payload = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            match = MESSAGES_PATH.match(url.path)
+            if url.path == '/_stats':
+                self._send_json(200, {
+                    'messages': len(state.messages),
+                    'duplicates': state.duplicates(),
+                    'rejected_429': state.rejected_429,
+                    'calls': len(state.calls),
+                    'live_calls': state.live,
+                    'peak_live_calls': state.peak_live,
+                    'double_dials': state.double_dials,
+                    'callbacks_sent': state.callbacks_sent
+                })
+                return
+            call_match = CALL_PATH.match(url.path)
+            if call_match:
+                call = state.calls.get(call_match.group('sid'))
+                if call is None:
+                    self._send_json(404, {'code': 20404, 'message': 'Not found', 'status': 404})
+                else:
+                    self._send_json(200, _public_call(state, call))
+                return
+            if CALLS_PATH.match(url.path):
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                with state.lock:
+                    candidates = list(state.calls_by_to.get(query['To'], [])) if 'To' in query \
+                        else list(state.calls.values())
+                if 'From' in query:
+                    candidates = [c for c in candidates if c['from'] == query['From']]
+                started_after = query.get('StartTime>')
+                if started_after:
+                    candidates = [c for c in candidates if c['_start_date'] >= started_after]
+                calls, next_page_uri = _page(url.path, query, candidates)
+                self._send_json(200, {'calls': [_public_call(state, c) for c in calls],
+                                      'next_page_uri': next_page_uri})
+                return
+            if not match:
+                self._send_json(404, {'code': 20404, 'message': 'Not found', 'status': 404})
+                return
+
+            query = {key: values[0] for key, values in parse_qs(url.query).items()}
+            with state.lock:
+                candidates = list(state.by_to.get(query['To'], [])) if 'To' in query else list(state.messages)
+            sent_after = query.get('DateSent>')
+            if sent_after:
+                # Queued messages have no date_sent and never match
+                candidates = [m for m in candidates if m['date_sent'] and _day(m['date_sent']) >= sent_after]
+            messages, next_page_uri = _page(url.path, query, candidates)
+            self._send_json(200, {'messages': [_public(m) for m in messages], 'next_page_uri': next_page_uri})
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            length = int(self.headers.get('Content-Length', 0))
+            raw = self.rfile.read(length).decode('utf-8') if length else ''
+            form = {key: values[0] for key, values in parse_qs(raw).items()}
+
+            match = MESSAGES_PATH.match(url.path)
+            calls_match = CALLS_PATH.match(url.path)
+            if not match and not calls_match:
+                self._send_json(404, {'code': 20404, 'message': 'Not found', 'status': 404})
+                return
+
+            time.sleep(state.delay())
+            if state.fail():
+                self._send_json(500, {'code': 20500, 'message': 'Internal Server Error', 'status': 500})
+                return
+            if not state.admit('calls' if calls_match else 'messages'):
+                self._send_json(429, {'code': 20429, 'message': 'Too Many Requests', 'status': 429},
+                                headers={'Retry-After': '1'})
+                return
+            if not form.get('To', '').startswith('+'):
+                self._send_json(400, {'code': 21211, 'message': "The 'To' number is not valid.", 'status': 400})
+                return
+
+            if calls_match:
+                if not form.get('Url'):
+                    self._send_json(400, {'code': 21205, 'message': 'Url parameter is required.', 'status': 400})
+                    return
+                created = _public_call(state, state.create_call(calls_match.group('account'), form))
+            else:
+                created = _public(state.store_message(match.group('account'), form))
+            if state.fail(state.accepted_error_rate):
+                self._send_json(500, {'code': 20500, 'message': 'Internal Server Error', 'status': 500})
+                return
+            self._send_json(201, created)
+
+    return FakeTwilioHandler
+
+
+class _FakeTwilioServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def handle_error(self, request, client_address):
+        # Clients killed mid-request (crash/resume runs) are expected here
+        pass
+
+
+def start_fake_twilio(port=0, state=None):
+    """
+    Start the fake Twilio API on a background thread.
+
+    Returns:
+        tuple: (server, api_base) where api_base replaces https://api.twilio.com/2010-04-01
+    """
+    state = state or FakeTwilioState()
+    server = _FakeTwilioServer(('127.0.0.1', port), _make_handler(state))
+    server.state = state
+    thread = threading.Thread(target=server.serve_forever, name='fake-twilio', daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/2010-04-01"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a local fake Twilio REST API.')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--mps', type=float, default=100.0)
+    parser.add_argument('--latency-ms', type=float, default=40.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--accepted-error-rate', type=float, default=0.0,
+                        help='Fraction of creates answered with HTTP 500 after they succeeded')
+    parser.add_argument('--cps', type=float, default=1.0)
+    parser.add_argument('--ring-ms', type=float, default=3000.0)
+    parser.add_argument('--talk-ms', type=float, default=60000.0)
+    args = parser.parse_args()
+
+    server, api_base = start_fake_twilio(args.port, FakeTwilioState(
+        mps=args.mps, latency_ms=args.latency_ms, error_rate=args.error_rate,
+        accepted_error_rate=args.accepted_error_rate,
+        cps=args.cps, ring_ms=args.ring_ms, talk_ms=args.talk_ms
+    ))
+    print(f"Fake Twilio API listening on {api_base} (set TWILIO_API_BASE={api_base})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
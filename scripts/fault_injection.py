@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Fault-injection run for the Claude circuit breaker.
+Sends test-screening turns through a real Anthropic client pointed at
+scripts/fake_anthropic.py while the fake goes through four phases (healthy,
+overloaded with 529 errors, hanging past the request timeout, healthy again)
+and reports per phase how turns were answered and how long they took, with
+the breaker on and with it effectively off.
+
+Usage:
+    python scripts/fault_injection.py --turns 40 --median-ms 150
+"""
+
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+
+# Add project root to path for imports
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from anthropic import Anthropic
+
+from benchmark_replay import percentile
+from fake_anthropic import FakeAnthropicConfig, start_fake_anthropic
+from src.use_cases.test_screening import TestScreeningUseCase
+from src.utils.config import CONFIG_DIR, config_store
+
+PHASES = (
+    ('healthy', {'error_rate': 0.0, 'hang_rate': 0.0}),
+    ('errors', {'error_rate': 1.0, 'hang_rate': 0.0}),
+    ('hangs', {'error_rate': 0.0, 'hang_rate': 1.0}),
+    ('recovery', {'error_rate': 0.0, 'hang_rate': 0.0})
+)
+
+QUESTIONS = ('What tests do I need?', 'Which blood tests are due now?', 'Do I need an ultrasound?')
+
+
+def use_config(settings_update):
+    """Install a copy of config/ with config.yaml sections updated."""
+    config_dir = Path(tempfile.mkdtemp()) / 'config'
+    shutil.copytree(CONFIG_DIR, config_dir)
+    settings = yaml.safe_load((config_dir / 'config.yaml').read_text(encoding='utf-8'))
+    for section, values in settings_update.items():
+        settings.setdefault(section, {}).update(values)
+    (config_dir / 'config.yaml').write_text(yaml.safe_dump(settings, allow_unicode=True), encoding='utf-8')
+    config_store.config_dir = config_dir
+    config_store.refresh()
+
+
+def run(label, args, breaker_settings):
+    use_config({
+        'llm': {'timeout_seconds': args.timeout},
+        'circuit_breaker': breaker_settings
+    })
+    fake = FakeAnthropicConfig(median_ms=args.median_ms, sigma=0.2, hang_ms=args.timeout * 3000, seed=7)
+    server, base_url = start_fake_anthropic(config=fake)
+    use_case = TestScreeningUseCase()
+    use_case.client = Anthropic(base_url=base_url, api_key='fake', max_retries=0)
+
+    print(f"\n{label}")
+    header = f"  {'phase':9} {'turns':>6} {'model':>6} {'cached':>7} {'fallback':>9} {'API calls':>10} {'p50 ms':>8} {'p99 ms':>8}"
+    print(header)
+    print('  ' + '-' * (len(header) - 2))
+    for phase, faults in PHASES:
+        fake.update(**faults)
+        requests_before = fake.requests
+        served = {'model': 0, 'cached': 0, 'fallback': 0}
+        samples = []
+        for i in range(args.turns):
+            turn_info = {}
+            start = time.perf_counter()
+            use_case.handle(QUESTIONS[i % len(QUESTIONS)], {'pregnancy_week': 20}, turn_info)
+            samples.append((time.perf_counter() - start) * 1000)
+            if turn_info.get('fallback'):
+                served['fallback'] += 1
+            elif turn_info.get('shed'):
+                served['cached'] += 1
+            else:
+                served['model'] += 1
+            time.sleep(args.interval)
+        print(f"  {phase:9} {args.turns:>6} {served['model']:>6} {served['cached']:>7} {served['fallback']:>9} "
+              f"{fake.requests - requests_before:>10} {percentile(samples, 50):>8.1f} {percentile(samples, 99):>8.1f}")
+    server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inject API faults and compare turns with and without the breaker.')
+    parser.add_argument('--turns', type=int, default=40, help='Turns per phase')
+    parser.add_argument('--median-ms', type=float, default=150.0, help='Fake API median latency')
+    parser.add_argument('--timeout', type=float, default=1.0, help='llm.timeout_seconds for the run')
+    parser.add_argument('--window', type=float, default=3.0, help='circuit_breaker.window_seconds')
+    parser.add_argument('--cooldown', type=float, default=1.0, help='circuit_breaker.cooldown_seconds')
+    parser.add_argument('--interval', type=float, default=0.05, help='Seconds between turns')
+    args = parser.parse_args()
+
+    breaker = {'window_seconds': args.window, 'min_requests': 5, 'error_rate': 0.5,
+               'slow_call_seconds': args.timeout * 0.8, 'slow_rate': 0.5, 'cooldown_seconds': args.cooldown}
+    try:
+        run('breaker on', args, breaker)
+        run('breaker off', args, dict(breaker, min_requests=10 ** 9))
+    finally:
+        config_store.config_dir = CONFIG_DIR
+        config_store.refresh()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Load demo users into the database, optionally with a large synthetic
+population, and benchmark per-turn point lookups.
+
+Usage:
+    python scripts/load_demo_data.py
+    python scripts/load_demo_data.py --path /tmp/bench.db --synthetic 1000000 --benchmark
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Add project root to path for imports
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.database.init_db import Database, init_db
+from src.database import queries
+
+SAMPLE_USERS = project_root / 'src' / 'data' / 'demo' / 'sample_user.json'
+
+
+def demo_rows(today):
+    with open(SAMPLE_USERS, encoding='utf-8') as f:
+        users = json.load(f)['users']
+    for user in users:
+        yield queries.user_row(
+            user['phone'], user.get('name'), user.get('language', 'english'),
+            user.get('pregnancy_week'), high_risk=user.get('high_risk', False), today=today
+        )
+
+
+def synthetic_rows(count, today, seed=7):
+    """Synthetic registrations spread evenly over the 40 weeks of pregnancy."""
+    rng = random.Random(seed)
+    for i in range(count):
+        lmp = today - timedelta(days=rng.randrange(0, 280))
+        yield queries.user_row(
+            f"+9197{i:08d}", None, 'hindi' if rng.random() < 0.6 else 'english',
+            (today - lmp).days // 7, lmp=lmp, high_risk=rng.random() < 0.1, today=today
+        )
+
+
+def benchmark_lookups(db, population, lookups, threads):
+    """Random point lookups by phone number from several threads, like concurrent calls."""
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(seed):
+        rng = random.Random(seed)
+        phones = [f"+9197{rng.randrange(population):08d}" for _ in range(lookups // threads)]
+        local = []
+        for phone in phones:
+            start = time.perf_counter()
+            queries.get_user_context(db, phone)
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker, args=(seed,)) for seed in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1e6
+    p99 = latencies[int(len(latencies) * 0.99)] * 1e6
+    print(f"Point lookups: {len(latencies):,} over {threads} threads in {elapsed:.2f}s "
+          f"({len(latencies) / elapsed:,.0f}/s), p50 {p50:.1f} us, p99 {p99:.1f} us")
+
+    start = time.perf_counter()
+    due = queries.users_due_for_reminder(db, date.today(), limit=1000)
+    print(f"Reminder index: {len(due)} users due today fetched in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description='Load demo users into the database.')
+    parser.add_argument('--path', help='SQLite file (default: DATABASE_PATH or data/voice_chatbot.db)')
+    parser.add_argument('--synthetic', type=int, default=0, help='Also load this many synthetic users')
+    parser.add_argument('--batch-size', type=int, default=50000, help='Rows per transaction')
+    parser.add_argument('--benchmark', action='store_true', help='Benchmark point lookups after loading')
+    parser.add_argument('--lookups', type=int, default=200000)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    db = init_db(Database(args.path))
+    today = date.today()
+
+    written = queries.bulk_upsert_users(db, demo_rows(today))
+    print(f"Loaded {written} demo users into {db.path}")
+
+    if args.synthetic:
+        start = time.perf_counter()
+        written = queries.bulk_upsert_users(db, synthetic_rows(args.synthetic, today), args.batch_size)
+        elapsed = time.perf_counter() - start
+        print(f"Bulk import: {written:,} users in {elapsed:.1f}s ({written / elapsed:,.0f} rows/s, "
+              f"batches of {args.batch_size:,})")
+
+    if args.benchmark:
+        benchmark_lookups(db, max(args.synthetic, 1), args.lookups, args.threads)
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
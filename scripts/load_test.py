@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Concurrent simulated-caller load test.
+Each simulated caller walks the real TwiML flow the way Twilio would:
+/voice/incoming -> <Gather action> with a SpeechResult -> any <Redirect> ...
+until its script is finished or the TwiML hangs up. The app talks to a local
+fake Anthropic server with log-normal latency. Concurrency is ramped until the
+p99 of /voice/process breaks the SLA, giving a capacity figure per worker
+configuration.
+
+Usage:
+    python scripts/load_test.py
+    python scripts/load_test.py --llm-median-ms 2000 --sla-ms 8000 --step-seconds 30
+    python scripts/load_test.py --server "gunicorn-4x8=gunicorn -w 4 --threads 8 -b 127.0.0.1:{port} src.app:app"
+    python scripts/load_test.py --target http://127.0.0.1:5000   # already running server
+"""
+
+import argparse
+import itertools
+import json
+import os
+import shlex
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from urllib.parse import urljoin
+
+import requests
+
+# Add project root to path for imports
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fake_anthropic import FakeAnthropicConfig, start_fake_anthropic
+from benchmark_replay import DEFAULT_FIXTURES, load_calls, percentile
+
+# Twilio gives up on a webhook after 15 seconds
+TWILIO_WEBHOOK_TIMEOUT_MS = 15000
+
+DEFAULT_SERVER = f"flask-threaded={shlex.quote(sys.executable)} src/app.py"
+
+
+class CallerScript:
+    def __init__(self, call, phone):
+        self.call = call
+        self.phone = phone
+        self.turns = [turn['speech'] for turn in call['turns']]
+        self.confidences = [turn.get('confidence', 0.9) for turn in call['turns']]
+
+
+class LoadResults:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies_ms = {}
+        self.errors = {}
+        self.calls_completed = 0
+
+    def record(self, path, elapsed_ms):
+        with self.lock:
+            self.latencies_ms.setdefault(path, []).append(elapsed_ms)
+
+    def error(self, path, reason):
+        with self.lock:
+            key = f"{path}: {reason}"
+            self.errors[key] = self.errors.get(key, 0) + 1
+
+    def call_done(self):
+        with self.lock:
+            self.calls_completed += 1
+
+
+class SimulatedCaller(threading.Thread):
+    """One phone line: places calls back to back until told to stop."""
+
+    def __init__(self, base_url, scripts, results, stop_event, think_ms, caller_id):
+        super().__init__(daemon=True, name=f"caller-{caller_id}")
+        self.base_url = base_url
+        self.scripts = scripts
+        self.results = results
+        self.stop_event = stop_event
+        self.think_ms = think_ms
+        self.caller_id = caller_id
+        self.session = requests.Session()
+        self.call_counter = itertools.count()
+
+    def run(self):
+        for script in itertools.cycle(self.scripts):
+            if self.stop_event.is_set():
+                return
+            self._place_call(script)
+
+    def _post(self, url, data):
+        path = url.split('?')[0].replace(self.base_url, '') or '/'
+        start = time.perf_counter()
+        try:
+            response = self.session.post(url, data=data, timeout=TWILIO_WEBHOOK_TIMEOUT_MS / 1000)
+        except requests.Timeout:
+            self.results.error(path, 'twilio timeout')
+            return None
+        except requests.RequestException as e:
+            self.results.error(path, type(e).__name__)
+            return None
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.results.record(path, elapsed_ms)
+        if response.status_code != 200:
+            self.results.error(path, f"HTTP {response.status_code}")
+            return None
+        try:
+            return ET.fromstring(response.content)
+        except ET.ParseError:
+            self.results.error(path, 'invalid TwiML')
+            return None
+
+    def _place_call(self, script):
+        call_sid = f"CA{self.caller_id:04d}{next(self.call_counter):08d}{os.getpid()}"
+        params = {'CallSid': call_sid, 'From': script.phone, 'To': '+911800000000',
+                  'CallStatus': 'in-progress'}
+        twiml = self._post(urljoin(self.base_url, '/voice/incoming'), params)
+        turn = 0
+
+        while twiml is not None and not self.stop_event.is_set():
+            gather = twiml.find('Gather')
+            redirect = twiml.find('Redirect')
+
+            if gather is not None and turn < len(script.turns):
+                # Caller listens to the prompt, then answers
+                if self.think_ms:
+                    time.sleep(self.think_ms / 1000)
+                action = gather.get('action', '/voice/process')
+                data = dict(params, SpeechResult=script.turns[turn],
+                            Confidence=str(script.confidences[turn]))
+                turn += 1
+                twiml = self._post(urljoin(self.base_url, action), data)
+            elif redirect is not None and redirect.text:
+                twiml = self._post(urljoin(self.base_url, redirect.text.strip()), params)
+            else:
+                # Hangup, or the caller has nothing more to say
+                break
+
+        self.results.call_done()
+
+
+def build_scripts(fixtures):
+    """Voice scripts from the fixtures, each with its own registered phone number."""
+    scripts = []
+    for index, call in enumerate(load_calls(fixtures)):
+        if call['channel'] == 'voice':
+            scripts.append(CallerScript(call, f"+9190000{index:05d}"))
+    return scripts
+
+
+def register_callers(base_url, scripts):
+    """Register known callers' pregnancy week through the context API."""
+    for script in scripts:
+        if script.call.get('pregnancy_week') is not None:
+            requests.post(
+                urljoin(base_url, '/api/context'),
+                params={'user_id': script.phone},
+                json={'pregnancy_week': script.call['pregnancy_week'], 'language': script.call['language']},
+                timeout=10
+            ).raise_for_status()
+
+
+def run_step(base_url, scripts, concurrency, seconds, think_ms):
+    results = LoadResults()
+    stop_event = threading.Event()
+    callers = [
+        SimulatedCaller(base_url, scripts[i % len(scripts):] + scripts[:i % len(scripts)],
+                        results, stop_event, think_ms, i)
+        for i in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for caller in callers:
+        caller.start()
+    time.sleep(seconds)
+    stop_event.set()
+    for caller in callers:
+        caller.join(TWILIO_WEBHOOK_TIMEOUT_MS / 1000 + 5)
+    elapsed = time.perf_counter() - start
+
+    process = results.latencies_ms.get('/voice/process', [])
+    total_requests = sum(len(values) for values in results.latencies_ms.values())
+    return {
+        'concurrency': concurrency,
+        'seconds': round(elapsed, 2),
+        'calls_completed': results.calls_completed,
+        'requests': total_requests,
+        'requests_per_sec': round(total_requests / elapsed, 2),
+        'process_count': len(process),
+        'process_p50_ms': round(percentile(process, 50), 1),
+        'process_p95_ms': round(percentile(process, 95), 1),
+        'process_p99_ms': round(percentile(process, 99), 1),
+        'errors': dict(results.errors)
+    }
+
+
+def wait_until_healthy(base_url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(urljoin(base_url, '/health'), timeout=2).status_code == 200:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def find_free_port():
+    import socket
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def measure_capacity(name, base_url, scripts, args):
+    """Ramp concurrency until /voice/process p99 breaks the SLA."""
+    register_callers(base_url, scripts)
+    steps = []
+    capacity = 0
+    concurrency = args.start_concurrency
+    while concurrency <= args.max_concurrency:
+        step = run_step(base_url, scripts, concurrency, args.step_seconds, args.think_ms)
+        errors = sum(step['errors'].values())
+        error_rate = errors / max(step['requests'], 1)
+        step['within_sla'] = step['process_p99_ms'] <= args.sla_ms and error_rate <= args.max_error_rate
+        steps.append(step)
+        print(f"  [{name}] {concurrency:>4} callers: p50 {step['process_p50_ms']:>8.1f}ms "
+              f"p99 {step['process_p99_ms']:>8.1f}ms  {step['requests_per_sec']:>7.1f} req/s  "
+              f"errors {errors:>4}  {'OK' if step['within_sla'] else 'SLA BREACH'}")
+        if not step['within_sla']:
+            break
+        capacity = concurrency
+        concurrency = max(concurrency + 1, int(concurrency * args.ramp_factor))
+
+    return {
+        'config': name,
+        'capacity_concurrent_calls': capacity,
+        'sla_breached': bool(steps) and not steps[-1]['within_sla'],
+        'steps': steps
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ramp simulated callers until /voice/process breaks its SLA.')
+    parser.add_argument('--server', action='append',
+                        help='NAME=COMMAND worker configuration; {port} is substituted (repeatable)')
+    parser.add_argument('--target', help='Base URL of an already running server (skips launching one)')
+    parser.add_argument('--fixtures', default=str(DEFAULT_FIXTURES))
+    parser.add_argument('--sla-ms', type=float, default=10000.0,
+                        help=f'p99 budget for /voice/process (Twilio times out at {TWILIO_WEBHOOK_TIMEOUT_MS}ms)')
+    parser.add_argument('--max-error-rate', type=float, default=0.01)
+    parser.add_argument('--start-concurrency', type=int, default=1)
+    parser.add_argument('--max-concurrency', type=int, default=512)
+    parser.add_argument('--ramp-factor', type=float, default=2.0)
+    parser.add_argument('--step-seconds', type=float, default=20.0)
+    parser.add_argument('--think-ms', type=float, default=1000.0,
+                        help='Pause before each answer, standing in for TTS playback')
+    parser.add_argument('--llm-median-ms', type=float, default=1500.0)
+    parser.add_argument('--llm-sigma', type=float, default=0.4)
+    parser.add_argument('--llm-error-rate', type=float, default=0.0)
+    parser.add_argument('--output', default='load_test_results.json')
+    args = parser.parse_args()
+
+    scripts = build_scripts(args.fixtures)
+    fake_server, fake_url = start_fake_anthropic(config=FakeAnthropicConfig(
+        median_ms=args.llm_median_ms, sigma=args.llm_sigma, error_rate=args.llm_error_rate, seed=1
+    ))
+    print(f"Fake Anthropic API at {fake_url} (median {args.llm_median_ms}ms, sigma {args.llm_sigma})")
+
+    reports = []
+    try:
+        if args.target:
+            reports.append(measure_capacity('external', args.target.rstrip('/'), scripts, args))
+        else:
+            for spec in args.server or [DEFAULT_SERVER]:
+                name, _, command = spec.partition('=')
+                port = find_free_port()
+                env = dict(os.environ, PORT=str(port), ANTHROPIC_BASE_URL=fake_url,
+                           ANTHROPIC_API_KEY='fake-key', FLASK_ENV='production', CALL_LOG_ENABLED='false',
+                           DATABASE_PATH=os.path.join(tempfile.mkdtemp(), 'load_test.db'))
+                process = subprocess.Popen(
+                    shlex.split(command.format(port=port)), cwd=project_root, env=env,
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+                )
+                try:
+                    base_url = f"http://127.0.0.1:{port}"
+                    if not wait_until_healthy(base_url):
+                        print(f"  [{name}] server did not become healthy; skipping")
+                        continue
+                    reports.append(measure_capacity(name, base_url, scripts, args))
+                finally:
+                    process.terminate()
+                    process.wait(10)
+    finally:
+        fake_server.shutdown()
+
+    print("\nCapacity (concurrent calls within SLA):")
+    for report in reports:
+        suffix = '' if report['sla_breached'] else '+ (no breach up to --max-concurrency)'
+        print(f"  {report['config']:24} {report['capacity_concurrent_calls']}{suffix}")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'sla_ms': args.sla_ms,
+            'think_ms': args.think_ms,
+            'llm_median_ms': args.llm_median_ms,
+            'llm_sigma': args.llm_sigma,
+            'reports': reports
+        }, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
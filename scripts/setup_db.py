@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Create the SQLite database used to persist users, calls and turns.
+
+Usage:
+    python scripts/setup_db.py                 # DATABASE_PATH or data/voice_chatbot.db
+    python scripts/setup_db.py --path /tmp/test.db --reset
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Add project root to path for imports
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.database.init_db import Database, init_db
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description='Create the voice chatbot database.')
+    parser.add_argument('--path', help='SQLite file (default: DATABASE_PATH or data/voice_chatbot.db)')
+    parser.add_argument('--reset', action='store_true', help='Drop existing tables first')
+    args = parser.parse_args()
+
+    db = init_db(Database(args.path), drop=args.reset)
+    counts = {
+        table: db.connection().execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+        for table in ('users', 'calls', 'turns')
+    }
+    db.close()
+    print(f"Database ready at {db.path}: {counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Exercise the Twilio integrations against a local fake Twilio API.
+
+Usage:
+    python scripts/test_twilio.py sms --messages 20000 --mps 500 --concurrency 50
+    python scripts/test_twilio.py sms --messages 5000 --crash-after 2.0   # kill and resume
+    python scripts/test_twilio.py calls --numbers 100000 --cps 500 --max-live 1000
+    python scripts/test_twilio.py calls --numbers 5000 --crash-after 3.0  # kill and resume
+"""
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs
+
+import requests
+
+# Add project root to path for imports
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fake_twilio import FakeTwilioState, start_fake_twilio
+from src.integrations.sms_service import BulkSMSSender
+from src.integrations.twilio_client import (
+    ANSWERED, UNREACHED, CallCheckpoint, ReminderCallDialer, record_status_callback
+)
+
+ACCOUNT_SID = 'AC' + '0' * 32
+
+
+def reminder_messages(count):
+    """Synthetic ANC reminder campaign: one message per registered number."""
+    for i in range(count):
+        yield (
+            f"+9198{i:08d}",
+            f"Reminder: your ANC visit is due this week. Please visit your health centre. Ref {i}"
+        )
+
+
+def run_sms_worker(args):
+    """Child process used by --crash-after: sends until it is killed."""
+    sender = BulkSMSSender(
+        account_sid=ACCOUNT_SID, auth_token='fake', from_number='+911800000000',
+        checkpoint_path=args.checkpoint, rate_per_sec=args.mps, max_concurrency=args.concurrency,
+        api_base=args.api_base
+    )
+    sender.send_campaign(args.campaign, list(reminder_messages(args.messages)))
+
+
+def run_sms(args):
+    state = FakeTwilioState(mps=args.mps, latency_ms=args.latency_ms, jitter_ms=args.latency_ms / 2,
+                            error_rate=args.error_rate, seed=1)
+    server, api_base = start_fake_twilio(state=state)
+    checkpoint = os.path.join(tempfile.mkdtemp(), 'sms_checkpoint.db')
+    campaign = 'anc-reminders-bench'
+    print(f"Fake Twilio at {api_base}: {args.mps} MPS limit, {args.latency_ms}ms latency, "
+          f"{args.error_rate:.1%} errors")
+
+    try:
+        if args.crash_after:
+            worker = subprocess.Popen([
+                sys.executable, __file__, 'sms-worker',
+                '--api-base', api_base, '--checkpoint', checkpoint, '--campaign', campaign,
+                '--messages', str(args.messages), '--mps', str(args.mps),
+                '--concurrency', str(args.concurrency)
+            ], cwd=project_root)
+            time.sleep(args.crash_after)
+            worker.send_signal(signal.SIGKILL)
+            worker.wait()
+            print(f"Killed sender after {args.crash_after}s with {len(state.messages)} messages accepted")
+
+        sender = BulkSMSSender(
+            account_sid=ACCOUNT_SID, auth_token='fake', from_number='+911800000000',
+            checkpoint_path=checkpoint, rate_per_sec=args.mps, max_concurrency=args.concurrency,
+            api_base=api_base
+        )
+        summary = sender.send_campaign(campaign, list(reminder_messages(args.messages)))
+        sender.close()
+
+        stats = requests.get(api_base.replace('/2010-04-01', '/_stats'), timeout=5).json()
+        print(f"Run summary: {summary}")
+        print(f"Fake Twilio: {stats['messages']} accepted, {stats['duplicates']} duplicates, "
+              f"{stats['rejected_429']} rejected with 429")
+        print(f"Throughput: {summary['messages_per_sec']} messages/sec "
+              f"(limit {args.mps} MPS, concurrency {args.concurrency})")
+        if stats['messages'] != args.messages or stats['duplicates']:
+            print("FAILED: every message should be accepted exactly once")
+            sys.exit(1)
+    finally:
+        server.shutdown()
+
+
+def reminder_calls(count):
+    """Synthetic voice reminder campaign: one call per registered number."""
+    for i in range(count):
+        yield f"+9197{i:08d}", 'hindi' if i % 3 else 'english'
+
+
+def start_status_receiver(checkpoint_path):
+    """Stand-in for the app's /voice/status: records call endings in the campaign checkpoint."""
+    checkpoint = CallCheckpoint(checkpoint_path)
+
+    class StatusHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            form = {key: values[0] for key, values in parse_qs(self.rfile.read(length).decode('utf-8')).items()}
+            record_status_callback(checkpoint, form)
+            self.send_response(204)
+            self.end_headers()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StatusHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='status-receiver', daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/voice/status"
+
+
+def make_dialer(args, api_base, checkpoint, status_url):
+    return ReminderCallDialer(
+        account_sid=ACCOUNT_SID, auth_token='fake', from_number='+911800000000',
+        checkpoint_path=checkpoint, rate_per_sec=args.cps, max_live_calls=args.max_live,
+        max_concurrency=args.concurrency, voice_url='https://example.org/voice/incoming',
+        status_callback_url=status_url, retry_schedule=[float(s) for s in args.retry_schedule.split(',')],
+        status_timeout=args.status_timeout, api_base=api_base
+    )
+
+
+def run_calls_worker(args):
+    """Child process used by --crash-after: dials until it is killed."""
+    dialer = make_dialer(args, args.api_base, args.checkpoint, args.status_url)
+    dialer.run_campaign(args.campaign, list(reminder_calls(args.numbers)))
+
+
+def run_calls(args):
+    state = FakeTwilioState(mps=args.cps, latency_ms=args.latency_ms, jitter_ms=args.latency_ms / 2,
+                            error_rate=args.error_rate, seed=1, cps=args.cps, ring_ms=args.ring_ms,
+                            talk_ms=args.talk_ms, no_answer_rate=args.no_answer_rate, busy_rate=args.busy_rate)
+    server, api_base = start_fake_twilio(state=state)
+    checkpoint = os.path.join(tempfile.mkdtemp(), 'call_campaigns.db')
+    CallCheckpoint(checkpoint).close()
+    receiver, status_url = start_status_receiver(checkpoint)
+    campaign = 'anc-reminder-calls-bench'
+    print(f"Fake Twilio at {api_base}: {args.cps} CPS limit, {args.latency_ms}ms latency, "
+          f"{args.ring_ms}ms ring, {args.talk_ms}ms talk, {args.no_answer_rate:.0%} no answer, "
+          f"{args.busy_rate:.0%} busy; live calls capped at {args.max_live}")
+
+    try:
+        if args.crash_after:
+            worker = subprocess.Popen([
+                sys.executable, __file__, 'calls-worker',
+                '--api-base', api_base, '--checkpoint', checkpoint, '--campaign', campaign,
+                '--status-url', status_url, '--numbers', str(args.numbers), '--cps', str(args.cps),
+                '--max-live', str(args.max_live), '--concurrency', str(args.concurrency),
+                '--retry-schedule', args.retry_schedule, '--status-timeout', str(args.status_timeout)
+            ], cwd=project_root)
+            time.sleep(args.crash_after)
+            worker.send_signal(signal.SIGKILL)
+            worker.wait()
+            print(f"Killed dialer after {args.crash_after}s with {len(state.calls)} calls created, "
+                  f"{state.live} still live")
+
+        dialer = make_dialer(args, api_base, checkpoint, status_url)
+        summary = dialer.run_campaign(campaign, list(reminder_calls(args.numbers)))
+        dialer.close()
+
+        stats = requests.get(api_base.replace('/2010-04-01', '/_stats'), timeout=5).json()
+        attempts = stats['calls'] / args.numbers
+        print(f"Run summary: {summary}")
+        print(f"Fake Twilio: {stats['calls']} calls ({attempts:.2f} per number), peak {stats['peak_live_calls']} live, "
+              f"{stats['double_dials']} numbers dialled while already live, {stats['rejected_429']} rejected with 429")
+        print(f"Throughput: {summary['calls_per_sec']} calls/sec (limit {args.cps} CPS, {args.max_live} live)")
+
+        # The same campaign at production settings: bounded by the CPS limit or
+        # by live calls / average call length, whichever is tighter
+        mean_call = (args.prod_talk_seconds * (1 - args.no_answer_rate - args.busy_rate)
+                     + args.prod_ring_seconds * 3 * args.no_answer_rate)
+        for cps, live in ((1, 50), (10, 200), (30, 500)):
+            rate = min(cps, live / mean_call)
+            print(f"  100,000 numbers at {cps} CPS / {live} live: {rate:.1f} calls/sec, "
+                  f"~{100000 * attempts / rate / 3600:.1f} h of dialling plus the retry schedule")
+
+        done = summary.get(ANSWERED, 0) + summary.get(UNREACHED, 0)
+        if done != args.numbers or stats['double_dials'] or stats['peak_live_calls'] > args.max_live:
+            print("FAILED: every number should end answered or unreached, never dialled twice at once, "
+                  "within the live-call cap")
+            sys.exit(1)
+    finally:
+        receiver.shutdown()
+        server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Twilio integration checks against a local fake.')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    sms = sub.add_parser('sms', help='Bulk SMS throughput and crash/resume check')
+    sms.add_argument('--messages', type=int, default=20000)
+    sms.add_argument('--mps', type=float, default=500.0)
+    sms.add_argument('--concurrency', type=int, default=50)
+    sms.add_argument('--latency-ms', type=float, default=40.0)
+    sms.add_argument('--error-rate', type=float, default=0.0)
+    sms.add_argument('--crash-after', type=float, default=0.0,
+                     help='Kill the first sender after this many seconds, then resume')
+
+    worker = sub.add_parser('sms-worker')
+    worker.add_argument('--api-base', required=True)
+    worker.add_argument('--checkpoint', required=True)
+    worker.add_argument('--campaign', required=True)
+    worker.add_argument('--messages', type=int, required=True)
+    worker.add_argument('--mps', type=float, required=True)
+    worker.add_argument('--concurrency', type=int, required=True)
+
+    calls = sub.add_parser('calls', help='Reminder call dialer throughput, live-call cap and crash/resume check')
+    calls.add_argument('--numbers', type=int, default=20000)
+    calls.add_argument('--cps', type=float, default=500.0)
+    calls.add_argument('--max-live', type=int, default=1000)
+    calls.add_argument('--concurrency', type=int, default=50)
+    calls.add_argument('--latency-ms', type=float, default=40.0)
+    calls.add_argument('--error-rate', type=float, default=0.0)
+    calls.add_argument('--ring-ms', type=float, default=200.0)
+    calls.add_argument('--talk-ms', type=float, default=1000.0)
+    calls.add_argument('--no-answer-rate', type=float, default=0.3)
+    calls.add_argument('--busy-rate', type=float, default=0.05)
+    calls.add_argument('--retry-schedule', default='2,4', help='Seconds before each retry (comma separated)')
+    calls.add_argument('--status-timeout', type=float, default=10.0)
+    calls.add_argument('--prod-ring-seconds', type=float, default=25.0,
+                       help='Ring time of an unanswered call, for the production projection')
+    calls.add_argument('--prod-talk-seconds', type=float, default=90.0,
+                       help='Average answered reminder call, for the production projection')
+    calls.add_argument('--crash-after', type=float, default=0.0,
+                       help='Kill the first dialer after this many seconds, then resume')
+
+    calls_worker = sub.add_parser('calls-worker')
+    calls_worker.add_argument('--api-base', required=True)
+    calls_worker.add_argument('--checkpoint', required=True)
+    calls_worker.add_argument('--campaign', required=True)
+    calls_worker.add_argument('--status-url', required=True)
+    calls_worker.add_argument('--numbers', type=int, required=True)
+    calls_worker.add_argument('--cps', type=float, required=True)
+    calls_worker.add_argument('--max-live', type=int, required=True)
+    calls_worker.add_argument('--concurrency', type=int, required=True)
+    calls_worker.add_argument('--retry-schedule', required=True)
+    calls_worker.add_argument('--status-timeout', type=float, required=True)
+
+    args = parser.parse_args()
+    if args.command == 'sms':
+        run_sms(args)
+    elif args.command == 'sms-worker':
+        run_sms_worker(args)
+    elif args.command == 'calls':
+        run_calls(args)
+    elif args.command == 'calls-worker':
+        run_calls_worker(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+Non-blocking call logger for per-turn analytics.
+Webhook handlers enqueue a small record and return immediately; a background
+writer drains the queue in batches into rotating, gzip-compressed JSONL files.
+"""
+
+import atexit
+import gzip
+import json
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+
+
+class CallLogger:
+    def __init__(self, log_dir='logs/calls', max_queue_size=10000, batch_size=500,
+                 flush_interval=1.0, max_file_bytes=50 * 1024 * 1024, block_timeout=0):
+        """
+        Args:
+            log_dir (str): Directory for the rotating .jsonl.gz files
+            max_queue_size (int): Records held in memory before new ones are dropped
+            batch_size (int): Maximum records written per gzip member
+            flush_interval (float): Seconds the writer waits before writing a partial batch
+            max_file_bytes (int): Compressed size at which a new file is started
+            block_timeout (float): Seconds log_turn() may wait for room when the
+                queue is full (backpressure). 0 drops immediately and counts it.
+        """
+        self.log_dir = Path(log_dir)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_file_bytes = max_file_bytes
+        self.block_timeout = block_timeout
+
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._stop = threading.Event()
+        self._thread = None
+        self._file = None
+        self._file_bytes = 0
+        self._file_index = 0
+
+        # Counters are updated from request threads and the writer
+        self._lock = threading.Lock()
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+        self.write_errors = 0
+
+    def start(self):
+        """Start the background writer (idempotent)."""
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='call-logger', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+        return self
+
+    def log_turn(self, call_sid, text, confidence, use_case, latency_ms, fallback, **extra):
+        """
+        Queue one conversation turn for writing.
+
+        Args:
+            call_sid (str): Twilio CallSid (or chat user id)
+            text (str): What the caller said
+            confidence (float): STT confidence reported by Twilio
+            use_case (str): Use case that handled the turn
+            latency_ms (float): Server-side time spent on the turn
+            fallback (bool): Whether a fallback answer was served
+            **extra: Additional JSON-serializable fields
+
+        Returns:
+            bool: True if queued, False if dropped because the queue was full
+        """
+        record = {
+            'ts': time.time(),
+            'call_sid': call_sid,
+            'text': text,
+            'confidence': confidence,
+            'use_case': use_case,
+            'latency_ms': round(latency_ms, 3),
+            'fallback': bool(fallback)
+        }
+        if extra:
+            record.update(extra)
+
+        try:
+            if self.block_timeout:
+                self._queue.put(record, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+        with self._lock:
+            self.enqueued += 1
+        return True
+
+    def flush(self, timeout=5.0):
+        """Block until everything queued so far has been written."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self._queue.unfinished_tasks == 0
+
+    def close(self, timeout=5.0):
+        """Drain the queue, close the current file and stop the writer."""
+        if self._thread is None:
+            return
+        self.flush(timeout)
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+        self._close_file()
+
+    def stats(self):
+        """Return logger counters for health/metrics endpoints."""
+        with self._lock:
+            return {
+                'queued': self._queue.qsize(),
+                'enqueued': self.enqueued,
+                'dropped': self.dropped,
+                'written': self.written,
+                'batches': self.batches,
+                'write_errors': self.write_errors
+            }
+
+    def _run(self):
+        """Writer loop: collect up to batch_size records, then write them as one gzip member."""
+        while not self._stop.is_set() or not self._queue.empty():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                self._write_batch(batch)
+                with self._lock:
+                    self.written += len(batch)
+                    self.batches += 1
+            except Exception as e:
+                with self._lock:
+                    self.write_errors += 1
+                print(f"Error writing call log batch: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write_batch(self, batch):
+        """
+        Append a batch as a standalone gzip member.
+        Concatenated members form a valid gzip stream, so a crash never
+        corrupts batches that were already written.
+        """
+        payload = ''.join(
+            json.dumps(record, ensure_ascii=False) + '\n' for record in batch
+        ).encode('utf-8')
+        compressed = gzip.compress(payload, compresslevel=6)
+
+        if self._file is None or self._file_bytes + len(compressed) > self.max_file_bytes:
+            self._rotate()
+
+        self._file.write(compressed)
+        self._file.flush()
+        self._file_bytes += len(compressed)
+
+    def _rotate(self):
+        """Close the current file and open the next one."""
+        self._close_file()
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self._file_index += 1
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        path = self.log_dir / f"calls-{stamp}-{os.getpid()}-{self._file_index:04d}.jsonl.gz"
+        self._file = open(path, 'ab')
+        self._file_bytes = 0
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_call_logs(log_dir='logs/calls'):
+    """
+    Iterate over every logged turn in a log directory (oldest file first).
+
+    Args:
+        log_dir (str): Directory written by CallLogger
+
+    Yields:
+        dict: One turn record
+    """
+    for path in sorted(Path(log_dir).glob('calls-*.jsonl.gz')):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+
+    print("Testing call_logger.py\n")
+
+    def turn(logger, i):
+        logger.log_turn(f"CA{i % 500:032d}", "What tests do I need?", 0.92, 'test_screening', 1234.5, False)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        n = 200000
+        logger = CallLogger(log_dir=tmp, max_queue_size=n, batch_size=1000,
+                            flush_interval=0.2).start()
+
+        # Request side: what a webhook pays per turn
+        start = time.perf_counter()
+        for i in range(n):
+            turn(logger, i)
+        elapsed = time.perf_counter() - start
+        print(f"log_turn(): {elapsed / n * 1e6:.2f} us/call over {n} calls")
+
+        # Writer side: draining the queue to disk, and the CPU the writer
+        # thread takes (while holding the GIL it competes with request threads)
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        logger.close()
+        drain = time.perf_counter() - start
+        print(f"Drain and close: {drain * 1000:.0f} ms for the backlog, "
+              f"{(time.process_time() - cpu_start) / n * 1e6:.2f} us CPU per record written")
+        stats = logger.stats()
+        print(f"Stats: {stats}")
+
+        files = list(Path(tmp).glob('*.gz'))
+        size = sum(p.stat().st_size for p in files)
+        print(f"Files: {len(files)}, {size / stats['written']:.1f} compressed bytes/turn")
+        print(f"Read back: {sum(1 for _ in read_call_logs(tmp))} records")
+
+    # The write path per batch of 1000: JSON encoding, gzip and the file write
+    with tempfile.TemporaryDirectory() as tmp:
+        logger = CallLogger(log_dir=tmp)
+        batch = [{'ts': time.time(), 'call_sid': f"CA{i:032d}", 'text': "What tests do I need?", 'confidence': 0.92,
+                  'use_case': 'test_screening', 'latency_ms': 1234.5, 'fallback': False} for i in range(1000)]
+        rounds = 50
+        start = time.perf_counter()
+        for _ in range(rounds):
+            payload = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in batch).encode('utf-8')
+        encode = (time.perf_counter() - start) / rounds
+        start = time.perf_counter()
+        for _ in range(rounds):
+            gzip.compress(payload, compresslevel=6)
+        compress = (time.perf_counter() - start) / rounds
+        start = time.perf_counter()
+        for _ in range(rounds):
+            logger._write_batch(batch)
+        total = (time.perf_counter() - start) / rounds
+        logger._close_file()
+        print(f"\n_write_batch(1000 records): {total * 1000:.2f} ms "
+              f"(JSON {encode * 1000:.2f} ms, gzip {compress * 1000:.2f} ms, rest {(total - encode - compress) * 1000:.2f} ms)")
+
+    # Counters stay exact when gthread workers log concurrently
+    with tempfile.TemporaryDirectory() as tmp:
+        logger = CallLogger(log_dir=tmp, max_queue_size=1000, flush_interval=0.05).start()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda i: turn(logger, i), range(20000)))
+        logger.close()
+        stats = logger.stats()
+        print(f"8 threads x 2500 turns: enqueued + dropped = {stats['enqueued'] + stats['dropped']}, "
+              f"written = {stats['written']}")
@@ -0,0 +1,285 @@
+"""
+In-process metrics: counters and HDR-style log-bucketed histograms.
+Recording is a dict lookup plus one short lock; /metrics renders everything
+in the Prometheus text exposition format.
+"""
+
+import bisect
+import math
+import threading
+import time
+
+
+# Each power of two is split into this many log-spaced sub-buckets (~19% wide)
+SUB_BUCKETS = 4
+
+# Linear buckets for values in [0, 1] such as STT confidence
+CONFIDENCE_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 1.0)
+
+# Small integer counts such as model round trips per turn
+COUNT_BUCKETS = (0, 1, 2, 3, 4, 5, 6, 8, 10)
+
+
+def _bucket_index(value):
+    """Map a positive value to its log bucket: floor(log2(value) * SUB_BUCKETS)."""
+    if value <= 0:
+        return None
+    mantissa, exponent = math.frexp(value)  # value = mantissa * 2**exponent, 0.5 <= mantissa < 1
+    return (exponent - 1) * SUB_BUCKETS + int((mantissa * 2 - 1) * SUB_BUCKETS)
+
+
+def _bucket_upper(index):
+    """Exclusive upper bound of a log bucket."""
+    exponent, sub = divmod(index, SUB_BUCKETS)
+    return math.ldexp(1 + (sub + 1) / SUB_BUCKETS, exponent)
+
+
+def _bucket_lower(index):
+    """Inclusive lower bound of a log bucket."""
+    exponent, sub = divmod(index, SUB_BUCKETS)
+    return math.ldexp(1 + sub / SUB_BUCKETS, exponent)
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Histogram:
+    def __init__(self, bounds=None):
+        """
+        Args:
+            bounds (tuple): Fixed, sorted upper bounds. If omitted, values are
+                placed in log buckets that cover any range with bounded
+                relative error.
+        """
+        self.bounds = bounds
+        self.counts = {}
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        if self.bounds is not None:
+            index = bisect.bisect_left(self.bounds, value)
+        else:
+            index = _bucket_index(value)
+        with self._lock:
+            self.counts[index] = self.counts.get(index, 0) + 1
+            self.count += 1
+            self.sum += value
+
+    def snapshot(self):
+        """Return (count, sum, [(upper_bound, cumulative_count), ...]) under the lock."""
+        with self._lock:
+            counts = dict(self.counts)
+            count, total = self.count, self.sum
+
+        buckets = []
+        cumulative = counts.pop(None, 0)  # zero/negative values sit below every bucket
+        for index in sorted(counts):
+            cumulative += counts[index]
+            if self.bounds is not None:
+                upper = self.bounds[index] if index < len(self.bounds) else math.inf
+            else:
+                upper = _bucket_upper(index)
+            buckets.append((upper, cumulative))
+        return count, total, buckets
+
+    def quantile(self, q):
+        """Approximate quantile, interpolated linearly inside its bucket."""
+        with self._lock:
+            counts = dict(self.counts)
+            count = self.count
+        if not count:
+            return 0.0
+
+        rank = q * count
+        cumulative = counts.pop(None, 0)
+        if cumulative >= rank:
+            return 0.0
+        for index in sorted(counts):
+            if self.bounds is not None:
+                lower = self.bounds[index - 1] if index > 0 else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else lower
+            else:
+                lower, upper = _bucket_lower(index), _bucket_upper(index)
+            if cumulative + counts[index] >= rank:
+                return lower + (upper - lower) * (rank - cumulative) / counts[index]
+            cumulative += counts[index]
+        return upper
+
+
+class _StageTimer:
+    """Context manager that records elapsed seconds into a histogram."""
+
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}   # (name, sorted labels) -> Counter/Histogram
+        self._fast = {}      # (name, labels in call order) -> same object, skips the sort
+        self._meta = {}      # name -> (type, help)
+        self._gauges = {}    # name -> (help, callback returning {labels: value})
+        self._lock = threading.Lock()
+
+    def _get(self, name, labels, factory, metric_type, help_text):
+        fast_key = (name, tuple(labels.items()))
+        metric = self._fast.get(fast_key)
+        if metric is not None:
+            return metric
+
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            metric = self._metrics.get(key)
+            if metric is None:
+                metric = factory()
+                self._metrics[key] = metric
+                self._meta.setdefault(name, (metric_type, help_text))
+            self._fast[fast_key] = metric
+        return metric
+
+    def counter(self, name, help_text='', **labels):
+        return self._get(name, labels, Counter, 'counter', help_text)
+
+    def histogram(self, name, help_text='', bounds=None, **labels):
+        return self._get(name, labels, lambda: Histogram(bounds), 'histogram', help_text)
+
+    def gauge(self, name, help_text, callback):
+        """
+        Register a gauge read at scrape time.
+
+        Args:
+            callback: Returns a number, or a dict of {labels_tuple: value}
+                where labels_tuple is a tuple of (key, value) pairs
+        """
+        self._gauges[name] = (help_text, callback)
+
+    def inc(self, name, amount=1, help_text='', **labels):
+        self.counter(name, help_text, **labels).inc(amount)
+
+    def observe(self, name, value, help_text='', **labels):
+        self.histogram(name, help_text, **labels).observe(value)
+
+    def time_stage(self, stage, **labels):
+        """Time a block as one stage of a turn: with metrics.time_stage('llm_call', ...):"""
+        return _StageTimer(self.histogram(
+            'turn_stage_seconds', 'Time spent in each stage of a conversation turn',
+            stage=stage, **labels
+        ))
+
+    def observe_stages(self, stages, **labels):
+        """Record a {stage: seconds} dict collected by a use case."""
+        for stage, seconds in stages.items():
+            self.histogram(
+                'turn_stage_seconds', 'Time spent in each stage of a conversation turn',
+                stage=stage, **labels
+            ).observe(seconds)
+
+    def reset(self):
+        with self._lock:
+            self._metrics.clear()
+            self._fast.clear()
+            self._meta.clear()
+
+    def render_prometheus(self):
+        """Render all metrics in the Prometheus text exposition format (0.0.4)."""
+        by_name = {}
+        for (name, labels), metric in list(self._metrics.items()):
+            by_name.setdefault(name, []).append((labels, metric))
+
+        lines = []
+        for name in sorted(by_name):
+            metric_type, help_text = self._meta[name]
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, metric in sorted(by_name[name], key=lambda item: item[0]):
+                if metric_type == 'counter':
+                    lines.append(f"{name}{_format_labels(labels)} {metric.value}")
+                    continue
+                count, total, buckets = metric.snapshot()
+                for upper, cumulative in buckets:
+                    if upper == math.inf:
+                        continue
+                    le = (('le', f"{upper:.6g}"),)
+                    lines.append(f"{name}_bucket{_format_labels(labels + le)} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {total:.9g}")
+                lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+        for name in sorted(self._gauges):
+            help_text, callback = self._gauges[name]
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            try:
+                value = callback()
+            except Exception as e:
+                print(f"Error reading gauge {name}: {e}")
+                continue
+            if isinstance(value, dict):
+                for labels, item in sorted(value.items()):
+                    lines.append(f"{name}{_format_labels(labels)} {item}")
+            else:
+                lines.append(f"{name} {value}")
+
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+# Process-wide registry used by the app and use cases
+metrics = MetricsRegistry()
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    print("Testing metrics.py\n")
+
+    registry = MetricsRegistry()
+    n = 200000
+
+    start = time.perf_counter()
+    for _ in range(n):
+        with registry.time_stage('llm_call', language='english', use_case='test_screening'):
+            pass
+    elapsed = time.perf_counter() - start
+    print(f"time_stage(): {elapsed / n * 1e6:.2f} us per timed stage")
+
+    start = time.perf_counter()
+    for _ in range(n):
+        registry.inc('voice_turns_total', language='english', use_case='test_screening', outcome='answered')
+    elapsed = time.perf_counter() - start
+    print(f"inc(): {elapsed / n * 1e6:.2f} us per increment")
+
+    histogram = Histogram()
+    for ms in range(1, 1001):
+        histogram.observe(ms / 1000)
+    print(f"p50={histogram.quantile(0.5):.3f}s p99={histogram.quantile(0.99):.3f}s (true 0.500s/0.990s)")
+
+    print()
+    print(registry.render_prometheus()[:600])
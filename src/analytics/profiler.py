@@ -0,0 +1,319 @@
+"""
+Sampling profiler and slow-request recorder.
+One daemon thread wakes every few milliseconds, reads every thread's Python
+stack with sys._current_frames() and folds it into collapsed-stack counts
+(the input format of flamegraph.pl and speedscope). It serves two purposes:
+an on-demand profile of the whole worker for N seconds, and stack samples for
+requests that have already been running for a while, kept (with their stage
+timings) in a bounded ring buffer when they end up slower than a threshold.
+Requests that finish quickly cost a dict insert and pop; the thread sleeps
+while nothing is running.
+"""
+
+import itertools
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+from .metrics import metrics
+
+# Innermost Python functions of a thread waiting on a lock, queue, socket or
+# select; 'cpu' profiles use them to drop idle samples where per-thread CPU
+# clocks are not available
+IDLE_FUNCTIONS = frozenset({
+    'wait', '_wait_for_tstate_lock', 'select', 'poll', 'accept', 'recv', 'recv_into', 'readinto', 'read'
+})
+
+MODES = ('wall', 'cpu')
+
+# Frames kept per stack, innermost first (deep recursion is cut at the root)
+MAX_DEPTH = 64
+
+_THREAD_NUMBER = re.compile(r'[-_]?\d+(?:_\d+)?$')
+
+
+def _frame_label(code):
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}:{code.co_name}"
+
+
+def collapse(frame):
+    """
+    Stack of a frame as 'outer;...;inner' labels (module:function).
+
+    Returns:
+        tuple: (collapsed stack, leaf function name)
+    """
+    labels = []
+    leaf = frame.f_code.co_name
+    while frame is not None and len(labels) < MAX_DEPTH:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return ';'.join(labels), leaf
+
+
+def render_collapsed(counts):
+    """Collapsed-stack text, one 'stack count' line per stack, heaviest first."""
+    return ''.join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+def _summary(record):
+    summary = {key: value for key, value in record.items() if key != 'samples'}
+    summary['sample_count'] = sum(record['samples'].values())
+    return summary
+
+
+def _thread_cpu_time(ident):
+    """CPU seconds a thread has used, or None where the platform cannot tell."""
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(ident))
+    except (AttributeError, OSError):
+        return None
+
+
+class _ActiveRequest:
+    __slots__ = ('endpoint', 'call_sid', 'started', 'wall_start', 'stages', 'samples')
+
+    def __init__(self, endpoint, call_sid):
+        self.endpoint = endpoint
+        self.call_sid = call_sid
+        self.started = time.perf_counter()
+        self.wall_start = time.time()
+        self.stages = None
+        self.samples = Counter()
+
+
+class RequestProfiler:
+    def __init__(self, slow_threshold=1.0, capacity=50, interval=0.01, sample_after=None,
+                 profile_interval=0.005, max_profile_seconds=60):
+        """
+        Args:
+            slow_threshold (float): Requests taking at least this many
+                seconds are kept in the ring buffer
+            capacity (int): Slow requests kept; the oldest are dropped
+            interval (float): Seconds between stack samples of a running request
+            sample_after (float): A request's stacks are sampled once it has
+                run this long (default: a quarter of slow_threshold), so fast
+                requests are never sampled
+            profile_interval (float): Seconds between samples of an on-demand profile
+            max_profile_seconds (float): Longest on-demand profile
+        """
+        self.slow_threshold = slow_threshold
+        self.interval = interval
+        self.sample_after = slow_threshold / 4 if sample_after is None else sample_after
+        self.profile_interval = profile_interval
+        self.max_profile_seconds = max_profile_seconds
+        self.slow = deque(maxlen=capacity)
+        self.active = {}  # thread id -> _ActiveRequest
+        self._ids = itertools.count(1)
+        self._profile = None  # {'mode', 'until', 'counts', 'samples'} while a profile runs
+        self._profile_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the sampling thread (per process: threads do not survive fork)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+            self._thread.start()
+
+    # Request hooks (called on the request's own thread)
+
+    def begin(self, endpoint, call_sid=None):
+        self.active[threading.get_ident()] = _ActiveRequest(endpoint, call_sid)
+        self._wake.set()
+
+    def annotate(self, stages=None, call_sid=None):
+        """Attach per-stage timings (seconds) and the call to the running request."""
+        current = self.active.get(threading.get_ident())
+        if current is None:
+            return
+        if stages is not None:
+            current.stages = dict(stages)
+        if call_sid is not None:
+            current.call_sid = call_sid
+
+    def end(self, status=None):
+        """
+        Finish the running request; keep it if it was slow.
+
+        Returns:
+            float or None: Request seconds, or None if begin() was not called
+        """
+        current = self.active.pop(threading.get_ident(), None)
+        if current is None:
+            return None
+        seconds = time.perf_counter() - current.started
+        if seconds >= self.slow_threshold:
+            self.slow.append({
+                'id': next(self._ids),
+                'endpoint': current.endpoint,
+                'call_sid': current.call_sid,
+                'status': status,
+                'started_at': current.wall_start,
+                'seconds': round(seconds, 4),
+                'stages': {stage: round(value, 4) for stage, value in (current.stages or {}).items()},
+                'sample_interval': self.interval,
+                'samples': current.samples
+            })
+            metrics.inc('slow_requests_total', help_text='Requests slower than the slow-request threshold',
+                        endpoint=current.endpoint)
+        return seconds
+
+    # Reading results
+
+    def slow_requests(self):
+        """Kept slow requests, newest first, without their stacks."""
+        return [_summary(record) for record in reversed(list(self.slow))]
+
+    def slow_request(self, request_id):
+        """One kept slow request with 'stacks' as collapsed-stack text, or None."""
+        for record in list(self.slow):
+            if record['id'] == request_id:
+                return dict(_summary(record), stacks=render_collapsed(record['samples']))
+        return None
+
+    def profile(self, seconds, mode='wall'):
+        """
+        Sample the worker for a number of seconds (blocks the caller).
+
+        Args:
+            seconds (float): Capped at max_profile_seconds
+            mode (str): 'wall' samples threads serving a request, waits
+                included; 'cpu' samples every thread, counting a sample only
+                if the thread used CPU since the previous tick
+
+        Returns:
+            dict: 'counts' (Counter of collapsed stacks), 'samples' (sampler
+                ticks), 'seconds' and 'cpu_seconds' (process CPU time used)
+
+        Raises:
+            ValueError: Unknown mode
+            RuntimeError: Another profile is running
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown profile mode: {mode}")
+        if not self._profile_lock.acquire(blocking=False):
+            raise RuntimeError('A profile is already running')
+        try:
+            seconds = min(max(float(seconds), 0.0), self.max_profile_seconds)
+            self.start()
+            session = {'mode': mode, 'until': time.perf_counter() + seconds, 'counts': Counter(), 'samples': 0,
+                       'cpu': {}, 'done': threading.Event()}
+            cpu_start = time.process_time()
+            self._profile = session
+            self._wake.set()
+            session['done'].wait(seconds + 5)
+            self._profile = None
+            return {'counts': session['counts'], 'samples': session['samples'], 'seconds': seconds,
+                    'cpu_seconds': round(time.process_time() - cpu_start, 4)}
+        finally:
+            self._profile_lock.release()
+
+    # Sampling thread
+
+    def _run(self):
+        own = threading.get_ident()
+        while True:
+            session = self._profile
+            if session is None and not self.active:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            now = time.perf_counter()
+            due = [(ident, request) for ident, request in list(self.active.items())
+                   if now - request.started >= self.sample_after]
+            if session is not None or due:
+                self._sample(own, now, session, due)
+            time.sleep(self.profile_interval if session is not None else self.interval)
+
+    def _sample(self, own, now, session, due):
+        frames = sys._current_frames()
+        for ident, request in due:
+            frame = frames.get(ident)
+            if frame is not None:
+                request.samples[collapse(frame)[0]] += 1
+
+        if session is None:
+            return
+        if now >= session['until']:
+            session['done'].set()
+            self._profile = None
+            return
+        session['samples'] += 1
+        if session['mode'] == 'wall':
+            for ident, request in list(self.active.items()):
+                frame = frames.get(ident)
+                if frame is not None:
+                    session['counts'][f"{request.endpoint};{collapse(frame)[0]}"] += 1
+            return
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in frames.items():
+            if ident == own:
+                continue
+            stack, leaf = collapse(frame)
+            cpu = _thread_cpu_time(ident)
+            if cpu is None:
+                if leaf in IDLE_FUNCTIONS:
+                    continue
+            else:
+                previous = session['cpu'].get(ident)
+                session['cpu'][ident] = cpu
+                if previous is None or cpu <= previous:
+                    continue
+            request = self.active.get(ident)
+            root = request.endpoint if request is not None else _THREAD_NUMBER.sub('', names.get(ident, 'thread'))
+            session['counts'][f"{root};{stack}"] += 1
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import hashlib
+
+    print("Testing profiler.py\n")
+    profiler = RequestProfiler(slow_threshold=0.2, interval=0.005)
+    profiler.start()
+
+    def hash_work(seconds):
+        data = b'x' * 4096
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            data = hashlib.sha256(data).digest() * 128
+
+    def handle(endpoint, busy, wait):
+        profiler.begin(endpoint, call_sid='CA123')
+        hash_work(busy)
+        time.sleep(wait)
+        profiler.annotate(stages={'knowledge_lookup': busy, 'llm_call': wait})
+        profiler.end(200)
+
+    # Overhead of the request hooks on a fast request
+    n = 20000
+    start = time.perf_counter()
+    for _ in range(n):
+        profiler.begin('voice_process')
+        profiler.end(200)
+    print(f"  begin + end: {(time.perf_counter() - start) / n * 1e6:.2f} us per request")
+
+    handle('voice_process', 0.01, 0.01)
+    handle('voice_process', 0.2, 0.3)
+    for record in profiler.slow_requests():
+        print(f"  slow: {record}")
+    detail = profiler.slow_request(profiler.slow_requests()[0]['id'])
+    print("  stacks:")
+    for line in detail['stacks'].splitlines()[:3]:
+        print(f"    {line}")
+
+    for mode in MODES:
+        # A request burning CPU for 0.3s, then waiting 0.3s
+        worker = threading.Thread(target=handle, args=('api_chat', 0.3, 0.3), name='request-1')
+        worker.start()
+        result = profiler.profile(0.5, mode)
+        worker.join()
+        print(f"\n  {mode} profile: {result['samples']} ticks, {result['cpu_seconds']}s CPU")
+        for stack, count in result['counts'].most_common(3):
+            print(f"    {stack} {count}")
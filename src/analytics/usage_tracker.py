@@ -0,0 +1,381 @@
+"""
+LLM token usage and cost accounting.
+Every model request's token counts and wall time are aggregated in memory per
+call, user, use case and language (plus a per-UTC-day total for budgets); a
+background thread appends the changes since the last flush to JSONL files.
+With share_days(), each flush also adds this worker's spend to the daily
+totals in the app database, so the per-day budget covers every worker and
+survives restarts.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from ..database import queries
+from .metrics import metrics
+
+# Token fields recorded per request and the pricing key each is billed at
+TOKEN_PRICES = (
+    ('input_tokens', 'input'),
+    ('output_tokens', 'output'),
+    ('cache_read_input_tokens', 'cache_read'),
+    ('cache_creation_input_tokens', 'cache_write')
+)
+
+DIMENSIONS = ('call', 'user', 'use_case', 'language')
+
+# Per-call and per-user entries are dropped after this long without a request
+# (their totals are already in the flushed files)
+IDLE_SECONDS = 3600
+
+# Days of totals kept for /api/usage
+DAYS_KEPT = 7
+
+
+class UsageTotals:
+    __slots__ = ('requests', 'errors', 'input_tokens', 'output_tokens', 'cache_read_input_tokens',
+                 'cache_creation_input_tokens', 'llm_seconds', 'cost_usd', 'last_seen')
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cache_read_input_tokens = 0
+        self.cache_creation_input_tokens = 0
+        self.llm_seconds = 0.0
+        self.cost_usd = 0.0
+        self.last_seen = 0.0
+
+    @property
+    def tokens(self):
+        """All tokens billed, the figure budgets are checked against."""
+        return self.input_tokens + self.output_tokens + self.cache_read_input_tokens + \
+            self.cache_creation_input_tokens
+
+    def add(self, request, cost, now):
+        self.requests += 1
+        self.errors += 1 if request.get('error') else 0
+        for field, _ in TOKEN_PRICES:
+            setattr(self, field, getattr(self, field) + request.get(field, 0))
+        self.llm_seconds += request.get('seconds', 0.0)
+        self.cost_usd += cost
+        self.last_seen = now
+
+    def to_dict(self):
+        totals = {name: getattr(self, name) for name in self.__slots__ if name != 'last_seen'}
+        totals['tokens'] = self.tokens
+        totals['llm_seconds'] = round(self.llm_seconds, 3)
+        totals['cost_usd'] = round(self.cost_usd, 6)
+        return totals
+
+
+def request_cost(request, pricing):
+    """USD cost of one request given prices per million tokens."""
+    return sum(request.get(field, 0) * pricing.get(key, 0) for field, key in TOKEN_PRICES) / 1e6
+
+
+class UsageTracker:
+    def __init__(self, log_dir='logs/usage', flush_interval=60.0, idle_seconds=IDLE_SECONDS):
+        """
+        Args:
+            log_dir (str): Directory for the daily usage-YYYYMMDD.jsonl files
+                (None keeps everything in memory only)
+            flush_interval (float): Seconds between background flushes
+            idle_seconds (float): Idle time after which call/user entries are dropped
+        """
+        self.log_dir = Path(log_dir) if log_dir else None
+        self.flush_interval = flush_interval
+        self.idle_seconds = idle_seconds
+
+        self._lock = threading.Lock()
+        self._totals = {dimension: {} for dimension in DIMENSIONS}
+        self._days = {}
+        self._pending = {}
+        self._db = None
+        self._unsynced = {}  # day -> [tokens, cost] not yet added to the shared totals
+        self._shared = {}  # day -> tokens used by every worker, as of the last sync
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.flushes = 0
+        self.write_errors = 0
+
+    def share_days(self, db):
+        """
+        Keep the per-day totals budgets are checked against in a database
+        shared by all workers (queries.add_day_usage).
+
+        Args:
+            db (Database): App database
+        """
+        self._db = db
+        return self
+
+    def start(self):
+        """Start the background flusher (idempotent)."""
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        if self._db is not None:
+            # Spend recorded before a restart or by other workers still counts
+            self.sync_days()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='usage-flusher', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+        return self
+
+    def close(self):
+        """Stop the flusher and write what is pending."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(5.0)
+            self._thread = None
+        self.flush()
+
+    def record(self, account, use_case, language, requests, pricing=None):
+        """
+        Add a turn's model requests to the aggregates.
+
+        Args:
+            account (dict): {'call': CallSid or chat id, 'user': phone or user id};
+                either may be missing
+            use_case (str): Use case that made the requests
+            language (str): Language of the turn
+            requests (list): turn_info['llm_requests'] entries from ToolUseLoop
+            pricing (dict): USD per million tokens by input/output/cache_read/cache_write
+        """
+        if not requests:
+            return
+        pricing = pricing or {}
+        account = account or {}
+        keys = {
+            'call': account.get('call'),
+            'user': account.get('user'),
+            'use_case': use_case,
+            'language': language
+        }
+        now = time.time()
+        day = time.strftime('%Y-%m-%d', time.gmtime(now))
+        costs = [request_cost(request, pricing) for request in requests]
+
+        with self._lock:
+            for dimension, key in keys.items():
+                if key is None:
+                    continue
+                totals = self._totals[dimension].get(key)
+                if totals is None:
+                    totals = self._totals[dimension][key] = UsageTotals()
+                pending = self._pending.get((day, dimension, key))
+                if pending is None:
+                    pending = self._pending[(day, dimension, key)] = UsageTotals()
+                for request, cost in zip(requests, costs):
+                    totals.add(request, cost, now)
+                    pending.add(request, cost, now)
+            totals = self._days.get(day)
+            if totals is None:
+                totals = self._days[day] = UsageTotals()
+            for request, cost in zip(requests, costs):
+                totals.add(request, cost, now)
+            if self._db is not None:
+                unsynced = self._unsynced.setdefault(day, [0, 0.0])
+                for request, cost in zip(requests, costs):
+                    unsynced[0] += sum(request.get(field, 0) for field, _ in TOKEN_PRICES)
+                    unsynced[1] += cost
+
+        for request, cost in zip(requests, costs):
+            for field, key in TOKEN_PRICES:
+                if request.get(field):
+                    metrics.inc('llm_tokens_total', request[field], 'Tokens used by model requests',
+                                type=key, use_case=use_case, language=language)
+            metrics.observe('llm_request_seconds', request.get('seconds', 0.0),
+                            'Wall time of model requests', use_case=use_case)
+            metrics.inc('llm_cost_usd_total', cost, 'Estimated model cost in USD', use_case=use_case)
+
+    def check(self, account, budgets):
+        """
+        Budget state for the next request.
+
+        Args:
+            account (dict): As passed to record()
+            budgets (dict): per_call_tokens and per_day_tokens limits (missing = unlimited)
+
+        Returns:
+            str or None: 'fallback' if today's total is over per_day_tokens,
+                'reduce' if the call (or user, for chat) is over
+                per_call_tokens, else None. With share_days() today's total
+                is every worker's, as of their last flush.
+        """
+        per_day = budgets.get('per_day_tokens')
+        per_call = budgets.get('per_call_tokens')
+        day = time.strftime('%Y-%m-%d', time.gmtime())
+        action = None
+
+        with self._lock:
+            if self._db is not None:
+                spent = self._shared.get(day, 0) + self._unsynced.get(day, (0,))[0]
+            else:
+                today = self._days.get(day)
+                spent = today.tokens if today is not None else 0
+            if per_day and spent >= per_day:
+                action = 'fallback'
+            elif per_call and account and account.get('call') is not None:
+                totals = self._totals['call'].get(account['call'])
+                if totals is not None and totals.tokens >= per_call:
+                    action = 'reduce'
+
+        if action:
+            metrics.inc('llm_budget_actions_total', help_text='Turns limited by a token budget', action=action)
+        return action
+
+    def snapshot(self, top=20, call=None, user=None):
+        """
+        Aggregates for an endpoint.
+
+        Args:
+            top (int): Largest call/user entries (by tokens) to include
+            call (str): Only this call's totals, if given
+            user (str): Only this user's totals, if given
+
+        Returns:
+            dict: {'days', 'use_case', 'language', 'call', 'user'} totals
+        """
+        with self._lock:
+            if call is not None or user is not None:
+                result = {}
+                if call is not None:
+                    totals = self._totals['call'].get(call)
+                    result['call'] = {call: totals.to_dict() if totals else None}
+                if user is not None:
+                    totals = self._totals['user'].get(user)
+                    result['user'] = {user: totals.to_dict() if totals else None}
+                return result
+
+            result = {
+                'days': {day: totals.to_dict() for day, totals in sorted(self._days.items())},
+                'use_case': {key: totals.to_dict() for key, totals in self._totals['use_case'].items()},
+                'language': {key: totals.to_dict() for key, totals in self._totals['language'].items()}
+            }
+            for dimension in ('call', 'user'):
+                entries = self._totals[dimension]
+                largest = sorted(entries.items(), key=lambda item: item[1].tokens, reverse=True)[:top]
+                result[dimension] = {key: totals.to_dict() for key, totals in largest}
+                result[f"{dimension}_count"] = len(entries)
+            return result
+
+    def sync_days(self):
+        """
+        Add this worker's usage since the last sync to the shared daily
+        totals and read back today's total across workers.
+
+        Returns:
+            dict: day -> tokens used by every worker, or None if the
+                database could not be written (the usage is kept for the
+                next sync)
+        """
+        today = time.strftime('%Y-%m-%d', time.gmtime())
+        with self._lock:
+            unsynced, self._unsynced = self._unsynced, {}
+        usage = {day: tuple(values) for day, values in unsynced.items()}
+        usage.setdefault(today, (0, 0.0))
+        try:
+            totals = queries.add_day_usage(self._db, usage)
+        except Exception as e:
+            with self._lock:
+                for day, (tokens, cost) in unsynced.items():
+                    values = self._unsynced.setdefault(day, [0, 0.0])
+                    values[0] += tokens
+                    values[1] += cost
+            self.write_errors += 1
+            print(f"Error saving daily usage: {e}")
+            return None
+        with self._lock:
+            self._shared.update(totals)
+            for day in sorted(self._shared)[:-DAYS_KEPT]:
+                del self._shared[day]
+        return totals
+
+    def flush(self):
+        """Append the changes since the last flush and drop idle call/user entries."""
+        if self._db is not None:
+            self.sync_days()
+        now = time.time()
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            for dimension in ('call', 'user'):
+                entries = self._totals[dimension]
+                for key in [key for key, totals in entries.items() if now - totals.last_seen > self.idle_seconds]:
+                    del entries[key]
+            for day in sorted(self._days)[:-DAYS_KEPT]:
+                del self._days[day]
+
+        if not pending or self.log_dir is None:
+            return 0
+
+        by_day = {}
+        for (day, dimension, key), totals in pending.items():
+            record = {'ts': round(now, 3), 'day': day, 'dimension': dimension, 'key': key}
+            record.update(totals.to_dict())
+            by_day.setdefault(day, []).append(json.dumps(record, ensure_ascii=False) + '\n')
+
+        try:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            for day, lines in by_day.items():
+                path = self.log_dir / f"usage-{day.replace('-', '')}.jsonl"
+                with open(path, 'a', encoding='utf-8') as f:
+                    f.writelines(lines)
+            self.flushes += 1
+        except Exception as e:
+            self.write_errors += 1
+            print(f"Error writing usage log: {e}")
+        return len(pending)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+
+usage_tracker = UsageTracker(
+    log_dir=os.getenv('USAGE_LOG_DIR', 'logs/usage'),
+    flush_interval=float(os.getenv('USAGE_FLUSH_INTERVAL', '60'))
+)
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import tempfile
+
+    print("Testing usage_tracker.py\n")
+
+    pricing = {'input': 3.0, 'output': 15.0, 'cache_read': 0.3, 'cache_write': 3.75}
+    budgets = {'per_call_tokens': 20000, 'per_day_tokens': 5000000}
+    requests = [
+        {'model': 'claude', 'seconds': 1.2, 'input_tokens': 900, 'output_tokens': 250,
+         'cache_read_input_tokens': 1200, 'cache_creation_input_tokens': 0},
+        {'model': 'claude', 'seconds': 0.8, 'input_tokens': 1100, 'output_tokens': 180,
+         'cache_read_input_tokens': 1200, 'cache_creation_input_tokens': 0}
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tracker = UsageTracker(log_dir=tmp)
+        n = 50000
+        start = time.perf_counter()
+        for i in range(n):
+            account = {'call': f"CA{i % 2000:032d}", 'user': f"+9198{i % 1500:08d}"}
+            tracker.check(account, budgets)
+            tracker.record(account, 'test_screening', 'english' if i % 3 else 'hindi', requests, pricing)
+        elapsed = time.perf_counter() - start
+        print(f"check() + record(): {elapsed / n * 1e6:.2f} us/turn over {n} turns")
+
+        start = time.perf_counter()
+        written = tracker.flush()
+        print(f"flush(): {written} entries in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        snapshot = tracker.snapshot(top=3)
+        print(f"Today: {list(snapshot['days'].values())[-1]}")
+        print(f"By language: { {k: v['tokens'] for k, v in snapshot['language'].items()} }")
+        print(f"Budget for a heavy call: {tracker.check({'call': 'CA' + '0' * 32}, budgets)}")
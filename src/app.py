@@ -6,8 +6,14 @@ Main API endpoints for testing and voice integration
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
+import functools
+import gc
+import hmac
 import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Add project root to path for imports
@@ -15,7 +21,25 @@ project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 from src.use_cases.test_screening import TestScreeningUseCase
+from src.demo.demo_handler import cassette_from_env
+from src.llm.admission import AdmissionController
+from src.llm.claude_client import circuit_breakers, OPEN
+from src.conversation.dialogue_manager import DialogueManager, PartialTurns, ANSWER_ACTIONS
+from src.conversation.response_generator import SharedAnswers, SpeculativeResponder
 from src.voice.twilio_handler import TwilioVoiceHandler
+from src.integrations.twilio_webhooks import WebhookDeduplicator, request_key
+from src.integrations.twilio_client import CallCheckpoint, FINAL_CALL_STATUSES, record_status_callback
+from src.voice.call_session import SessionCodec
+from src.analytics.call_logger import CallLogger
+from src.analytics.usage_tracker import usage_tracker
+from src.analytics.metrics import metrics, CONFIDENCE_BUCKETS, COUNT_BUCKETS
+from src.analytics.profiler import RequestProfiler, MODES, render_collapsed
+from src.database.init_db import Database, init_db
+from src.database import queries
+from src.database.models import current_week
+from src.knowledge.risk_assessment import get_escalation_message, DANGER_SIGNS
+from src.knowledge.facility_finder import load_facilities
+from src.utils.config import config_store
 from twilio.twiml.voice_response import VoiceResponse
 
 # Load environment variables
@@ -27,20 +51,373 @@ CORS(app)
 
 # Initialize use cases and handlers
 test_screening = TestScreeningUseCase()
+# LLM_CASSETTE records or replays Claude answers (offline demos and benchmarks)
+test_screening.client = cassette_from_env(test_screening.client)
+# Bounded model concurrency per worker; turns that cannot get a slot within
+# LLM_MAX_QUEUE_WAIT_MS get a cached or fallback answer instead of timing out
+admission = None
+if os.getenv('ADMISSION_ENABLED', 'true').lower() == 'true':
+    admission = AdmissionController(
+        max_concurrent=int(os.getenv('LLM_MAX_CONCURRENT', 8)),
+        max_queue=int(os.getenv('LLM_MAX_QUEUE', 32)),
+        max_wait=float(os.getenv('LLM_MAX_QUEUE_WAIT_MS', 2000)) / 1000,
+        per_caller=int(os.getenv('LLM_PER_CALLER', 1))
+    )
+    test_screening.admission = admission
 twilio_voice = TwilioVoiceHandler()
 
-# In-memory context storage (for demo - use database in production)
+# Likely follow-up answers are pre-generated while Twilio plays the current
+# one; SPECULATION_TOKEN_BUDGET caps the extra spend per call
+speculator = None
+if os.getenv('SPECULATION_ENABLED', 'true').lower() == 'true':
+    speculator = SpeculativeResponder(
+        test_screening,
+        max_workers=int(os.getenv('SPECULATION_WORKERS', 2)),
+        per_turn=int(os.getenv('SPECULATION_PER_TURN', 2)),
+        token_budget=int(os.getenv('SPECULATION_TOKEN_BUDGET', 4000))
+    )
+
+# Per-call state machine that runs the pre-LLM stages and decides each turn's action
+dialogue_manager = DialogueManager(test_screening, speculator=speculator)
+
+# Work started from Twilio's partial transcripts, reused by /voice/process
+partial_turns = PartialTurns(dialogue_manager, ttl=float(os.getenv('PARTIAL_RESULT_TTL', 30)))
+
+# Twilio retries of a slow /voice/process (and replayed requests) get the
+# first request's TwiML instead of a second model call; 0 turns this off
+webhook_ttl = float(os.getenv('WEBHOOK_DEDUPE_TTL', 60))
+webhook_dedupe = WebhookDeduplicator(ttl=webhook_ttl) if webhook_ttl > 0 else None
+
+# CALL_SESSION_TOKENS=true: call state travels in signed tokens in the TwiML
+# callback URLs, so any worker on any node can serve any turn
+session_codec = SessionCodec.from_env()
+
+# Stack samples and stage timings of requests slower than
+# SLOW_REQUEST_THRESHOLD_MS, plus on-demand profiles (see /admin/*)
+request_profiler = None
+if os.getenv('PROFILER_ENABLED', 'true').lower() == 'true':
+    request_profiler = RequestProfiler(
+        slow_threshold=float(os.getenv('SLOW_REQUEST_THRESHOLD_MS', 2000)) / 1000,
+        capacity=int(os.getenv('SLOW_REQUEST_CAPACITY', 50)),
+        interval=float(os.getenv('PROFILER_INTERVAL_MS', 10)) / 1000
+    )
+
+# Bearer token for the /admin/* endpoints; they are disabled (404) without one
+admin_token = os.getenv('ADMIN_TOKEN', '')
+
+# /api/chat/batch: items per request, and users answered at once per worker
+# (shared by all batches; the admission controller still bounds model calls)
+chat_batch_max_items = int(os.getenv('CHAT_BATCH_MAX_ITEMS', 100))
+chat_batch_concurrency = int(os.getenv('CHAT_BATCH_CONCURRENCY', 8))
+_chat_batch_executor = None
+_chat_batch_lock = threading.Lock()
+
+# Context fields a chat request may set
+CHAT_CONTEXT_FIELDS = ('pregnancy_week', 'language', 'name')
+# user_id of /api/chat requests that do not send one
+DEFAULT_USER_ID = 'default_user'
+
+# voice_turns_total outcome for each dialogue action
+TURN_OUTCOMES = {
+    'answer': 'answered',
+    'answer_pending': 'answered',
+    'ask_week': 'ask_week',
+    'prompt': 'prompt',
+    'close': 'closed'
+}
+
+# Per-turn analytics, written off the request path by a background thread
+call_logger = CallLogger(
+    log_dir=os.getenv('CALL_LOG_DIR', 'logs/calls'),
+    max_queue_size=int(os.getenv('CALL_LOG_QUEUE_SIZE', 10000))
+)
+
+# Escalation TwiML is rendered once at startup, so a danger-sign turn only
+# costs the detector and a dict lookup. The greeting and "please repeat"
+# prompts do not vary per call either. Their callback URLs carry the turn
+# number (see twilio_webhooks), so each is rendered for the first
+# PRERENDERED_TURNS turns; later turns are rendered on demand.
+PRERENDERED_TURNS = 10
+escalation_twiml = {
+    (category, language, turn): twilio_voice.escalation_response(
+        get_escalation_message(category, language), language, {'turn': turn}
+    )
+    for category in DANGER_SIGNS
+    for language in ('english', 'hindi')
+    for turn in range(1, PRERENDERED_TURNS + 1)
+}
+welcome_twiml = {language: twilio_voice.welcome_message(language, {'turn': 0}) for language in ('english', 'hindi')}
+repeat_twiml = {
+    (language, turn): twilio_voice._ask_to_repeat(language, {'turn': turn})
+    for language in ('english', 'hindi')
+    for turn in range(1, PRERENDERED_TURNS + 1)
+}
+
+metrics.gauge('config_version', 'Version of the loaded configuration snapshot', lambda: config_store.snapshot.version)
+
+if admission is not None:
+    metrics.gauge('llm_admission_in_flight', 'Model calls holding an admission slot', lambda: admission.in_flight)
+    metrics.gauge('llm_admission_queue_depth', 'Turns waiting for a model call slot', lambda: admission.queued)
+
+metrics.gauge('llm_circuit_state', 'Circuit breaker state (0 closed, 1 half-open, 2 open)', circuit_breakers.states)
+
+metrics.gauge(
+    'call_log_dropped_records', 'Turn records dropped because the call log queue was full',
+    lambda: call_logger.dropped
+)
+
+# User and call state is persisted in SQLite (DATABASE_PATH); the dicts
+# below are per-process caches in front of it
+db = init_db(Database())
+# The per-day token budget counts every worker's spend (see usage_tracker)
+usage_tracker.share_days(db)
 user_contexts = {}
 call_contexts = {}  # Track context per call
 
+# Checkpoint of the outbound reminder call dialer (CALL_CAMPAIGN_DB); opened
+# on the first status callback so each worker has its own connection
+_call_campaigns = None
+
+
+# ============================================================================
+# SERVER LIFECYCLE
+# ============================================================================
+# Under gunicorn (gunicorn.conf.py) the app is imported once in the master:
+# preload() loads the read-only data there so forked workers share it
+# copy-on-write; each worker then runs start_background_threads() and
+# warmup() after fork. The development server does the same in one process.
+
+# Set by gunicorn.conf.py: workers are forked from a preloaded master and
+# must not serve traffic until post_fork has run warmup()
+SERVER_PRELOAD = os.getenv('SERVER_PRELOAD', 'false').lower() == 'true'
+
+warmup_state = {'status': 'cold', 'seconds': None, 'steps': {}, 'errors': {}}
+_warmup_lock = threading.Lock()
+
+
+def start_background_threads():
+    """Start the config watcher and log writers. Threads do not survive fork(), so workers call this themselves."""
+    # Config, prompts and tool schemas are reloaded when their files change
+    if os.getenv('CONFIG_HOT_RELOAD', 'true').lower() == 'true':
+        config_store.start_watching()
+    # Per-turn analytics, written off the request path
+    if os.getenv('CALL_LOG_ENABLED', 'true').lower() == 'true':
+        call_logger.start()
+    # Token usage per call/user/use case/language (USAGE_LOG_DIR, USAGE_FLUSH_INTERVAL);
+    # budgets are in config.yaml
+    usage_tracker.start()
+    # Samples stacks of slow requests and runs on-demand profiles
+    if request_profiler is not None:
+        request_profiler.start()
+
+
+def preload():
+    """
+    Load lazily-built read-only data in the server master before workers are
+    forked, then move everything allocated so far out of the garbage
+    collector's reach so collections in the workers do not write to (and
+    un-share) those pages.
+    """
+    load_facilities()
+    # Compiles the URL map and Flask's request machinery
+    with app.test_request_context('/health'):
+        app.url_map.bind('localhost').match('/voice/process', method='POST')
+    gc.collect()
+    gc.freeze()
+
+
+def warmup():
+    """
+    Per-process warmup, run after fork and before the process reports ready:
+    opens the Claude connection, starts the stage thread pools, opens
+    database connections and renders the per-turn TwiML once.
+
+    Returns:
+        dict: warmup_state ('status', total 'seconds', per-step 'steps'
+            timings and any step 'errors')
+    """
+    with _warmup_lock:
+        if warmup_state['status'] == 'ready':
+            return warmup_state
+        warmup_state['status'] = 'warming'
+
+    def llm_connection():
+        # Cassette clients wrap the real one (or none, when replaying)
+        client = getattr(test_screening.client, 'client', test_screening.client)
+        if client is not None and hasattr(client, 'models') and os.getenv('ANTHROPIC_API_KEY'):
+            client.models.list(limit=1)
+
+    def dialogue():
+        # Without a pregnancy week the turn ends at ask_week, before any model call
+        for text, language in (("What tests do I need?", 'english'),
+                               ("मुझे कौन से टेस्ट करवाने चाहिए?", 'hindi')):
+            dialogue_manager.handle_turn(text, {'language': language, 'pregnancy_week': None, 'messages': []},
+                                         turn_info={})
+            test_screening.prepare({'language': language, 'pregnancy_week': 20})
+
+    def database():
+        db.prewarm(int(os.getenv('DB_PREWARM_CONNECTIONS', 4)))
+
+    def twiml():
+        for language in ('english', 'hindi'):
+            twilio_voice.generate_response("Warmup.", language)
+
+    def requests():
+        # Read-only requests through the whole WSGI stack (form parsing,
+        # routing, CORS, JSON and the call lookup) touch the code and data
+        # pages a real webhook will, so the first caller does not pay for them
+        client = app.test_client()
+        client.get('/api/test')
+        client.post('/voice/partial', data={'CallSid': 'warmup', 'UnstableSpeechResult': 'warmup'})
+
+    start = time.perf_counter()
+    for name, step in (('llm_connection', llm_connection), ('dialogue', dialogue),
+                       ('database', database), ('twiml', twiml), ('requests', requests)):
+        step_start = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            # A failed step leaves that path cold but must not keep the worker out of rotation
+            warmup_state['errors'][name] = str(e)
+            print(f"Error during warmup step {name}: {e}")
+        warmup_state['steps'][name] = round(time.perf_counter() - step_start, 4)
+    warmup_state['seconds'] = round(time.perf_counter() - start, 4)
+    warmup_state['status'] = 'ready'
+    return warmup_state
+
+
+def post_fork():
+    """Worker side of a preloading server: fresh DB handles, own threads, then warmup."""
+    db.after_fork()
+    start_background_threads()
+    warmup_state['status'] = 'warming'
+    threading.Thread(target=warmup, name='warmup', daemon=True).start()
+
+
+# Without a preloading server (dev server, scripts, tests) the threads start on import
+if not SERVER_PRELOAD:
+    start_background_threads()
+
+
+def _load_user(user_id):
+    """Cached context for a user, loading it from the database on first use."""
+    if user_id not in user_contexts:
+        context = queries.get_user_context(db, user_id)
+        if context is not None:
+            user_contexts[user_id] = context
+    context = user_contexts.get(user_id)
+    if context is not None and context.get('lmp_date'):
+        # The week moves on while the context sits in the cache
+        context['pregnancy_week'] = current_week(context['lmp_date'])
+    return context
+
+
+def _load_call(call_sid):
+    """Cached context for a call, rebuilt from the database after a restart."""
+    if call_sid not in call_contexts:
+        call = queries.get_call(db, call_sid)
+        if call is None:
+            return None
+        known = (_load_user(call['phone']) if call['phone'] else None) or {}
+        call_contexts[call_sid] = {
+            'pregnancy_week': known.get('pregnancy_week'),
+            'language': call['language'],
+            'name': known.get('name', 'there'),
+            'phone': call['phone'],
+            'messages': queries.get_call_messages(db, call_sid)
+        }
+        call_contexts[call_sid]['turns'] = len(call_contexts[call_sid]['messages']) // 2
+    return call_contexts[call_sid]
+
+
+def _caller_number():
+    """
+    The user's number on a voice webhook. Reminder calls are placed by us
+    (see twilio_client), so on outbound calls the user is the number called.
+    """
+    outbound = request.values.get('Direction', '').startswith('outbound')
+    return request.values.get('To' if outbound else 'From')
+
+
+def _call_context(call_sid):
+    """
+    Context for a voice webhook: decoded from the session token in the URL
+    when tokens are on, else (or if the token is missing or invalid) this
+    worker's cached or stored context.
+    """
+    token = request.args.get('s') if session_codec is not None else None
+    if token:
+        context = session_codec.decode(call_sid, token)
+        if context is not None:
+            context['phone'] = _caller_number()
+            context['messages'] = []
+            return context
+        app.logger.warning(f"Invalid session token for call {call_sid}")
+    return _load_call(call_sid)
+
+
+def _callback_query(call_sid, context):
+    """
+    Parameters for the URLs the next TwiML sends Twilio to: the turn number
+    (see twilio_webhooks) and, with session tokens on, the call's token.
+    """
+    query = {'turn': context.get('turns', 0)}
+    if session_codec is not None:
+        query['s'] = session_codec.encode(call_sid, context)
+    return query
+
+
+def _remember_week(phone, week, language):
+    """Save a pregnancy week a caller told us, so their next call does not ask again."""
+    user = _load_user(phone) or user_contexts.setdefault(phone, {'language': language, 'name': None})
+    user['pregnancy_week'] = week
+    queries.save_user(db, phone, user)
+
+
+@app.before_request
+def _begin_request():
+    if request_profiler is not None and not request.path.startswith('/admin/'):
+        request_profiler.begin(request.endpoint or request.path, request.values.get('CallSid'))
+
+
+@app.after_request
+def _end_request(response):
+    if request_profiler is not None:
+        request_profiler.end(response.status_code)
+    return response
+
+
+@app.teardown_request
+def _teardown_request(exc):
+    # after_request is skipped when a view raises
+    if request_profiler is not None:
+        request_profiler.end(500)
+
 
 @app.route('/health', methods=['GET'])
 def health():
-    """Health check endpoint."""
+    """
+    Health check endpoint; 503 while this worker is still warming up
+    (readiness), and under a preloading server until its warmup has
+    finished (a worker whose post_fork never ran stays 'cold'); 'degraded'
+    while a Claude circuit breaker is open (the worker still answers, from
+    cache and fallbacks).
+    """
+    status = warmup_state['status']
+    if status == 'warming' or (SERVER_PRELOAD and status != 'ready'):
+        return jsonify({
+            'status': 'warming_up' if status == 'warming' else status,
+            'service': 'voice_chatbot_india',
+            'version': '1.0.0'
+        }), 503
+    breakers = circuit_breakers.snapshot()
+    degraded = any(breaker['state'] == OPEN for breaker in breakers.values())
     return jsonify({
-        'status': 'healthy',
+        'status': 'degraded' if degraded else 'healthy',
         'service': 'voice_chatbot_india',
-        'version': '1.0.0'
+        'version': '1.0.0',
+        'warmup': warmup_state,
+        'circuit_breakers': breakers
     })
 
 
@@ -58,6 +435,7 @@ def chat():
         "name": "Priya"         # optional
     }
     """
+    start_time = time.perf_counter()
     try:
         data = request.json
         
@@ -67,48 +445,208 @@ def chat():
                 'error': 'Missing required field: message'
             }), 400
         
-        user_message = data['message']
-        user_id = data.get('user_id', 'default_user')
+        user_id = data.get('user_id', DEFAULT_USER_ID)
+        body, changed, turn_info = _chat_turn(user_id, data, start_time)
         
-        # Get or create user context
-        if user_id not in user_contexts:
-            user_contexts[user_id] = {
-                'pregnancy_week': data.get('pregnancy_week'),
-                'language': data.get('language', 'english'),
-                'name': data.get('name', 'there')
-            }
-        else:
-            # Update context with any new info
-            if 'pregnancy_week' in data:
-                user_contexts[user_id]['pregnancy_week'] = data['pregnancy_week']
-            if 'language' in data:
-                user_contexts[user_id]['language'] = data['language']
-            if 'name' in data:
-                user_contexts[user_id]['name'] = data['name']
+        if changed:
+            queries.save_user(db, user_id, user_contexts[user_id])
+        if request_profiler is not None:
+            request_profiler.annotate(stages=turn_info.get('stages'), call_sid=user_id)
+        return jsonify(body)
+        
+    except Exception as e:
+        app.logger.error(f"Error in /api/chat: {str(e)}")
+        return jsonify({
+            'error': 'An error occurred processing your request',
+            'details': str(e)
+        }), 500
+
+
+@app.route('/api/chat/batch', methods=['POST'])
+def chat_batch():
+    """
+    Many chat messages in one request, for partner integrations (WhatsApp,
+    IVR) that forward messages in bulk.
+    
+    Request body:
+    {
+        "items": [
+            {"user_id": "user123", "message": "What is the GTT?", "context": {"pregnancy_week": 24}},
+            {"user_id": "user456", "message": "क्या एचआईवी जांच ज़रूरी है?", "context": {"language": "hindi"}}
+        ]
+    }
+    
+    Each item is an /api/chat body; pregnancy_week, language and name may
+    also be given under "context". A user's items run in order, different
+    users' items concurrently (CHAT_BATCH_CONCURRENCY per worker), and items
+    that would send the model the same prompt share one answer.
+    
+    Returns:
+        {"results": [...]} in item order: the /api/chat response body, or
+        {"error", "status"} for an item that failed
+    """
+    start_time = time.perf_counter()
+    try:
+        data = request.json
+        items = data.get('items') if isinstance(data, dict) else None
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'Missing required field: items'}), 400
+        if len(items) > chat_batch_max_items:
+            return jsonify({'error': f"At most {chat_batch_max_items} items per batch"}), 400
+        
+        results = [None] * len(items)
+        groups = {}  # user_id -> [(index, fields)], in item order
+        for index, item in enumerate(items):
+            fields = _batch_item_fields(item)
+            if fields is None:
+                results[index] = {'error': 'Missing required field: message', 'status': 400}
+                continue
+            groups.setdefault(fields.get('user_id', DEFAULT_USER_ID), []).append((index, fields))
+        
+        # One database read for every user not cached yet
+        unknown = [user_id for user_id in groups if user_id not in user_contexts]
+        if unknown:
+            user_contexts.update(queries.get_user_contexts(db, unknown))
         
-        context = user_contexts[user_id]
+        shared_answers = SharedAnswers()
+        changed = set()
         
-        # Determine which use case to handle (for now just test_screening)
-        # TODO: Add intent classification
-        use_case = test_screening
+        def run_user(user_id, entries):
+            for index, fields in entries:
+                item_start = time.perf_counter()
+                try:
+                    body, item_changed, _ = _chat_turn(user_id, fields, item_start, loaded=True,
+                                                       shared_answers=shared_answers)
+                    # Later items of the same user keep changing the context
+                    body['context'] = dict(body['context'])
+                    results[index] = body
+                    if item_changed:
+                        changed.add(user_id)
+                except Exception as e:
+                    app.logger.error(f"Error in /api/chat/batch item {index}: {str(e)}")
+                    results[index] = {'error': 'An error occurred processing this item', 'details': str(e),
+                                      'status': 500}
         
-        # Get response
-        response = use_case.handle(user_message, context)
+        pool = _chat_batch_pool()
+        for future in [pool.submit(run_user, user_id, entries) for user_id, entries in groups.items()]:
+            future.result()
         
+        # One database write for every context the batch changed
+        if changed:
+            queries.save_users(db, {user_id: user_contexts[user_id] for user_id in changed})
+        
+        failed = sum(1 for result in results if 'error' in result)
+        seconds = time.perf_counter() - start_time
+        for outcome, count in (('ok', len(items) - failed), ('error', failed)):
+            if count:
+                metrics.inc('chat_batch_items_total', count, help_text='Chat batch items, by outcome', outcome=outcome)
+        metrics.observe('chat_batch_seconds', seconds, 'Time to answer a chat batch')
         return jsonify({
-            'response': response,
-            'context': context,
-            'user_id': user_id
+            'results': results,
+            'items': len(items),
+            'failed': failed,
+            'shared_answers': shared_answers.shared,
+            'seconds': round(seconds, 4)
         })
         
     except Exception as e:
-        app.logger.error(f"Error in /api/chat: {str(e)}")
+        app.logger.error(f"Error in /api/chat/batch: {str(e)}")
         return jsonify({
             'error': 'An error occurred processing your request',
             'details': str(e)
         }), 500
 
 
+def _batch_item_fields(item):
+    """An /api/chat body for a batch item ("context" merged in), or None if it has no message."""
+    if not isinstance(item, dict) or 'message' not in item:
+        return None
+    context = item.get('context')
+    fields = dict(context) if isinstance(context, dict) else {}
+    fields.update((key, value) for key, value in item.items() if key != 'context')
+    return fields
+
+
+def _chat_batch_pool():
+    """Worker threads for /api/chat/batch (created on first use, after fork)."""
+    global _chat_batch_executor
+    with _chat_batch_lock:
+        if _chat_batch_executor is None:
+            _chat_batch_executor = ThreadPoolExecutor(max_workers=chat_batch_concurrency,
+                                                      thread_name_prefix='chat-batch')
+    return _chat_batch_executor
+
+
+def _chat_context(user_id, data, loaded=False):
+    """
+    A chat user's cached context, created or updated from request fields.
+    
+    Args:
+        user_id (str): Chat user id
+        data (dict): Request body (pregnancy_week, language and name are applied)
+        loaded (bool): The caller already looked the user up in the database
+    
+    Returns:
+        tuple: (context, True if the user is new)
+    """
+    created = (user_contexts.get(user_id) if loaded else _load_user(user_id)) is None
+    if created:
+        user_contexts[user_id] = {
+            'pregnancy_week': data.get('pregnancy_week'),
+            'language': data.get('language', 'english'),
+            'name': data.get('name', 'there')
+        }
+    else:
+        # Update context with any new info
+        for field in CHAT_CONTEXT_FIELDS:
+            if field in data:
+                user_contexts[user_id][field] = data[field]
+    return user_contexts[user_id], created
+
+
+def _chat_turn(user_id, data, start_time, loaded=False, shared_answers=None):
+    """
+    Answer one chat message (an /api/chat body) and log the turn.
+    
+    Returns:
+        tuple: (response body, True if the user's context must be saved, turn_info)
+    """
+    user_message = data['message']
+    context, created = _chat_context(user_id, data, loaded)
+    
+    # The dialogue manager decides what to do with the message (answer,
+    # ask for the pregnancy week, escalate, close) and runs the use case
+    # Requests without a user_id come from different people: no per-call
+    # budget or per-caller admission limit is shared between them
+    call = user_id if user_id != DEFAULT_USER_ID else None
+    turn_info = {'account': {'call': call, 'user': user_id}}
+    if shared_answers is not None:
+        turn_info['shared_answers'] = shared_answers
+    result = dialogue_manager.handle_turn(
+        user_message, context, turn_info=turn_info, auto_language='language' not in data
+    )
+    
+    call_logger.log_turn(
+        user_id, user_message, None, result.use_case,
+        (time.perf_counter() - start_time) * 1000, turn_info['fallback'],
+        channel='chat', round_trips=turn_info.get('round_trips'),
+        danger_signs=result.danger_signs or None, state=result.state,
+        budget=turn_info.get('budget'), shed=turn_info.get('shed'), faq=turn_info.get('faq'),
+        shared_answer=turn_info.get('shared_answer')
+    )
+    
+    body = {
+        'response': result.text,
+        'context': context,
+        'user_id': user_id,
+        'state': result.state
+    }
+    if result.danger_signs:
+        body['danger_signs'] = result.danger_signs
+    changed = created or result.context_changed or any(field in data for field in CHAT_CONTEXT_FIELDS)
+    return body, changed, turn_info
+
+
 # ============================================================================
 # VOICE ENDPOINTS (Twilio Webhooks)
 # ============================================================================
@@ -122,18 +660,28 @@ def voice_incoming():
     try:
         language = request.values.get('language', 'english')
         call_sid = request.values.get('CallSid', 'unknown')
-        
-        # Initialize context for this call
+        caller = _caller_number()
+
+        # Initialize context for this call, seeded from the caller's
+        # registered context (keyed by phone number) when we have one
+        known = (_load_user(caller) if caller else None) or {}
         call_contexts[call_sid] = {
-            'pregnancy_week': None,  # Will ask user or default to 20
+            'pregnancy_week': known.get('pregnancy_week'),  # Will ask user if unknown
             'language': language,
-            'name': 'there',
-            'messages': []
+            'name': known.get('name', 'there'),
+            'phone': caller,
+            'messages': [],
+            'turns': 0
         }
+        queries.start_call(db, call_sid, caller, language)
         
         app.logger.info(f"Incoming call: {call_sid}, language: {language}")
         
-        return twilio_voice.welcome_message(language), 200, {'Content-Type': 'text/xml'}
+        if session_codec is not None:
+            twiml = twilio_voice.welcome_message(language, _callback_query(call_sid, call_contexts[call_sid]))
+        else:
+            twiml = welcome_twiml.get(language) or twilio_voice.welcome_message(language, {'turn': 0})
+        return twiml, 200, {'Content-Type': 'text/xml'}
         
     except Exception as e:
         app.logger.error(f"Error in /voice/incoming: {str(e)}")
@@ -144,56 +692,238 @@ def voice_incoming():
 def voice_process():
     """
     Process speech input from user.
-    Called after user speaks in response to prompts.
+    Called after user speaks in response to prompts. Duplicate deliveries of
+    the same turn are answered once (see twilio_webhooks).
     """
+    if webhook_dedupe is None:
+        return _process_speech()
+    return webhook_dedupe.run(request_key(request.values), _process_speech)
+
+
+def _process_speech():
+    """Answer one speech turn (the body of /voice/process)."""
+    start_time = time.perf_counter()
     try:
         speech_result = request.values.get('SpeechResult', '')
         confidence = float(request.values.get('Confidence', 0))
         call_sid = request.values.get('CallSid', 'unknown')
         
-        app.logger.info(f"Speech received: '{speech_result}' (confidence: {confidence})")
-        
         # Get or create context for this call
-        if call_sid not in call_contexts:
-            call_contexts[call_sid] = {
+        stage_start = time.perf_counter()
+        context = _call_context(call_sid)
+        if context is None:
+            context = call_contexts[call_sid] = {
                 'pregnancy_week': 20,  # Default
                 'language': 'english',
                 'name': 'there',
-                'messages': []
+                'messages': [],
+                'turns': 0
             }
         
-        context = call_contexts[call_sid]
         language = context['language']
+        context_seconds = time.perf_counter() - stage_start
+        
+        # Danger signs are checked before anything else (whatever the
+        # recognition confidence) and answered with pre-rendered TwiML
+        turn_info = {'account': {'call': call_sid, 'user': context.get('phone')}}
+        pending_question = context.get('pending_question')
+        result = dialogue_manager.handle_turn(
+            speech_result, context, confidence, turn_info,
+            session_id=call_sid, partial=partial_turns.take(call_sid)
+        )
+        if result.action == 'escalate':
+            return _escalate(call_sid, context, speech_result, confidence, result, start_time)
+        
+        app.logger.info(f"Speech received: '{speech_result}' (confidence: {confidence})")
+        
+        metrics.observe(
+            'stt_confidence', confidence, 'Twilio speech recognition confidence',
+            bounds=CONFIDENCE_BUCKETS, language=language
+        )
         
-        if not speech_result or confidence < 0.5:
-            # Low confidence or no speech
-            return twilio_voice._ask_to_repeat(language), 200, {'Content-Type': 'text/xml'}
+        if result.action == 'repeat':
+            # Low confidence or no speech. The repeat is a turn of its own, so
+            # the caller saying the same words again is not taken for a retry
+            context['turns'] = context.get('turns', 0) + 1
+            latency = time.perf_counter() - start_time
+            _record_voice_turn(language, 'repeat', 'repeat', latency)
+            call_logger.log_turn(
+                call_sid, speech_result, confidence, 'repeat',
+                latency * 1000, False,
+                channel='voice', language=language
+            )
+            if session_codec is not None:
+                twiml = twilio_voice._ask_to_repeat(language, _callback_query(call_sid, context))
+            else:
+                twiml = repeat_twiml.get((language, context['turns'])) or \
+                    twilio_voice._ask_to_repeat(language, _callback_query(call_sid, context))
+            return twiml, 200, {'Content-Type': 'text/xml'}
+        
+        chatbot_response = result.text
         
         # Add to conversation history
         context['messages'].append({
             'role': 'user',
             'content': speech_result
         })
-        
-        # Get chatbot response using test screening use case
-        chatbot_response = test_screening.handle(speech_result, context)
-        
-        # Add to conversation history
         context['messages'].append({
             'role': 'assistant',
             'content': chatbot_response
         })
+        context['turns'] = context.get('turns', 0) + 1
+        if result.action in ANSWER_ACTIONS:
+            # What the caller last asked about (carried in session tokens)
+            context['summary'] = pending_question if result.action == 'answer_pending' and pending_question \
+                else speech_result
+        queries.add_turns(db, call_sid, [
+            ('user', speech_result, confidence),
+            ('assistant', chatbot_response, None)
+        ])
+        if result.context_changed and context.get('phone'):
+            _remember_week(context['phone'], context['pregnancy_week'], language)
+        
+        app.logger.info(f"Chatbot response ({result.action}): {chatbot_response[:100]}...")
         
-        app.logger.info(f"Chatbot response: {chatbot_response[:100]}...")
+        stage_start = time.perf_counter()
+        # The turn number in the next callback URLs keeps a caller who repeats
+        # themselves word for word from looking like a Twilio retry
+        query = _callback_query(call_sid, context)
+        if result.action in ANSWER_ACTIONS:
+            twiml = twilio_voice.generate_response(chatbot_response, language, query=query)
+        elif result.action == 'close':
+            queries.end_call(db, call_sid)
+            twiml = twilio_voice.goodbye(chatbot_response, language)
+        else:
+            twiml = twilio_voice.ask(chatbot_response, language, query=query)
         
-        return twilio_voice.generate_response(chatbot_response, language), 200, {'Content-Type': 'text/xml'}
+        stages = turn_info['stages']
+        stages['context_fetch'] = context_seconds
+        stages['twiml_generation'] = time.perf_counter() - stage_start
+        latency = time.perf_counter() - start_time
+        
+        metrics.observe_stages(stages, language=language, use_case=result.use_case)
+        if request_profiler is not None:
+            request_profiler.annotate(stages=stages)
+        if 'partial_reuse' in turn_info:
+            metrics.inc(
+                'partial_reuse_total', help_text='Turns by how much partial-transcript work was reused',
+                reuse=turn_info['partial_reuse']
+            )
+        if 'round_trips' in turn_info:
+            metrics.observe(
+                'llm_round_trips', turn_info['round_trips'], 'Model calls needed to answer a turn',
+                bounds=COUNT_BUCKETS, use_case=result.use_case
+            )
+        _record_voice_turn(
+            language, result.use_case,
+            'fallback' if turn_info['fallback'] else TURN_OUTCOMES[result.action], latency
+        )
+        call_logger.log_turn(
+            call_sid, speech_result, confidence, result.use_case,
+            latency * 1000, turn_info['fallback'],
+            channel='voice', language=language, round_trips=turn_info.get('round_trips'),
+            state=result.state, speculative=turn_info.get('speculative_hit', False),
+            budget=turn_info.get('budget'), shed=turn_info.get('shed'), faq=turn_info.get('faq')
+        )
+        
+        return twiml, 200, {'Content-Type': 'text/xml'}
         
     except Exception as e:
         app.logger.error(f"Error in /voice/process: {str(e)}")
         language = call_contexts.get(call_sid, {}).get('language', 'english')
+        _record_voice_turn(language, test_screening.name, 'error', time.perf_counter() - start_time)
         return twilio_voice.handle_error(str(e), language), 200, {'Content-Type': 'text/xml'}
 
 
+@app.route('/voice/status', methods=['POST'])
+def voice_status():
+    """
+    Twilio StatusCallback: close the call record, drop the call's speculative
+    answers and partial transcripts and, for outbound reminder calls, tell
+    the campaign dialer how the call ended (it frees a live-call
+    slot and schedules retries of busy or unanswered numbers).
+    """
+    global _call_campaigns
+    try:
+        call_sid = request.values.get('CallSid', 'unknown')
+        call_status = request.values.get('CallStatus')
+        if call_status in FINAL_CALL_STATUSES:
+            queries.end_call(db, call_sid)
+            # Callers who hang up never reach /voice/continue
+            if speculator is not None:
+                speculator.discard(call_sid)
+            partial_turns.discard(call_sid)
+            if request.values.get('Direction', '').startswith('outbound'):
+                if _call_campaigns is None:
+                    _call_campaigns = CallCheckpoint()
+                record_status_callback(_call_campaigns, request.values)
+            metrics.inc('voice_call_endings_total', help_text='Calls ended, by Twilio call status and direction',
+                        status=call_status, direction=request.values.get('Direction', 'unknown'))
+    except Exception as e:
+        app.logger.error(f"Error in /voice/status: {str(e)}")
+    return '', 204
+
+
+@app.route('/voice/partial', methods=['POST'])
+def voice_partial():
+    """
+    Twilio partialResultCallback: run the pre-LLM stages on the transcript
+    so far, so /voice/process can reuse them when the final result arrives.
+    """
+    try:
+        call_sid = request.values.get('CallSid', 'unknown')
+        stable = request.values.get('StableSpeechResult', '').strip()
+        unstable = request.values.get('UnstableSpeechResult', '').strip()
+        # Unstable text is usually the full hypothesis; otherwise it extends the stable part
+        text = unstable if unstable.startswith(stable) else f"{stable} {unstable}".strip()
+        context = _call_context(call_sid)
+        if text and context is not None:
+            sequence = int(request.values.get('SequenceNumber', 0))
+            if partial_turns.update(call_sid, text, sequence, context):
+                metrics.inc('partial_results_total', help_text='Partial transcripts processed')
+    except Exception as e:
+        app.logger.error(f"Error in /voice/partial: {str(e)}")
+    return '', 204
+
+
+def _escalate(call_sid, context, speech_result, confidence, result, start_time):
+    """Answer a danger-sign turn with the pre-rendered escalation TwiML (per call with session tokens)."""
+    danger_signs = result.danger_signs
+    language = context['language']
+    latency = time.perf_counter() - start_time
+    
+    _record_voice_turn(language, 'danger_sign', 'escalated', latency)
+    call_logger.log_turn(
+        call_sid, speech_result, confidence, 'danger_sign',
+        latency * 1000, False,
+        channel='voice', language=language, danger_signs=danger_signs
+    )
+    app.logger.warning(f"Danger sign {danger_signs} on call {call_sid}: '{speech_result}'")
+    
+    context['messages'].append({'role': 'user', 'content': speech_result})
+    context['messages'].append({'role': 'assistant', 'content': result.text})
+    context['turns'] = context.get('turns', 0) + 1
+    queries.add_turns(db, call_sid, [('user', speech_result, confidence), ('assistant', result.text, None)])
+    twiml = escalation_twiml.get((danger_signs[0], language, context['turns'])) \
+        if session_codec is None else None
+    if twiml is None:
+        # Session tokens, a late turn or a language without pre-rendered TwiML
+        twiml = twilio_voice.escalation_response(result.text, language, _callback_query(call_sid, context))
+    return twiml, 200, {'Content-Type': 'text/xml'}
+
+
+def _record_voice_turn(language, use_case, outcome, latency):
+    """Count a finished voice turn and record its end-to-end latency."""
+    metrics.inc(
+        'voice_turns_total', help_text='Voice turns by outcome (answered, fallback, ask_week, prompt, closed, repeat, escalated, error)',
+        language=language, use_case=use_case, outcome=outcome
+    )
+    metrics.observe(
+        'voice_turn_seconds', latency, 'End-to-end server time for a voice turn',
+        language=language, use_case=use_case
+    )
+
+
 @app.route('/voice/language', methods=['POST', 'GET'])
 def voice_language():
     """
@@ -221,6 +951,7 @@ def voice_set_language():
         # Update call context
         if call_sid in call_contexts:
             call_contexts[call_sid]['language'] = language
+        queries.set_call_language(db, call_sid, language)
         
         app.logger.info(f"Language set to: {language} for call {call_sid}")
         
@@ -240,8 +971,12 @@ def voice_continue():
     """
     try:
         call_sid = request.values.get('CallSid', 'unknown')
-        context = call_contexts.get(call_sid, {'language': 'english'})
+        context = _call_context(call_sid) or {'language': 'english'}
         language = context['language']
+        queries.end_call(db, call_sid)
+        if speculator is not None:
+            speculator.discard(call_sid)
+        partial_turns.discard(call_sid)
         
         # For now, just end the call gracefully
         response = VoiceResponse()
@@ -270,10 +1005,10 @@ def manage_context():
     GET: Returns current context for user_id
     POST: Updates context for user_id
     """
-    user_id = request.args.get('user_id', 'default_user')
+    user_id = request.args.get('user_id', DEFAULT_USER_ID)
     
     if request.method == 'GET':
-        context = user_contexts.get(user_id, {})
+        context = _load_user(user_id) or {}
         return jsonify({
             'user_id': user_id,
             'context': context
@@ -285,10 +1020,11 @@ def manage_context():
             return jsonify({'error': 'No data provided'}), 400
         
         # Update or create context
-        if user_id not in user_contexts:
+        if _load_user(user_id) is None:
             user_contexts[user_id] = {}
         
         user_contexts[user_id].update(data)
+        queries.save_user(db, user_id, user_contexts[user_id])
         
         return jsonify({
             'user_id': user_id,
@@ -300,16 +1036,118 @@ def manage_context():
 @app.route('/api/context/reset', methods=['POST'])
 def reset_context():
     """Reset context for a user."""
-    user_id = request.args.get('user_id', 'default_user')
+    user_id = request.args.get('user_id', DEFAULT_USER_ID)
     
     if user_id in user_contexts:
         del user_contexts[user_id]
+    queries.delete_user(db, user_id)
     
     return jsonify({
         'message': f'Context reset for user {user_id}'
     })
 
 
+@app.route('/api/usage', methods=['GET'])
+def usage():
+    """
+    LLM token usage and estimated cost.
+    
+    Query params: call_sid or user_id for one call/user, otherwise totals per
+    day, use case and language plus the top call/user entries (top=20).
+    """
+    call_sid = request.args.get('call_sid')
+    user_id = request.args.get('user_id')
+    top = request.args.get('top', 20, type=int)
+    return jsonify({
+        'usage': usage_tracker.snapshot(top=top, call=call_sid, user=user_id),
+        'budgets': dict(config_store.snapshot.budgets)
+    })
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus scrape endpoint (per-stage latency, STT confidence, fallback rates)."""
+    return metrics.render_prometheus(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+
+# ============================================================================
+# ADMIN ENDPOINTS (Authorization: Bearer $ADMIN_TOKEN)
+# ============================================================================
+
+def admin_only(view):
+    """Serve a view only with the admin token; 404 while admin endpoints are disabled."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not admin_token or request_profiler is None:
+            return jsonify({'error': 'Not found'}), 404
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+        if not hmac.compare_digest(supplied.encode('utf-8'), admin_token.encode('utf-8')):
+            return jsonify({'error': 'Unauthorized'}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@app.route('/admin/profile', methods=['GET', 'POST'])
+@admin_only
+def admin_profile():
+    """
+    Profile this worker for a number of seconds and return collapsed stacks
+    (flamegraph.pl, speedscope). Blocks for the duration.
+    
+    Query params: seconds (default 10, at most 60), mode ('wall': request
+    threads including waits, 'cpu': threads while on CPU), format
+    ('collapsed' text or 'json').
+    """
+    mode = request.args.get('mode', 'wall')
+    if mode not in MODES:
+        return jsonify({'error': f"mode must be one of {', '.join(MODES)}"}), 400
+    try:
+        result = request_profiler.profile(request.args.get('seconds', 10, type=float), mode)
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+    stacks = render_collapsed(result['counts'])
+    if request.args.get('format') == 'json':
+        return jsonify({
+            'mode': mode,
+            'seconds': result['seconds'],
+            'samples': result['samples'],
+            'interval': request_profiler.profile_interval,
+            'cpu_seconds': result['cpu_seconds'],
+            'pid': os.getpid(),
+            'stacks': stacks
+        })
+    return stacks, 200, {
+        'Content-Type': 'text/plain; charset=utf-8',
+        'Content-Disposition': f'attachment; filename="profile-{mode}-{os.getpid()}.folded"'
+    }
+
+
+@app.route('/admin/slow-requests', methods=['GET'])
+@admin_only
+def admin_slow_requests():
+    """Slow requests kept by this worker, newest first (stage timings, no stacks)."""
+    return jsonify({
+        'threshold_seconds': request_profiler.slow_threshold,
+        'pid': os.getpid(),
+        'requests': request_profiler.slow_requests()
+    })
+
+
+@app.route('/admin/slow-requests/<int:request_id>', methods=['GET'])
+@admin_only
+def admin_slow_request(request_id):
+    """One slow request with its stack samples; format=collapsed downloads just the stacks."""
+    record = request_profiler.slow_request(request_id)
+    if record is None:
+        return jsonify({'error': 'Unknown or expired slow request'}), 404
+    if request.args.get('format') == 'collapsed':
+        return record['stacks'], 200, {
+            'Content-Type': 'text/plain; charset=utf-8',
+            'Content-Disposition': f'attachment; filename="slow-{os.getpid()}-{request_id}.folded"'
+        }
+    return jsonify(record)
+
+
 # ============================================================================
 # DEVELOPMENT HELPER ENDPOINTS
 # ============================================================================
@@ -322,9 +1160,16 @@ def test_endpoint():
         'endpoints': {
             'health': '/health',
             'chat': '/api/chat (POST)',
+            'chat_batch': '/api/chat/batch (POST)',
             'context': '/api/context (GET/POST)',
             'voice_incoming': '/voice/incoming (POST)',
             'voice_process': '/voice/process (POST)',
+            'voice_partial': '/voice/partial (POST)',
+            'voice_status': '/voice/status (POST)',
+            'usage': '/api/usage (GET)',
+            'metrics': '/metrics (GET)',
+            'profile': '/admin/profile (GET, admin token)',
+            'slow_requests': '/admin/slow-requests (GET, admin token)',
             'test': '/api/test (GET)'
         }
     })
@@ -384,6 +1229,7 @@ if __name__ == '__main__':
     ║   API Endpoints:                                       ║
     ║   • GET  /health           - Health check              ║
     ║   • POST /api/chat         - Text chat                 ║
+    ║   • POST /api/chat/batch   - Chat for many users       ║
     ║   • GET  /api/examples     - Example requests          ║
     ║                                                        ║
     ║   Voice Endpoints (Twilio):                            ║
@@ -395,4 +1241,5 @@ if __name__ == '__main__':
     ╚════════════════════════════════════════════════════════╝
     """)
     
+    warmup()
     app.run(host='0.0.0.0', port=port, debug=debug)
\ No newline at end of file
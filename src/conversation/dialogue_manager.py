@@ -0,0 +1,616 @@
+"""
+Per-call dialogue state machine shared by the voice and chat entry points.
+Each turn runs the danger-sign check, then the pre-LLM stages (language
+detection, intent scoring, slot extraction, knowledge lookup), maps their
+signals to an event and follows a transition table compiled at import.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from ..knowledge.risk_assessment import danger_detector, get_escalation_message, normalize
+from ..knowledge.test_schedules import get_tests_for_week, get_trimester_from_week
+from ..utils.language_detector import detect_language, response_language
+from ..utils.validators import extract_week_slot
+from .intent_classifier import intent_classifier
+
+# Dialogue states
+AWAITING_WEEK = 'awaiting_week'
+ASKING_QUESTION = 'asking_question'
+FOLLOW_UP = 'follow_up'
+ESCALATION = 'escalation'
+CLOSING = 'closing'
+
+STATES = (AWAITING_WEEK, ASKING_QUESTION, FOLLOW_UP, ESCALATION, CLOSING)
+INITIAL_STATE = ASKING_QUESTION
+
+# Events derived from a turn's signals
+EVENTS = ('danger', 'unclear', 'goodbye', 'question', 'question_no_week', 'week_given', 'affirm', 'deny')
+
+# (from state or '*', event, to state or None to stay, action). The first
+# row that matches a (state, event) pair wins, so wildcard rows that must
+# override everything come first.
+TRANSITIONS = [
+    ('*', 'danger', ESCALATION, 'escalate'),
+    ('*', 'unclear', None, 'repeat'),
+    ('*', 'goodbye', CLOSING, 'close'),
+    (CLOSING, '*', CLOSING, 'close'),
+    ('*', 'question', FOLLOW_UP, 'answer'),
+    ('*', 'question_no_week', AWAITING_WEEK, 'ask_week'),
+    ('*', 'week_given', FOLLOW_UP, 'answer_pending'),
+    (AWAITING_WEEK, 'affirm', AWAITING_WEEK, 'ask_week'),
+    (AWAITING_WEEK, 'deny', AWAITING_WEEK, 'ask_week'),
+    ('*', 'affirm', ASKING_QUESTION, 'prompt'),
+    (ASKING_QUESTION, 'deny', CLOSING, 'close'),
+    (FOLLOW_UP, 'deny', CLOSING, 'close'),
+    (ESCALATION, 'deny', CLOSING, 'close'),
+]
+
+# Actions whose reply comes from the use case
+ANSWER_ACTIONS = frozenset({'answer', 'answer_pending'})
+
+MESSAGES = {
+    'ask_week': {
+        'english': "To help you better, could you tell me how many weeks or months pregnant you are, or when your last period was?",
+        'hindi': "आप गर्भावस्था के कितने सप्ताह या महीने में हैं, या आखिरी माहवारी कब हुई थी? यह जानकर मैं आपको सही जानकारी दे सकूंगी।"
+    },
+    'prompt': {
+        'english': "Please go ahead and ask your question.",
+        'hindi': "कृपया अपना सवाल पूछिए।"
+    },
+    'repeat': {
+        'english': "I'm sorry, I didn't catch that. Please repeat your question.",
+        'hindi': "मुझे सुनाई नहीं दिया। कृपया दोबारा कहें।"
+    },
+    'close': {
+        'english': "Thank you for calling. Goodbye!",
+        'hindi': "धन्यवाद। अलविदा।"
+    },
+    # Asked on the caller's behalf when they gave the week without a question
+    'default_question': {
+        'english': "What tests do I need right now?",
+        'hindi': "मुझे अभी कौन से टेस्ट करवाने चाहिए?"
+    }
+}
+
+
+def compile_transitions(rows, states=STATES, events=EVENTS):
+    """
+    Expand wildcard rows into a {(state, event): (next_state, action)} table.
+
+    Raises:
+        ValueError: If a row names an unknown state or event, or some
+            (state, event) pair has no transition
+    """
+    table = {}
+    for from_state, event, to_state, action in rows:
+        for name, allowed in ((from_state, states), (event, events), (to_state, states)):
+            if name not in allowed and name not in ('*', None):
+                raise ValueError(f"Unknown state or event in transition: {name}")
+        for state in (states if from_state == '*' else (from_state,)):
+            for ev in (events if event == '*' else (event,)):
+                table.setdefault((state, ev), (to_state or state, action))
+
+    missing = [(state, ev) for state in states for ev in events if (state, ev) not in table]
+    if missing:
+        raise ValueError(f"No transition for {missing}")
+    return table
+
+
+TRANSITION_TABLE = compile_transitions(TRANSITIONS)
+
+
+def _language_stage(text, normalized, context):
+    return detect_language(text)
+
+
+def _intent_stage(text, normalized, context):
+    return intent_classifier.score(text, normalized)
+
+
+def _slot_stage(text, normalized, context):
+    return extract_week_slot(text, context.get('dialogue_state') == AWAITING_WEEK)
+
+
+def _knowledge_stage(text, normalized, context):
+    return lookup_tests(context.get('pregnancy_week'))
+
+
+def lookup_tests(week):
+    """Test schedule for a week, in the shape use cases read from signals['knowledge']."""
+    if not week:
+        return None
+    return {
+        'pregnancy_week': week,
+        'test_data': get_tests_for_week(week),
+        'trimester': get_trimester_from_week(week)
+    }
+
+
+class Stage:
+    def __init__(self, name, signal, run, blocking=False):
+        """
+        One independent pre-LLM stage.
+
+        Args:
+            name (str): Stage name for turn_stage_seconds
+            signal (str): Key the result is stored under in the turn's signals
+            run (callable): run(text, normalized_text, context) -> value
+            blocking (bool): True if the stage waits on I/O (database, network);
+                blocking stages run concurrently on the engine's thread pool
+        """
+        self.name = name
+        self.signal = signal
+        self.run = run
+        self.blocking = blocking
+
+
+DEFAULT_STAGES = (
+    Stage('language_detection', 'language', _language_stage),
+    Stage('intent_scoring', 'intents', _intent_stage),
+    Stage('slot_extraction', 'slots', _slot_stage),
+    Stage('knowledge_lookup', 'knowledge', _knowledge_stage),
+)
+
+
+class TurnResult:
+    def __init__(self, state, previous_state, event, action, text, use_case,
+                 signals=None, danger_signs=None, context_changed=False):
+        self.state = state
+        self.previous_state = previous_state
+        self.event = event
+        self.action = action
+        self.text = text
+        self.use_case = use_case
+        self.signals = signals or {}
+        self.danger_signs = danger_signs or []
+        self.context_changed = context_changed
+
+    def __repr__(self):
+        return f"TurnResult({self.previous_state} --{self.event}--> {self.state}, action={self.action})"
+
+
+class DialogueManager:
+    def __init__(self, use_case, stages=DEFAULT_STAGES, transitions=TRANSITION_TABLE,
+                 concurrency='auto', max_workers=4, min_confidence=0.5, speculator=None):
+        """
+        Args:
+            use_case: Object with .name and .handle(user_input, context, turn_info),
+                and optionally .answers_without_week(user_input) for questions
+                answered without asking for the pregnancy week
+            stages (tuple): Pre-LLM stages run on every turn
+            transitions (dict): Compiled transition table
+            concurrency (str): 'auto' runs blocking stages concurrently and
+                CPU-only stages inline (threads only add overhead for those
+                under the GIL); 'all' runs every stage on the pool; 'none'
+                runs everything inline
+            max_workers (int): Stage thread pool size
+            min_confidence (float): Speech below this confidence is 'unclear'
+            speculator (SpeculativeResponder): Optional; pre-generates likely
+                follow-up answers for turns that pass a session_id
+        """
+        self.use_case = use_case
+        self.speculator = speculator
+        self.stages = tuple(stages)
+        self.transitions = transitions
+        self.concurrency = concurrency
+        self.min_confidence = min_confidence
+        self.max_workers = max_workers
+        self._executor = None
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='turn-stage')
+        return self._executor
+
+    def _concurrent(self, stage):
+        return self.concurrency == 'all' or (self.concurrency == 'auto' and stage.blocking)
+
+    @staticmethod
+    def _timed(stage, text, normalized, context):
+        start = time.perf_counter()
+        value = stage.run(text, normalized, context)
+        return value, time.perf_counter() - start
+
+    def run_stages(self, text, context, stage_times=None, normalized=None):
+        """
+        Run the pre-LLM stages for an utterance.
+
+        Args:
+            text (str): Utterance
+            context (dict): Conversation context (read only)
+            stage_times (dict): Optional {stage: seconds} to fill
+            normalized (str): normalize(text), if the caller already has it
+
+        Returns:
+            dict: {signal: value} for every stage
+        """
+        if stage_times is None:
+            stage_times = {}
+        if normalized is None:
+            normalized = normalize(text)
+        signals = {}
+        pending = [
+            (stage, self._pool().submit(self._timed, stage, text, normalized, context))
+            for stage in self.stages if self._concurrent(stage)
+        ]
+        # Inline stages run on the request thread while the pool works
+        for stage in self.stages:
+            if not self._concurrent(stage):
+                signals[stage.signal], stage_times[stage.name] = self._timed(stage, text, normalized, context)
+        for stage, future in pending:
+            signals[stage.signal], stage_times[stage.name] = future.result()
+        return signals
+
+    @staticmethod
+    def _adopts_week(slots, context, previous_state):
+        """
+        True if the week in the utterance is the caller's own stage (an LMP,
+        "I am...", the answer to the week question) and it may replace what
+        the context holds, not a week they ask about.
+        """
+        return bool(slots.get('about_caller')) and \
+            (not context.get('pregnancy_week') or previous_state == AWAITING_WEEK)
+
+    def _event(self, text, confidence, context, signals):
+        if not text or (confidence is not None and confidence < self.min_confidence):
+            return 'unclear'
+        intents = signals.get('intents', {})
+        asks = intents.get('question', 0)
+        if intents.get('goodbye') and not asks:
+            return 'goodbye'
+        if (signals.get('slots') or {}).get('pregnancy_week') and not asks and 'asked_week' not in signals:
+            return 'week_given'
+        if not asks:
+            if intents.get('affirm') > intents.get('deny'):
+                return 'affirm'
+            if intents.get('deny'):
+                return 'deny'
+        if context.get('pregnancy_week') or signals.get('asked_week'):
+            return 'question'
+        # Questions with an answer for every week (the FAQ bank) need not wait for it
+        answers_without_week = getattr(self.use_case, 'answers_without_week', None)
+        if answers_without_week is not None and answers_without_week(text):
+            return 'question'
+        return 'question_no_week'
+
+    def handle_turn(self, text, context, confidence=None, turn_info=None, auto_language=False,
+                    session_id=None, partial=None):
+        """
+        Advance the dialogue by one turn.
+
+        Args:
+            text (str): What the user said or typed
+            context (dict): Conversation context; updated in place with the
+                dialogue state, a question waiting for the week, and any
+                slots or language learned this turn
+            confidence (float): Speech recognition confidence (voice only)
+            turn_info (dict): Optional dict filled like TestScreeningUseCase.handle
+                does, plus the turn's 'signals' and per-stage timings
+            auto_language (bool): Switch context['language'] to the detected
+                language (chat requests that did not name one)
+            session_id (str): Call identifier; enables speculative answers
+                (voice calls, where the caller listens while we work)
+            partial (PartialTranscript): Work done on the partial transcript
+                (PartialTurns.take); reused where it still applies
+
+        Returns:
+            TurnResult: New state, action taken and the reply text
+        """
+        if turn_info is None:
+            turn_info = {}
+        turn_info.setdefault('fallback', False)
+        stages = turn_info.setdefault('stages', {})
+        previous_state = context.get('dialogue_state', INITIAL_STATE)
+        language = context.get('language', 'english')
+        changed = False
+
+        # Danger signs short-circuit everything else, whatever the confidence
+        danger_signs = danger_detector.detect(text) if text else []
+        if danger_signs:
+            if auto_language and len(text.split()) >= 3:
+                language = response_language(detect_language(text))
+                changed = language != context.get('language')
+                context['language'] = language
+            context['dialogue_state'] = self.transitions[(previous_state, 'danger')][0]
+            return TurnResult(
+                context['dialogue_state'], previous_state, 'danger', 'escalate',
+                get_escalation_message(danger_signs[0], language), 'danger_sign',
+                danger_signs=danger_signs, context_changed=changed
+            )
+
+        signals = {}
+        if text and (confidence is None or confidence >= self.min_confidence):
+            stage_start = time.perf_counter()
+            normalized = normalize(text)
+            reuse = partial.reuse(normalized, context) if partial is not None else None
+            if reuse == 'full':
+                signals = dict(partial.signals)
+            else:
+                signals = self.run_stages(text, context, stages, normalized)
+                if reuse == 'prepared':
+                    signals['prepared'] = partial.signals['prepared']
+            if partial is not None:
+                turn_info['partial_reuse'] = reuse or 'none'
+            stages['pre_llm'] = time.perf_counter() - stage_start
+
+            if auto_language and len(text.split()) >= 3:
+                detected = response_language(signals['language'])
+                if detected != language:
+                    context['language'] = language = detected
+                    changed = True
+
+            slots = signals.get('slots') or {}
+            week = slots.get('pregnancy_week')
+            if week and week != context.get('pregnancy_week'):
+                if self._adopts_week(slots, context, previous_state):
+                    context['pregnancy_week'] = week
+                    changed = True
+                else:
+                    # "What tests will I need at 28 weeks?", "tests in the 7th
+                    # month": answer for that week this turn, keep the caller's
+                    signals['asked_week'] = week
+                # Knowledge ran against the old week
+                if (signals.get('knowledge') or {}).get('pregnancy_week') != week:
+                    signals['knowledge'] = lookup_tests(week)
+            turn_info['signals'] = signals
+
+        event = self._event(text, confidence, context, signals)
+        state, action = self.transitions[(previous_state, event)]
+        context['dialogue_state'] = state
+
+        speculator = self.speculator if session_id is not None else None
+        use_case = 'dialogue'
+        if action in ANSWER_ACTIONS:
+            question = text
+            reply = None
+            if action == 'answer_pending':
+                question = context.pop('pending_question', None) or MESSAGES['default_question'][language]
+            elif speculator is not None and 'asked_week' not in signals:
+                # Predictions were made for the caller's own week
+                reply = speculator.take(session_id, text, context, turn_info)
+            if reply is None:
+                reply = self.use_case.handle(question, context, turn_info)
+            use_case = self.use_case.name
+            if speculator is not None:
+                speculator.speculate(session_id, question, context)
+        else:
+            if action == 'ask_week' and event == 'question_no_week':
+                context['pending_question'] = text
+            elif action == 'close':
+                context.pop('pending_question', None)
+                if speculator is not None:
+                    speculator.discard(session_id)
+            if action == 'repeat':
+                use_case = 'repeat'
+            reply = MESSAGES[action][language]
+
+        return TurnResult(state, previous_state, event, action, reply, use_case,
+                          signals=signals, context_changed=changed)
+
+
+class PartialTranscript:
+    __slots__ = ('text', 'normalized', 'sequence', 'state_key', 'signals', 'updated')
+
+    def __init__(self, text, normalized, sequence, state_key, signals):
+        self.text = text
+        self.normalized = normalized
+        self.sequence = sequence
+        self.state_key = state_key
+        self.signals = signals
+        self.updated = time.monotonic()
+
+    def reuse(self, normalized, context):
+        """
+        How much of this work applies to the final transcript.
+
+        Returns:
+            str or None: 'full' (same words, same dialogue state), 'prepared'
+                (only the week/language-dependent prompt parts) or None
+        """
+        if self.state_key != _state_key(context):
+            return None
+        if self.normalized == normalized:
+            return 'full'
+        return 'prepared' if self.signals.get('prepared') else None
+
+
+def _state_key(context):
+    """The context fields the pre-LLM stages depend on."""
+    return (context.get('pregnancy_week'), context.get('language'), context.get('dialogue_state'))
+
+
+class PartialTurns:
+    def __init__(self, manager, ttl=30.0, max_calls=10000):
+        """
+        Pre-LLM work done on partial transcripts (Twilio partialResultCallback),
+        kept per CallSid until the final SpeechResult arrives.
+
+        Args:
+            manager (DialogueManager): Runs the stages; its use case's
+                prepare(context) warms the prompt parts
+            ttl (float): Seconds an untaken entry is kept (calls that hang up
+                mid-utterance)
+            max_calls (int): Entries kept at once; the oldest are dropped
+        """
+        self.manager = manager
+        self.ttl = ttl
+        self.max_calls = max_calls
+        self.entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def update(self, call_sid, text, sequence, context):
+        """
+        Process the transcript so far, unless it is stale or unchanged.
+
+        Args:
+            call_sid (str): Twilio CallSid
+            text (str): Partial transcript
+            sequence (int): Twilio SequenceNumber (later partials are larger)
+            context (dict): Call context (read only)
+
+        Returns:
+            bool: True if the stages ran
+        """
+        normalized = normalize(text)
+        state_key = _state_key(context)
+        with self._lock:
+            entry = self.entries.get(call_sid)
+            if entry is not None and entry.state_key == state_key and (
+                    sequence <= entry.sequence or entry.normalized == normalized):
+                return False
+
+        signals = self.manager.run_stages(text, context, normalized=normalized)
+        week = (signals.get('slots') or {}).get('pregnancy_week') or context.get('pregnancy_week')
+        if week and (signals.get('knowledge') or {}).get('pregnancy_week') != week:
+            signals['knowledge'] = lookup_tests(week)
+        prepare = getattr(self.manager.use_case, 'prepare', None)
+        if prepare is not None and week:
+            signals['prepared'] = prepare({'pregnancy_week': week, 'language': context.get('language', 'english')})
+
+        entry = PartialTranscript(text, normalized, sequence, state_key, signals)
+        with self._lock:
+            current = self.entries.get(call_sid)
+            if current is not None and current.state_key == state_key and current.sequence >= sequence:
+                return False
+            self.entries[call_sid] = entry
+            self.entries.move_to_end(call_sid)
+            self._sweep(entry.updated)
+        return True
+
+    def take(self, call_sid):
+        """Remove and return the call's partial work (None if there is none)."""
+        with self._lock:
+            entry = self.entries.pop(call_sid, None)
+        if entry is not None and time.monotonic() - entry.updated > self.ttl:
+            return None
+        return entry
+
+    def discard(self, call_sid):
+        with self._lock:
+            self.entries.pop(call_sid, None)
+
+    def _sweep(self, now):
+        """Drop expired and excess entries, oldest first (lock held)."""
+        while self.entries:
+            oldest = next(iter(self.entries.values()))
+            if now - oldest.updated <= self.ttl and len(self.entries) <= self.max_calls:
+                break
+            self.entries.popitem(last=False)
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import json
+    import statistics
+    from pathlib import Path
+
+    print("Testing dialogue_manager.py\n")
+    print(f"Transition table: {len(TRANSITION_TABLE)} entries ({len(STATES)} states x {len(EVENTS)} events)\n")
+
+    class EchoUseCase:
+        name = 'test_screening'
+
+        def handle(self, user_input, context, turn_info=None):
+            knowledge = (turn_info or {}).get('signals', {}).get('knowledge')
+            shared = 'shared' if knowledge and knowledge['pregnancy_week'] == context['pregnancy_week'] else 'lookup'
+            return f"[week {context['pregnancy_week']}, {shared}] answer to: {user_input}"
+
+    fixtures = Path(__file__).parent.parent.parent / 'tests' / 'fixtures' / 'sample_calls.json'
+    with open(fixtures, encoding='utf-8') as f:
+        calls = json.load(f)['calls']
+
+    manager = DialogueManager(EchoUseCase())
+    for call in calls[:6]:
+        context = {'pregnancy_week': call['pregnancy_week'], 'language': call['language'], 'name': 'there'}
+        print(call['id'])
+        for turn in call['turns']:
+            text = turn.get('speech', turn.get('message'))
+            result = manager.handle_turn(text, context, turn.get('confidence'))
+            print(f"  {text!r}: {result}\n    -> {result.text[:80]}")
+        print()
+
+    utterances = [turn.get('speech', turn.get('message')) for call in calls for turn in call['turns']]
+    context = {'pregnancy_week': 20, 'language': 'english'}
+
+    def per_turn_us(engine, rounds=300):
+        samples = []
+        for _ in range(rounds):
+            for text in utterances:
+                start = time.perf_counter()
+                engine.run_stages(text, context)
+                samples.append((time.perf_counter() - start) * 1e6)
+        return statistics.median(samples)
+
+    stage_sums = []
+    for text in utterances * 100:
+        times = {}
+        manager.run_stages(text, context, times)
+        stage_sums.append(sum(times.values()) * 1e6)
+    print("CPU-only stages (median per turn):")
+    print(f"  sum of stage times:         {statistics.median(stage_sums):7.1f} us")
+    print(f"  inline ('auto'):            {per_turn_us(DialogueManager(EchoUseCase())):7.1f} us")
+    print(f"  thread pool ('all'):        {per_turn_us(DialogueManager(EchoUseCase(), concurrency='all')):7.1f} us")
+
+    # Stages that wait on I/O (a vector store, a profile service) overlap on the pool
+    def io_stage(seconds):
+        return lambda text, normalized, context: time.sleep(seconds)
+
+    io_stages = DEFAULT_STAGES + (
+        Stage('retrieval', 'passages', io_stage(0.020), blocking=True),
+        Stage('profile_fetch', 'profile', io_stage(0.015), blocking=True),
+    )
+    for mode in ('none', 'auto'):
+        engine = DialogueManager(EchoUseCase(), stages=io_stages, concurrency=mode)
+        samples = []
+        for text in utterances[:10]:
+            start = time.perf_counter()
+            engine.run_stages(text, context)
+            samples.append((time.perf_counter() - start) * 1000)
+        print(f"With 20 ms + 15 ms I/O stages, concurrency={mode!r}: {statistics.median(samples):5.1f} ms per turn")
+
+    # Partial transcripts: the stages run while the caller is still speaking,
+    # so the final turn only pays for them if the words changed
+    engine = DialogueManager(EchoUseCase(), stages=io_stages)
+    partials = PartialTurns(engine)
+    samples = {'without partials': [], 'with partials': []}
+    for text in utterances[:10]:
+        for label in samples:
+            turn_context = {'pregnancy_week': 20, 'language': 'english', 'dialogue_state': FOLLOW_UP}
+            partial = None
+            if label == 'with partials':
+                words = text.split()
+                for count in range(1, len(words) + 1):
+                    partials.update('CA1', ' '.join(words[:count]), count, turn_context)
+                partial = partials.take('CA1')
+            start = time.perf_counter()
+            engine.handle_turn(text, turn_context, 0.9, partial=partial)
+            samples[label].append((time.perf_counter() - start) * 1000)
+    for label, values in samples.items():
+        print(f"Final turn with I/O stages, {label}: {statistics.median(values):6.2f} ms")
+
+    # Week answers: the digits-only extractor this replaced vs the bilingual one
+    import re
+
+    def digits_only_slots(text, normalized, context):
+        match = re.search(r'(\d{1,2})\s*(?:weeks?|wks?|hafte|hafta|saptah|हफ्ते|हफ्ता|सप्ताह)', text.lower())
+        return {'pregnancy_week': int(match.group(1))} if match else {}
+
+    legacy_stages = tuple(Stage(stage.name, stage.signal, digits_only_slots) if stage.signal == 'slots' else stage
+                          for stage in DEFAULT_STAGES)
+    unknown_week = [call for call in calls if call.get('pregnancy_week') is None]
+    print(f"\nCalls that start without a week ({len(unknown_week)} fixtures):")
+    for label, stages in (('digits only', legacy_stages), ('bilingual', DEFAULT_STAGES)):
+        engine = DialogueManager(EchoUseCase(), stages=stages)
+        asked = answered = 0
+        for call in unknown_week:
+            context = {'language': call['language'], 'name': 'there'}
+            for turn in call['turns']:
+                result = engine.handle_turn(turn.get('speech', turn.get('message')), context, turn.get('confidence'))
+                asked += result.action == 'ask_week'
+                answered += result.action in ANSWER_ACTIONS
+        print(f"  {label:12} week asked {asked} times, {answered} of "
+              f"{sum(len(call['turns']) for call in unknown_week)} turns answered "
+              f"({asked / len(unknown_week):.1f} week prompts per call)")
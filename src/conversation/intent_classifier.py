@@ -0,0 +1,76 @@
+"""
+Keyword intent scoring for caller utterances.
+Scores each dialogue intent (question, giving the pregnancy week, yes, no,
+goodbye) from English, Hindi and Hinglish cue words.
+"""
+
+from ..knowledge.risk_assessment import normalize
+
+# Cue phrases per intent; matched on whole words after normalisation
+INTENT_CUES = {
+    'question': [
+        'what', 'when', 'which', 'why', 'how', 'where', 'should', 'do i', 'is it', 'is the', 'can i',
+        'tell me', 'test', 'tests', 'scan', 'ultrasound', 'check', 'checks', 'need',
+        'क्या', 'कब', 'कौन', 'कौनसा', 'कौन से', 'क्यों', 'कैसे', 'कहां', 'बताइए', 'बताओ', 'जांच', 'टेस्ट',
+        'kya', 'kab', 'kaun', 'kyun', 'kaise', 'kahan', 'batao', 'bataiye', 'jaanch', 'janch'
+    ],
+    'give_week': [
+        'week', 'weeks', 'month', 'months', 'pregnant', 'last period', 'lmp',
+        'हफ्ते', 'हफ्ता', 'सप्ताह', 'महीने', 'महीना', 'माह',
+        'hafte', 'hafta', 'saptah', 'mahine', 'mahina'
+    ],
+    'affirm': [
+        'yes', 'yeah', 'yes please', 'sure', 'ok', 'okay', 'i have', 'one more',
+        'हां', 'हाँ', 'जी हां', 'जी', 'ठीक है', 'haan', 'han', 'ji', 'ji haan', 'theek hai'
+    ],
+    'deny': [
+        'no', 'nope', 'no thanks', 'no thank you', 'nothing', 'nothing else', 'not now', "that's all",
+        'नहीं', 'जी नहीं', 'कुछ नहीं', 'बस', 'nahi', 'nahin', 'kuch nahi', 'bas'
+    ],
+    'goodbye': [
+        'bye', 'goodbye', 'good bye', 'thank you', 'thanks', 'that is all', "that's all", 'see you',
+        'धन्यवाद', 'शुक्रिया', 'अलविदा', 'बस इतना ही', 'dhanyavad', 'dhanyawad', 'shukriya', 'alvida'
+    ]
+}
+
+
+class IntentClassifier:
+    def __init__(self, cues=None):
+        # Pad every cue the way normalize() pads words, so a substring test is a whole-word match
+        self.cues = {
+            intent: tuple(normalize(cue) for cue in phrases)
+            for intent, phrases in (cues or INTENT_CUES).items()
+        }
+
+    def score(self, text, normalized=None):
+        """
+        Score every intent for an utterance.
+
+        Args:
+            text (str): Utterance
+            normalized (str): normalize(text), if the caller already has it
+
+        Returns:
+            dict: {intent: number of matching cues}
+        """
+        padded = normalized if normalized is not None else normalize(text)
+        return {
+            intent: sum(1 for cue in phrases if cue in padded)
+            for intent, phrases in self.cues.items()
+        }
+
+    def classify(self, text):
+        """Top-scoring intent, or None if nothing matched."""
+        scores = self.score(text)
+        intent, best = max(scores.items(), key=lambda item: item[1])
+        return intent if best else None
+
+
+intent_classifier = IntentClassifier()
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    print("Testing intent_classifier.py\n")
+    for utterance in ["What tests do I need?", "बीस हफ्ते", "no thank you", "हाँ", "Hemoglobin test kab hota hai?"]:
+        print(f"  {utterance!r}: {intent_classifier.classify(utterance)}  {intent_classifier.score(utterance)}")
@@ -0,0 +1,507 @@
+"""
+Speculative answers for likely follow-up questions.
+While Twilio plays an answer, a background pool pre-generates answers about
+the tests the caller is most likely to ask about next; if the next utterance
+is a plain question about one of them, the answer is served without waiting
+for the model. Spend is capped per call and hits and wasted tokens are
+exported as metrics.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from ..analytics.metrics import metrics
+from ..knowledge.risk_assessment import normalize
+from ..knowledge.test_schedules import get_tests_for_week
+
+# How callers refer to each test in TEST_SCHEDULE (English, Hindi, Hinglish)
+TEST_ALIASES = {
+    'Blood Pressure': ['blood pressure', 'bp', 'रक्तचाप', 'बीपी'],
+    'Blood Group & Rh Factor': ['blood group', 'rh factor', 'rh', 'ब्लड ग्रुप', 'रक्त समूह'],
+    'Hemoglobin (Anemia Test)': ['hemoglobin', 'haemoglobin', 'hb', 'anemia', 'anaemia', 'हीमोग्लोबिन', 'खून की कमी'],
+    'Hemoglobin': ['hemoglobin', 'haemoglobin', 'hb', 'anemia', 'anaemia', 'हीमोग्लोबिन', 'खून की कमी'],
+    'Blood Sugar (Fasting)': ['blood sugar', 'sugar', 'शुगर', 'रक्त शर्करा'],
+    'Urine Test': ['urine', 'पेशाब', 'मूत्र'],
+    'HIV Test': ['hiv', 'एचआईवी'],
+    'Hepatitis B': ['hepatitis', 'hepatitis b', 'हेपेटाइटिस'],
+    'Syphilis (VDRL/RPR)': ['syphilis', 'vdrl', 'rpr', 'सिफलिस'],
+    'Ultrasound (Anomaly Scan)': ['ultrasound', 'anomaly scan', 'scan', 'sonography', 'अल्ट्रासाउंड', 'सोनोग्राफी'],
+    'Glucose Tolerance Test (GTT)': ['glucose', 'glucose tolerance', 'gtt', 'sugar', 'शुगर', 'ग्लूकोज'],
+    'Baby Position Check': ['baby position', 'position', 'बच्चे की स्थिति'],
+    'Non-Stress Test (NST)': ['non stress', 'nst', 'एनएसटी'],
+    'Group B Strep (GBS) Test': ['group b strep', 'strep', 'gbs'],
+}
+
+# Tests ordered by how often callers follow up about them; tune with the
+# speculation hit-rate metrics. Unlisted tests follow in schedule order.
+FOLLOW_UP_PRIORITY = [
+    'Glucose Tolerance Test (GTT)',
+    'Ultrasound (Anomaly Scan)',
+    'Non-Stress Test (NST)',
+    'Group B Strep (GBS) Test',
+    'Hemoglobin (Anemia Test)',
+    'Hemoglobin',
+    'Blood Sugar (Fasting)',
+    'Blood Group & Rh Factor',
+    'HIV Test',
+    'Urine Test',
+]
+
+# Words a follow-up may contain besides the test itself and still be the
+# "what is it / when do I get it" question we pre-generated
+FOLLOW_UP_FILLER = frozenset(normalize(' '.join([
+    'what', 'whats', 's', 'is', 'the', 'a', 'an', 'when', 'should', 'shall', 'i', 'get', 'do', 'does',
+    'my', 'me', 'tell', 'about', 'test', 'tests', 'check', 'it', 'done', 'have', 'has', 'to', 'need',
+    'for', 'of', 'please', 'and', 'this', 'that',
+    'kya', 'hai', 'kab', 'hota', 'hoti', 'karwana', 'karwani', 'karana', 'karani', 'ke', 'ki', 'ka',
+    'baare', 'mein', 'batao', 'bataiye', 'mujhe', 'chahiye', 'jaanch', 'janch',
+    'क्या', 'है', 'कब', 'होती', 'होता', 'होगी', 'करवानी', 'करवाना', 'कराना', 'करानी', 'की', 'का', 'के',
+    'जांच', 'टेस्ट', 'परीक्षण', 'मुझे', 'चाहिए', 'बारे', 'में', 'बताइए', 'बताओ'
+])).split())
+
+FOLLOW_UP_QUESTIONS = {
+    'english': "What is the {name} and when should I get it?",
+    'hindi': "{hindi_name} क्या है और यह कब करवानी चाहिए?"
+}
+
+_ALIASES = {
+    name: tuple(normalize(alias) for alias in aliases)
+    for name, aliases in TEST_ALIASES.items()
+}
+
+
+def mentioned_tests(text, tests, normalized=None):
+    """
+    Tests from a schedule that an utterance mentions.
+
+    Args:
+        text (str): Utterance
+        tests (list): Test dicts (get_tests_for_week()['tests'])
+        normalized (str): normalize(text), if the caller already has it
+
+    Returns:
+        list: Names of the mentioned tests, in schedule order
+    """
+    padded = normalized if normalized is not None else normalize(text)
+    return [
+        test['name'] for test in tests
+        if any(alias in padded for alias in _ALIASES.get(test['name'], (normalize(test['name']),)))
+    ]
+
+
+def is_plain_follow_up(text, test_name):
+    """True if text is only a what/when question about test_name (no other content words)."""
+    padded = normalize(text)
+    for alias in sorted(_ALIASES.get(test_name, (normalize(test_name),)), key=len, reverse=True):
+        padded = padded.replace(alias, ' ')
+    return all(word in FOLLOW_UP_FILLER for word in padded.split())
+
+
+def predict_follow_ups(week, exclude=(), limit=2):
+    """
+    Tests the caller is most likely to ask about next.
+
+    Args:
+        week (int): Pregnancy week
+        exclude (set): Test names already asked about on this call
+        limit (int): Maximum predictions
+
+    Returns:
+        list: Test dicts from the week's schedule
+    """
+    tests = get_tests_for_week(week)['tests']
+    rank = {name: i for i, name in enumerate(FOLLOW_UP_PRIORITY)}
+    candidates = [test for test in tests if test['name'] not in exclude]
+    candidates.sort(key=lambda test: rank.get(test['name'], len(rank)))
+    return candidates[:limit]
+
+
+def follow_up_question(test, language):
+    template = FOLLOW_UP_QUESTIONS['hindi' if language == 'hindi' else 'english']
+    return template.format(name=test['name'], hindi_name=test.get('hindi_name', test['name']))
+
+
+class _Prediction:
+    __slots__ = ('test', 'week', 'language', 'future', 'tokens', 'outcome')
+
+    def __init__(self, test, week, language, future):
+        self.test = test
+        self.week = week
+        self.language = language
+        self.future = future
+        self.tokens = None
+        self.outcome = None
+
+
+class _Session:
+    __slots__ = ('predictions', 'asked', 'spent_tokens', 'in_flight')
+
+    def __init__(self):
+        self.predictions = {}
+        self.asked = set()
+        self.spent_tokens = 0
+        self.in_flight = 0
+
+
+class SpeculativeResponder:
+    def __init__(self, use_case, max_workers=2, per_turn=2, token_budget=4000, max_sessions=10000,
+                 initial_estimate=700):
+        """
+        Args:
+            use_case: Object with .handle(user_input, context, turn_info) that
+                reports 'input_tokens'/'output_tokens' in turn_info
+            max_workers (int): Background generation threads
+            per_turn (int): Follow-ups predicted after each answer
+            token_budget (int): Maximum tokens spent on speculation per call
+            max_sessions (int): Calls tracked at once; the oldest is dropped
+            initial_estimate (int): Tokens assumed per answer until some
+                have been measured
+        """
+        self.use_case = use_case
+        self.per_turn = per_turn
+        self.token_budget = token_budget
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='speculate')
+        self._lock = threading.Lock()
+        self._measured = 0
+        self._measured_tokens = 0
+        self.initial_estimate = initial_estimate
+        self.counts = {'started': 0, 'reused': 0, 'skipped': 0, 'hits': 0, 'misses': 0,
+                       'used_tokens': 0, 'wasted_tokens': 0}
+
+    def estimate(self):
+        """Expected tokens for one speculative answer (running mean)."""
+        return self._measured_tokens / self._measured if self._measured else self.initial_estimate
+
+    def speculate(self, session_id, question, context):
+        """
+        Pre-generate answers for the likely next questions after `question`.
+        Predictions that are still wanted are kept; the rest are discarded.
+
+        Args:
+            session_id (str): Call identifier (CallSid)
+            question (str): Question that was just answered
+            context (dict): Conversation context (pregnancy_week, language, name)
+        """
+        week = context.get('pregnancy_week')
+        if not week:
+            return
+        language = context.get('language', 'english')
+        snapshot = {'pregnancy_week': week, 'language': language, 'name': context.get('name', 'there')}
+        account = {'call': session_id, 'user': context.get('phone'), 'speculative': True}
+        tests = get_tests_for_week(week)['tests']
+        started = []
+
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                session = self.sessions[session_id] = _Session()
+                while len(self.sessions) > self.max_sessions:
+                    _, evicted = self.sessions.popitem(last=False)
+                    self._drop(evicted, list(evicted.predictions))
+            else:
+                self.sessions.move_to_end(session_id)
+
+            session.asked.update(mentioned_tests(question, tests))
+            wanted = {test['name']: test for test in predict_follow_ups(week, session.asked, self.per_turn)}
+            self._drop(session, [
+                name for name, prediction in session.predictions.items()
+                if name not in wanted or prediction.week != week or prediction.language != language
+            ])
+
+            for name, test in wanted.items():
+                if name in session.predictions:
+                    self.counts['reused'] += 1
+                    metrics.inc('speculation_predictions_total', help_text='Speculative answers by outcome',
+                                outcome='reused')
+                    continue
+                committed = session.spent_tokens + (session.in_flight + 1) * self.estimate()
+                if committed > self.token_budget:
+                    self.counts['skipped'] += 1
+                    metrics.inc('speculation_predictions_total', help_text='Speculative answers by outcome',
+                                outcome='skipped_budget')
+                    continue
+                future = self._executor.submit(self._generate, follow_up_question(test, language), snapshot,
+                                                account)
+                prediction = _Prediction(name, week, language, future)
+                session.predictions[name] = prediction
+                session.in_flight += 1
+                self.counts['started'] += 1
+                metrics.inc('speculation_predictions_total', help_text='Speculative answers by outcome',
+                            outcome='started')
+                started.append(prediction)
+
+        # Outside the lock: a finished future runs its callback immediately
+        for prediction in started:
+            prediction.future.add_done_callback(lambda f, s=session, p=prediction: self._finished(s, p))
+
+    def take(self, session_id, text, context, turn_info=None):
+        """
+        Answer from a prediction if `text` is a plain follow-up about a
+        predicted test.
+
+        Args:
+            session_id (str): Call identifier
+            text (str): Caller's utterance
+            context (dict): Conversation context
+            turn_info (dict): Marked with 'speculative_hit' and the
+                'speculation_wait' stage on a hit
+
+        Returns:
+            str or None: Pre-generated answer, or None on a miss
+        """
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is None or not session.predictions:
+                return None
+            week = context.get('pregnancy_week')
+            mentioned = mentioned_tests(text, get_tests_for_week(week)['tests']) if week else []
+            prediction = session.predictions.get(mentioned[0]) if len(mentioned) == 1 else None
+            if prediction is not None and (
+                prediction.week != week or prediction.language != context.get('language', 'english')
+                or not is_plain_follow_up(text, prediction.test)
+            ):
+                prediction = None
+            if prediction is not None:
+                del session.predictions[prediction.test]
+                session.asked.add(prediction.test)
+
+        answer = None
+        if prediction is not None:
+            start = time.perf_counter()
+            try:
+                answer, info = prediction.future.result()
+                if info.get('fallback'):
+                    answer = None
+            except Exception as e:
+                print(f"Error in speculative answer: {e}")
+            waited = time.perf_counter() - start
+            with self._lock:
+                self._settle(prediction, 'used' if answer is not None else 'wasted')
+            if answer is not None and turn_info is not None:
+                turn_info['speculative_hit'] = True
+                turn_info.setdefault('stages', {})['speculation_wait'] = waited
+
+        outcome = 'hit' if answer is not None else 'miss'
+        with self._lock:
+            self.counts['hits' if answer is not None else 'misses'] += 1
+        metrics.inc('speculation_turns_total', help_text='Answer turns with predictions outstanding, by outcome',
+                    outcome=outcome)
+        return answer
+
+    def discard(self, session_id):
+        """Forget a finished call; its unused predictions count as wasted."""
+        with self._lock:
+            session = self.sessions.pop(session_id, None)
+            if session is not None:
+                self._drop(session, list(session.predictions))
+
+    def stats(self):
+        """Counters for tuning: hit rate and token spend."""
+        counts = dict(self.counts)
+        answered = counts['hits'] + counts['misses']
+        counts['hit_rate'] = counts['hits'] / answered if answered else 0.0
+        return counts
+
+    def _generate(self, question, context, account=None):
+        turn_info = {'account': account}
+        answer = self.use_case.handle(question, context, turn_info)
+        return answer, turn_info
+
+    def _drop(self, session, names):
+        """Discard predictions (lock held); ones not yet started are cancelled for free."""
+        for name in names:
+            prediction = session.predictions.pop(name)
+            if prediction.future.cancel():
+                session.in_flight -= 1
+                continue
+            self._settle(prediction, 'wasted')
+
+    def _finished(self, session, prediction):
+        if prediction.future.cancelled():
+            return
+        try:
+            _, info = prediction.future.result()
+            tokens = info.get('input_tokens', 0) + info.get('output_tokens', 0)
+        except Exception:
+            tokens = 0
+        with self._lock:
+            session.in_flight -= 1
+            session.spent_tokens += tokens
+            self._measured += 1
+            self._measured_tokens += tokens
+            prediction.tokens = tokens
+            if prediction.outcome is not None:
+                self._record_tokens(prediction)
+
+    def _settle(self, prediction, outcome):
+        """Decide a prediction's fate (lock held); tokens are counted once it has finished."""
+        prediction.outcome = outcome
+        if prediction.tokens is not None:
+            self._record_tokens(prediction)
+
+    def _record_tokens(self, prediction):
+        self.counts[f'{prediction.outcome}_tokens'] += prediction.tokens
+        metrics.inc('speculation_tokens_total', prediction.tokens,
+                    help_text='Tokens spent on speculative answers, by whether the answer was used',
+                    outcome=prediction.outcome)
+
+
+class AnswerCache:
+    def __init__(self, max_entries=2000, ttl=3600.0):
+        """
+        Recent model answers, served to turns that are shed under load.
+
+        Args:
+            max_entries (int): Answers kept (least recently used dropped first)
+            ttl (float): Seconds an answer may be served after it was generated
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(question, week, language, name, config_version):
+        """Answers depend on the wording, week, language, the name used and the prompts."""
+        return (normalize(question), week, language, name, config_version)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            answer, stored = entry
+            if time.monotonic() - stored > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return answer
+
+    def put(self, key, answer):
+        with self._lock:
+            self._entries[key] = (answer, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class _SharedAnswer:
+    __slots__ = ('done', 'answer', 'outcome')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.answer = None
+        self.outcome = {}
+
+
+class SharedAnswers:
+    # turn_info fields that describe how the shared answer was produced
+    OUTCOME_FIELDS = ('fallback', 'shed', 'budget')
+
+    def __init__(self):
+        """
+        Answers shared by the turns of one chat batch: turns that would send
+        the model the same prompt (same AnswerCache.key) wait for the first
+        one's answer instead of making their own call.
+        """
+        self.shared = 0
+        self._answers = {}
+        self._lock = threading.Lock()
+
+    def run(self, key, generate, turn_info):
+        """
+        Answer for a prompt key, generated at most once per batch.
+
+        Args:
+            key (tuple): AnswerCache.key() of the turn
+            generate (callable): Produces the answer (and fills turn_info)
+            turn_info (dict): The turn's info; a turn given another's answer
+                gets its outcome fields and 'shared_answer': True
+
+        Returns:
+            str: Answer
+        """
+        with self._lock:
+            entry = self._answers.get(key)
+            first = entry is None
+            if first:
+                entry = self._answers[key] = _SharedAnswer()
+
+        if not first:
+            entry.done.wait()
+            # The first turn failed: generate this one on its own
+            if entry.answer is None:
+                return generate()
+            with self._lock:
+                self.shared += 1
+            turn_info.update(entry.outcome)
+            turn_info['shared_answer'] = True
+            metrics.inc('chat_batch_shared_answers_total', help_text="Chat batch items given another item's answer")
+            return entry.answer
+
+        try:
+            entry.answer = generate()
+            entry.outcome = {field: turn_info[field] for field in self.OUTCOME_FIELDS if field in turn_info}
+            return entry.answer
+        finally:
+            entry.done.set()
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import json
+    import statistics
+    from pathlib import Path
+
+    print("Testing response_generator.py\n")
+
+    class SlowUseCase:
+        """Stands in for TestScreeningUseCase: 300 ms per answer, ~650 tokens."""
+        name = 'test_screening'
+
+        def handle(self, user_input, context, turn_info=None):
+            time.sleep(0.3)
+            turn_info.update({'fallback': False, 'input_tokens': 520, 'output_tokens': 130})
+            return f"Answer (week {context['pregnancy_week']}): {user_input}"
+
+    use_case = SlowUseCase()
+    responder = SpeculativeResponder(use_case)
+    fixtures = Path(__file__).parent.parent.parent / 'tests' / 'fixtures' / 'sample_calls.json'
+    with open(fixtures, encoding='utf-8') as f:
+        calls = [call for call in json.load(f)['calls'] if call['pregnancy_week']]
+
+    latencies = {'hit': [], 'miss': []}
+    for call in calls:
+        context = {'pregnancy_week': call['pregnancy_week'], 'language': call['language'], 'name': 'there'}
+        for turn in call['turns']:
+            text = turn.get('speech', turn.get('message'))
+            start = time.perf_counter()
+            answer = responder.take(call['id'], text, context)
+            if answer is None:
+                answer = use_case.handle(text, context, {})
+            latencies['miss' if answer.endswith(text) else 'hit'].append((time.perf_counter() - start) * 1000)
+            responder.speculate(call['id'], text, context)
+            time.sleep(1.0)  # the caller listens to the answer
+        responder.discard(call['id'])
+
+    time.sleep(0.5)
+    stats = responder.stats()
+    print(f"Hit rate: {stats['hit_rate']:.0%} ({stats['hits']} hits, {stats['misses']} misses)")
+    print(f"Predictions: {stats['started']} started, {stats['reused']} reused, {stats['skipped']} over budget")
+    print(f"Tokens: {stats['used_tokens']} used, {stats['wasted_tokens']} wasted")
+    for outcome, samples in latencies.items():
+        if samples:
+            print(f"  {outcome}: median {statistics.median(samples):6.1f} ms over {len(samples)} turns")
+
+    for text in ["When should I get my ultrasound?", "What is the GTT?", "Do I need to fast before the glucose test?",
+                 "शुगर की जांच कब होती है?"]:
+        tests = get_tests_for_week(24 if 'शुगर' not in text else 20)['tests']
+        names = mentioned_tests(text, tests)
+        print(f"  {text!r}: {names} plain={bool(names) and is_plain_follow_up(text, names[0])}")
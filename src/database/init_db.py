@@ -0,0 +1,164 @@
+"""
+SQLite connection handling and schema creation.
+Each thread uses its own connection (with its own prepared-statement cache);
+connections of finished threads go back to an idle pool for reuse, since the
+development server starts a new thread per request.
+"""
+
+import os
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+
+from .models import SCHEMA_VERSION, TABLES, INDEXES
+
+DEFAULT_DATABASE_PATH = 'data/voice_chatbot.db'
+
+
+class Database:
+    def __init__(self, path=None, cached_statements=128):
+        """
+        Args:
+            path (str): SQLite file (DATABASE_PATH, default data/voice_chatbot.db)
+            cached_statements (int): Prepared statements kept per connection.
+                Queries use constant SQL strings, so after the first call on a
+                thread every query reuses its compiled statement.
+        """
+        self.path = path or os.getenv('DATABASE_PATH', DEFAULT_DATABASE_PATH)
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._connections = []
+        self._idle = []
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory and self.path != ':memory:':
+            os.makedirs(directory, exist_ok=True)
+
+    def connection(self):
+        """Return this thread's connection, taking an idle one or opening one on first use."""
+        lease = getattr(self._local, 'lease', None)
+        if lease is not None:
+            return lease.conn
+
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._connect()
+        lease = _Lease(conn)
+        # The thread-local lease is dropped when the thread exits, which hands
+        # the connection back to the idle pool
+        weakref.finalize(lease, self._release, conn)
+        self._local.lease = lease
+        return conn
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.path, isolation_level=None, check_same_thread=False,
+            cached_statements=self.cached_statements, timeout=10
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA foreign_keys=ON')
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    def _release(self, conn):
+        with self._lock:
+            if conn in self._connections:
+                self._idle.append(conn)
+
+    @contextmanager
+    def transaction(self, immediate=False):
+        """
+        Run a block inside one transaction on this thread's connection.
+
+        Args:
+            immediate (bool): Take the write lock up front (BEGIN IMMEDIATE)
+        """
+        conn = self.connection()
+        conn.execute('BEGIN IMMEDIATE' if immediate else 'BEGIN')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def prewarm(self, count):
+        """
+        Open connections ahead of time and park them in the idle pool, so the
+        first request on each server thread does not pay for connect + PRAGMAs.
+
+        Args:
+            count (int): Idle connections wanted
+        """
+        with self._lock:
+            missing = count - len(self._idle)
+        for _ in range(missing):
+            conn = self._connect()
+            # The first statement on a connection parses the schema
+            conn.execute('SELECT count(*) FROM sqlite_master').fetchone()
+            with self._lock:
+                self._idle.append(conn)
+
+    def after_fork(self):
+        """
+        Forget connections inherited from the parent process. SQLite handles
+        must not be used across fork(), so a forked worker opens its own.
+        """
+        self._lock = threading.Lock()
+        self._connections = []
+        self._idle = []
+        self._local = threading.local()
+
+    def close(self):
+        """Close every connection opened by any thread."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+            self._idle = []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                pass
+        self._local = threading.local()
+
+
+class _Lease:
+    """Holds a thread's connection; its finalizer returns the connection to the pool."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+
+def init_db(db, drop=False):
+    """
+    Create tables and indexes if they do not exist.
+
+    Args:
+        db (Database): Target database
+        drop (bool): Drop existing tables first
+    """
+    conn = db.connection()
+    with db.transaction(immediate=True):
+        if drop:
+            for table in ('turns', 'calls', 'users'):
+                conn.execute(f'DROP TABLE IF EXISTS {table}')
+        for statement in TABLES + INDEXES:
+            conn.execute(statement)
+        conn.execute(f'PRAGMA user_version={SCHEMA_VERSION}')
+    return db
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    print("Testing init_db.py\n")
+    db = init_db(Database(':memory:'))
+    tables = [row['name'] for row in db.connection().execute(
+        "SELECT name FROM sqlite_master WHERE type IN ('table', 'index') ORDER BY name"
+    )]
+    print(f"Schema objects: {tables}")
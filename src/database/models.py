@@ -0,0 +1,98 @@
+"""
+Database schema for users, calls, conversation turns and daily model usage.
+Users are keyed by phone number (or chat user_id); calls by Twilio CallSid.
+"""
+
+from datetime import date
+
+from ..utils.validators import MAX_WEEK, MIN_WEEK, weeks_since
+
+SCHEMA_VERSION = 1
+
+TABLES = [
+    '''
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY,
+        phone TEXT NOT NULL UNIQUE,
+        name TEXT,
+        language TEXT NOT NULL DEFAULT 'english',
+        pregnancy_week INTEGER,
+        lmp_date TEXT,
+        high_risk INTEGER NOT NULL DEFAULT 0,
+        next_reminder_date TEXT,
+        created_at TEXT NOT NULL DEFAULT (datetime('now')),
+        updated_at TEXT NOT NULL DEFAULT (datetime('now'))
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS calls (
+        call_sid TEXT PRIMARY KEY,
+        phone TEXT,
+        language TEXT NOT NULL DEFAULT 'english',
+        started_at TEXT NOT NULL DEFAULT (datetime('now')),
+        ended_at TEXT
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS turns (
+        id INTEGER PRIMARY KEY,
+        call_sid TEXT NOT NULL,
+        role TEXT NOT NULL,
+        content TEXT NOT NULL,
+        confidence REAL,
+        created_at TEXT NOT NULL DEFAULT (datetime('now'))
+    )
+    ''',
+    # Model usage per UTC day, summed over every worker (for per_day_tokens)
+    '''
+    CREATE TABLE IF NOT EXISTS usage_days (
+        day TEXT PRIMARY KEY,
+        tokens INTEGER NOT NULL DEFAULT 0,
+        cost_usd REAL NOT NULL DEFAULT 0,
+        updated_at TEXT NOT NULL DEFAULT (datetime('now'))
+    ) WITHOUT ROWID
+    '''
+]
+
+# users.phone and calls.call_sid are indexed by their UNIQUE / PRIMARY KEY constraints
+INDEXES = [
+    'CREATE INDEX IF NOT EXISTS idx_users_next_reminder ON users (next_reminder_date) '
+    'WHERE next_reminder_date IS NOT NULL',
+    'CREATE INDEX IF NOT EXISTS idx_calls_phone ON calls (phone)',
+    'CREATE INDEX IF NOT EXISTS idx_turns_call_sid ON turns (call_sid, id)'
+]
+
+# Columns of users that mirror the in-memory conversation context
+USER_CONTEXT_FIELDS = ['name', 'language', 'pregnancy_week', 'lmp_date']
+
+
+def current_week(lmp, today=None):
+    """Pregnancy week on a day, from the LMP (an ISO date string or date)."""
+    if isinstance(lmp, str):
+        lmp = date.fromisoformat(lmp)
+    return max(MIN_WEEK, min(weeks_since(lmp, today or date.today()), MAX_WEEK))
+
+
+def user_to_context(row, today=None):
+    """
+    Convert a users row into the context dict used by the use cases.
+
+    The LMP is the source of truth: the week is worked out from it, so it
+    keeps advancing between calls. pregnancy_week is only used for rows
+    without an LMP.
+
+    Args:
+        row (sqlite3.Row): Row from the users table
+        today (date): Day to work the week out for (defaults to today)
+
+    Returns:
+        dict: Context with pregnancy_week, lmp_date (ISO string or None),
+            language and name
+    """
+    lmp = row['lmp_date']
+    return {
+        'pregnancy_week': current_week(lmp, today) if lmp else row['pregnancy_week'],
+        'lmp_date': lmp,
+        'language': row['language'] or 'english',
+        'name': row['name'] or 'there'
+    }
@@ -0,0 +1,325 @@
+"""
+Queries for users, calls, conversation turns and daily model usage.
+SQL is kept in module constants so each thread's connection compiles a
+statement once and reuses it from the statement cache.
+"""
+
+from datetime import date, timedelta
+
+from ..knowledge.anc_guidelines import next_reminder_date
+from .models import current_week, user_to_context
+
+GET_USER = 'SELECT * FROM users WHERE phone = ?'
+
+# Phones per IN (...) lookup, well under SQLite's bound-parameter limit
+LOOKUP_CHUNK = 500
+
+UPSERT_USER = '''
+    INSERT INTO users (phone, name, language, pregnancy_week, lmp_date, high_risk, next_reminder_date)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (phone) DO UPDATE SET
+        name = excluded.name,
+        language = excluded.language,
+        pregnancy_week = excluded.pregnancy_week,
+        lmp_date = excluded.lmp_date,
+        high_risk = excluded.high_risk,
+        next_reminder_date = excluded.next_reminder_date,
+        updated_at = datetime('now')
+'''
+
+DELETE_USER = 'DELETE FROM users WHERE phone = ?'
+
+USERS_DUE = '''
+    SELECT * FROM users
+    WHERE next_reminder_date IS NOT NULL AND next_reminder_date <= ?
+    ORDER BY next_reminder_date
+    LIMIT ?
+'''
+
+SET_NEXT_REMINDER = 'UPDATE users SET next_reminder_date = ? WHERE phone = ?'
+
+START_CALL = '''
+    INSERT INTO calls (call_sid, phone, language) VALUES (?, ?, ?)
+    ON CONFLICT (call_sid) DO UPDATE SET language = excluded.language
+'''
+
+GET_CALL = 'SELECT * FROM calls WHERE call_sid = ?'
+
+SET_CALL_LANGUAGE = 'UPDATE calls SET language = ? WHERE call_sid = ?'
+
+END_CALL = "UPDATE calls SET ended_at = datetime('now') WHERE call_sid = ?"
+
+ADD_TURN = 'INSERT INTO turns (call_sid, role, content, confidence) VALUES (?, ?, ?, ?)'
+
+GET_TURNS = 'SELECT role, content FROM turns WHERE call_sid = ? ORDER BY id'
+
+ADD_DAY_USAGE = '''
+    INSERT INTO usage_days (day, tokens, cost_usd) VALUES (?, ?, ?)
+    ON CONFLICT (day) DO UPDATE SET
+        tokens = tokens + excluded.tokens,
+        cost_usd = cost_usd + excluded.cost_usd,
+        updated_at = datetime('now')
+'''
+
+GET_DAY_USAGE = 'SELECT tokens FROM usage_days WHERE day = ?'
+
+
+def user_row(phone, name=None, language='english', pregnancy_week=None, lmp=None, high_risk=False,
+             today=None):
+    """
+    Build the parameter tuple for UPSERT_USER.
+
+    The LMP is estimated from the pregnancy week when it is not known, so the
+    next reminder date can be indexed for the daily reminder run.
+    """
+    today = today or date.today()
+    if lmp is None and pregnancy_week:
+        lmp = today - timedelta(weeks=int(pregnancy_week))
+    reminder = next_reminder_date(lmp, today, high_risk) if lmp else None
+    return (
+        phone, name, language or 'english', pregnancy_week,
+        lmp.isoformat() if lmp else None, int(bool(high_risk)),
+        reminder.isoformat() if reminder else None
+    )
+
+
+def get_user(db, phone):
+    """
+    Look up a user by phone number.
+
+    Returns:
+        sqlite3.Row or None
+    """
+    return db.connection().execute(GET_USER, (phone,)).fetchone()
+
+
+def get_user_context(db, phone):
+    """
+    Conversation context for a phone number.
+
+    Returns:
+        dict or None: pregnancy_week, language and name, or None if unknown
+    """
+    row = get_user(db, phone)
+    return user_to_context(row) if row else None
+
+
+def get_user_contexts(db, phones):
+    """
+    Conversation contexts for many phone numbers, one query per LOOKUP_CHUNK.
+
+    Returns:
+        dict: phone -> context, for the phone numbers that are known
+    """
+    phones = list(phones)
+    conn = db.connection()
+    contexts = {}
+    for start in range(0, len(phones), LOOKUP_CHUNK):
+        chunk = phones[start:start + LOOKUP_CHUNK]
+        query = f"SELECT * FROM users WHERE phone IN ({', '.join('?' * len(chunk))})"
+        for row in conn.execute(query, chunk):
+            contexts[row['phone']] = user_to_context(row)
+    return contexts
+
+
+def context_row(phone, context, today=None):
+    """
+    UPSERT_USER parameters for a conversation context dict (see save_user).
+
+    The context's lmp_date (from user_to_context) is kept while the week
+    still matches it; the LMP is only estimated again when the caller gave
+    a different week.
+    """
+    today = today or date.today()
+    week = context.get('pregnancy_week')
+    try:
+        week = int(week) if week is not None else None
+    except (TypeError, ValueError):
+        week = None
+    lmp = context.get('lmp_date')
+    lmp = date.fromisoformat(lmp) if lmp else None
+    if lmp is not None and week is not None and current_week(lmp, today) != week:
+        lmp = None
+    return user_row(phone, context.get('name'), context.get('language'), week, lmp,
+                    high_risk=context.get('high_risk', False), today=today)
+
+
+def save_user(db, phone, context):
+    """
+    Insert or update a user from a conversation context dict.
+
+    Args:
+        db (Database): Target database
+        phone (str): Phone number or chat user_id
+        context (dict): Context with pregnancy_week, language, name; its
+            lmp_date is set to the LMP that was stored
+    """
+    row = context_row(phone, context)
+    db.connection().execute(UPSERT_USER, row)
+    context['lmp_date'] = row[4]
+
+
+def save_users(db, contexts):
+    """
+    Insert or update many users from context dicts in one transaction.
+
+    Args:
+        db (Database): Target database
+        contexts (dict): phone -> context (lmp_date is updated as in save_user)
+
+    Returns:
+        int: Rows written
+    """
+    rows = []
+    for phone, context in contexts.items():
+        row = context_row(phone, context)
+        context['lmp_date'] = row[4]
+        rows.append(row)
+    return bulk_upsert_users(db, rows)
+
+
+def delete_user(db, phone):
+    db.connection().execute(DELETE_USER, (phone,))
+
+
+def bulk_upsert_users(db, rows, batch_size=50000):
+    """
+    Insert or update many users with executemany, one transaction per batch.
+
+    Args:
+        db (Database): Target database
+        rows (iterable): Parameter tuples built with user_row()
+        batch_size (int): Rows per transaction
+
+    Returns:
+        int: Rows written
+    """
+    conn = db.connection()
+    written = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            with db.transaction(immediate=True):
+                conn.executemany(UPSERT_USER, batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        with db.transaction(immediate=True):
+            conn.executemany(UPSERT_USER, batch)
+        written += len(batch)
+    return written
+
+
+def users_due_for_reminder(db, day, limit=1000):
+    """
+    Users whose next reminder is on or before a day (uses idx_users_next_reminder).
+
+    Returns:
+        list: sqlite3.Row objects ordered by next_reminder_date
+    """
+    return db.connection().execute(USERS_DUE, (day.isoformat(), limit)).fetchall()
+
+
+def advance_reminders(db, rows, today):
+    """
+    Move each user's next_reminder_date past today after their reminder was sent.
+
+    Args:
+        rows (list): users rows returned by users_due_for_reminder()
+        today (date): Day the reminders went out
+    """
+    updates = []
+    for row in rows:
+        lmp = date.fromisoformat(row['lmp_date']) if row['lmp_date'] else None
+        reminder = next_reminder_date(lmp, today + timedelta(days=1), bool(row['high_risk'])) if lmp else None
+        updates.append((reminder.isoformat() if reminder else None, row['phone']))
+    with db.transaction():
+        db.connection().executemany(SET_NEXT_REMINDER, updates)
+
+
+def start_call(db, call_sid, phone, language='english'):
+    db.connection().execute(START_CALL, (call_sid, phone, language))
+
+
+def get_call(db, call_sid):
+    return db.connection().execute(GET_CALL, (call_sid,)).fetchone()
+
+
+def set_call_language(db, call_sid, language):
+    db.connection().execute(SET_CALL_LANGUAGE, (language, call_sid))
+
+
+def end_call(db, call_sid):
+    db.connection().execute(END_CALL, (call_sid,))
+
+
+def add_turns(db, call_sid, turns):
+    """
+    Append conversation turns for a call in one transaction.
+
+    Args:
+        turns (list): (role, content, confidence) tuples
+    """
+    with db.transaction() as conn:
+        conn.executemany(ADD_TURN, [(call_sid, role, content, confidence) for role, content, confidence in turns])
+
+
+def add_day_usage(db, usage):
+    """
+    Add one worker's model usage to the daily totals shared by all workers.
+
+    Args:
+        usage (dict): UTC day ('YYYY-MM-DD') -> (tokens, cost_usd) to add;
+            (0, 0.0) just reads the day's total
+
+    Returns:
+        dict: day -> tokens used by every worker that day, after the addition
+    """
+    with db.transaction(immediate=True) as conn:
+        conn.executemany(ADD_DAY_USAGE, [(day, tokens, cost) for day, (tokens, cost) in usage.items() if tokens])
+        totals = {}
+        for day in usage:
+            row = conn.execute(GET_DAY_USAGE, (day,)).fetchone()
+            totals[day] = row['tokens'] if row else 0
+    return totals
+
+
+def get_call_messages(db, call_sid):
+    """
+    Conversation history for a call in the context 'messages' format.
+
+    Returns:
+        list: [{'role': ..., 'content': ...}, ...]
+    """
+    return [
+        {'role': row['role'], 'content': row['content']}
+        for row in db.connection().execute(GET_TURNS, (call_sid,))
+    ]
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import os
+    import tempfile
+    import time
+
+    from .init_db import Database, init_db
+
+    print("Testing queries.py\n")
+    db = init_db(Database(os.path.join(tempfile.mkdtemp(), 'test.db')))
+
+    save_user(db, '+919800000001', {'pregnancy_week': 20, 'language': 'hindi', 'name': 'Priya'})
+    print(f"Context: {get_user_context(db, '+919800000001')}")
+    print(f"Next reminder: {get_user(db, '+919800000001')['next_reminder_date']}")
+
+    start_call(db, 'CA123', '+919800000001', 'hindi')
+    add_turns(db, 'CA123', [('user', 'मुझे कौन से टेस्ट चाहिए?', 0.9), ('assistant', 'नमस्ते प्रिया...', None)])
+    print(f"Call messages: {get_call_messages(db, 'CA123')}")
+
+    lookups = 100000
+    start = time.perf_counter()
+    for _ in range(lookups):
+        get_user_context(db, '+919800000001')
+    print(f"\nPoint lookup: {(time.perf_counter() - start) / lookups * 1e6:.1f} us")
+    db.close()
@@ -0,0 +1,35 @@
+"""
+Demo conversations for recording and replaying LLM cassettes.
+Each scenario is one chat turn as a presenter would type it; recording them
+once against the live API lets demos and benchmarks run offline afterwards.
+"""
+
+from pathlib import Path
+
+CASSETTE_DIR = Path(__file__).parent.parent.parent / 'data' / 'cassettes'
+
+DEFAULT_CASSETTE = CASSETTE_DIR / 'demo.jsonl'
+
+DEMO_SCENARIOS = [
+    {'name': 'Priya', 'pregnancy_week': 10, 'language': 'english',
+     'question': "What tests do I need right now?"},
+    {'name': 'Priya', 'pregnancy_week': 20, 'language': 'english',
+     'question': "When should I get my ultrasound?"},
+    {'name': 'Priya', 'pregnancy_week': 26, 'language': 'english',
+     'question': "What is the glucose test and why do I need it?"},
+    {'name': 'Sunita', 'pregnancy_week': 30, 'language': 'hindi',
+     'question': "मुझे कौन से टेस्ट करवाने चाहिए?"},
+    {'name': 'Sunita', 'pregnancy_week': 14, 'language': 'hindi',
+     'question': "Hemoglobin test kab hota hai?"},
+    {'name': 'Anjali', 'pregnancy_week': 36, 'language': 'english',
+     'question': "Is there anything I should check before delivery?"}
+]
+
+
+def demo_context(scenario):
+    """Use case context for a scenario."""
+    return {
+        'pregnancy_week': scenario['pregnancy_week'],
+        'language': scenario['language'],
+        'name': scenario['name']
+    }
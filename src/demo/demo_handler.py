@@ -0,0 +1,357 @@
+"""
+Record/replay cassettes for Claude API calls.
+CassetteClient stands in for anthropic.Anthropic: in record mode it calls the
+real client and appends each request fingerprint, response and wall time to a
+JSONL cassette; in replay mode it answers from the cassette, instantly or with
+the recorded timing, so demos and benchmarks run offline and reproducibly.
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from .demo_data import DEFAULT_CASSETTE
+
+# Request fields that decide the answer; anything else (timeouts, metadata)
+# does not change the fingerprint
+FINGERPRINT_FIELDS = ('model', 'max_tokens', 'system', 'messages', 'tools', 'tool_choice',
+                      'temperature', 'top_p', 'top_k', 'stop_sequences')
+
+MODES = ('record', 'replay')
+MISS_POLICIES = ('error', 'passthrough', 'record')
+
+
+class CassetteMiss(LookupError):
+    pass
+
+
+def request_fingerprint(request):
+    """Stable hash of the fields of a messages.create() request that affect the response."""
+    fields = {key: request[key] for key in FINGERPRINT_FIELDS if request.get(key) is not None}
+    payload = json.dumps(fields, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=_plain)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _plain(obj):
+    """JSON-friendly form of SDK objects (pydantic models or namespaces)."""
+    if hasattr(obj, 'model_dump'):
+        return obj.model_dump()
+    if hasattr(obj, '__dict__'):
+        return {key: value for key, value in vars(obj).items() if not key.startswith('_')}
+    return str(obj)
+
+
+def response_to_dict(message):
+    """Serialise a Messages API response for the cassette."""
+    return json.loads(json.dumps(message, ensure_ascii=False, default=_plain))
+
+
+def response_from_dict(data):
+    """
+    Rebuild a response with the attribute access ToolUseLoop uses
+    (message.content[i].type/.text/.input, message.usage.*); tool inputs stay dicts.
+    """
+    fields = dict(data)
+    fields['content'] = [SimpleNamespace(**block) for block in data.get('content', [])]
+    if data.get('usage') is not None:
+        fields['usage'] = SimpleNamespace(**data['usage'])
+    return SimpleNamespace(**fields)
+
+
+class Cassette:
+    def __init__(self, path=DEFAULT_CASSETTE):
+        """
+        Append-only JSONL file of recorded exchanges, with a sidecar index
+        (<path>.idx.json) of fingerprint -> byte offsets so replay seeks
+        straight to an entry instead of parsing the whole file.
+
+        Args:
+            path (str): Cassette file; created on first record
+        """
+        self.path = Path(path)
+        self.index_path = self.path.with_name(self.path.name + '.idx.json')
+        self._lock = threading.Lock()
+        self._offsets = {}
+        self._cursors = {}
+        self._entries = {}
+        self._index_dirty = False
+        self._load_index()
+
+    def __len__(self):
+        return sum(len(offsets) for offsets in self._offsets.values())
+
+    def __contains__(self, fingerprint):
+        return fingerprint in self._offsets
+
+    def get(self, fingerprint):
+        """
+        Next recorded entry for a fingerprint, or None.
+        A request recorded several times is answered with each recording in
+        turn, cycling, so repeated replays see the same spread of answers.
+        """
+        with self._lock:
+            offsets = self._offsets.get(fingerprint)
+            if not offsets:
+                return None
+            position = self._cursors.get(fingerprint, 0)
+            self._cursors[fingerprint] = (position + 1) % len(offsets)
+            offset = offsets[position]
+            entry = self._entries.get(offset)
+            if entry is None:
+                with open(self.path, 'rb') as f:
+                    f.seek(offset)
+                    entry = self._entries[offset] = json.loads(f.readline())
+            return entry
+
+    def append(self, fingerprint, request, response, seconds):
+        """
+        Record one exchange.
+
+        Args:
+            fingerprint (str): request_fingerprint(request)
+            request (dict): messages.create() keyword arguments
+            response (dict): response_to_dict() of the answer
+            seconds (float): Wall time of the live call
+        """
+        messages = request.get('messages') or []
+        last = messages[-1]['content'] if messages else ''
+        entry = {
+            'fingerprint': fingerprint,
+            'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'seconds': round(seconds, 4),
+            'request': {
+                'model': request.get('model'),
+                'max_tokens': request.get('max_tokens'),
+                'turns': len(messages),
+                'last_message': last[:200] if isinstance(last, str) else '(tool results)'
+            },
+            'response': response
+        }
+        line = (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8')
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'ab') as f:
+                offset = f.tell()
+                f.write(line)
+            self._offsets.setdefault(fingerprint, []).append(offset)
+            self._entries[offset] = entry
+            self._index_dirty = True
+
+    def save_index(self):
+        """Write the sidecar index (after recording)."""
+        with self._lock:
+            if not self._index_dirty:
+                return
+            index = {'size': self.path.stat().st_size, 'offsets': self._offsets}
+            tmp = self.index_path.with_name(self.index_path.name + '.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(index, f)
+            os.replace(tmp, self.index_path)
+            self._index_dirty = False
+
+    def _load_index(self):
+        """Use the sidecar index if it matches the file, else rebuild it by scanning."""
+        if not self.path.exists():
+            return
+        size = self.path.stat().st_size
+        try:
+            with open(self.index_path, encoding='utf-8') as f:
+                index = json.load(f)
+            if index.get('size') == size:
+                self._offsets = index['offsets']
+                return
+        except (OSError, ValueError, KeyError):
+            pass
+
+        offset = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._offsets.setdefault(entry['fingerprint'], []).append(offset)
+                offset += len(line)
+        self._index_dirty = True
+
+
+class CassetteClient:
+    def __init__(self, cassette, client=None, mode='replay', on_miss='error', latency_scale=0.0):
+        """
+        Drop-in for anthropic.Anthropic (only messages.create is used).
+
+        Args:
+            cassette (Cassette): Where exchanges are stored
+            client: Real client for record mode and pass-through misses
+            mode (str): 'record' calls the client and stores every exchange;
+                'replay' answers from the cassette
+            on_miss (str): Replay miss handling: 'error' raises CassetteMiss,
+                'passthrough' calls the client, 'record' calls it and stores the result
+            latency_scale (float): Replay delay as a fraction of the recorded
+                time (0 = instant, 1 = as recorded)
+        """
+        if mode not in MODES:
+            raise ValueError(f"Cassette mode must be one of {', '.join(MODES)}")
+        if on_miss not in MISS_POLICIES:
+            raise ValueError(f"Cassette miss policy must be one of {', '.join(MISS_POLICIES)}")
+        if client is None and (mode == 'record' or on_miss != 'error'):
+            raise ValueError(f"A client is needed to {mode if mode == 'record' else 'pass misses through'}")
+        self.cassette = cassette
+        self.client = client
+        self.mode = mode
+        self.on_miss = on_miss
+        self.latency_scale = latency_scale
+        self.messages = self
+        self._lock = threading.Lock()
+        self.counts = {'hits': 0, 'misses': 0, 'recorded': 0, 'passthrough': 0}
+
+    def create(self, **request):
+        """messages.create(): answer from the cassette or the live client."""
+        fingerprint = request_fingerprint(request)
+
+        if self.mode == 'replay':
+            entry = self.cassette.get(fingerprint)
+            if entry is not None:
+                self._count('hits')
+                if self.latency_scale > 0:
+                    time.sleep(entry['seconds'] * self.latency_scale)
+                return response_from_dict(entry['response'])
+            self._count('misses')
+            if self.on_miss == 'error':
+                messages = request.get('messages') or [{}]
+                raise CassetteMiss(
+                    f"No recording in {self.cassette.path} for request {fingerprint[:12]} "
+                    f"(last message: {str(messages[-1].get('content'))[:80]!r})"
+                )
+
+        start = time.perf_counter()
+        message = self.client.messages.create(**request)
+        seconds = time.perf_counter() - start
+
+        if self.mode == 'record' or self.on_miss == 'record':
+            self.cassette.append(fingerprint, request, response_to_dict(message), seconds)
+            self._count('recorded')
+        else:
+            self._count('passthrough')
+        return message
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counts, entries=len(self.cassette))
+
+    def close(self):
+        """Persist the index of anything recorded."""
+        self.cassette.save_index()
+
+    def _count(self, outcome):
+        with self._lock:
+            self.counts[outcome] += 1
+
+
+def cassette_from_env(client):
+    """
+    Wrap a client in a CassetteClient when LLM_CASSETTE names a cassette file.
+
+    Env:
+        LLM_CASSETTE: Cassette path (unset or empty = live client)
+        LLM_CASSETTE_MODE: 'replay' (default) or 'record'
+        LLM_CASSETTE_ON_MISS: 'error' (default), 'passthrough' or 'record'
+        LLM_CASSETTE_LATENCY_SCALE: 0 = instant replay (default), 1 = recorded timing
+
+    Returns:
+        The client itself, or a CassetteClient around it
+    """
+    path = os.getenv('LLM_CASSETTE')
+    if not path:
+        return client
+    cassette_client = CassetteClient(
+        Cassette(path),
+        client=client,
+        mode=os.getenv('LLM_CASSETTE_MODE', 'replay'),
+        on_miss=os.getenv('LLM_CASSETTE_ON_MISS', 'error'),
+        latency_scale=float(os.getenv('LLM_CASSETTE_LATENCY_SCALE', '0'))
+    )
+    atexit.register(cassette_client.close)
+    return cassette_client
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import statistics
+    import sys
+    import tempfile
+
+    from .demo_data import DEMO_SCENARIOS, demo_context
+    from ..use_cases.test_screening import TestScreeningUseCase
+
+    print("Testing demo_handler.py\n")
+
+    class NoisyClient:
+        """Live-API stand-in: 80 ms +/- 60 ms per request."""
+
+        def __init__(self):
+            self.messages = self
+            self.calls = 0
+
+        def create(self, **request):
+            self.calls += 1
+            time.sleep(0.08 + 0.06 * ((self.calls * 7919) % 100 - 50) / 50)
+            text = f"Answer {self.calls}: {request['messages'][-1]['content'][-60:]}"
+            return SimpleNamespace(
+                id=f"msg_{self.calls}", type='message', role='assistant', model=request['model'],
+                stop_reason='end_turn', content=[SimpleNamespace(type='text', text=text)],
+                usage=SimpleNamespace(input_tokens=len(request['messages'][-1]['content']) // 4,
+                                      output_tokens=len(text) // 4,
+                                      cache_read_input_tokens=0, cache_creation_input_tokens=0)
+            )
+
+    def run_scenarios(use_case, rounds):
+        samples = []
+        answers = []
+        for _ in range(rounds):
+            for scenario in DEMO_SCENARIOS:
+                start = time.perf_counter()
+                turn_info = {}
+                answers.append(use_case.handle(scenario['question'], demo_context(scenario), turn_info))
+                if turn_info.get('fallback'):
+                    sys.exit(f"Fallback answer for {scenario['question']!r}")
+                samples.append((time.perf_counter() - start) * 1000)
+        return samples, answers
+
+    def report(label, samples):
+        print(f"  {label:28} median {statistics.median(samples):8.3f} ms  "
+              f"stdev {statistics.pstdev(samples):7.3f} ms")
+
+    use_case = TestScreeningUseCase()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'demo.jsonl'
+
+        use_case.client = CassetteClient(Cassette(path), client=NoisyClient(), mode='record')
+        live_samples, recorded = run_scenarios(use_case, 1)
+        use_case.client.close()
+        report('record (live client)', live_samples)
+
+        replay = CassetteClient(Cassette(path))
+        use_case.client = replay
+        instant, replayed = run_scenarios(use_case, 20)
+        report('replay, instant', instant)
+        print(f"  answers identical to recording: {replayed[:len(recorded)] == recorded}")
+
+        use_case.client = CassetteClient(Cassette(path), latency_scale=1.0)
+        timed, _ = run_scenarios(use_case, 2)
+        report('replay, recorded timing', timed)
+        print(f"  replay stats: {replay.stats()}")
+
+        start = time.perf_counter()
+        for _ in range(10000):
+            request_fingerprint({'model': 'm', 'max_tokens': 1024, 'system': 'x' * 2000,
+                                 'messages': [{'role': 'user', 'content': 'y' * 1500}]})
+        print(f"\n  request_fingerprint(): {(time.perf_counter() - start) / 10000 * 1e6:.1f} us")
+
+        try:
+            replay.create(model='m', max_tokens=10, messages=[{'role': 'user', 'content': 'unrecorded'}])
+        except CassetteMiss as e:
+            print(f"  miss: {e}")
@@ -0,0 +1,376 @@
+"""
+Bulk SMS reminder sender (Twilio Messages API).
+Sends ANC visit and test reminders at the account's rate limit over a pooled
+HTTP session, with a durable SQLite checkpoint so an interrupted campaign can
+resume without double-sending or starting over.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from email.utils import parsedate_to_datetime
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+TWILIO_API_BASE = 'https://api.twilio.com/2010-04-01'
+
+# Checkpoint states
+PENDING = 'pending'
+SENDING = 'sending'   # claimed and possibly handed to Twilio; reconciled on resume
+SENT = 'sent'
+FAILED = 'failed'
+
+# Seconds our clock may be ahead of Twilio's when matching date_created
+CLOCK_SKEW = 60
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` are available, then take them."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait_seconds = (tokens - self.tokens) / self.rate
+            time.sleep(wait_seconds)
+
+    def penalize(self, seconds):
+        """Drain the bucket so nobody sends for `seconds` (used on HTTP 429)."""
+        with self.lock:
+            self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+def created_time(resource):
+    """Unix time of a Twilio resource's date_created (RFC 2822), 0 if missing."""
+    try:
+        return parsedate_to_datetime(resource['date_created']).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return 0
+
+
+def idempotency_key(campaign_id, to_number, body):
+    """Stable key for one message of one campaign."""
+    digest = hashlib.sha256(f"{campaign_id}\x1f{to_number}\x1f{body}".encode('utf-8'))
+    return digest.hexdigest()[:32]
+
+
+class SMSCheckpoint:
+    """
+    SQLite-backed campaign progress.
+    Every message is claimed (SENDING) in a committed transaction before it is
+    handed to Twilio, so after a crash only claimed-but-unconfirmed messages
+    are in doubt, and those are reconciled against Twilio before resending.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS sms_messages (
+                idempotency_key TEXT PRIMARY KEY,
+                campaign_id TEXT NOT NULL,
+                to_number TEXT NOT NULL,
+                body TEXT NOT NULL,
+                status TEXT NOT NULL,
+                sid TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                claimed_at REAL,
+                updated_at REAL
+            )
+        ''')
+        self.conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_sms_campaign_status ON sms_messages (campaign_id, status)'
+        )
+
+    def add(self, campaign_id, messages):
+        """
+        Register messages for a campaign (already-known keys are left untouched).
+
+        Args:
+            campaign_id (str): Campaign identifier
+            messages (list): (idempotency_key, to_number, body) tuples
+        """
+        with self.lock:
+            self.conn.execute('BEGIN')
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO sms_messages '
+                '(idempotency_key, campaign_id, to_number, body, status, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                [(key, campaign_id, to, body, PENDING, time.time()) for key, to, body in messages]
+            )
+            self.conn.execute('COMMIT')
+
+    def claim(self, campaign_id, limit):
+        """Atomically move up to `limit` pending messages to SENDING and return them."""
+        with self.lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            rows = self.conn.execute(
+                'SELECT idempotency_key, to_number, body FROM sms_messages '
+                'WHERE campaign_id = ? AND status = ? LIMIT ?',
+                (campaign_id, PENDING, limit)
+            ).fetchall()
+            now = time.time()
+            self.conn.executemany(
+                'UPDATE sms_messages SET status = ?, claimed_at = ?, attempts = attempts + 1 '
+                'WHERE idempotency_key = ?',
+                [(SENDING, now, row[0]) for row in rows]
+            )
+            self.conn.execute('COMMIT')
+        return rows
+
+    def in_doubt(self, campaign_id):
+        """Messages claimed by a previous run that never recorded an outcome."""
+        with self.lock:
+            return self.conn.execute(
+                'SELECT idempotency_key, to_number, body, claimed_at FROM sms_messages '
+                'WHERE campaign_id = ? AND status = ?',
+                (campaign_id, SENDING)
+            ).fetchall()
+
+    def record(self, results):
+        """Persist a batch of (idempotency_key, status, sid, error) outcomes."""
+        if not results:
+            return
+        with self.lock:
+            self.conn.execute('BEGIN')
+            now = time.time()
+            self.conn.executemany(
+                'UPDATE sms_messages SET status = ?, sid = ?, error = ?, updated_at = ? '
+                'WHERE idempotency_key = ?',
+                [(status, sid, error, now, key) for key, status, sid, error in results]
+            )
+            self.conn.execute('COMMIT')
+
+    def counts(self, campaign_id):
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT status, COUNT(*) FROM sms_messages WHERE campaign_id = ? GROUP BY status',
+                (campaign_id,)
+            ).fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class BulkSMSSender:
+    def __init__(self, account_sid=None, auth_token=None, from_number=None, checkpoint_path='sms_checkpoint.db',
+                 rate_per_sec=None, max_concurrency=None, messaging_service_sid=None,
+                 api_base=None, max_retries=3, claim_batch_size=200, timeout=10):
+        """
+        Args:
+            account_sid (str): Twilio Account SID (default: TWILIO_ACCOUNT_SID)
+            auth_token (str): Twilio auth token (default: TWILIO_AUTH_TOKEN)
+            from_number (str): Sender number (default: TWILIO_PHONE_NUMBER)
+            checkpoint_path (str): SQLite file holding campaign progress
+            rate_per_sec (float): Messages per second allowed by the account
+                (default: SMS_RATE_PER_SEC or 10)
+            max_concurrency (int): Simultaneous HTTP requests (default: SMS_MAX_CONCURRENCY or 20)
+            messaging_service_sid (str): Send through a Messaging Service instead of from_number
+            api_base (str): Twilio API base URL (override for a local fake)
+            max_retries (int): Retries for 429/5xx/network errors per message
+            claim_batch_size (int): Messages claimed per checkpoint transaction
+            timeout (float): HTTP timeout in seconds
+        """
+        self.account_sid = account_sid or os.getenv('TWILIO_ACCOUNT_SID')
+        self.auth_token = auth_token or os.getenv('TWILIO_AUTH_TOKEN')
+        self.from_number = from_number or os.getenv('TWILIO_PHONE_NUMBER')
+        self.messaging_service_sid = messaging_service_sid or os.getenv('TWILIO_MESSAGING_SERVICE_SID')
+        self.api_base = (api_base or os.getenv('TWILIO_API_BASE', TWILIO_API_BASE)).rstrip('/')
+        self.max_concurrency = int(max_concurrency or os.getenv('SMS_MAX_CONCURRENCY', 20))
+        self.max_retries = max_retries
+        self.claim_batch_size = claim_batch_size
+        self.timeout = timeout
+
+        self.bucket = TokenBucket(float(rate_per_sec or os.getenv('SMS_RATE_PER_SEC', 10)))
+        self.checkpoint = SMSCheckpoint(checkpoint_path)
+
+        self.session = requests.Session()
+        self.session.auth = (self.account_sid, self.auth_token)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    @property
+    def messages_url(self):
+        return f"{self.api_base}/Accounts/{self.account_sid}/Messages.json"
+
+    def send_campaign(self, campaign_id, messages):
+        """
+        Send (or resume) a campaign.
+
+        Args:
+            campaign_id (str): Stable campaign identifier; reuse it to resume
+            messages (iterable): (to_number, body) pairs
+
+        Returns:
+            dict: Counts by status plus elapsed seconds and messages/sec for this run
+        """
+        start = time.perf_counter()
+        self.checkpoint.add(campaign_id, [
+            (idempotency_key(campaign_id, to, body), to, body) for to, body in messages
+        ])
+
+        reconciled = self._reconcile(campaign_id)
+        sent_this_run = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='sms') as pool:
+            in_flight = set()
+            finished = []
+            while True:
+                batch = self.checkpoint.claim(campaign_id, self.claim_batch_size)
+                if not batch and not in_flight:
+                    break
+                for key, to, body in batch:
+                    # Bounded queue: never hold more than two claim batches of futures
+                    while len(in_flight) >= self.max_concurrency * 2:
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        finished.extend(future.result() for future in done)
+                    in_flight.add(pool.submit(self._send_one, key, to, body))
+
+                if not batch:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    finished.extend(future.result() for future in done)
+
+                if finished:
+                    self.checkpoint.record(finished)
+                    sent_this_run += sum(1 for result in finished if result[1] == SENT)
+                    finished = []
+
+        elapsed = time.perf_counter() - start
+        summary = self.checkpoint.counts(campaign_id)
+        summary.update({
+            'sent_this_run': sent_this_run,
+            'reconciled': reconciled,
+            'elapsed_seconds': round(elapsed, 3),
+            'messages_per_sec': round(sent_this_run / elapsed, 2) if elapsed else 0.0
+        })
+        return summary
+
+    def _send_one(self, key, to, body):
+        """Send one message with retries. Returns (key, status, sid, error)."""
+        data = {'To': to, 'Body': body}
+        if self.messaging_service_sid:
+            data['MessagingServiceSid'] = self.messaging_service_sid
+        else:
+            data['From'] = self.from_number
+
+        first_attempt = time.time()
+        error = None
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                response = self.session.post(self.messages_url, data=data, timeout=self.timeout)
+            except requests.ConnectTimeout as e:
+                # Never reached Twilio: safe to send again
+                error = f"ConnectTimeout: {e}"
+                time.sleep(min(2 ** attempt * 0.5, 8))
+                continue
+            except requests.RequestException as e:
+                # Read timeout or dropped connection: Twilio may have accepted it
+                error = f"{type(e).__name__}: {e}"
+            else:
+                if response.status_code in (200, 201):
+                    return key, SENT, response.json().get('sid'), None
+
+                if response.status_code == 429 or response.status_code >= 500:
+                    retry_after = float(response.headers.get('Retry-After', 2 ** attempt * 0.5))
+                    self.bucket.penalize(retry_after)
+                    error = f"HTTP {response.status_code}"
+                    if response.status_code == 429:
+                        # Rejected before it was queued
+                        continue
+                else:
+                    # Any other 4xx (invalid number, unsubscribed, ...) will not succeed on retry
+                    try:
+                        payload = response.json()
+                    except ValueError:
+                        payload = {}
+                    return key, FAILED, None, \
+                        f"HTTP {response.status_code} code {payload.get('code')}: {payload.get('message')}"
+
+            # The outcome is unknown: check Twilio before sending again
+            try:
+                sid = self._find_existing(to, body, first_attempt)
+            except RuntimeError:
+                return key, SENDING, None, error
+            if sid:
+                return key, SENT, sid, None
+
+        return key, FAILED, None, error
+
+    def _reconcile(self, campaign_id):
+        """
+        Resolve messages claimed by a crashed run: if Twilio already has a
+        matching message it is marked sent, otherwise it goes back to pending.
+        Messages that cannot be checked right now stay in doubt (never resent).
+        """
+        def check(row):
+            key, to, body, claimed_at = row
+            try:
+                sid = self._find_existing(to, body, claimed_at)
+            except RuntimeError as e:
+                print(f"Error reconciling SMS {key}: {e}")
+                return None
+            return (key, SENT, sid, None) if sid else (key, PENDING, None, None)
+
+        rows = self.checkpoint.in_doubt(campaign_id)
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='sms-reconcile') as pool:
+            results = [result for result in pool.map(check, rows) if result]
+        self.checkpoint.record(results)
+        return len(results)
+
+    def _find_existing(self, to, body, since):
+        """
+        Return the SID of a message to `to` with this body that Twilio created
+        since `since` (unix seconds), whatever its status. The list is not
+        filtered on DateSent, which queued and accepted messages do not have
+        yet; every page is read.
+        """
+        created_after = (since or 0) - CLOCK_SKEW
+        url = self.messages_url
+        params = {'To': to, 'PageSize': 1000}
+        while url:
+            self.bucket.acquire()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+                response.raise_for_status()
+                page = response.json()
+            except (requests.RequestException, ValueError) as e:
+                raise RuntimeError(f"Could not list messages to {to}: {e}")
+            for message in page.get('messages', []):
+                if message.get('body') == body and created_time(message) >= created_after:
+                    return message.get('sid')
+            # next_page_uri carries the query of the first request
+            next_page = page.get('next_page_uri')
+            url = urljoin(self.api_base, next_page) if next_page else None
+            params = None
+        return None
+
+    def close(self):
+        self.session.close()
+        self.checkpoint.close()
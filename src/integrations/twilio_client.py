@@ -0,0 +1,518 @@
+"""
+Outbound reminder call dialer (Twilio Calls API).
+Reminders for users who cannot read SMS go out as voice calls answered by
+the normal /voice/incoming flow. Calls are created at the account's
+calls-per-second limit over a pooled HTTP session, the number of calls live
+at once is capped to what the webhook tier can serve, busy and unanswered
+numbers are called again on a schedule, and progress lives in a SQLite
+checkpoint so an interrupted campaign resumes where it stopped.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlencode, urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .sms_service import TokenBucket, TWILIO_API_BASE, created_time
+
+# Checkpoint states
+PENDING = 'pending'       # waiting for its first or next attempt (next_attempt_at)
+DIALING = 'dialing'       # claimed and possibly handed to Twilio; reconciled on resume
+LIVE = 'live'             # Twilio created the call; waiting to hear how it ended
+ANSWERED = 'answered'
+UNREACHED = 'unreached'   # busy or not answered on every attempt
+FAILED = 'failed'
+
+# Twilio CallStatus values of a call that is over, and those worth another try
+FINAL_CALL_STATUSES = frozenset({'completed', 'busy', 'no-answer', 'failed', 'canceled'})
+RETRY_CALL_STATUSES = frozenset({'busy', 'no-answer'})
+
+# Seconds to wait after each unanswered attempt before the next one
+DEFAULT_RETRY_SCHEDULE = (1800, 7200, 21600)
+
+DEFAULT_CHECKPOINT_PATH = 'data/call_campaigns.db'
+
+
+def call_key(campaign_id, to_number):
+    """Stable key for the reminder call to one number in one campaign."""
+    return hashlib.sha256(f"{campaign_id}\x1f{to_number}".encode('utf-8')).hexdigest()[:32]
+
+
+class CallCheckpoint:
+    """
+    SQLite-backed campaign progress, shared with the app's /voice/status
+    webhook, which records how each call ended in call_endings.
+    Every call is claimed (DIALING) in a committed transaction before it is
+    handed to Twilio, so after a crash only claimed-but-unconfirmed calls are
+    in doubt, and those are reconciled against Twilio before dialling again.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv('CALL_CAMPAIGN_DB', DEFAULT_CHECKPOINT_PATH)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS reminder_calls (
+                call_key TEXT PRIMARY KEY,
+                campaign_id TEXT NOT NULL,
+                to_number TEXT NOT NULL,
+                language TEXT NOT NULL,
+                status TEXT NOT NULL,
+                sid TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL DEFAULT 0,
+                call_status TEXT,
+                duration INTEGER,
+                error TEXT,
+                claimed_at REAL,
+                updated_at REAL
+            )
+        ''')
+        self.conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_reminder_calls_campaign '
+            'ON reminder_calls (campaign_id, status, next_attempt_at)'
+        )
+        # How calls ended, by SID; a status callback can arrive before the
+        # dialer has recorded the SID of a call that ended at once (busy)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS call_endings (
+                sid TEXT PRIMARY KEY,
+                call_status TEXT NOT NULL,
+                duration INTEGER,
+                received_at REAL
+            ) WITHOUT ROWID
+        ''')
+
+    def add(self, campaign_id, calls):
+        """
+        Register calls for a campaign (already-known keys are left untouched).
+
+        Args:
+            campaign_id (str): Campaign identifier
+            calls (list): (call_key, to_number, language) tuples
+        """
+        with self.lock:
+            self.conn.execute('BEGIN')
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO reminder_calls '
+                '(call_key, campaign_id, to_number, language, status, updated_at) VALUES (?, ?, ?, ?, ?, ?)',
+                [(key, campaign_id, to, language, PENDING, time.time()) for key, to, language in calls]
+            )
+            self.conn.execute('COMMIT')
+
+    def claim(self, campaign_id, limit, now):
+        """Atomically move up to `limit` calls that are due to DIALING and return them."""
+        with self.lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            rows = self.conn.execute(
+                'SELECT call_key, to_number, language FROM reminder_calls '
+                'WHERE campaign_id = ? AND status = ? AND next_attempt_at <= ? ORDER BY next_attempt_at LIMIT ?',
+                (campaign_id, PENDING, now, limit)
+            ).fetchall()
+            self.conn.executemany(
+                'UPDATE reminder_calls SET status = ?, claimed_at = ?, attempts = attempts + 1 WHERE call_key = ?',
+                [(DIALING, now, row[0]) for row in rows]
+            )
+            self.conn.execute('COMMIT')
+        return rows
+
+    def in_doubt(self, campaign_id):
+        """Calls claimed by a previous run that never recorded whether Twilio took them."""
+        with self.lock:
+            return self.conn.execute(
+                'SELECT call_key, to_number, claimed_at FROM reminder_calls WHERE campaign_id = ? AND status = ?',
+                (campaign_id, DIALING)
+            ).fetchall()
+
+    def live(self, campaign_id):
+        """(call_key, sid, updated_at) of calls Twilio created whose end is not yet handled."""
+        with self.lock:
+            return self.conn.execute(
+                'SELECT call_key, sid, updated_at FROM reminder_calls WHERE campaign_id = ? AND status = ?',
+                (campaign_id, LIVE)
+            ).fetchall()
+
+    def record(self, results):
+        """
+        Persist a batch of dial outcomes: (call_key, status, sid, error)
+        tuples. A call put back to PENDING gets its attempt back.
+        """
+        if not results:
+            return
+        with self.lock:
+            self.conn.execute('BEGIN')
+            now = time.time()
+            self.conn.executemany(
+                'UPDATE reminder_calls SET status = ?, sid = ?, error = ?, updated_at = ?, '
+                'attempts = attempts - (? = ?) WHERE call_key = ?',
+                [(status, sid, error, now, status, PENDING, key) for key, status, sid, error in results]
+            )
+            self.conn.execute('COMMIT')
+
+    def record_call_status(self, sid, call_status, duration):
+        """Store how a call ended (status callback or poll)."""
+        with self.lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO call_endings (sid, call_status, duration, received_at) VALUES (?, ?, ?, ?)',
+                (sid, call_status, duration, time.time())
+            )
+
+    def ended(self, campaign_id):
+        """(call_key, call_status, duration, attempts) of live calls that are over."""
+        with self.lock:
+            return self.conn.execute(
+                'SELECT r.call_key, e.call_status, e.duration, r.attempts FROM reminder_calls r '
+                'JOIN call_endings e ON e.sid = r.sid WHERE r.campaign_id = ? AND r.status = ?',
+                (campaign_id, LIVE)
+            ).fetchall()
+
+    def settle(self, outcomes):
+        """Persist (call_key, status, next_attempt_at, error, call_status, duration) for calls that ended."""
+        if not outcomes:
+            return
+        with self.lock:
+            self.conn.execute('BEGIN')
+            now = time.time()
+            self.conn.executemany(
+                'UPDATE reminder_calls SET status = ?, next_attempt_at = ?, error = ?, call_status = ?, '
+                'duration = ?, updated_at = ? WHERE call_key = ?',
+                [(status, next_attempt_at, error, call_status, duration, now, key)
+                 for key, status, next_attempt_at, error, call_status, duration in outcomes]
+            )
+            self.conn.execute('COMMIT')
+
+    def next_due(self, campaign_id):
+        """Time of the earliest pending attempt, or None when nothing is left to dial."""
+        with self.lock:
+            return self.conn.execute(
+                'SELECT MIN(next_attempt_at) FROM reminder_calls WHERE campaign_id = ? AND status = ?',
+                (campaign_id, PENDING)
+            ).fetchone()[0]
+
+    def counts(self, campaign_id):
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT status, COUNT(*) FROM reminder_calls WHERE campaign_id = ? GROUP BY status',
+                (campaign_id,)
+            ).fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def record_status_callback(checkpoint, values):
+    """
+    Hand a Twilio StatusCallback for a finished outbound call to the dialer.
+
+    Args:
+        checkpoint (CallCheckpoint): Checkpoint the campaign dialer runs from
+        values (Mapping): Callback parameters (CallSid, CallStatus, CallDuration)
+
+    Returns:
+        bool: True if the call is over (and was recorded)
+    """
+    call_status = values.get('CallStatus')
+    if call_status not in FINAL_CALL_STATUSES:
+        return False
+    checkpoint.record_call_status(values.get('CallSid'), call_status, int(values.get('CallDuration') or 0))
+    return True
+
+
+class ReminderCallDialer:
+    def __init__(self, account_sid=None, auth_token=None, from_number=None, checkpoint_path=None,
+                 rate_per_sec=None, max_live_calls=None, max_concurrency=None, voice_url=None,
+                 status_callback_url=None, retry_schedule=None, ring_seconds=30, status_timeout=600,
+                 poll_interval=0.2, api_base=None, max_retries=3, claim_batch_size=100, timeout=10):
+        """
+        Args:
+            account_sid (str): Twilio Account SID (default: TWILIO_ACCOUNT_SID)
+            auth_token (str): Twilio auth token (default: TWILIO_AUTH_TOKEN)
+            from_number (str): Caller ID (default: TWILIO_PHONE_NUMBER)
+            checkpoint_path (str): SQLite file holding campaign progress, also
+                written by /voice/status (default: CALL_CAMPAIGN_DB)
+            rate_per_sec (float): Calls created per second allowed by the
+                account (default: CALL_RATE_PER_SEC or 1)
+            max_live_calls (int): Calls ringing or in progress at once; size it
+                to the webhook tier's capacity from scripts/load_test.py
+                (default: CALL_MAX_LIVE or 50)
+            max_concurrency (int): Simultaneous HTTP requests (default: CALL_MAX_CONCURRENCY or 10)
+            voice_url (str): TwiML URL answered calls fetch (default:
+                PUBLIC_BASE_URL + /voice/incoming)
+            status_callback_url (str): Where Twilio reports how a call ended
+                (default: PUBLIC_BASE_URL + /voice/status)
+            retry_schedule (tuple): Seconds before each further attempt at a
+                busy or unanswered number (default: CALL_RETRY_SCHEDULE or
+                30 min, 2 h, 6 h)
+            ring_seconds (int): How long a call rings before it counts as unanswered
+            status_timeout (float): Seconds without a status callback before
+                the dialer asks Twilio about a live call itself
+            poll_interval (float): Seconds between checks for ended calls
+            api_base (str): Twilio API base URL (override for a local fake)
+            max_retries (int): Retries for 429/5xx/network errors per call request
+            claim_batch_size (int): Calls claimed per checkpoint transaction
+            timeout (float): HTTP timeout in seconds
+        """
+        self.account_sid = account_sid or os.getenv('TWILIO_ACCOUNT_SID')
+        self.auth_token = auth_token or os.getenv('TWILIO_AUTH_TOKEN')
+        self.from_number = from_number or os.getenv('TWILIO_PHONE_NUMBER')
+        self.api_base = (api_base or os.getenv('TWILIO_API_BASE', TWILIO_API_BASE)).rstrip('/')
+        public_base = os.getenv('PUBLIC_BASE_URL', '').rstrip('/')
+        self.voice_url = voice_url or (public_base and f"{public_base}/voice/incoming")
+        self.status_callback_url = status_callback_url or (public_base and f"{public_base}/voice/status")
+        if not self.voice_url:
+            raise ValueError('Set PUBLIC_BASE_URL or pass voice_url for answered calls')
+        if retry_schedule is None:
+            retry_schedule = [float(s) for s in os.getenv('CALL_RETRY_SCHEDULE', '').split(',') if s.strip()] \
+                or DEFAULT_RETRY_SCHEDULE
+        self.retry_schedule = tuple(retry_schedule)
+        self.max_live_calls = int(max_live_calls or os.getenv('CALL_MAX_LIVE', 50))
+        self.max_concurrency = int(max_concurrency or os.getenv('CALL_MAX_CONCURRENCY', 10))
+        self.ring_seconds = ring_seconds
+        self.status_timeout = status_timeout
+        self.poll_interval = poll_interval
+        self.max_retries = max_retries
+        self.claim_batch_size = claim_batch_size
+        self.timeout = timeout
+
+        self.bucket = TokenBucket(float(rate_per_sec or os.getenv('CALL_RATE_PER_SEC', 1)))
+        self.checkpoint = CallCheckpoint(checkpoint_path)
+
+        self.session = requests.Session()
+        self.session.auth = (self.account_sid, self.auth_token)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    @property
+    def calls_url(self):
+        return f"{self.api_base}/Accounts/{self.account_sid}/Calls.json"
+
+    def run_campaign(self, campaign_id, calls, wait_for_retries=True):
+        """
+        Dial (or resume) a campaign.
+
+        Args:
+            campaign_id (str): Stable campaign identifier; reuse it to resume
+            calls (iterable): (to_number, language) pairs
+            wait_for_retries (bool): Keep running until the last scheduled
+                retry is done; otherwise return once nothing is due now (run
+                again later to make the retries)
+
+        Returns:
+            dict: Counts by status plus, for this run, calls dialled, retries
+                scheduled, peak live calls, elapsed seconds and calls/sec
+        """
+        start = time.perf_counter()
+        self.checkpoint.add(campaign_id, [(call_key(campaign_id, to), to, language) for to, language in calls])
+
+        reconciled = self._reconcile(campaign_id)
+        # Calls left live by a previous run still hold a line until they end
+        live = {key: (sid, updated) for key, sid, updated in self.checkpoint.live(campaign_id)}
+        run = {'dialed': 0, 'retries_scheduled': 0, 'polled': 0, 'peak_live': len(live)}
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='dialer') as pool:
+            in_flight = {}
+            while True:
+                self._settle(campaign_id, live, run)
+
+                # Claimed calls count as live; never claim more than two rounds
+                # of requests ahead, so a crash leaves few calls in doubt
+                free = min(self.max_live_calls - len(live), self.max_concurrency * 2) - len(in_flight)
+                if free > 0:
+                    for key, to, language in self.checkpoint.claim(
+                            campaign_id, min(free, self.claim_batch_size), time.time()):
+                        in_flight[pool.submit(self._dial, key, to, language)] = key
+                run['peak_live'] = max(run['peak_live'], len(live) + len(in_flight))
+
+                if in_flight:
+                    done, _ = wait(in_flight, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                    results = [future.result() for future in done]
+                    for future in done:
+                        del in_flight[future]
+                    self.checkpoint.record(results)
+                    for key, status, sid, _ in results:
+                        if status == LIVE:
+                            live[key] = (sid, time.time())
+                            run['dialed'] += 1
+                    continue
+                if live:
+                    time.sleep(self.poll_interval)
+                    continue
+
+                next_due = self.checkpoint.next_due(campaign_id)
+                if next_due is None or not wait_for_retries:
+                    break
+                time.sleep(min(max(next_due - time.time(), self.poll_interval), 60))
+
+        elapsed = time.perf_counter() - start
+        summary = self.checkpoint.counts(campaign_id)
+        summary.update(run)
+        summary.update({
+            'reconciled': reconciled,
+            'elapsed_seconds': round(elapsed, 3),
+            'calls_per_sec': round(run['dialed'] / elapsed, 2) if elapsed else 0.0
+        })
+        return summary
+
+    def _settle(self, campaign_id, live, run):
+        """Move calls that ended to answered, a scheduled retry, unreached or failed."""
+        now = time.time()
+        for key, (sid, since) in list(live.items()):
+            if now - since < self.status_timeout:
+                continue
+            # No status callback (app unreachable, or not configured): ask Twilio
+            run['polled'] += 1
+            ended = self._poll(sid)
+            if ended is not None:
+                self.checkpoint.record_call_status(sid, *ended)
+            live[key] = (sid, now)
+
+        outcomes = []
+        for key, call_status, duration, attempts in self.checkpoint.ended(campaign_id):
+            live.pop(key, None)
+            if call_status == 'completed':
+                outcome = (ANSWERED, 0, None)
+            elif call_status in RETRY_CALL_STATUSES and attempts <= len(self.retry_schedule):
+                outcome = (PENDING, now + self.retry_schedule[attempts - 1], None)
+                run['retries_scheduled'] += 1
+            elif call_status in RETRY_CALL_STATUSES:
+                outcome = (UNREACHED, 0, f"{call_status} on all {attempts} attempts")
+            else:
+                outcome = (FAILED, 0, f"call {call_status}")
+            outcomes.append((key, *outcome, call_status, duration))
+        self.checkpoint.settle(outcomes)
+
+    def _dial(self, key, to, language):
+        """Create one call with retries. Returns (key, status, sid, error)."""
+        data = {
+            'To': to,
+            'From': self.from_number,
+            'Url': f"{self.voice_url}?{urlencode({'language': language})}",
+            'Method': 'POST',
+            'Timeout': self.ring_seconds
+        }
+        if self.status_callback_url:
+            data.update({'StatusCallback': self.status_callback_url, 'StatusCallbackMethod': 'POST'})
+
+        first_attempt = time.time()
+        error = None
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                response = self.session.post(self.calls_url, data=data, timeout=self.timeout)
+            except requests.ConnectTimeout as e:
+                # Never reached Twilio: safe to dial again
+                error = f"ConnectTimeout: {e}"
+                time.sleep(min(2 ** attempt * 0.5, 8))
+                continue
+            except requests.RequestException as e:
+                # Read timeout or dropped connection: Twilio may have created the call
+                error = f"{type(e).__name__}: {e}"
+            else:
+                if response.status_code in (200, 201):
+                    return key, LIVE, response.json().get('sid'), None
+
+                if response.status_code == 429 or response.status_code >= 500:
+                    retry_after = float(response.headers.get('Retry-After', 2 ** attempt * 0.5))
+                    self.bucket.penalize(retry_after)
+                    error = f"HTTP {response.status_code}"
+                    if response.status_code == 429:
+                        # Rejected before the call was created
+                        continue
+                else:
+                    # Any other 4xx (invalid number, unverified caller ID, ...) will not succeed on retry
+                    try:
+                        payload = response.json()
+                    except ValueError:
+                        payload = {}
+                    return key, FAILED, None, \
+                        f"HTTP {response.status_code} code {payload.get('code')}: {payload.get('message')}"
+
+            # The outcome is unknown: check Twilio before dialling again
+            try:
+                sid = self._find_existing(to, first_attempt)
+            except RuntimeError:
+                return key, DIALING, None, error
+            if sid:
+                return key, LIVE, sid, None
+
+        return key, FAILED, None, error
+
+    def _reconcile(self, campaign_id):
+        """
+        Resolve calls claimed by a crashed run: if Twilio created a call to
+        the number since the claim it is live, otherwise it goes back to
+        pending. Calls that cannot be checked right now stay in doubt (never
+        dialled twice).
+        """
+        def check(row):
+            key, to, claimed_at = row
+            try:
+                sid = self._find_existing(to, claimed_at)
+            except RuntimeError as e:
+                print(f"Error reconciling call {key}: {e}")
+                return None
+            return (key, LIVE, sid, None) if sid else (key, PENDING, None, None)
+
+        rows = self.checkpoint.in_doubt(campaign_id)
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='dialer-reconcile') as pool:
+            results = [result for result in pool.map(check, rows) if result]
+        self.checkpoint.record(results)
+        return len(results)
+
+    def _find_existing(self, to, since):
+        """
+        Return the SID of a call from our number to `to` that Twilio created
+        since `since` (unix seconds), whatever its status. The list is not
+        filtered on StartTime, which queued and ringing calls do not have
+        yet; every page is read.
+        """
+        # Whole-second timestamps: allow for the claim's fraction of a second.
+        # No more slack than that, or a retry could match the last attempt's call
+        created_after = int(since or 0)
+        url = self.calls_url
+        params = {'To': to, 'From': self.from_number, 'PageSize': 1000}
+        while url:
+            self.bucket.acquire()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+                response.raise_for_status()
+                page = response.json()
+            except (requests.RequestException, ValueError) as e:
+                raise RuntimeError(f"Could not list calls to {to}: {e}")
+            for call in page.get('calls', []):
+                if created_time(call) >= created_after:
+                    return call.get('sid')
+            # next_page_uri carries the query of the first request
+            next_page = page.get('next_page_uri')
+            url = urljoin(self.api_base, next_page) if next_page else None
+            params = None
+        return None
+
+    def _poll(self, sid):
+        """(call_status, duration) if Twilio says the call is over, else None."""
+        try:
+            response = self.session.get(f"{self.api_base}/Accounts/{self.account_sid}/Calls/{sid}.json",
+                                        timeout=self.timeout)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            print(f"Error polling call {sid}: {e}")
+            return None
+        call = response.json()
+        if call.get('status') not in FINAL_CALL_STATUSES:
+            return None
+        return call['status'], int(call.get('duration') or 0)
+
+    def close(self):
+        self.session.close()
+        self.checkpoint.close()
@@ -0,0 +1,163 @@
+"""
+Idempotent handling of Twilio webhooks.
+Twilio retries a webhook that is slow to answer, and flaky caller networks
+replay them, so the same turn can arrive two or three times. Each turn is keyed
+by CallSid plus a signature of its parameters (including the turn number the
+app puts in each Gather action URL): the first request computes the response,
+duplicates that arrive while it runs wait for it, and later ones get the
+stored TwiML until it expires. The store is per process, so duplicates are
+only caught when they reach the same worker.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from ..analytics.metrics import metrics
+
+
+def request_key(values):
+    """
+    Key for a webhook request: CallSid plus a hash of all its parameters.
+
+    Args:
+        values (Mapping): Request parameters (flask request.values); multi-valued
+            parameters are hashed in full
+    """
+    items = values.items(multi=True) if hasattr(values, 'getlist') else values.items()
+    signature = hashlib.sha256(repr(sorted(items)).encode('utf-8')).hexdigest()[:24]
+    return f"{values.get('CallSid', 'unknown')}:{signature}"
+
+
+class _Turn:
+    __slots__ = ('done', 'response', 'seconds', 'finished')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.seconds = 0.0
+        self.finished = None
+
+
+class WebhookDeduplicator:
+    def __init__(self, ttl=60.0, max_entries=10000, max_wait=30.0):
+        """
+        Args:
+            ttl (float): Seconds a finished response is replayed to duplicates
+            max_entries (int): Responses kept at once; the oldest are dropped
+            max_wait (float): Seconds a duplicate waits for the in-flight
+                request before computing the response itself (as it also does
+                when that request failed)
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_wait = max_wait
+        self.entries = OrderedDict()
+        self.counts = {'first': 0, 'joined': 0, 'replayed': 0, 'recomputed': 0}
+        self.saved_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def run(self, key, compute, endpoint='voice_process'):
+        """
+        Return the response for a request, computing it only once per key.
+
+        Args:
+            key (str): See request_key()
+            compute (callable): Builds the response; not called for duplicates
+            endpoint (str): Metrics label
+
+        Returns:
+            The response from compute(), or the stored one for a duplicate
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            turn = self.entries.get(key)
+            if turn is None:
+                turn = self.entries[key] = _Turn()
+                outcome = 'first'
+            else:
+                outcome = 'replayed' if turn.done.is_set() else 'joined'
+
+        if outcome == 'joined' and (not turn.done.wait(self.max_wait) or turn.finished is None):
+            outcome = 'recomputed'
+        if outcome in ('joined', 'replayed'):
+            self._count(outcome, endpoint, turn.seconds)
+            return turn.response
+
+        start = time.perf_counter()
+        try:
+            response = compute()
+        except Exception:
+            # Nothing to replay: let the next duplicate try again
+            with self._lock:
+                if self.entries.get(key) is turn:
+                    del self.entries[key]
+            turn.done.set()
+            raise
+        self._count(outcome, endpoint)
+        if outcome == 'first':
+            turn.response = response
+            turn.seconds = time.perf_counter() - start
+            turn.finished = time.monotonic()
+            turn.done.set()
+            with self._lock:
+                if self.entries.get(key) is turn:
+                    self.entries.move_to_end(key)
+        return response
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counts, entries=len(self.entries), saved_seconds=round(self.saved_seconds, 3))
+
+    def _count(self, outcome, endpoint, saved=0.0):
+        with self._lock:
+            self.counts[outcome] += 1
+            self.saved_seconds += saved
+        metrics.inc('webhook_requests_total', help_text='Webhook requests by dedupe outcome (first, joined, replayed, recomputed)',
+                    endpoint=endpoint, outcome=outcome)
+        if saved:
+            metrics.inc('webhook_dedupe_saved_seconds_total', saved,
+                        help_text='Processing time not spent on duplicate webhook requests', endpoint=endpoint)
+
+    def _sweep(self, now):
+        """Drop expired and excess finished entries, oldest first (lock held)."""
+        while self.entries:
+            oldest = next(iter(self.entries.values()))
+            if oldest.finished is None:
+                # Still in flight; its duplicates may be waiting on it
+                break
+            if now - oldest.finished <= self.ttl and len(self.entries) <= self.max_entries:
+                break
+            self.entries.popitem(last=False)
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    from concurrent.futures import ThreadPoolExecutor
+
+    print("Testing twilio_webhooks.py\n")
+
+    dedupe = WebhookDeduplicator(ttl=5.0)
+    calls = []
+
+    def slow_turn():
+        calls.append(1)
+        time.sleep(0.5)
+        return '<Response><Say>Blood pressure and hemoglobin tests.</Say></Response>', 200
+
+    params = {'CallSid': 'CA123', 'SpeechResult': 'What tests do I need?', 'Confidence': '0.91'}
+    key = request_key(params)
+    # Twilio retry and a replay arrive while the first request is still running
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(dedupe.run, key, slow_turn) for _ in range(3)]
+        time.sleep(0.05)
+        responses = [future.result() for future in futures]
+    print(f"  3 concurrent copies: computed {len(calls)}x, same response: {len(set(responses)) == 1}")
+
+    start = time.perf_counter()
+    dedupe.run(key, slow_turn)
+    print(f"  late retry replayed in {(time.perf_counter() - start) * 1e6:.1f} us, computed {len(calls)}x")
+    print(f"  next turn has another key: {request_key(dict(params, SpeechResult='Is it safe?')) != key}")
+    print(f"  stats: {dedupe.stats()}")
@@ -0,0 +1,143 @@
+"""
+ANC visit cadence and test due dates.
+Visit schedule follows the WHO 2016 recommendation of eight ANC contacts;
+test due weeks are derived from the timing text in TEST_SCHEDULE.
+"""
+
+import re
+from bisect import bisect_left
+from datetime import timedelta
+
+from .test_schedules import TEST_SCHEDULE
+
+
+# WHO 2016: eight contacts, the first within 12 weeks
+ANC_CONTACT_WEEKS = [12, 20, 26, 30, 34, 36, 38, 40]
+
+# Days before the due date that a reminder goes out
+REMINDER_LEAD_DAYS = 3
+
+# Full term from LMP (Naegele's rule)
+PREGNANCY_DAYS = 280
+
+_RANGE = re.compile(r'(\d+)\s*-\s*(\d+)\s*weeks')
+_PLUS = re.compile(r'(\d+)\+\s*weeks')
+_AROUND = re.compile(r'(?:around|after)\s+(\d+)\s*weeks', re.IGNORECASE)
+
+
+def parse_due_week(test):
+    """
+    Work out the week a test is due from its TEST_SCHEDULE timing text.
+
+    Args:
+        test (dict): One entry of a trimester's required_tests
+
+    Returns:
+        int or None: Due week, or None for tests done at every visit (they
+        are covered by the visit reminders instead)
+    """
+    timing = test['timing']
+    if 'Every visit' in test['frequency'] or timing.startswith('Every visit'):
+        return None
+    if timing.startswith('First visit'):
+        return ANC_CONTACT_WEEKS[0]
+
+    match = _RANGE.search(timing)
+    if match:
+        return int(match.group(1))
+    match = _PLUS.search(timing) or _AROUND.search(timing)
+    if match:
+        return int(match.group(1))
+    return None
+
+
+def build_reminder_events():
+    """
+    Build the ordered list of reminder events for one pregnancy.
+
+    Returns:
+        list: Dicts with key, kind ('visit' or 'test'), name, hindi_name,
+        due_week, remind_day (days after LMP) and high_risk_only
+    """
+    events = []
+    for number, week in enumerate(ANC_CONTACT_WEEKS, 1):
+        events.append({
+            'key': f"anc_visit_{number}",
+            'kind': 'visit',
+            'name': f"ANC visit {number}",
+            'hindi_name': f"एएनसी जांच {number}",
+            'due_week': week,
+            'high_risk_only': False
+        })
+
+    seen = set()
+    for trimester in TEST_SCHEDULE.values():
+        for test in trimester['required_tests']:
+            week = parse_due_week(test)
+            if week is None or (test['name'], week) in seen:
+                continue
+            seen.add((test['name'], week))
+            events.append({
+                'key': 'test_' + re.sub(r'[^a-z0-9]+', '_', test['name'].lower()).strip('_') + f"_w{week}",
+                'kind': 'test',
+                'name': test['name'],
+                'hindi_name': test.get('hindi_name', test['name']),
+                'due_week': week,
+                'high_risk_only': 'high-risk' in test['timing']
+            })
+
+    for event in events:
+        event['remind_day'] = max(0, event['due_week'] * 7 - REMINDER_LEAD_DAYS)
+    events.sort(key=lambda event: (event['remind_day'], event['kind'] != 'visit', event['key']))
+    return events
+
+
+def get_due_events_between(start_week, end_week, high_risk=False):
+    """
+    Visits and tests falling due in a range of weeks (inclusive).
+
+    Args:
+        start_week (int): First pregnancy week
+        end_week (int): Last pregnancy week
+        high_risk (bool): Include tests only done for high-risk pregnancies
+
+    Returns:
+        list: Reminder events ordered by due week
+    """
+    return [
+        event for event in REMINDER_EVENTS
+        if start_week <= event['due_week'] <= end_week and (high_risk or not event['high_risk_only'])
+    ]
+
+
+def next_reminder_date(lmp, today, high_risk=False):
+    """
+    Date of the next reminder on or after today.
+
+    Args:
+        lmp (date): Last menstrual period
+        today (date): Reference day
+        high_risk (bool): Include tests only done for high-risk pregnancies
+
+    Returns:
+        date or None: Next reminder date, or None once every reminder has gone out
+    """
+    remind_days = _REMIND_DAYS_HIGH_RISK if high_risk else _REMIND_DAYS
+    index = bisect_left(remind_days, (today - lmp).days)
+    if index == len(remind_days):
+        return None
+    return lmp + timedelta(days=remind_days[index])
+
+
+REMINDER_EVENTS = build_reminder_events()
+_REMIND_DAYS = sorted({e['remind_day'] for e in REMINDER_EVENTS if not e['high_risk_only']})
+_REMIND_DAYS_HIGH_RISK = sorted({e['remind_day'] for e in REMINDER_EVENTS})
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    print("Testing anc_guidelines.py\n")
+    for event in REMINDER_EVENTS:
+        flag = ' (high-risk only)' if event['high_risk_only'] else ''
+        print(f"  day {event['remind_day']:>3} (week {event['due_week']:>2}): {event['name']}{flag}")
+    print(f"\nDue in weeks 18-28: {[e['name'] for e in get_due_events_between(18, 28)]}")
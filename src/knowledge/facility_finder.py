@@ -0,0 +1,67 @@
+"""
+Find health facilities for ANC visits, tests and delivery.
+Searches the facility directory in src/data/facilities.json.
+"""
+
+import json
+from pathlib import Path
+
+FACILITIES_FILE = Path(__file__).parent.parent / 'data' / 'facilities.json'
+
+# Larger facilities first: they offer every service a smaller one does
+FACILITY_TYPE_ORDER = ['district_hospital', 'chc', 'phc', 'anganwadi']
+
+_facilities = None
+
+
+def load_facilities():
+    """Load (and cache) the facility directory."""
+    global _facilities
+    if _facilities is None:
+        with open(FACILITIES_FILE, encoding='utf-8') as f:
+            _facilities = json.load(f)['facilities']
+    return _facilities
+
+
+def search_facilities(district=None, pincode=None, service=None, facility_type=None, limit=3):
+    """
+    Search facilities by location and service.
+
+    Args:
+        district (str): District name (case-insensitive)
+        pincode (str): 6-digit pincode; facilities sharing the first 3 digits
+            (same postal district) are returned when there is no exact match
+        service (str): Required service key, e.g. 'ultrasound', 'delivery'
+        facility_type (str): 'district_hospital', 'chc', 'phc' or 'anganwadi'
+        limit (int): Maximum results
+
+    Returns:
+        list: Matching facilities, nearest pincode and largest facility first
+    """
+    results = []
+    for facility in load_facilities():
+        if district and facility['district'].lower() != district.strip().lower():
+            continue
+        if service and service not in facility['services']:
+            continue
+        if facility_type and facility['type'] != facility_type:
+            continue
+        if pincode and facility['pincode'][:3] != str(pincode)[:3]:
+            continue
+        results.append(facility)
+
+    def rank(facility):
+        exact = 0 if pincode and facility['pincode'] == str(pincode) else 1
+        return (exact, FACILITY_TYPE_ORDER.index(facility['type']), facility['name'])
+
+    return sorted(results, key=rank)[:limit]
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    print("Testing facility_finder.py\n")
+    for facility in search_facilities(district='Lucknow', service='ultrasound'):
+        print(f"  {facility['name']} ({facility['type']}, {facility['hours']})")
+    print()
+    for facility in search_facilities(pincode='221007'):
+        print(f"  {facility['name']} ({facility['pincode']})")
@@ -0,0 +1,230 @@
+"""
+Curated answers to frequent test questions (src/data/faq.json).
+Questions that match an approved entry are answered straight from the file,
+without a model call. A question is looked up by its normalised words first
+(a dict lookup), then scored with BM25 against every paraphrase; the best
+paraphrase is only used if the question and the paraphrase cover most of
+each other's (idf-weighted) words, so anything personal or unusual falls
+through to the model.
+"""
+
+import json
+import math
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from .risk_assessment import normalize
+
+FAQ_FILE = Path(__file__).parent.parent / 'data' / 'faq.json'
+
+# Lowest match score (0-1) answered from the bank, unless config.yaml sets faq.min_score
+MIN_SCORE = 0.75
+
+# Words that carry no meaning for matching. Question words (what, when, why,
+# kab, kyu, क्या, कब, क्यों) are kept: they separate "what is the GTT" from
+# "when is the GTT".
+STOPWORDS = frozenset("""
+a an the is are am was be do does did i me my we our you your it its this that to of for in on at
+with and or can could should would will shall have has had get got done go going there they them
+please tell about
+hai hain ho hota hoti hote ka ki ke ko se me mein mujhe mera meri mere karna karana karani karwana
+karte kar ye yeh wo woh
+है हैं हो होता होती होते का की के को से में मुझे मेरा मेरी मेरे करना कराना करानी करवाना करते कर
+यह ये वह वो
+""".split())
+
+# BM25 parameters (the usual defaults)
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text):
+    """
+    Words used for matching: normalised (see risk_assessment.normalize),
+    stopwords dropped and English plurals folded ("tests" -> "test").
+    """
+    terms = []
+    for word in normalize(text).split():
+        if word in STOPWORDS:
+            continue
+        if word.isascii() and len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+def _applies(entry, week):
+    """True if an entry may answer at this pregnancy week (None = unknown)."""
+    weeks = entry.get('weeks')
+    if not weeks:
+        return True
+    return week is not None and weeks[0] <= week <= weeks[1]
+
+
+class FAQBank:
+    def __init__(self, entries):
+        """
+        Args:
+            entries (list): Entry dicts from faq.json; only those with
+                status 'approved' are indexed
+        """
+        self.entries = [entry for entry in entries if entry.get('status') == 'approved']
+        self.exact = defaultdict(list)  # normalised question -> entry indexes
+        self.docs = []  # (entry index, term counts, length), one per paraphrase
+        self.postings = defaultdict(list)  # term -> [(doc index, term count)]
+        for index, entry in enumerate(self.entries):
+            for question in entry['questions']:
+                terms = tokenize(question)
+                if not terms:
+                    continue
+                key = ' '.join(terms)
+                if index not in self.exact[key]:
+                    self.exact[key].append(index)
+                counts = Counter(terms)
+                for term, count in counts.items():
+                    self.postings[term].append((len(self.docs), count))
+                self.docs.append((index, counts, len(terms)))
+
+        total = len(self.docs)
+        self.avg_length = sum(length for _, _, length in self.docs) / total if total else 1.0
+        self.idf = {term: math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for term, postings in self.postings.items()}
+        # A word no paraphrase uses counts as much as the rarest indexed word
+        self.unknown_idf = math.log(1 + (total + 0.5) / 0.5)
+
+    def _bm25(self, terms):
+        scores = defaultdict(float)
+        for term in set(terms):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc, count in self.postings[term]:
+                length = self.docs[doc][2]
+                scores[doc] += idf * count * (K1 + 1) / (count + K1 * (1 - B + B * length / self.avg_length))
+        return scores
+
+    def _score(self, terms, doc, bm25):
+        """
+        Match score (0-1): the smaller of the question's BM25 score against
+        the paraphrase as a share of what it would score if the paraphrase
+        held every question word once, and the idf-weighted share of the
+        paraphrase's words found in the question.
+        """
+        _, counts, length = self.docs[doc]
+        saturation = (K1 + 1) / (1 + K1 * (1 - B + B * length / self.avg_length))
+        ideal = sum(self.idf.get(term, self.unknown_idf) for term in set(terms)) * saturation
+        question_words = set(terms)
+        covered = sum(self.idf[term] for term in counts if term in question_words)
+        return min(bm25 / ideal, covered / sum(self.idf[term] for term in counts), 1.0)
+
+    def match(self, question, week=None, language='english', min_score=MIN_SCORE):
+        """
+        Curated answer for a question.
+
+        Args:
+            question (str): Utterance
+            week (int): Pregnancy week (None if unknown: only entries that
+                apply at every week can answer)
+            language (str): 'english' or 'hindi'
+            min_score (float): Lowest match score answered
+
+        Returns:
+            dict or None: {'id', 'answer', 'score', 'method': 'exact' or
+                'bm25'}, or None when nothing matches well enough
+        """
+        terms = tokenize(question)
+        if not terms:
+            return None
+
+        for index in self.exact.get(' '.join(terms), ()):
+            if _applies(self.entries[index], week):
+                return self._result(index, language, 1.0, 'exact')
+
+        best = None
+        for doc, bm25 in self._bm25(terms).items():
+            index = self.docs[doc][0]
+            if not _applies(self.entries[index], week):
+                continue
+            score = self._score(terms, doc, bm25)
+            if best is None or score > best[0]:
+                best = (score, index)
+        if best is None or best[0] < min_score:
+            return None
+        return self._result(best[1], language, best[0], 'bm25')
+
+    def _result(self, index, language, score, method):
+        entry = self.entries[index]
+        answers = entry['answers']
+        return {
+            'id': entry['id'],
+            'answer': answers.get(language) or answers['english'],
+            'score': round(score, 3),
+            'method': method
+        }
+
+
+_bank = None
+
+
+def load_faq_bank():
+    """Load (and cache) the answer bank."""
+    global _bank
+    if _bank is None:
+        with open(FAQ_FILE, encoding='utf-8') as f:
+            _bank = FAQBank(json.load(f)['entries'])
+    return _bank
+
+
+def find_answer(question, week=None, language='english', min_score=MIN_SCORE):
+    """Curated answer for a question, or None (see FAQBank.match)."""
+    return load_faq_bank().match(question, week, language, min_score)
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import statistics
+    import time
+
+    print("Testing faq.py\n")
+    bank = load_faq_bank()
+    print(f"  {len(bank.entries)} approved entries, {len(bank.docs)} paraphrases, {len(bank.idf)} terms\n")
+
+    # Fixture turns with the week the caller's record holds (or gave in an
+    # earlier turn of the same call), as the test screening use case sees them
+    from ..utils.validators import extract_pregnancy_week
+    fixtures = Path(__file__).parent.parent.parent / 'tests' / 'fixtures' / 'sample_calls.json'
+    with open(fixtures, encoding='utf-8') as f:
+        calls = json.load(f)['calls']
+    turns = []
+    for call in calls:
+        week = call.get('pregnancy_week')
+        for turn in call['turns']:
+            text = turn.get('speech', turn.get('message'))
+            week = week or extract_pregnancy_week(text)
+            turns.append((text, week, call['language']))
+
+    hits = 0
+    for text, week, language in turns:
+        result = find_answer(text, week, language)
+        hits += result is not None
+        outcome = f"{result['id']} ({result['method']}, {result['score']})" if result else '-'
+        print(f"  {text!r:58} week={week!s:4} -> {outcome}")
+    print(f"\n  Bypass: {hits}/{len(turns)} turns ({hits / len(turns):.0%})")
+
+    # Rewordings, and near misses that must fall through to the model
+    print()
+    for text in ["group b strep kya hota hai", "क्या एचआईवी टेस्ट ज़रूरी है", "when should i do the GTT",
+                 "What tests do I need before the GTT?", "Is the glucose test compulsory?",
+                 "I have HIV, is my baby safe?", "What is my blood group?", "my GTT result is 150, is that bad?"]:
+        result = find_answer(text, 20, min_score=0)
+        served = 'answered' if result['score'] >= MIN_SCORE else 'falls through'
+        print(f"  {text!r:58} -> {result['id']} ({result['method']}, {result['score']}): {served}")
+
+    timings = []
+    for _ in range(200):
+        for text, week, language in turns:
+            start = time.perf_counter()
+            find_answer(text, week, language)
+            timings.append((time.perf_counter() - start) * 1e6)
+    timings.sort()
+    print(f"\n  {statistics.median(timings):.1f} us median, {timings[int(len(timings) * 0.99)]:.1f} us p99 per lookup")
@@ -0,0 +1,587 @@
+"""
+Danger-sign detection for pregnancy emergencies.
+Matches English, Hindi and transliterated (Hinglish) danger-sign phrases in
+a single pass with an Aho-Corasick automaton, then applies a compiled rule
+table, so every utterance can be checked before any other work is done.
+"""
+
+import re
+import unicodedata
+from bisect import bisect_right
+
+# Phrases ending in '*' match as word prefixes ("bleed*" matches "bleeding");
+# all others must match whole words. Hindi nukta and chandrabindu are
+# normalised away, so "तेज़" and "तेज", "साँस" and "सांस" are the same.
+TERM_GROUPS = {
+    'bleeding': {
+        'english': ['bleed*', 'blood coming', 'blood is coming', 'passing blood', 'spotting',
+                    'passing clots', 'clots coming'],
+        'hindi': ['खून आ*', 'खून बह*', 'खून निकल*', 'खून जा*', 'रक्तस्राव', 'ब्लीडिंग'],
+        'transliterated': ['khoon aa*', 'khun aa*', 'khoon beh*', 'khoon nikal*', 'khun nikal*',
+                           'khoon ja*']
+    },
+    # Blood where it means bleeding ("blood on my pad"); bare "blood" is also
+    # the blood test, blood group and blood pressure
+    'blood': {
+        'english': ['blood', 'bloody'],
+        'hindi': ['खून', 'रक्त'],
+        'transliterated': ['khoon', 'khun']
+    },
+    'pad': {
+        'english': ['pad', 'pads', 'underwear', 'panty', 'panties', 'undergarment*', 'vagina*', 'private part*',
+                    'down there', 'sheets', 'bedsheet*'],
+        'hindi': ['पैड', 'चड्डी', 'कच्छे', 'कपड़े', 'कपड़ों', 'योनि'],
+        'transliterated': ['chaddi', 'kachhe', 'kapde', 'kapdon']
+    },
+    'bleeding_negated': {
+        'english': ['no bleed*', 'not bleed*', 'without bleed*', 'bleeding stopped',
+                    'bleeding has stopped', 'never bleed*'],
+        'hindi': ['खून नहीं', 'ब्लीडिंग नहीं', 'खून आना बंद', 'खून नहीं आ*'],
+        'transliterated': ['khoon nahi', 'khun nahi', 'bleeding nahi']
+    },
+    'headache': {
+        'english': ['headache*', 'head hurts', 'head is hurting', 'head pain', 'pain in my head',
+                    'pain in head'],
+        'hindi': ['सिरदर्द', 'सिर दर्द', 'सर दर्द', 'सिर में दर्द', 'सर में दर्द', 'सिर फट'],
+        'transliterated': ['sir dard', 'sar dard', 'sirdard', 'sir me dard', 'sir mein dard',
+                           'sar me dard', 'sar mein dard']
+    },
+    'vision': {
+        'english': ['blurred*', 'blurry', 'blurring', 'blur', 'seeing spots', 'spots in front',
+                    'flashing lights', "can't see properly", 'cannot see properly', "can't see clearly",
+                    'cannot see clearly', 'double vision', 'losing my vision', 'lost my vision'],
+        'hindi': ['धुंधला', 'धुंधली', 'धुंध', 'दिखाई नहीं', 'आंखों के सामने अंधेरा',
+                  'आंखों के आगे अंधेरा', 'कम दिख'],
+        'transliterated': ['dhundhla', 'dhundla', 'dhundhli', 'dikhai nahi', 'andhera']
+    },
+    'severe': {
+        'english': ['severe*', 'very bad', 'really bad', 'badly', 'terrible', 'unbearable', 'too much', 'so much',
+                    'a lot', 'worst', 'strong', 'intense', 'very high', 'high fever*', 'high temperature'],
+        'hindi': ['तेज', 'बहुत', 'ज्यादा', 'जोर', 'जोरों', 'असहनीय', 'भयंकर'],
+        'transliterated': ['tez', 'tej', 'bahut', 'jyada', 'zyada', 'jor', 'bohot']
+    },
+    'fetal_movement': {
+        'english': ['baby not moving', 'baby is not moving', "baby isn't moving", 'baby not kicking',
+                    "baby isn't kicking", 'baby is not kicking', 'baby stopped moving',
+                    'baby has stopped moving', 'baby moving less', 'baby is moving less',
+                    'baby moves less', 'not moving much', 'less movement*', 'no movement*',
+                    'fewer kicks', 'kicks less', 'kicking less', 'kicks are less', 'kicks have reduced',
+                    'kicks reduced', 'less kicks', 'less kicking', 'no kicks', 'not kicking', 'reduced movement*', 'reduced fetal movement*', 'moving less',
+                    'movements have become less', 'movements are less', 'movement is less',
+                    'movement has reduced', 'movements have reduced',
+                    "can't feel the baby", 'cannot feel the baby', "can't feel baby",
+                    "don't feel the baby", 'not feeling the baby', 'not felt the baby'],
+        'hindi': ['बच्चा हिल नहीं', 'बच्चा नहीं हिल', 'बच्चा कम हिल', 'बच्चे की हलचल कम',
+                  'बच्चे की हलचल नहीं', 'हलचल कम', 'हलचल नहीं', 'हलचल बंद', 'बच्चा हिलना बंद',
+                  'बच्चे का हिलना बंद', 'बच्चा लात नहीं'],
+        'transliterated': ['baccha hil nahi', 'bachcha hil nahi', 'bacha hil nahi', 'bachha hil nahi',
+                           'hil nahi raha', 'halchal kam', 'halchal nahi', 'halchal band',
+                           'baccha kam hil*', 'bachcha kam hil*']
+    },
+    'convulsions': {
+        'english': ['fits', 'had a fit', 'seizure*', 'convulsion*', 'fainted', 'fainting',
+                    'passed out', 'unconscious', 'blacked out'],
+        'hindi': ['दौरा', 'दौरे', 'झटके', 'बेहोश*', 'मिर्गी'],
+        'transliterated': ['daura', 'daure', 'jhatke', 'behosh*', 'mirgi']
+    },
+    'abdominal_pain': {
+        'english': ['stomach pain', 'abdominal pain', 'belly pain', 'tummy pain', 'pain in my stomach',
+                    'pain in stomach', 'pain in the stomach', 'pain in my belly', 'pain in my tummy',
+                    'stomach hurts', 'stomach is hurting', 'belly hurts', 'abdomen pain',
+                    'pain in my abdomen', 'stomach ache', 'stomachache'],
+        'hindi': ['पेट में दर्द', 'पेट दर्द', 'पेट में बहुत दर्द', 'पेट में तेज दर्द', 'पेट के निचले हिस्से में दर्द'],
+        'transliterated': ['pet me dard', 'pet mein dard', 'pet dard', 'pait me dard', 'pet main dard']
+    },
+    'water_leak': {
+        'english': ['water broke', 'waters broke', 'water has broken', 'waters have broken',
+                    'water breaking', 'water is leaking', 'water leaking', 'leaking water',
+                    'leaking fluid', 'fluid leaking', 'fluid is leaking', 'leaking from my vagina'],
+        'hindi': ['पानी निकल*', 'पानी आ रहा', 'पानी की थैली फट*', 'पानी गिर*', 'पानी बह*'],
+        'transliterated': ['pani nikal*', 'paani nikal*', 'pani aa raha', 'paani aa raha',
+                           'pani gir*', 'paani gir*', 'thaili phat*']
+    },
+    # "water has been leaking", "पानी रिस रहा है"
+    'water': {
+        'english': ['water', 'waters', 'fluid', 'liquid'],
+        'hindi': ['पानी', 'द्रव'],
+        'transliterated': ['pani', 'paani']
+    },
+    'leak': {
+        'english': ['leak*', 'dripping', 'trickl*', 'gush*'],
+        'hindi': ['रिस*', 'टपक*', 'लीक'],
+        'transliterated': ['leak', 'tapak*']
+    },
+    # Body part and pain words for phrases split by an intensifier ("सिर में बहुत दर्द")
+    'head': {
+        'english': ['head'],
+        'hindi': ['सिर', 'सर'],
+        # Bare "sir"/"sar" is also the English "sir"
+        'transliterated': ['sir me', 'sir mein', 'sir main', 'sar me', 'sar mein', 'sar main']
+    },
+    'belly': {
+        'english': ['stomach', 'belly', 'tummy', 'abdomen', 'abdominal'],
+        'hindi': ['पेट'],
+        'transliterated': ['pet', 'pait']
+    },
+    'pain': {
+        'english': ['pain*', 'hurt*', 'ache*', 'aching'],
+        'hindi': ['दर्द', 'दुख*'],
+        'transliterated': ['dard', 'dukh*']
+    },
+    'fever': {
+        'english': ['fever*', 'temperature'],
+        'hindi': ['बुखार', 'ताप'],
+        'transliterated': ['bukhar', 'bukhaar']
+    },
+    'breathing': {
+        'english': ["can't breathe", 'cannot breathe', 'difficulty breathing', 'difficulty in breathing',
+                    'trouble breathing', 'hard to breathe', 'short of breath', 'shortness of breath',
+                    'breathless*', 'not able to breathe', 'unable to breathe'],
+        'hindi': ['सांस लेने में तकलीफ', 'सांस लेने में दिक्कत', 'सांस लेने में परेशानी',
+                  'सांस फूल*', 'सांस नहीं', 'सांस लेने में मुश्किल'],
+        'transliterated': ['saans phool*', 'sans phool*', 'saans lene me', 'saans lene mein',
+                           'sans lene me', 'saans nahi', 'sans nahi']
+    },
+    'swelling': {
+        'english': ['swelling', 'swollen', 'puffy'],
+        'hindi': ['सूजन', 'सूज*'],
+        'transliterated': ['sujan', 'soojan', 'sooj*']
+    },
+    'face': {
+        'english': ['face'],
+        'hindi': ['चेहरे', 'चेहरा', 'मुंह', 'आंखों'],
+        'transliterated': ['chehra', 'chehre', 'muh', 'munh']
+    }
+}
+
+# A negation group cancels matches of its group that it overlaps, so "no
+# bleeding" does not fire but "no pain but bleeding now" still does
+NEGATIONS = {
+    'bleeding_negated': 'bleeding'
+}
+
+# Negation cues for every group, scoped to their clause. A 'before' cue
+# cancels the terms that follow it ("no headache", "without any bleeding"),
+# an 'after' cue the terms just before it ("headache is gone", "सिरदर्द नहीं
+# है"); only filler words may stand in between, so "not feeling well,
+# bleeding since morning" or "खून रुक नहीं रहा" still escalate. A cue that is
+# part of a term ("baby not moving", "दिखाई नहीं") is not a negation.
+#
+# Only words that say a sign is absent or over are cues: "not much bleeding"
+# still reports bleeding, and "is bleeding normal?" is a question about it,
+# so 'much'/'more' are not fillers and 'normal'/'fine'/'better' not cues.
+NEGATION_CUES = {
+    'before': ['no', 'not', 'never', 'without', 'none', "don't", "doesn't", "didn't", "isn't", "wasn't",
+               "haven't", "hasn't", "aren't", 'बिना', 'bina'],
+    'after': ['gone', 'stopped', 'over', 'away', 'past',
+              'नहीं', 'नही', 'ना', 'न', 'बंद', 'ठीक', 'nahi', 'nahin', 'nhi', 'band', 'theek', 'thik']
+}
+NEGATION_FILLERS = {
+    'before': ['any', 'a', 'an', 'the', 'my', 'real', 'such', 'sign', 'signs', 'of', 'have',
+               'having', 'had', 'feel', 'feeling', 'get', 'getting', 'got', 'see', 'seeing', 'कोई', 'koi'],
+    'after': ['is', 'was', 'has', 'have', 'had', 'now', 'already', 'all', 'completely', 'totally', 'went',
+              'gone', 'got', 'in', 'the', 'है', 'हैं', 'था', 'थी', 'हो', 'रहा', 'रही', 'रहे', 'गया', 'गई', 'हुआ', 'हुई',
+              'अब', 'बिल्कुल', 'hai', 'ho', 'tha', 'thi', 'raha', 'rahi', 'gaya', 'gayi', 'ab', 'bilkul']
+}
+
+# A clause with one of these words brings back the signs the clause before
+# it negated: "bleeding stopped yesterday but started again today"
+RESUME_CUES = ['again', 'restarted', 'phir', 'fir', 'dobara', 'dubara', 'wapas', 'फिर', 'दोबारा', 'वापस']
+
+# Words that end one clause and start another ("no pain but bleeding now");
+# punctuation does too. "और"/"and" do not: "face and hands are swollen".
+CLAUSE_BREAKS = ['but', 'however', 'although', 'though', 'lekin', 'magar', 'लेकिन', 'मगर', 'परंतु', 'किंतु']
+
+# Rules fire when every group in all_of matched; with 'within', only if
+# matches of all the groups lie in one clause, at most that many words apart
+# ("severe headache", "सिर में बहुत दर्द", not "severe" anywhere in a call
+# about a headache). Listed most urgent first.
+DANGER_RULES = [
+    {'category': 'convulsions', 'all_of': ['convulsions']},
+    {'category': 'bleeding', 'all_of': ['bleeding']},
+    {'category': 'bleeding', 'all_of': ['blood', 'pad'], 'within': 4},
+    {'category': 'breathing_difficulty', 'all_of': ['breathing']},
+    {'category': 'reduced_fetal_movement', 'all_of': ['fetal_movement']},
+    {'category': 'severe_headache', 'all_of': ['headache', 'vision']},
+    {'category': 'severe_headache', 'all_of': ['headache', 'severe'], 'within': 3},
+    {'category': 'severe_headache', 'all_of': ['head', 'pain', 'severe'], 'within': 3},
+    {'category': 'blurred_vision', 'all_of': ['vision']},
+    {'category': 'water_leak', 'all_of': ['water_leak']},
+    {'category': 'water_leak', 'all_of': ['water', 'leak'], 'within': 3},
+    {'category': 'severe_abdominal_pain', 'all_of': ['abdominal_pain', 'severe'], 'within': 3},
+    {'category': 'severe_abdominal_pain', 'all_of': ['belly', 'pain', 'severe'], 'within': 3},
+    {'category': 'high_fever', 'all_of': ['fever', 'severe'], 'within': 3},
+    {'category': 'face_swelling', 'all_of': ['swelling', 'face'], 'within': 5}
+]
+
+DANGER_SIGNS = {
+    'convulsions': {'name': 'Fits or fainting', 'hindi_name': 'दौरे या बेहोशी'},
+    'bleeding': {'name': 'Vaginal bleeding', 'hindi_name': 'खून आना'},
+    'breathing_difficulty': {'name': 'Difficulty breathing', 'hindi_name': 'सांस लेने में तकलीफ'},
+    'reduced_fetal_movement': {'name': 'Baby moving less', 'hindi_name': 'बच्चे की हलचल कम'},
+    'severe_headache': {'name': 'Severe headache', 'hindi_name': 'तेज सिरदर्द'},
+    'blurred_vision': {'name': 'Blurred vision', 'hindi_name': 'धुंधला दिखना'},
+    'water_leak': {'name': 'Water leaking', 'hindi_name': 'पानी निकलना'},
+    'severe_abdominal_pain': {'name': 'Severe abdominal pain', 'hindi_name': 'पेट में तेज दर्द'},
+    'high_fever': {'name': 'High fever', 'hindi_name': 'तेज बुखार'},
+    'face_swelling': {'name': 'Swelling of face or hands', 'hindi_name': 'चेहरे पर सूजन'}
+}
+
+ESCALATION_MESSAGES = {
+    'english': (
+        "{sign} can be a danger sign in pregnancy. Please go to the nearest hospital "
+        "or health centre right now. Call 108 for a free ambulance. Do not wait."
+    ),
+    'hindi': (
+        "{sign} गर्भावस्था में खतरे का संकेत हो सकता है। कृपया अभी तुरंत नज़दीकी अस्पताल "
+        "या स्वास्थ्य केंद्र जाएं। मुफ्त एम्बुलेंस के लिए 108 पर कॉल करें। इंतज़ार न करें।"
+    )
+}
+
+# Everything that is not a letter, digit or Devanagari mark becomes a word break
+_NON_WORD = re.compile(r"[^\wऀ-ॿ']+")
+_CLAUSE_PUNCTUATION = re.compile(r'[,;:!?।|]+|\.(?!\d)')
+_FOLD = str.maketrans({'़': None, 'ँ': 'ं', '’': "'", '।': ' '})
+
+
+def normalize(text):
+    """
+    Normalise an utterance for matching: lowercase, fold Hindi variants, and
+    pad every word with single spaces (so matches fall on word boundaries).
+    """
+    text = unicodedata.normalize('NFC', text).lower().translate(_FOLD)
+    return ' ' + ' '.join(_NON_WORD.sub(' ', text).split()) + ' '
+
+
+class AhoCorasick:
+    """Multi-pattern string matcher: finds every pattern occurrence in one pass."""
+
+    def __init__(self, patterns):
+        """
+        Args:
+            patterns (list): (string, value) pairs
+        """
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [()]
+
+        for string, value in patterns:
+            state = 0
+            for char in string:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(())
+                state = next_state
+            self.output[state] = self.output[state] + ((len(string), value),)
+
+        # Breadth-first: a state's failure link is the longest proper suffix that is also a prefix
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0) if state else 0
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def search(self, text):
+        """
+        Returns:
+            list: (start, end, value) for every match, end exclusive
+        """
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+        matches = []
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                end = index + 1
+                for length, value in output[state]:
+                    matches.append((end - length, end, value))
+        return matches
+
+
+def clauses(text):
+    """
+    An utterance split into clauses (at punctuation and CLAUSE_BREAKS words),
+    each normalised like normalize().
+    """
+    result = []
+    # Lowercase and fold once; '।' is folded to a space, so split first
+    for part in _CLAUSE_PUNCTUATION.split(unicodedata.normalize('NFC', text).lower()):
+        words = []
+        for word in _NON_WORD.sub(' ', part.translate(_FOLD)).split():
+            if word in _CLAUSE_BREAKS:
+                if words:
+                    result.append(' ' + ' '.join(words) + ' ')
+                words = []
+            else:
+                words.append(word)
+        if words:
+            result.append(' ' + ' '.join(words) + ' ')
+    return result
+
+
+_CLAUSE_BREAKS = frozenset(normalize(' '.join(CLAUSE_BREAKS)).split())
+
+
+class DangerSignDetector:
+    def __init__(self, term_groups=None, rules=None, negations=None, negation_cues=None, negation_fillers=None):
+        term_groups = term_groups or TERM_GROUPS
+        rules = rules or DANGER_RULES
+        self.negations = NEGATIONS if negations is None else negations
+        cues = NEGATION_CUES if negation_cues is None else negation_cues
+        fillers = NEGATION_FILLERS if negation_fillers is None else negation_fillers
+        self.cues = {side: frozenset(normalize(' '.join(words)).split()) for side, words in cues.items()}
+        self.fillers = {side: frozenset(normalize(' '.join(words)).split()) for side, words in fillers.items()}
+        self.resume_cues = frozenset(normalize(' '.join(RESUME_CUES)).split())
+
+        # Each group gets one bit; rules compile to (required bit mask, category,
+        # groups and word distance for proximity rules)
+        self.group_bits = {group: 1 << index for index, group in enumerate(term_groups)}
+        patterns = []
+        for group, lexicons in term_groups.items():
+            for language, phrases in lexicons.items():
+                for phrase in phrases:
+                    prefix = phrase.endswith('*')
+                    text = normalize(phrase.rstrip('*'))
+                    patterns.append((text[:-1] if prefix else text, (group, language)))
+        self.matcher = AhoCorasick(patterns)
+
+        self.rules = []
+        for rule in rules:
+            mask = 0
+            for group in rule['all_of']:
+                mask |= self.group_bits[group]
+            within = rule.get('within')
+            self.rules.append((mask, rule['category'], tuple(rule['all_of']) if within is not None else None, within))
+
+    def _clause_matches(self, clause):
+        """
+        Terms in a clause as (first word, last word, group, language).
+
+        Returns:
+            tuple: (terms that are not negated, terms that are)
+        """
+        matches = self.matcher.search(clause)
+        if not matches:
+            return [], []
+        words = clause.split()
+        starts = []
+        offset = 1
+        for word in words:
+            starts.append(offset)
+            offset += len(word) + 1
+
+        spans = []
+        for start, end, (group, language) in matches:
+            first = bisect_right(starts, start + 1) - 1
+            last = bisect_right(starts, end - 1 if clause[end - 1] != ' ' else end - 2) - 1
+            spans.append((first, last, group, language))
+
+        in_term = set()
+        for first, last, _, _ in spans:
+            in_term.update(range(first, last + 1))
+        negated = set()
+        for index, word in enumerate(words):
+            if index in in_term:
+                continue
+            for side, step in (('before', 1), ('after', -1)):
+                if word not in self.cues[side]:
+                    continue
+                # Walk away from the cue over fillers and terms; every term
+                # reached is negated
+                position = index + step
+                while 0 <= position < len(words):
+                    if position in in_term:
+                        negated.add(position)
+                    elif words[position] not in self.fillers[side]:
+                        break
+                    position += step
+
+        explicit = [(first, last, self.negations[group]) for first, last, group, _ in spans if group in self.negations]
+        kept = []
+        cancelled = []
+        for span in spans:
+            first, last, group, _ = span
+            if group in self.negations:
+                continue
+            if negated.intersection(range(first, last + 1)) or explicit and any(
+                    target == group and n_first <= first and last <= n_last for n_first, n_last, target in explicit):
+                cancelled.append(span)
+            else:
+                kept.append(span)
+        return kept, cancelled
+
+    def _matches(self, text):
+        """Per clause, the term matches that are not negated."""
+        result = []
+        previous = []
+        for clause in clauses(text):
+            kept, cancelled = self._clause_matches(clause)
+            result.append(kept)
+            # "... stopped yesterday but started again": a clause with no
+            # terms of its own brings back the terms the clause before
+            # negated (as a clause of their own, so proximity rules still
+            # compare words of one clause)
+            if previous and not kept and not cancelled and self.resume_cues.intersection(clause.split()):
+                result.append(previous)
+            previous = cancelled
+        return result
+
+    def matched_groups(self, text):
+        """
+        Term groups found in an utterance, after negations are applied.
+
+        Returns:
+            dict: {group: language of the first match}
+        """
+        found = {}
+        for matches in self._matches(text):
+            for _, _, group, language in matches:
+                found.setdefault(group, language)
+        return found
+
+    @staticmethod
+    def _near(matches, groups, within):
+        """True if one clause has a match of every group, each at most `within` words from the first group's."""
+        for clause in matches:
+            by_group = {}
+            for first, last, group, _ in clause:
+                if group in groups:
+                    by_group.setdefault(group, []).append((first, last))
+            if len(by_group) < len(groups):
+                continue
+            for a_first, a_last in by_group[groups[0]]:
+                if all(any(max(first - a_last, a_first - last) - 1 <= within for first, last in by_group[group])
+                       for group in groups[1:]):
+                    return True
+        return False
+
+    def detect(self, text):
+        """
+        Check an utterance for danger signs.
+
+        Args:
+            text (str): What the caller said
+
+        Returns:
+            list: Matching danger-sign categories, most urgent first (empty if none)
+        """
+        matches = self._matches(text)
+        bits = 0
+        for clause in matches:
+            for _, _, group, _ in clause:
+                bits |= self.group_bits[group]
+        if not bits:
+            return []
+        categories = []
+        for mask, category, groups, within in self.rules:
+            if bits & mask != mask or category in categories:
+                continue
+            if groups is not None and not self._near(matches, groups, within):
+                continue
+            categories.append(category)
+        return categories
+
+
+def get_escalation_message(category, language='english'):
+    """
+    Urgent referral advice for a danger sign.
+
+    Args:
+        category (str): Key of DANGER_SIGNS
+        language (str): 'english' or 'hindi'
+
+    Returns:
+        str: Message to speak or send
+    """
+    sign = DANGER_SIGNS[category]
+    if language == 'hindi':
+        return ESCALATION_MESSAGES['hindi'].format(sign=sign['hindi_name'])
+    return ESCALATION_MESSAGES['english'].format(sign=sign['name'])
+
+
+danger_detector = DangerSignDetector()
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import json
+    import time
+    from pathlib import Path
+
+    print("Testing risk_assessment.py\n")
+
+    for utterance in ["I have some bleeding since morning", "मुझे तेज़ सिरदर्द हो रहा है और धुंधला दिख रहा है",
+                      "The baby not moving much today", "There is no bleeding, when is my next scan?",
+                      "What tests do I need?"]:
+        print(f"  {utterance!r}: {danger_detector.detect(utterance)}")
+
+    fixture = Path(__file__).parent.parent.parent / 'tests' / 'fixtures' / 'danger_signs.json'
+    with open(fixture, encoding='utf-8') as f:
+        labelled = json.load(f)
+
+    print("\nRecall by language:")
+    misses = []
+    by_language = {}
+    for case in labelled['positives']:
+        categories = danger_detector.detect(case['text'])
+        hits, total = by_language.get(case['language'], (0, 0))
+        hit = case['category'] in categories
+        by_language[case['language']] = (hits + hit, total + 1)
+        if not hit:
+            misses.append((case['text'], case['category'], categories))
+    for language, (hits, total) in sorted(by_language.items()):
+        print(f"  {language:<15} {hits}/{total} ({hits / total:.0%})")
+    hits = sum(h for h, _ in by_language.values())
+    total = sum(t for _, t in by_language.values())
+    print(f"  {'overall':<15} {hits}/{total} ({hits / total:.0%})")
+    for text, expected, got in misses:
+        print(f"  missed {expected}: {text!r} -> {got}")
+
+    false_alarms = [case['text'] for case in labelled['negatives'] if danger_detector.detect(case['text'])]
+    print(f"\nFalse alarms: {len(false_alarms)}/{len(labelled['negatives'])}")
+    for text in false_alarms:
+        print(f"  {text!r} -> {danger_detector.detect(text)}")
+
+    utterances = [case['text'] for case in labelled['positives'] + labelled['negatives']]
+    rounds = 2000
+
+    def per_utterance(run, inputs):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for item in inputs:
+                run(item)
+        return (time.perf_counter() - start) / (rounds * len(inputs)) * 1e6
+
+    print(f"\nLatency ({len(utterances)} utterances x {rounds}):")
+    print(f"  detect (clauses, negation, rules): {per_utterance(danger_detector.detect, utterances):5.1f} us")
+
+    # Term matching alone, on normalised text, against the regex-per-group
+    # baseline it replaced. The detector's total is higher than the old
+    # baseline's because of the clause and negation work the baseline
+    # never did, not because of the matcher.
+    group_patterns = {
+        group: re.compile('|'.join(
+            re.escape(normalize(p.rstrip('*'))[:-1] if p.endswith('*') else normalize(p))
+            for phrases in lexicons.values() for p in phrases
+        ))
+        for group, lexicons in TERM_GROUPS.items()
+    }
+    normalized = [normalize(utterance) for utterance in utterances]
+    print(f"  Aho-Corasick, every match with its position: "
+          f"{per_utterance(danger_detector.matcher.search, normalized):5.1f} us")
+    print(f"  Regex per group, first match only:           "
+          f"{per_utterance(lambda text: [g for g, p in group_patterns.items() if p.search(text)], normalized):5.1f} us")
+    print(f"  Regex per group, every match with position:  "
+          f"{per_utterance(lambda text: [m.span() for p in group_patterns.values() for m in p.finditer(text)], normalized):5.1f} us")
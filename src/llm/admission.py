@@ -0,0 +1,207 @@
+"""
+Admission control for model calls.
+Caps how many turns wait on Claude at once. A turn that cannot get a slot
+within the queue-time limit (or finds the queue full) is shed, so the use case
+can answer from cache or its fallback instead of letting Twilio time out.
+Waiting turns are served round-robin by caller, so one caller cannot take
+every slot that frees up, and speculative work only uses spare capacity.
+Turns without a caller (anonymous chat requests) are not held to the
+per-caller limit: they are different people, and share one place in the
+round-robin.
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+
+from ..analytics.metrics import metrics
+
+
+class _Waiter:
+    __slots__ = ('caller', 'event', 'granted')
+
+    def __init__(self, caller):
+        self.caller = caller
+        self.event = threading.Event()
+        self.granted = False
+
+
+class AdmissionController:
+    def __init__(self, max_concurrent=8, max_queue=32, max_wait=2.0, per_caller=1, speculative_headroom=2):
+        """
+        Args:
+            max_concurrent (int): Model calls allowed in flight at once
+            max_queue (int): Turns allowed to wait for a slot; more are shed at once
+            max_wait (float): Seconds a turn may wait for a slot before it is shed
+            per_caller (int): Slots one caller may hold at once (speculation excluded)
+            speculative_headroom (int): Slots kept free for live turns; speculative
+                calls are only admitted below max_concurrent - speculative_headroom
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.per_caller = per_caller
+        self.speculative_headroom = speculative_headroom
+
+        self._lock = threading.Lock()
+        self._queues = OrderedDict()
+        self._held = {}
+        self.in_flight = 0
+        self.queued = 0
+        self.counts = {'admitted': 0, 'queued': 0, 'shed_queue_full': 0, 'shed_timeout': 0,
+                       'shed_speculative': 0}
+
+    def acquire(self, caller=None, speculative=False, timeout=None):
+        """
+        Wait for a slot.
+
+        Args:
+            caller (str): Who the call is for (CallSid or chat user id; None
+                for an anonymous request, which has no per-caller limit)
+            speculative (bool): Pre-generated answer; never waits
+            timeout (float): Override of max_wait
+
+        Returns:
+            str or None: None when admitted (call release() afterwards),
+                else why the turn was shed: 'queue_full', 'timeout' or 'speculative'
+        """
+        start = time.perf_counter()
+        with self._lock:
+            if speculative:
+                if self.queued or self.in_flight >= self.max_concurrent - self.speculative_headroom:
+                    return self._shed('speculative')
+                self.in_flight += 1
+                self.counts['admitted'] += 1
+                return None
+
+            if not self.queued and self.in_flight < self.max_concurrent and self._below_limit(caller):
+                self._grant(caller)
+                return None
+
+            if self.queued >= self.max_queue:
+                return self._shed('queue_full')
+
+            waiter = _Waiter(caller)
+            self._queues.setdefault(caller, deque()).append(waiter)
+            self.queued += 1
+            self.counts['queued'] += 1
+            # Free slots may be waiting only on callers at their per-caller limit
+            self._dispatch()
+
+        waiter.event.wait(self.max_wait if timeout is None else timeout)
+
+        with self._lock:
+            if not waiter.granted:
+                queue = self._queues.get(caller)
+                queue.remove(waiter)
+                if not queue:
+                    del self._queues[caller]
+                self.queued -= 1
+                reason = self._shed('timeout')
+            else:
+                reason = None
+        metrics.observe('llm_admission_wait_seconds', time.perf_counter() - start,
+                        'Time turns waited for a model call slot', outcome=reason or 'admitted')
+        return reason
+
+    def release(self, caller=None, speculative=False):
+        """Give back a slot taken by acquire() and hand it to the next waiting caller."""
+        with self._lock:
+            self.in_flight -= 1
+            if not speculative and caller is not None:
+                held = self._held.get(caller, 0) - 1
+                if held > 0:
+                    self._held[caller] = held
+                else:
+                    self._held.pop(caller, None)
+            self._dispatch()
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counts, in_flight=self.in_flight, queued=self.queued)
+
+    def _below_limit(self, caller):
+        """True if a caller may take another slot (lock held)."""
+        return caller is None or self._held.get(caller, 0) < self.per_caller
+
+    def _grant(self, caller):
+        """Take a slot for a caller (lock held)."""
+        self.in_flight += 1
+        if caller is not None:
+            self._held[caller] = self._held.get(caller, 0) + 1
+        self.counts['admitted'] += 1
+
+    def _dispatch(self):
+        """Admit waiters while slots are free, one per caller in turn (lock held)."""
+        while self.in_flight < self.max_concurrent and self._queues:
+            for caller in self._queues:
+                if self._below_limit(caller):
+                    break
+            else:
+                return
+            queue = self._queues.pop(caller)
+            waiter = queue.popleft()
+            if queue:
+                # Back of the line: other callers go first
+                self._queues[caller] = queue
+            self.queued -= 1
+            self._grant(caller)
+            waiter.granted = True
+            waiter.event.set()
+
+    def _shed(self, reason):
+        """Count a shed turn (lock held) and return the reason."""
+        self.counts[f'shed_{reason}'] += 1
+        metrics.inc('llm_shed_total', help_text='Turns refused a model call slot, by reason', reason=reason)
+        return reason
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import random
+    from concurrent.futures import ThreadPoolExecutor
+
+    print("Testing admission.py\n")
+
+    # 2x overload: 40 turns/s arriving for 8 slots of ~400 ms model time (20 turns/s)
+    def simulate(controller, turns=400, rate=40.0, llm_seconds=0.4, twilio_timeout=3.0):
+        rng = random.Random(7)
+        results = []
+        lock = threading.Lock()
+
+        def turn(caller, arrived):
+            reason = controller.acquire(caller) if controller else None
+            if reason is None:
+                try:
+                    time.sleep(llm_seconds * rng.uniform(0.7, 1.5))
+                finally:
+                    if controller:
+                        controller.release(caller)
+                latency = time.perf_counter() - arrived
+                outcome = 'answered' if latency < twilio_timeout else 'timed_out'
+            else:
+                latency = time.perf_counter() - arrived
+                outcome = 'degraded'
+            with lock:
+                results.append((outcome, latency))
+
+        with ThreadPoolExecutor(max_workers=200) as pool:
+            for i in range(turns):
+                pool.submit(turn, f"CA{i % 60}", time.perf_counter())
+                time.sleep(1 / rate)
+
+        summary = {}
+        for outcome, _ in results:
+            summary[outcome] = summary.get(outcome, 0) + 1
+        latencies = sorted(latency for _, latency in results)
+        return summary, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99) - 1]
+
+    # Without admission control the model API is the queue (8 connections)
+    class ConnectionLimit(AdmissionController):
+        def __init__(self):
+            super().__init__(max_concurrent=8, max_queue=10 ** 6, max_wait=3600, per_caller=10 ** 6)
+
+    for label, controller in (('unbounded queue', ConnectionLimit()),
+                              ('admission control', AdmissionController(max_concurrent=8, max_wait=1.0))):
+        summary, p50, p99 = simulate(controller)
+        print(f"  {label:18} {summary}  p50 {p50:.2f}s  p99 {p99:.2f}s")
@@ -0,0 +1,221 @@
+"""
+Circuit breakers for the Claude API, one per model and endpoint.
+A breaker trips open when too many recent requests failed or were slow; while
+open, turns skip the network and go straight to their fallback. After the
+cool-down one probe request is let through (half-open) and its outcome
+decides whether the breaker closes again.
+"""
+
+import threading
+import time
+from collections import deque
+
+from ..analytics.metrics import metrics
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Prometheus value per state
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+DEFAULT_SETTINGS = {
+    'window_seconds': 30,
+    'min_requests': 5,
+    'error_rate': 0.5,
+    'slow_call_seconds': 8,
+    'slow_rate': 0.5,
+    'cooldown_seconds': 20
+}
+
+
+def endpoint_of(client):
+    """Messages endpoint a client talks to (wrapped and stub clients have no base_url)."""
+    base_url = getattr(client, 'base_url', None)
+    return f"{str(base_url).rstrip('/')}/v1/messages" if base_url else 'v1/messages'
+
+
+def is_failure(request):
+    """
+    Whether a ToolUseLoop request record counts against the API: timeouts,
+    connection errors, rate limiting and server errors do; a request the API
+    rejected as invalid (other 4xx) does not.
+    """
+    if not request.get('error'):
+        return False
+    status = request.get('status')
+    return status is None or status == 429 or status >= 500
+
+
+class CircuitBreaker:
+    def __init__(self, name, settings=None):
+        """
+        Args:
+            name (str): '<model> <endpoint>'
+            settings (dict): Overrides of DEFAULT_SETTINGS (see config.yaml circuit_breaker)
+        """
+        self.name = name
+        self.settings = settings or {}
+        self.state = CLOSED
+        self.opened_at = None
+        self.short_circuited = 0
+        self._probe_in_flight = False
+        self._window = deque()
+        self._errors = 0
+        self._slow = 0
+        self._lock = threading.Lock()
+
+    def setting(self, key):
+        return self.settings.get(key, DEFAULT_SETTINGS[key])
+
+    def allow(self):
+        """
+        Whether a request may go to the API now. In half-open state only one
+        probe is allowed; its caller must record() its outcome or abandon().
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.setting('cooldown_seconds'):
+                    return self._short_circuit()
+                self._transition(HALF_OPEN)
+            if self._probe_in_flight:
+                return self._short_circuit()
+            self._probe_in_flight = True
+            return True
+
+    def record(self, failed, seconds):
+        """
+        Report the outcome of an allowed request.
+
+        Args:
+            failed (bool): See is_failure()
+            seconds (float): Wall time of the request
+        """
+        slow = seconds >= self.setting('slow_call_seconds')
+        now = time.monotonic()
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probe_in_flight = False
+                if failed or slow:
+                    self._open(now)
+                else:
+                    self._transition(CLOSED)
+                return
+            if self.state == OPEN:
+                # A request admitted before the breaker tripped
+                return
+
+            self._window.append((now, failed, slow))
+            self._errors += failed
+            self._slow += slow
+            self._prune(now)
+            total = len(self._window)
+            if total >= self.setting('min_requests') and (
+                self._errors / total >= self.setting('error_rate') or
+                self._slow / total >= self.setting('slow_rate')
+            ):
+                self._open(now)
+
+    def abandon(self):
+        """An allowed request was never sent (e.g. shed); frees the half-open probe."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def snapshot(self):
+        """State for /health."""
+        with self._lock:
+            self._prune(time.monotonic())
+            total = len(self._window)
+            snapshot = {
+                'state': self.state,
+                'requests': total,
+                'error_rate': round(self._errors / total, 3) if total else 0.0,
+                'slow_rate': round(self._slow / total, 3) if total else 0.0,
+                'short_circuited': self.short_circuited
+            }
+            if self.state == OPEN:
+                remaining = self.setting('cooldown_seconds') - (time.monotonic() - self.opened_at)
+                snapshot['retry_in_seconds'] = round(max(0.0, remaining), 1)
+            return snapshot
+
+    def _prune(self, now):
+        """Drop outcomes older than the window (lock held)."""
+        horizon = now - self.setting('window_seconds')
+        while self._window and self._window[0][0] < horizon:
+            _, failed, slow = self._window.popleft()
+            self._errors -= failed
+            self._slow -= slow
+
+    def _open(self, now):
+        self.opened_at = now
+        self._window.clear()
+        self._errors = 0
+        self._slow = 0
+        self._transition(OPEN)
+
+    def _transition(self, state):
+        self.state = state
+        metrics.inc('llm_circuit_transitions_total', help_text='Circuit breaker state changes',
+                    breaker=self.name, state=state)
+
+    def _short_circuit(self):
+        self.short_circuited += 1
+        metrics.inc('llm_circuit_short_circuits_total', help_text='Requests skipped by an open circuit breaker',
+                    breaker=self.name)
+        return False
+
+
+class CircuitBreakers:
+    def __init__(self):
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, model, endpoint, settings=None):
+        """
+        The breaker for a model and endpoint, created on first use. The
+        settings are refreshed on every call, so config reloads apply.
+        """
+        name = f"{model} {endpoint}"
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(name, CircuitBreaker(name, settings))
+        if settings is not None:
+            breaker.settings = settings
+        return breaker
+
+    def snapshot(self):
+        return {name: breaker.snapshot() for name, breaker in list(self._breakers.items())}
+
+    def states(self):
+        """{labels: state value} for the llm_circuit_state gauge."""
+        return {(('breaker', name),): STATE_VALUES[breaker.state] for name, breaker in list(self._breakers.items())}
+
+
+circuit_breakers = CircuitBreakers()
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    print("Testing claude_client.py\n")
+
+    breaker = CircuitBreaker('claude v1/messages', {'min_requests': 5, 'cooldown_seconds': 0.2})
+    for i in range(6):
+        if breaker.allow():
+            breaker.record(failed=i >= 2, seconds=0.5)
+        print(f"  request {i}: state {breaker.state}")
+
+    tripped = CircuitBreaker('bench', {'min_requests': 1, 'cooldown_seconds': 60})
+    tripped.record(failed=True, seconds=0.1)
+    n = 100000
+    start = time.perf_counter()
+    for _ in range(n):
+        tripped.allow()
+    print(f"\n  allow() while open: {(time.perf_counter() - start) / n * 1e6:.2f} us")
+
+    time.sleep(0.25)
+    print(f"  after cool-down: probe allowed {breaker.allow()}, second request allowed {breaker.allow()}")
+    breaker.record(failed=False, seconds=0.4)
+    print(f"  probe succeeded: state {breaker.state}  {breaker.snapshot()}")
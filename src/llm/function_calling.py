@@ -0,0 +1,413 @@
+"""
+Claude tool use with locally executed tools.
+Tool definitions live in config/functions/*.json; tool_use blocks from one
+model turn run concurrently, deterministic results are memoized across
+turns and calls, and the number of model round trips per turn is capped.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from ..knowledge.anc_guidelines import ANC_CONTACT_WEEKS, get_due_events_between
+from ..knowledge.facility_finder import search_facilities
+from ..knowledge.test_schedules import get_tests_for_week
+
+FUNCTIONS_DIR = Path(__file__).parent.parent.parent / 'config' / 'functions'
+
+# Token counts copied from each response's usage block
+USAGE_FIELDS = ('input_tokens', 'output_tokens', 'cache_read_input_tokens', 'cache_creation_input_tokens')
+
+
+def load_tool_definitions(directory=FUNCTIONS_DIR):
+    """
+    Load tool definitions from JSON files.
+
+    Each file holds one Anthropic tool definition (name, description,
+    input_schema) plus an optional "cache" flag for tools whose result
+    depends only on their input.
+
+    Returns:
+        list: Tool definition dicts, sorted by name
+    """
+    tools = []
+    for path in sorted(Path(directory).glob('*.json')):
+        with open(path, encoding='utf-8') as f:
+            tools.append(json.load(f))
+    return sorted(tools, key=lambda tool: tool['name'])
+
+
+# ============================================================================
+# TOOL IMPLEMENTATIONS
+# ============================================================================
+
+def test_lookup(pregnancy_week, include_upcoming=False):
+    """Tests recommended at a week of pregnancy."""
+    week = int(pregnancy_week)
+    data = get_tests_for_week(week)
+    result = {
+        'pregnancy_week': week,
+        'trimester': data['trimester'],
+        'tests': [
+            {
+                'name': test['name'],
+                'hindi_name': test.get('hindi_name'),
+                'timing': test['timing'],
+                'why': test['why']
+            }
+            for test in data['tests']
+        ]
+    }
+    if include_upcoming:
+        result['upcoming'] = [
+            {'name': event['name'], 'due_week': event['due_week']}
+            for event in get_due_events_between(week + 1, week + 4)
+            if event['kind'] == 'test'
+        ]
+    return result
+
+
+def facility_search(district=None, pincode=None, service=None, facility_type=None):
+    """Facilities for ANC visits, tests and delivery."""
+    facilities = search_facilities(district=district, pincode=pincode, service=service,
+                                   facility_type=facility_type)
+    return {
+        'facilities': [
+            {key: facility[key] for key in ('name', 'hindi_name', 'type', 'district', 'pincode', 'hours', 'services')}
+            for facility in facilities
+        ]
+    }
+
+
+def appointment_check(pregnancy_week, high_risk=False, weeks_ahead=4):
+    """Next ANC visit and tests falling due soon."""
+    week = int(pregnancy_week)
+    next_visit = next((contact for contact in ANC_CONTACT_WEEKS if contact >= week), None)
+    due = get_due_events_between(week, week + int(weeks_ahead), high_risk=bool(high_risk))
+    return {
+        'pregnancy_week': week,
+        'next_anc_visit_week': next_visit,
+        'weeks_until_next_visit': next_visit - week if next_visit is not None else None,
+        'due_soon': [
+            {'name': event['name'], 'kind': event['kind'], 'due_week': event['due_week']}
+            for event in due
+        ]
+    }
+
+
+TOOL_HANDLERS = {
+    'test_lookup': test_lookup,
+    'facility_search': facility_search,
+    'appointment_check': appointment_check
+}
+
+
+# ============================================================================
+# RESULT CACHE AND LOOP
+# ============================================================================
+
+class ToolResultCache:
+    """Thread-safe LRU cache of tool results keyed by tool name and input."""
+
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(name, tool_input):
+        return name + ':' + json.dumps(tool_input, sort_keys=True, ensure_ascii=False)
+
+    def get(self, key):
+        with self._lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Shared by every loop in the process, so results carry over between calls
+tool_cache = ToolResultCache()
+
+
+class ToolSet:
+    """
+    Tool definitions ready to send: the local "cache" flag is stripped and
+    only tools with a handler are offered. Built once per config load.
+    """
+
+    def __init__(self, definitions, handlers=None):
+        handlers = handlers if handlers is not None else TOOL_HANDLERS
+        self.tools = [
+            {key: value for key, value in tool.items() if key != 'cache'}
+            for tool in definitions if tool['name'] in handlers
+        ]
+        self.cacheable = frozenset(tool['name'] for tool in definitions if tool.get('cache'))
+        self.names = frozenset(tool['name'] for tool in self.tools)
+
+
+def _block_to_param(block):
+    """Convert a response content block into a request content block."""
+    if block.type == 'tool_use':
+        return {'type': 'tool_use', 'id': block.id, 'name': block.name, 'input': block.input}
+    if block.type == 'text':
+        return {'type': 'text', 'text': block.text}
+    return block.model_dump() if hasattr(block, 'model_dump') else dict(vars(block))
+
+
+class ToolUseLoop:
+    def __init__(self, model, max_tokens=1024, tools=None, handlers=None, max_iterations=3,
+                 max_workers=4, cache=None):
+        """
+        Args:
+            model (str): Claude model name
+            max_tokens (int): Output token limit per model call
+            tools (list or ToolSet): Tool definitions (default: config/functions)
+            handlers (dict): Tool name -> callable taking the tool input as kwargs
+            max_iterations (int): Maximum model calls per turn; the last one is
+                made with tool_choice none so it has to answer
+            max_workers (int): Tools run concurrently within one model turn
+            cache (ToolResultCache): Result cache (default: process-wide)
+        """
+        self.model = model
+        self.max_tokens = max_tokens
+        self.handlers = handlers if handlers is not None else TOOL_HANDLERS
+        self.toolset = tools if isinstance(tools, ToolSet) else ToolSet(
+            tools if tools is not None else load_tool_definitions(), self.handlers
+        )
+        self.max_iterations = max(1, max_iterations)
+        self.cache = cache if cache is not None else tool_cache
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tool')
+
+    def run(self, client, system, messages, turn_info=None, model=None, max_tokens=None,
+            toolset=None, max_iterations=None, timeout=None):
+        """
+        Call Claude, executing tools until it gives a final answer.
+
+        Args:
+            client: anthropic.Anthropic (or a compatible stub)
+            system (str): System prompt
+            messages (list): Conversation so far; not modified
+            turn_info (dict): Filled with 'round_trips', 'tool_calls',
+                'tool_cache_hits', 'input_tokens', 'output_tokens',
+                'llm_requests' (one dict per model request with its token
+                usage, model and wall time; failed requests carry 'error' and
+                the HTTP 'status', if any) and stage timings 'llm_call' and
+                'tool_execution' (seconds, summed over the turn)
+            model, max_tokens, toolset, max_iterations: Per-call overrides of
+                the constructor settings (e.g. from the current config snapshot)
+            timeout (float): Seconds to wait for each model request
+
+        Returns:
+            str: Final text answer
+        """
+        model = model or self.model
+        max_tokens = max_tokens or self.max_tokens
+        toolset = toolset or self.toolset
+        max_iterations = max(1, max_iterations or self.max_iterations)
+        if turn_info is None:
+            turn_info = {}
+        stages = turn_info.setdefault('stages', {})
+        stages.setdefault('llm_call', 0.0)
+        turn_info['round_trips'] = 0
+        turn_info['tool_calls'] = 0
+        turn_info['tool_cache_hits'] = 0
+        turn_info['input_tokens'] = 0
+        turn_info['output_tokens'] = 0
+        requests = turn_info.setdefault('llm_requests', [])
+        messages = list(messages)
+
+        for iteration in range(max_iterations):
+            request = {
+                'model': model,
+                'max_tokens': max_tokens,
+                'system': system,
+                'messages': messages
+            }
+            if toolset.tools:
+                request['tools'] = toolset.tools
+                if iteration == max_iterations - 1:
+                    request['tool_choice'] = {'type': 'none'}
+            if timeout:
+                request['timeout'] = timeout
+
+            stage_start = time.perf_counter()
+            record = {'model': model, 'seconds': 0.0}
+            requests.append(record)
+            try:
+                message = client.messages.create(**request)
+            except Exception as e:
+                record['error'] = True
+                record['status'] = getattr(e, 'status_code', None)
+                raise
+            finally:
+                record['seconds'] = time.perf_counter() - stage_start
+                stages['llm_call'] += record['seconds']
+                turn_info['round_trips'] += 1
+
+            usage = getattr(message, 'usage', None)
+            if usage is not None:
+                for field in USAGE_FIELDS:
+                    record[field] = getattr(usage, field, 0) or 0
+                turn_info['input_tokens'] += record['input_tokens']
+                turn_info['output_tokens'] += record['output_tokens']
+
+            tool_uses = [block for block in message.content if block.type == 'tool_use']
+            if getattr(message, 'stop_reason', 'end_turn') != 'tool_use' or not tool_uses:
+                text = ''.join(block.text for block in message.content if block.type == 'text')
+                if not text:
+                    raise RuntimeError('Model returned no text answer')
+                return text
+
+            stage_start = time.perf_counter()
+            results = self.execute_tools(tool_uses, turn_info, toolset)
+            stages['tool_execution'] = stages.get('tool_execution', 0.0) + time.perf_counter() - stage_start
+
+            messages.append({'role': 'assistant', 'content': [_block_to_param(block) for block in message.content]})
+            messages.append({'role': 'user', 'content': results})
+
+        raise RuntimeError(f"No answer after {max_iterations} model round trips")
+
+    def execute_tools(self, tool_uses, turn_info=None, toolset=None):
+        """
+        Execute the tool_use blocks of one model turn.
+
+        Cached results are answered immediately; identical calls in the same
+        turn run once; everything else runs concurrently on the pool.
+
+        Returns:
+            list: tool_result blocks in the order of tool_uses
+        """
+        if turn_info is None:
+            turn_info = {}
+        toolset = toolset or self.toolset
+        turn_info['tool_calls'] = turn_info.get('tool_calls', 0) + len(tool_uses)
+
+        outcomes = {}  # cache key -> (content, is_error)
+        pending = {}   # cache key -> future
+        keys = []
+        for block in tool_uses:
+            key = ToolResultCache.key(block.name, block.input)
+            keys.append(key)
+            if key in outcomes or key in pending:
+                continue
+            if block.name in toolset.cacheable:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    outcomes[key] = (cached, False)
+                    turn_info['tool_cache_hits'] = turn_info.get('tool_cache_hits', 0) + 1
+                    continue
+            pending[key] = self.executor.submit(self._call_tool, block.name, block.input, toolset)
+
+        for key, future in pending.items():
+            outcomes[key] = future.result()
+
+        results = []
+        for block, key in zip(tool_uses, keys):
+            content, is_error = outcomes[key]
+            if not is_error and block.name in toolset.cacheable and key in pending:
+                self.cache.put(key, content)
+            result = {'type': 'tool_result', 'tool_use_id': block.id, 'content': content}
+            if is_error:
+                result['is_error'] = True
+            results.append(result)
+        return results
+
+    def _call_tool(self, name, tool_input, toolset):
+        """Run one tool; returns (json content, is_error)."""
+        handler = self.handlers.get(name)
+        if handler is None or name not in toolset.names:
+            return f"Unknown tool: {name}", True
+        try:
+            return json.dumps(handler(**tool_input), ensure_ascii=False), False
+        except Exception as e:
+            print(f"Error running tool {name}: {e}")
+            return f"Tool {name} failed: {e}", True
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    from types import SimpleNamespace
+
+    print("Testing function_calling.py\n")
+
+    class ScriptedClient:
+        """Asks for three tools in one turn, then answers."""
+
+        def __init__(self, latency_ms=0):
+            self.messages = self
+            self.latency_ms = latency_ms
+
+        def create(self, **request):
+            time.sleep(self.latency_ms / 1000)
+            last = request['messages'][-1]['content']
+            if isinstance(last, list) and last and last[0].get('type') == 'tool_result':
+                return SimpleNamespace(stop_reason='end_turn', content=[
+                    SimpleNamespace(type='text', text=f"Answer built from {len(last)} tool results.")
+                ])
+            return SimpleNamespace(stop_reason='tool_use', content=[
+                SimpleNamespace(type='text', text='Let me check.'),
+                SimpleNamespace(type='tool_use', id='t1', name='test_lookup', input={'pregnancy_week': 20}),
+                SimpleNamespace(type='tool_use', id='t2', name='appointment_check', input={'pregnancy_week': 20}),
+                SimpleNamespace(type='tool_use', id='t3', name='facility_search',
+                                input={'district': 'Lucknow', 'service': 'ultrasound'})
+            ])
+
+    tool_latency = 0.05
+
+    def slow(handler):
+        def wrapped(**kwargs):
+            time.sleep(tool_latency)
+            return handler(**kwargs)
+        return wrapped
+
+    slow_handlers = {name: slow(handler) for name, handler in TOOL_HANDLERS.items()}
+    client = ScriptedClient()
+    messages = [{'role': 'user', 'content': 'What tests do I need at 20 weeks and where can I get a scan?'}]
+
+    for label, workers in (('sequential', 1), ('parallel', 4)):
+        tool_cache.clear()
+        loop = ToolUseLoop('claude-sonnet-4-20250514', handlers=slow_handlers, max_workers=workers)
+        info = {}
+        start = time.perf_counter()
+        answer = loop.run(client, 'system', messages, info)
+        print(f"{label:>10}: {(time.perf_counter() - start) * 1000:6.1f} ms, {info['round_trips']} round trips, "
+              f"{info['tool_calls']} tool calls, {info['tool_cache_hits']} cache hits -> {answer}")
+
+    info = {}
+    start = time.perf_counter()
+    loop.run(client, 'system', messages, info)
+    print(f"{'cached':>10}: {(time.perf_counter() - start) * 1000:6.1f} ms, {info['round_trips']} round trips, "
+          f"{info['tool_calls']} tool calls, {info['tool_cache_hits']} cache hits")
+
+    class LoopingClient(ScriptedClient):
+        def create(self, **request):
+            self.last_request = request
+            return super().create(**{**request, 'messages': request['messages'][:1]})
+
+    looping = LoopingClient()
+    info = {}
+    try:
+        ToolUseLoop('claude-sonnet-4-20250514', max_iterations=3).run(looping, 'system', messages, info)
+    except RuntimeError as e:
+        print(f"\nIteration cap: {e} (last request tool_choice={looping.last_request.get('tool_choice')})")
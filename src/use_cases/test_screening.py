@@ -4,109 +4,278 @@ Handles inquiries about required medical tests during pregnancy.
 """
 
 import os
+import time
 from anthropic import Anthropic
+from ..knowledge.faq import MIN_SCORE as FAQ_MIN_SCORE, find_answer
 from ..knowledge.test_schedules import get_tests_for_week, get_trimester_from_week
+from ..llm.claude_client import circuit_breakers, endpoint_of, is_failure
+from ..llm.function_calling import ToolUseLoop
+from ..analytics.usage_tracker import usage_tracker
+from ..analytics.metrics import metrics
+from ..conversation.response_generator import AnswerCache
+from ..utils.config import get_config
+from ..utils.validators import extract_week_slot
 
 class TestScreeningUseCase:
     def __init__(self):
         self.name = "test_screening"
         self.client = Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
+        config = get_config()
+        self.tool_loop = ToolUseLoop(
+            model=config.llm['model'],
+            max_tokens=config.llm['max_tokens'],
+            tools=config.toolset,
+            max_iterations=config.llm['max_tool_rounds']
+        )
+        # Optional AdmissionController (set by the app) and the answers that
+        # turns shed by it can reuse
+        self.admission = None
+        self.answer_cache = AnswerCache()
         
-    def handle(self, user_input, context):
+    def handle(self, user_input, context, turn_info=None):
         """
         Handle test inquiry based on pregnancy stage.
         
         Args:
             user_input (str): What the user said/asked
             context (dict): User context including pregnancy_week, language, etc.
+            turn_info (dict): Optional dict the use case fills with details about
+                how the turn was answered ('fallback', 'round_trips' to the
+                model, tool call counts, and per-stage timings in seconds
+                under 'stages'); 'signals' from the dialogue manager are
+                reused when present, and 'account' ({'call', 'user'}) is
+                what token usage is charged to; 'shed' is set when admission
+                control or an open circuit breaker refused the model call;
+                'faq' holds the id of a curated answer served without one;
+                'shared_answers' (SharedAnswers) lets the turns of a chat
+                batch share answers to identical prompts
         
         Returns:
             str: Natural language response about required tests
         """
-        # Get pregnancy week from context
-        pregnancy_week = context.get('pregnancy_week')
+        if turn_info is None:
+            turn_info = {}
+        turn_info.setdefault('fallback', False)
+        stages = turn_info.setdefault('stages', {})
+        
+        # Get pregnancy week from context, unless the caller asked about
+        # another week this turn (the dialogue manager's 'asked_week')
+        signals = turn_info.get('signals', {})
+        pregnancy_week = signals.get('asked_week') or context.get('pregnancy_week')
         language = context.get('language', 'english')
         user_name = context.get('name', 'there')
         
+        if not pregnancy_week:
+            # "I am five months pregnant, what tests do I need?" (only the
+            # caller's own stage is kept: "tests in the 7th month" is not)
+            slot = extract_week_slot(user_input)
+            pregnancy_week = slot.get('pregnancy_week')
+            if slot.get('about_caller'):
+                context['pregnancy_week'] = pregnancy_week
+        
+        # Curated answers need no model call
+        answer = self._faq_answer(user_input, pregnancy_week, language, turn_info)
+        if answer is not None:
+            return answer
         if not pregnancy_week:
             return self._ask_for_pregnancy_week(language)
         
-        # Get the test data
-        test_data = get_tests_for_week(pregnancy_week)
-        trimester = get_trimester_from_week(pregnancy_week)
+        # Get the test data, reusing the dialogue manager's lookup (or the
+        # prompt parts warmed from a partial transcript) when it ran for the
+        # same week
+        knowledge = signals.get('knowledge')
+        prepared = signals.get('prepared')
+        if not self._is_current(prepared, pregnancy_week, language):
+            prepared = None
+        if prepared:
+            test_data = prepared['test_data']
+            trimester = prepared['trimester']
+        elif knowledge and knowledge['pregnancy_week'] == pregnancy_week:
+            test_data = knowledge['test_data']
+            trimester = knowledge['trimester']
+        else:
+            stage_start = time.perf_counter()
+            test_data = get_tests_for_week(pregnancy_week)
+            trimester = get_trimester_from_week(pregnancy_week)
+            stages['knowledge_lookup'] = time.perf_counter() - stage_start
         
         # Create a prompt for Claude with the medical data
-        response = self._generate_response(
-            user_input=user_input,
-            test_data=test_data,
-            pregnancy_week=pregnancy_week,
-            trimester=trimester,
-            language=language,
-            user_name=user_name
-        )
+        def generate():
+            return self._generate_response(
+                user_input=user_input,
+                test_data=test_data,
+                pregnancy_week=pregnancy_week,
+                trimester=trimester,
+                language=language,
+                user_name=user_name,
+                turn_info=turn_info,
+                prepared=prepared
+            )
         
-        return response
+        # Items of a chat batch that would send the same prompt share one answer
+        shared = turn_info.get('shared_answers')
+        if shared is not None:
+            key = AnswerCache.key(user_input, pregnancy_week, language, user_name, get_config().version)
+            return shared.run(key, generate, turn_info)
+        return generate()
     
-    def _generate_response(self, user_input, test_data, pregnancy_week, trimester, language, user_name):
+    def prepare(self, context):
+        """
+        Build the prompt parts that depend only on the pregnancy week and
+        language, so they can be warmed before the caller finishes speaking.
+        
+        Args:
+            context (dict): Context with pregnancy_week and language
+        
+        Returns:
+            dict or None: Prepared parts (None if the week is unknown)
+        """
+        pregnancy_week = context.get('pregnancy_week')
+        if not pregnancy_week:
+            return None
+        language = context.get('language', 'english')
+        config = get_config()
+        prompts = config.use_cases[self.name]
+        test_data = get_tests_for_week(pregnancy_week)
+        return {
+            'pregnancy_week': pregnancy_week,
+            'language': language,
+            'config_version': config.version,
+            'test_data': test_data,
+            'trimester': get_trimester_from_week(pregnancy_week),
+            'tests_info': self._format_tests_for_prompt(test_data['tests']),
+            'system_prompt': config.prompt(prompts['system_prompt']).render(language=language)
+        }
+    
+    def answers_without_week(self, user_input):
+        """True if the FAQ bank answers this question whatever the pregnancy week."""
+        settings = get_config().faq
+        return settings.get('enabled', True) and \
+            find_answer(user_input, min_score=settings.get('min_score', FAQ_MIN_SCORE)) is not None
+    
+    def _faq_answer(self, user_input, pregnancy_week, language, turn_info):
+        """
+        Approved answer from the FAQ bank (src/data/faq.json) if the question
+        matches one closely enough, else None.
+        """
+        settings = get_config().faq
+        if not settings.get('enabled', True):
+            return None
+        stage_start = time.perf_counter()
+        match = find_answer(user_input, pregnancy_week, language, settings.get('min_score', FAQ_MIN_SCORE))
+        turn_info['stages']['faq_lookup'] = time.perf_counter() - stage_start
+        metrics.inc('faq_lookups_total', help_text='FAQ bank lookups, by outcome',
+                    outcome=match['method'] if match else 'miss')
+        if match is None:
+            return None
+        turn_info['faq'] = match['id']
+        return match['answer']
+    
+    def _is_current(self, prepared, pregnancy_week, language):
+        """True if prepared parts match this turn and the loaded config."""
+        return bool(prepared) and prepared['pregnancy_week'] == pregnancy_week and \
+            prepared['language'] == language and prepared['config_version'] == get_config().version
+    
+    def _generate_response(self, user_input, test_data, pregnancy_week, trimester, language, user_name,
+                           turn_info=None, prepared=None):
         """
         Use Claude to generate a natural, empathetic response about tests.
         """
-        # Format the test data for Claude
-        tests_info = self._format_tests_for_prompt(test_data['tests'])
+        if turn_info is None:
+            turn_info = {}
+        stages = turn_info.setdefault('stages', {})
+        stage_start = time.perf_counter()
         
-        # Create system prompt
-        system_prompt = f"""You are a helpful, warm maternal health assistant for pregnant women in India.
-You provide clear, accurate information about prenatal tests in a caring, reassuring way.
-
-Guidelines:
-- Speak in simple, easy-to-understand language
-- Be warm and encouraging
-- Explain WHY each test is important (not just what it is)
-- Address the woman by name when appropriate
-- If speaking in Hindi, use simple Hindi that's easy to understand
-- Keep responses concise but complete (2-3 paragraphs max for voice)
-- Focus on what's most important for their current stage
-
-Current language: {language}
-"""
-
-        # Create user prompt with context
-        user_prompt = f"""The pregnant woman (name: {user_name}) is at {pregnancy_week} weeks of pregnancy ({trimester}).
-
-She asked: "{user_input}"
-
-Here are the tests recommended for her current stage:
-
-{tests_info}
-
-Please provide a helpful, natural response that:
-1. Addresses her question directly
-2. Explains the 2-3 most important tests for her current week
-3. Briefly mentions why each test matters
-4. Is warm and reassuring in tone
-5. Responds in {language}
-
-Keep it conversational and suitable for a voice conversation (not too long)."""
+        # Prompts come from the current config snapshot (config/prompts)
+        config = get_config()
+        prompts = config.use_cases[self.name]
+        if prepared:
+            tests_info = prepared['tests_info']
+            system_prompt = prepared['system_prompt']
+        else:
+            # Format the test data for Claude
+            tests_info = self._format_tests_for_prompt(test_data['tests'])
+            system_prompt = config.prompt(prompts['system_prompt']).render(language=language)
+        user_prompt = config.prompt(prompts['prompt']).render(
+            user_name=user_name,
+            pregnancy_week=pregnancy_week,
+            trimester=trimester,
+            user_input=user_input,
+            tests_info=tests_info,
+            language=language
+        )
 
-        # Call Claude API
+        stages['prompt_build'] = time.perf_counter() - stage_start
+        
+        # Token budgets: shorter answers once a call is over its budget, the
+        # static answer once the day's budget is spent
+        account = turn_info.get('account')
+        budget = usage_tracker.check(account, config.budgets)
+        max_tokens = config.llm['max_tokens']
+        if budget:
+            turn_info['budget'] = budget
+        if budget == 'fallback':
+            turn_info['fallback'] = True
+            return self._fallback_response(test_data, language)
+        if budget == 'reduce':
+            max_tokens = min(max_tokens, config.budgets.get('reduced_max_tokens', max_tokens))
+        
+        # Circuit breaker: while the API is failing or too slow, skip it and
+        # answer from cache or the fallback straight away
+        cache_key = AnswerCache.key(user_input, pregnancy_week, language, user_name, config.version)
+        breaker = circuit_breakers.get(config.llm['model'], endpoint_of(self.client), config.circuit_breaker)
+        if not breaker.allow():
+            return self._shed_response(cache_key, 'circuit_open', test_data, language, turn_info)
+        
+        # Admission control: when too many turns are already waiting on the
+        # model, answer this one now from cache or the fallback instead
+        speculative = bool(account and account.get('speculative'))
+        caller = account.get('call') if account else None
+        if self.admission is not None:
+            wait_start = time.perf_counter()
+            shed = self.admission.acquire(caller, speculative=speculative)
+            stages['admission_wait'] = time.perf_counter() - wait_start
+            if shed:
+                breaker.abandon()
+                return self._shed_response(cache_key, shed, test_data, language, turn_info)
+        
+        # Call Claude API, running any tools it asks for
+        requests_before = len(turn_info.get('llm_requests', ()))
         try:
-            message = self.client.messages.create(
-                model="claude-sonnet-4-20250514",
-                max_tokens=1024,
-                system=system_prompt,
-                messages=[
+            answer = self.tool_loop.run(
+                self.client,
+                system_prompt,
+                [
                     {
                         "role": "user",
                         "content": user_prompt
                     }
-                ]
+                ],
+                turn_info,
+                model=config.llm['model'],
+                max_tokens=max_tokens,
+                toolset=config.toolset,
+                max_iterations=config.llm['max_tool_rounds'],
+                timeout=config.llm.get('timeout_seconds')
             )
-            
-            return message.content[0].text
+            self.answer_cache.put(cache_key, answer)
+            return answer
             
         except Exception as e:
             print(f"Error calling Claude API: {e}")
+            turn_info['fallback'] = True
             return self._fallback_response(test_data, language)
+        
+        finally:
+            if self.admission is not None:
+                self.admission.release(caller, speculative=speculative)
+            requests = turn_info.get('llm_requests', [])[requests_before:]
+            for request in requests:
+                breaker.record(is_failure(request), request['seconds'])
+            if not requests:
+                breaker.abandon()
+            use_case = self.name + ('/speculative' if account and account.get('speculative') else '')
+            usage_tracker.record(account, use_case, language, requests, config.pricing)
     
     def _format_tests_for_prompt(self, tests):
         """Format test data into a readable string for Claude."""
@@ -127,9 +296,30 @@ Test: {test['name']}
     def _ask_for_pregnancy_week(self, language):
         """Ask user for their pregnancy week if not provided."""
         if language == 'hindi':
-            return "आप गर्भावस्था के कितने सप्ताह में हैं? यह जानकर मैं आपको सही जानकारी दे सकूंगी।"
+            return "आप गर्भावस्था के कितने सप्ताह या महीने में हैं, या आखिरी माहवारी कब हुई थी? यह जानकर मैं आपको सही जानकारी दे सकूंगी।"
+        else:
+            return "To help you better, could you tell me how many weeks or months pregnant you are, or when your last period was?"
+    
+    def _shed_response(self, cache_key, reason, test_data, language, turn_info):
+        """
+        Answer for a turn that may not call the model (shed by admission
+        control or an open circuit breaker): a cached answer, else the
+        fallback, with a busy note when the service is overloaded.
+        """
+        turn_info['shed'] = reason
+        answer = self.answer_cache.get(cache_key) if reason != 'speculative' else None
+        served = 'cached' if answer is not None else 'fallback'
+        metrics.inc('llm_shed_answers_total', help_text='Answers served to shed turns', served=served)
+        if answer is not None:
+            return answer
+        turn_info['fallback'] = True
+        if reason not in ('queue_full', 'timeout'):
+            return self._fallback_response(test_data, language)
+        if language == 'hindi':
+            busy = "अभी बहुत सी माताएं कॉल कर रही हैं, इसलिए संक्षेप में बता रही हूं। ज़्यादा जानकारी के लिए एक मिनट बाद फिर पूछें।\n"
         else:
-            return "To help you better, could you tell me how many weeks pregnant you are?"
+            busy = "Many mothers are calling right now, so here is a short answer. Please ask again in a minute for more detail.\n"
+        return busy + self._fallback_response(test_data, language)
     
     def _fallback_response(self, test_data, language):
         """Fallback response if Claude API fails."""
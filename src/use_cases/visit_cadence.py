@@ -0,0 +1,243 @@
+"""
+Use Case: Follow visit + testing cadence by trimester.
+Population-scale reminder scheduler: works out who is due for which ANC visit
+or test on which day, for every registered pregnancy.
+"""
+
+from datetime import date, timedelta
+
+from ..knowledge.anc_guidelines import REMINDER_EVENTS, PREGNANCY_DAYS
+
+
+class ReminderScheduler:
+    """
+    Calendar queue keyed by LMP day.
+
+    Every reminder fires a fixed number of days after the LMP, so the women due
+    for a given event on day D are exactly those whose LMP is D - offset. A
+    daily run therefore does one bucket lookup per distinct event offset and
+    touches only the pregnancies that are actually due, instead of scanning the
+    whole population.
+    """
+
+    def __init__(self, events=None):
+        self.events = events or REMINDER_EVENTS
+        self.offsets = {}  # remind_day -> [events]
+        for event in self.events:
+            self.offsets.setdefault(event['remind_day'], []).append(event)
+
+        self.lmp_by_user = {}    # user_id -> LMP as a date ordinal
+        self.buckets = {}        # LMP ordinal -> [user_id, ...]
+        self.high_risk = set()
+        self.last_run_day = None
+
+    def __len__(self):
+        return len(self.lmp_by_user)
+
+    def add_pregnancy(self, user_id, lmp=None, edd=None, high_risk=False):
+        """
+        Register (or re-date) a pregnancy.
+
+        Args:
+            user_id: Any hashable id (phone number, database id)
+            lmp (date): Last menstrual period
+            edd (date): Expected delivery date, used when lmp is unknown
+            high_risk (bool): Include high-risk-only tests (e.g. NST)
+        """
+        if lmp is None:
+            if edd is None:
+                raise ValueError("Either lmp or edd is required")
+            lmp = edd - timedelta(days=PREGNANCY_DAYS)
+        lmp_day = lmp.toordinal()
+
+        previous = self.lmp_by_user.get(user_id)
+        if previous is not None and previous != lmp_day:
+            self.buckets[previous].remove(user_id)
+        if previous != lmp_day:
+            self.buckets.setdefault(lmp_day, []).append(user_id)
+        self.lmp_by_user[user_id] = lmp_day
+
+        if high_risk:
+            self.high_risk.add(user_id)
+        else:
+            self.high_risk.discard(user_id)
+
+    def add_many(self, rows):
+        """
+        Bulk-register pregnancies.
+
+        Args:
+            rows (iterable): (user_id, lmp_date, high_risk) tuples
+        """
+        lmp_by_user = self.lmp_by_user
+        buckets = self.buckets
+        for user_id, lmp, high_risk in rows:
+            lmp_day = lmp.toordinal()
+            if user_id in lmp_by_user:
+                self.add_pregnancy(user_id, lmp=lmp, high_risk=high_risk)
+                continue
+            lmp_by_user[user_id] = lmp_day
+            bucket = buckets.get(lmp_day)
+            if bucket is None:
+                buckets[lmp_day] = [user_id]
+            else:
+                bucket.append(user_id)
+            if high_risk:
+                self.high_risk.add(user_id)
+
+    def remove_pregnancy(self, user_id):
+        """Stop reminders (delivery, loss, or opt-out)."""
+        lmp_day = self.lmp_by_user.pop(user_id, None)
+        if lmp_day is not None:
+            self.buckets[lmp_day].remove(user_id)
+        self.high_risk.discard(user_id)
+
+    def due_groups(self, day):
+        """
+        Reminders due on one day, grouped by event.
+
+        Args:
+            day (date): Calendar day
+
+        Returns:
+            list: (event, [user_id, ...]) pairs; user lists are copies
+        """
+        ordinal = day.toordinal()
+        groups = []
+        for offset, events in self.offsets.items():
+            users = self.buckets.get(ordinal - offset)
+            if not users:
+                continue
+            for event in events:
+                if event['high_risk_only']:
+                    selected = [user_id for user_id in users if user_id in self.high_risk]
+                    if selected:
+                        groups.append((event, selected))
+                else:
+                    groups.append((event, list(users)))
+        return groups
+
+    def due_on(self, day):
+        """Reminders due on one day as flat (user_id, event) pairs."""
+        return [(user_id, event) for event, users in self.due_groups(day) for user_id in users]
+
+    def run_daily(self, today):
+        """
+        Incremental daily run: everything that fell due since the previous run
+        (so a skipped day is caught up, and nothing is returned twice).
+
+        Args:
+            today (date): Day being processed
+
+        Returns:
+            list: (day, event, [user_id, ...]) tuples
+        """
+        start = today if self.last_run_day is None else self.last_run_day + timedelta(days=1)
+        due = []
+        day = start
+        while day <= today:
+            due.extend((day, event, users) for event, users in self.due_groups(day))
+            day += timedelta(days=1)
+        if self.last_run_day is None or today > self.last_run_day:
+            self.last_run_day = today
+        return due
+
+    def forecast(self, start, days):
+        """
+        Number of reminders per day for capacity planning (SMS / dialer).
+
+        Returns:
+            dict: {date: count}
+        """
+        return {
+            start + timedelta(days=i): sum(len(users) for _, users in self.due_groups(start + timedelta(days=i)))
+            for i in range(days)
+        }
+
+    def full_scan(self, day, batch_size=100000):
+        """
+        Reference implementation: scan every pregnancy in batches and check
+        its gestational day against the event table. Same result as due_on(),
+        used to validate and benchmark the calendar queue.
+        """
+        ordinal = day.toordinal()
+        offsets = self.offsets
+        high_risk = self.high_risk
+        due = []
+        items = list(self.lmp_by_user.items())
+        for start in range(0, len(items), batch_size):
+            for user_id, lmp_day in items[start:start + batch_size]:
+                events = offsets.get(ordinal - lmp_day)
+                if events:
+                    for event in events:
+                        if not event['high_risk_only'] or user_id in high_risk:
+                            due.append((user_id, event))
+        return due
+
+
+def reminder_text(event, language='english', name=None):
+    """
+    SMS/voice text for one reminder.
+
+    Args:
+        event (dict): Reminder event from REMINDER_EVENTS
+        language (str): 'english' or 'hindi'
+        name (str): Optional first name
+
+    Returns:
+        str: Reminder message
+    """
+    if language == 'hindi':
+        greeting = f"{name} जी, " if name else ""
+        if event['kind'] == 'visit':
+            return f"{greeting}आपकी {event['hindi_name']} इस सप्ताह है। कृपया अपने स्वास्थ्य केंद्र जाएं।"
+        return f"{greeting}आपकी {event['hindi_name']} का समय आ गया है। कृपया अगली जांच पर करवाएं।"
+
+    greeting = f"Hello {name}, " if name else ""
+    if event['kind'] == 'visit':
+        return f"{greeting}your {event['name']} is due this week. Please visit your health centre."
+    return f"{greeting}it is time for your {event['name']}. Please ask for it at your next visit."
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import random
+    import time
+
+    print("Testing visit_cadence.py\n")
+
+    population = 1000000
+    today = date.today()
+    rng = random.Random(7)
+    rows = [
+        (f"+9198{i:08d}", today - timedelta(days=rng.randrange(0, PREGNANCY_DAYS)), rng.random() < 0.1)
+        for i in range(population)
+    ]
+
+    scheduler = ReminderScheduler()
+    start = time.perf_counter()
+    scheduler.add_many(rows)
+    print(f"Loaded {len(scheduler):,} pregnancies in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    scanned = scheduler.full_scan(today)
+    scan_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    incremental = scheduler.run_daily(today)
+    daily_seconds = time.perf_counter() - start
+
+    due_count = sum(len(users) for _, _, users in incremental)
+    assert sorted((u, e['key']) for u, e in scanned) == sorted(
+        (u, e['key']) for _, e, users in incremental for u in users)
+    print(f"Full scan:     {scan_seconds * 1000:9.1f} ms -> {len(scanned):,} reminders")
+    print(f"Daily run:     {daily_seconds * 1000:9.1f} ms -> {due_count:,} reminders in "
+          f"{len(incremental)} event batches ({scan_seconds / daily_seconds:.0f}x faster)")
+
+    start = time.perf_counter()
+    week = scheduler.forecast(today + timedelta(days=1), 7)
+    print(f"7-day forecast in {(time.perf_counter() - start) * 1000:.1f} ms: {sum(week.values()):,} reminders")
+
+    event, user_id = incremental[0][1], incremental[0][2][0]
+    print(f"\nSample: {user_id}: {reminder_text(event)}")
+    print(f"        {reminder_text(event, 'hindi', 'प्रिया')}")
@@ -0,0 +1,282 @@
+"""
+Configuration snapshot for config/config.yaml, prompts and function schemas.
+Everything is parsed and validated once into a ConfigSnapshot; a watcher
+thread swaps in a new snapshot when a file changes, so requests only read
+the current snapshot reference.
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+from types import MappingProxyType
+
+import yaml
+
+from ..llm.claude_client import DEFAULT_SETTINGS as BREAKER_DEFAULTS
+from ..llm.function_calling import ToolSet
+from ..llm.prompts import PromptError, load_prompts
+
+CONFIG_DIR = Path(__file__).parent.parent.parent / 'config'
+
+PRICE_KEYS = ('input', 'output', 'cache_read', 'cache_write')
+
+
+class ConfigError(ValueError):
+    pass
+
+
+def _require(condition, message):
+    if not condition:
+        raise ConfigError(message)
+
+
+def _freeze(value):
+    """Read-only view of parsed YAML (dicts become mappingproxy, lists tuples)."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _watched_files(config_dir):
+    config_dir = Path(config_dir)
+    return [config_dir / 'config.yaml'] + sorted((config_dir / 'prompts').glob('*.txt')) + \
+        sorted((config_dir / 'functions').glob('*.json'))
+
+
+def _file_stamps(config_dir):
+    """{path: (mtime_ns, size)} for every watched file; new or deleted files change it too."""
+    stamps = {}
+    for path in _watched_files(config_dir):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        stamps[str(path)] = (stat.st_mtime_ns, stat.st_size)
+    return stamps
+
+
+def _validate_settings(settings):
+    _require(isinstance(settings, dict), "config.yaml must be a mapping")
+
+    llm = settings.get('llm')
+    _require(isinstance(llm, dict), "config.yaml: llm section is required")
+    _require(isinstance(llm.get('model'), str) and llm['model'], "llm.model must be a non-empty string")
+    for key in ('max_tokens', 'max_tool_rounds'):
+        _require(isinstance(llm.get(key), int) and llm[key] > 0, f"llm.{key} must be a positive integer")
+    pricing = llm.get('pricing') or {}
+    _require(isinstance(pricing, dict), "llm.pricing must be a mapping")
+    for key, price in pricing.items():
+        _require(key in PRICE_KEYS, f"llm.pricing.{key} is not one of {', '.join(PRICE_KEYS)}")
+        _require(isinstance(price, (int, float)) and price >= 0, f"llm.pricing.{key} must be a non-negative number")
+    if llm.get('timeout_seconds') is not None:
+        _require(isinstance(llm['timeout_seconds'], (int, float)) and llm['timeout_seconds'] > 0,
+                 "llm.timeout_seconds must be a positive number")
+
+    budgets = settings.get('budgets') or {}
+    _require(isinstance(budgets, dict), "budgets must be a mapping")
+    for key in ('per_call_tokens', 'per_day_tokens', 'reduced_max_tokens'):
+        if budgets.get(key) is not None:
+            _require(isinstance(budgets[key], int) and budgets[key] > 0, f"budgets.{key} must be a positive integer")
+
+    breaker = settings.get('circuit_breaker') or {}
+    _require(isinstance(breaker, dict), "circuit_breaker must be a mapping")
+    for key, value in breaker.items():
+        _require(key in BREAKER_DEFAULTS, f"circuit_breaker.{key} is not one of {', '.join(BREAKER_DEFAULTS)}")
+        _require(isinstance(value, (int, float)) and value > 0, f"circuit_breaker.{key} must be a positive number")
+    for key in ('error_rate', 'slow_rate'):
+        _require(breaker.get(key, 0) <= 1, f"circuit_breaker.{key} must be at most 1")
+
+    faq = settings.get('faq') or {}
+    _require(isinstance(faq, dict), "faq must be a mapping")
+    _require(isinstance(faq.get('enabled', True), bool), "faq.enabled must be true or false")
+    if faq.get('min_score') is not None:
+        _require(isinstance(faq['min_score'], (int, float)) and 0 < faq['min_score'] <= 1,
+                 "faq.min_score must be a number above 0 and at most 1")
+
+    prompts = settings.get('prompts')
+    _require(isinstance(prompts, dict) and prompts, "config.yaml: prompts section is required")
+    for name, variables in prompts.items():
+        _require(isinstance(variables, list) and all(isinstance(v, str) for v in variables),
+                 f"prompts.{name} must be a list of placeholder names")
+
+    use_cases = settings.get('use_cases') or {}
+    _require(isinstance(use_cases, dict), "use_cases must be a mapping")
+    for name, use_case in use_cases.items():
+        for key in ('system_prompt', 'prompt'):
+            _require(isinstance(use_case, dict) and use_case.get(key) in prompts,
+                     f"use_cases.{name}.{key} must name a declared prompt")
+
+    interval = (settings.get('reload') or {}).get('interval_seconds', 2)
+    _require(isinstance(interval, (int, float)) and interval > 0,
+             "reload.interval_seconds must be a positive number")
+
+
+def _load_functions(functions_dir):
+    definitions = []
+    names = set()
+    for path in sorted(Path(functions_dir).glob('*.json')):
+        try:
+            with open(path, encoding='utf-8') as f:
+                tool = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ConfigError(f"{path.name}: {e}")
+        _require(isinstance(tool, dict), f"{path.name}: must hold one tool definition")
+        _require(isinstance(tool.get('name'), str) and tool['name'], f"{path.name}: name is required")
+        _require(tool['name'] not in names, f"{path.name}: duplicate tool name {tool['name']}")
+        _require(isinstance(tool.get('description'), str), f"{path.name}: description is required")
+        schema = tool.get('input_schema')
+        _require(isinstance(schema, dict) and schema.get('type') == 'object',
+                 f"{path.name}: input_schema must be an object schema")
+        names.add(tool['name'])
+        definitions.append(tool)
+    return sorted(definitions, key=lambda tool: tool['name'])
+
+
+class ConfigSnapshot:
+    """
+    One consistent, validated view of the configuration. Never modified after
+    construction; a reload builds a new snapshot.
+    """
+
+    def __init__(self, config_dir=CONFIG_DIR, version=1):
+        config_dir = Path(config_dir)
+        self.version = version
+        self.loaded_at = time.time()
+        self.stamps = _file_stamps(config_dir)
+
+        try:
+            with open(config_dir / 'config.yaml', encoding='utf-8') as f:
+                settings = yaml.safe_load(f)
+        except (OSError, yaml.YAMLError) as e:
+            raise ConfigError(f"config.yaml: {e}")
+        _validate_settings(settings)
+
+        try:
+            self.prompts = MappingProxyType(load_prompts(settings['prompts'], config_dir / 'prompts'))
+        except PromptError as e:
+            raise ConfigError(str(e))
+        self.toolset = ToolSet(_load_functions(config_dir / 'functions'))
+
+        self.settings = _freeze(settings)
+        self.llm = self.settings['llm']
+        self.use_cases = self.settings.get('use_cases') or MappingProxyType({})
+        self.pricing = self.llm.get('pricing') or MappingProxyType({})
+        self.budgets = self.settings.get('budgets') or MappingProxyType({})
+        self.circuit_breaker = self.settings.get('circuit_breaker') or MappingProxyType({})
+        self.faq = self.settings.get('faq') or MappingProxyType({})
+        self.reload_interval = float((settings.get('reload') or {}).get('interval_seconds', 2))
+
+    def prompt(self, name):
+        return self.prompts[name]
+
+    def __repr__(self):
+        return f"ConfigSnapshot(version={self.version}, prompts={sorted(self.prompts)}, " \
+               f"tools={sorted(self.toolset.names)})"
+
+
+class ConfigStore:
+    def __init__(self, config_dir=CONFIG_DIR):
+        """
+        Load the configuration now (raising ConfigError if it is invalid) and
+        keep it current with start_watching().
+        """
+        self.config_dir = Path(config_dir)
+        self.snapshot = ConfigSnapshot(self.config_dir)
+        self.last_error = None
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def get(self):
+        """The current snapshot (a plain attribute read; swaps are atomic)."""
+        return self.snapshot
+
+    def refresh(self):
+        """
+        Reload if any watched file changed. An invalid change is logged and the
+        current snapshot kept.
+
+        Returns:
+            bool: True if a new snapshot was installed
+        """
+        with self._reload_lock:
+            if _file_stamps(self.config_dir) == self.snapshot.stamps:
+                return False
+            try:
+                snapshot = ConfigSnapshot(self.config_dir, self.snapshot.version + 1)
+            except ConfigError as e:
+                if str(e) != self.last_error:
+                    print(f"Error reloading config, keeping version {self.snapshot.version}: {e}")
+                self.last_error = str(e)
+                return False
+            self.last_error = None
+            self.snapshot = snapshot
+            return True
+
+    def start_watching(self):
+        """Poll file mtimes on a daemon thread (interval from reload.interval_seconds)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name='config-watcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop_watching(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _watch(self):
+        while not self._stop.wait(self.snapshot.reload_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error watching config: {e}")
+
+
+config_store = ConfigStore()
+
+
+def get_config():
+    """Current configuration snapshot."""
+    return config_store.snapshot
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import shutil
+    import tempfile
+
+    print("Testing config.py\n")
+    print(get_config())
+
+    reads = 1000000
+    start = time.perf_counter()
+    for _ in range(reads):
+        get_config().prompts['test_screening']
+    snapshot_ns = (time.perf_counter() - start) / reads * 1e9
+
+    loads = 200
+    start = time.perf_counter()
+    for _ in range(loads):
+        ConfigSnapshot()
+    load_us = (time.perf_counter() - start) / loads * 1e6
+    print(f"Snapshot read: {snapshot_ns:.0f} ns; full parse and validate: {load_us:.0f} us")
+
+    # Hot reload against a scratch copy of the config directory
+    scratch = Path(tempfile.mkdtemp()) / 'config'
+    shutil.copytree(CONFIG_DIR, scratch)
+    store = ConfigStore(scratch)
+    prompt_file = scratch / 'prompts' / 'system_prompt.txt'
+
+    prompt_file.write_text(prompt_file.read_text(encoding='utf-8') + "\nAlways mention the 108 ambulance.\n",
+                           encoding='utf-8')
+    print(f"\nAfter prompt edit: reloaded={store.refresh()} version={store.get().version}")
+
+    prompt_file.write_text("Broken {placeholder}", encoding='utf-8')
+    print(f"After invalid edit: reloaded={store.refresh()} version={store.get().version}")
+    shutil.rmtree(scratch.parent)
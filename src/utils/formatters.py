@@ -0,0 +1,185 @@
+"""
+Spoken-number normalisation for slot extraction.
+Rewrites numbers said in English, Hindi or Hinglish ("twenty two", "बीस",
+"paanch", "साढ़े पांच", "fifth", "पांचवां") as digits ("22", "20", "5", "5.5",
+"5th"), so the week/month/date patterns in validators only deal with digits.
+The word tables are folded and merged into one dict at import; a call is a
+tokenise plus one dict lookup per word.
+"""
+
+import re
+import unicodedata
+
+ENGLISH_UNITS = ['one', 'two', 'three', 'four', 'five', 'six', 'seven', 'eight', 'nine']
+ENGLISH_TEENS = ['ten', 'eleven', 'twelve', 'thirteen', 'fourteen', 'fifteen', 'sixteen', 'seventeen',
+                 'eighteen', 'nineteen']
+ENGLISH_TENS = {'twenty': 20, 'thirty': 30, 'forty': 40}
+ENGLISH_ORDINALS = ['first', 'second', 'third', 'fourth', 'fifth', 'sixth', 'seventh', 'eighth', 'ninth',
+                    'tenth', 'eleventh', 'twelfth', 'thirteenth', 'fourteenth', 'fifteenth', 'sixteenth',
+                    'seventeenth', 'eighteenth', 'nineteenth']
+ENGLISH_TENS_ORDINALS = {'twentieth': 20, 'thirtieth': 30, 'fortieth': 40}
+
+# 1-42, the range a pregnancy week can take; variants are common spellings
+HINDI_NUMBERS = [
+    'एक', 'दो', 'तीन', 'चार', 'पांच', 'छह छः छै', 'सात', 'आठ', 'नौ', 'दस',
+    'ग्यारह', 'बारह', 'तेरह', 'चौदह', 'पंद्रह पन्द्रह', 'सोलह', 'सत्रह सत्तरह', 'अठारह अट्ठारह', 'उन्नीस', 'बीस',
+    'इक्कीस', 'बाईस बाइस', 'तेईस तेइस', 'चौबीस', 'पच्चीस', 'छब्बीस', 'सत्ताईस सत्ताइस', 'अट्ठाईस अट्ठाइस अठाईस',
+    'उनतीस उन्तीस', 'तीस', 'इकतीस इकत्तीस', 'बत्तीस', 'तैंतीस तेतीस', 'चौंतीस चौतीस', 'पैंतीस पेंतीस', 'छत्तीस',
+    'सैंतीस सेंतीस', 'अड़तीस अडतीस', 'उनतालीस उन्तालीस', 'चालीस', 'इकतालीस', 'बयालीस बियालीस'
+]
+HINGLISH_NUMBERS = [
+    'ek', 'do', 'teen', 'char chaar', 'paanch panch paach', 'chhah chhe che chheh', 'saat sat', 'aath ath',
+    'nau', 'das dus', 'gyarah gyara', 'barah bara', 'terah tera', 'chaudah chauda', 'pandrah pandra',
+    'solah sola', 'satrah satra', 'atharah athara attharah', 'unnis unees unnees', 'bees bis',
+    'ikkis ikkees', 'bais baees baais', 'teis teyis', 'chaubis chobis', 'pachis pachees pachchis',
+    'chhabbis chabbis', 'sattais sataees', 'atthais athais', 'untees untis', 'tees tis',
+    'iktees iktis ikattis', 'battis batees', 'taintis tetis', 'chauntis chontis', 'paintis pentis',
+    'chhattis chattis', 'saintis sentis', 'adtis artis adtees', 'untalis untaalis', 'chalis chaalis',
+    'iktalis', 'bayalis byalis'
+]
+# Month ordinals ("पांचवां महीना", "paanchva mahina")
+HINDI_ORDINALS = [
+    'पहला पहले पहली', 'दूसरा दूसरे दूसरी', 'तीसरा तीसरे तीसरी', 'चौथा चौथे चौथी',
+    'पांचवां पांचवें पांचवा पांचवे', 'छठा छठे छठवां छठवें', 'सातवां सातवें सातवा सातवे',
+    'आठवां आठवें आठवा आठवे', 'नौवां नौवें नौवा नौवे'
+]
+HINGLISH_ORDINALS = [
+    'pehla pehle pahla pahle', 'doosra dusra doosre dusre', 'teesra tisra teesre tisre', 'chautha chauthe',
+    'paanchva panchva paanchve panchve paanchvan', 'chhatha chhathe chhata', 'saatva satva saatve',
+    'aathva athva aathve', 'nauva nauve'
+]
+# "saadhe paanch" = 5.5; "dedh" = 1.5, "dhai" = 2.5
+HALF_PREFIXES = ('saadhe', 'sadhe', 'साढ़े', 'साढे')
+FRACTIONS = {'dedh': 1.5, 'dhai': 2.5, 'adhai': 2.5, 'डेढ़': 1.5, 'डेढ': 1.5, 'ढाई': 2.5}
+
+# Words that are also ordinary English/Hinglish words ("what tests do I
+# need", "pehle" = before): only read as numbers right before a unit word
+AMBIGUOUS = frozenset({'do', 'sat', 'bees', 'tees', 'tis', 'bis', 'char', 'teen', 'ath', 'tera', 'bara',
+                       'sola', 'che', 'second', 'pehle', 'pahle', 'पहले'})
+
+# Words a number can be followed by in a slot (weeks, months)
+UNIT_WORDS = frozenset({
+    'week', 'weeks', 'wk', 'wks', 'hafte', 'hafta', 'hafton', 'saptah', 'हफ्ते', 'हफ्ता', 'हफ्तों', 'सप्ताह',
+    'month', 'months', 'mahine', 'mahina', 'mahino', 'mahinay', 'mahene', 'maah', 'महीने', 'महीना', 'महीनों',
+    'महिने', 'माह'
+})
+
+_FOLD = str.maketrans({'़': None, 'ँ': 'ं', '’': "'", '०': '0', '१': '1', '२': '2', '३': '3', '४': '4',
+                       '५': '5', '६': '6', '७': '7', '८': '8', '९': '9'})
+_TOKEN = re.compile(r"[^\s,;:!?।\-–()\"]+")
+
+
+def fold(text):
+    """Lowercase, fold Hindi nukta/chandrabindu variants and Devanagari digits."""
+    return unicodedata.normalize('NFC', text).lower().translate(_FOLD)
+
+
+def _ordinal(value):
+    suffix = 'th' if 10 <= value % 100 <= 20 else {1: 'st', 2: 'nd', 3: 'rd'}.get(value % 10, 'th')
+    return f"{value}{suffix}"
+
+
+def _build_tables():
+    """{word: (value, ordinal)} for every spelling, folded like the input will be."""
+    words = {}
+    for value, word in enumerate(ENGLISH_UNITS + ENGLISH_TEENS, 1):
+        words[word] = (value, False)
+    for value, word in enumerate(ENGLISH_ORDINALS, 1):
+        words[word] = (value, True)
+    for word, value in ENGLISH_TENS.items():
+        words[word] = (value, False)
+    for word, value in ENGLISH_TENS_ORDINALS.items():
+        words[word] = (value, True)
+    for table, ordinal in ((HINDI_NUMBERS, False), (HINGLISH_NUMBERS, False),
+                           (HINDI_ORDINALS, True), (HINGLISH_ORDINALS, True)):
+        for value, spellings in enumerate(table, 1):
+            for word in spellings.split():
+                words[fold(word)] = (value, ordinal)
+    return words
+
+
+NUMBER_WORDS = _build_tables()
+_HALF_PREFIXES = frozenset(fold(word) for word in HALF_PREFIXES)
+_FRACTIONS = {fold(word): value for word, value in FRACTIONS.items()}
+_AMBIGUOUS = frozenset(fold(word) for word in AMBIGUOUS)
+_UNIT_WORDS = frozenset(fold(word) for word in UNIT_WORDS)
+
+
+def _number(value, ordinal):
+    if ordinal:
+        return _ordinal(int(value))
+    return str(int(value)) if value == int(value) else str(value)
+
+
+def normalize_numerals(text):
+    """
+    Rewrite spoken numbers as digits.
+
+    Args:
+        text (str): Utterance in English, Hindi (Devanagari) or Hinglish
+
+    Returns:
+        str: Folded (see fold()) tokens joined by single spaces, with number
+            words replaced: "twenty two hafte" -> "22 hafte",
+            "साढ़े पांच महीने" -> "5.5 महीने", "fifth month" -> "5th month"
+    """
+    tokens = _TOKEN.findall(fold(text))
+    out = []
+    i = 0
+    count = len(tokens)
+    while i < count:
+        token = tokens[i]
+        following = tokens[i + 1] if i + 1 < count else None
+        entry = NUMBER_WORDS.get(token)
+
+        if token in _HALF_PREFIXES and following is not None and following in NUMBER_WORDS:
+            value, _ = NUMBER_WORDS[following]
+            out.append(str(value + 0.5))
+            i += 2
+            continue
+        if token in _FRACTIONS:
+            out.append(str(_FRACTIONS[token]))
+            i += 1
+            continue
+        if entry is None or (token in _AMBIGUOUS and following not in _UNIT_WORDS):
+            out.append(token)
+            i += 1
+            continue
+
+        value, ordinal = entry
+        i += 1
+        # "twenty two", "twenty-second"
+        if token in ENGLISH_TENS and following is not None and following in NUMBER_WORDS:
+            unit, unit_ordinal = NUMBER_WORDS[following]
+            if unit < 10 and following.isascii():
+                value += unit
+                ordinal = unit_ordinal
+                i += 1
+        # "five and a half months"
+        if tokens[i:i + 3] == ['and', 'a', 'half']:
+            value += 0.5
+            i += 3
+        elif tokens[i:i + 2] == ['and', 'half']:
+            value += 0.5
+            i += 2
+        out.append(_number(value, ordinal))
+    return ' '.join(out)
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import time
+
+    print("Testing formatters.py\n")
+    samples = ["I am five months pregnant", "बीस हफ्ते", "twenty-two weeks", "saadhe paanch mahine",
+               "पांचवां महीना चल रहा है", "I'm in my fifth month", "what tests do I need", "do hafte pehle",
+               "२४ सप्ताह", "five and a half months"]
+    for sample in samples:
+        print(f"  {sample!r:32} -> {normalize_numerals(sample)!r}")
+
+    n = 20000
+    start = time.perf_counter()
+    for _ in range(n):
+        for sample in samples:
+            normalize_numerals(sample)
+    print(f"\n  {(time.perf_counter() - start) / (n * len(samples)) * 1e6:.2f} us per utterance")
@@ -0,0 +1,57 @@
+"""
+Language detection for short utterances.
+Distinguishes Hindi (Devanagari), romanised Hindi (Hinglish) and English by
+script and a small set of common Hindi function words.
+"""
+
+import re
+
+_DEVANAGARI = re.compile(r'[ऀ-ॿ]')
+_LATIN = re.compile(r'[A-Za-z]')
+_WORD = re.compile(r"[a-z']+")
+
+# Frequent Hindi words as they come out of English speech recognition
+HINGLISH_WORDS = frozenset({
+    'hai', 'hain', 'hoon', 'hun', 'ho', 'kya', 'kab', 'kaun', 'kaunsa', 'kaun', 'kyun', 'kaise', 'kahan',
+    'mujhe', 'mera', 'meri', 'mere', 'aap', 'aapka', 'humko', 'hume', 'nahi', 'nahin', 'haan', 'ji',
+    'karna', 'karwana', 'karwane', 'karana', 'karwaye', 'hota', 'hoti', 'raha', 'rahi', 'rahe',
+    'aur', 'ke', 'ki', 'ka', 'se', 'me', 'mein', 'par', 'ko', 'bhi', 'abhi', 'kitne', 'kitna',
+    'hafte', 'hafta', 'mahine', 'mahina', 'jaanch', 'janch', 'dard', 'bahut', 'bacha', 'baccha', 'bachcha'
+})
+
+
+def detect_language(text):
+    """
+    Detect the language of an utterance.
+
+    Args:
+        text (str): Transcribed speech or chat message
+
+    Returns:
+        str: 'hindi', 'hinglish' or 'english' ('english' when there is no text)
+    """
+    if not text:
+        return 'english'
+    devanagari = len(_DEVANAGARI.findall(text))
+    latin = len(_LATIN.findall(text))
+    if devanagari and devanagari >= latin:
+        return 'hindi'
+
+    words = _WORD.findall(text.lower())
+    if not words:
+        return 'english'
+    hindi_words = sum(1 for word in words if word in HINGLISH_WORDS)
+    return 'hinglish' if hindi_words * 4 >= len(words) else 'english'
+
+
+def response_language(detected):
+    """Language to answer in: Hinglish callers are answered in Hindi."""
+    return 'english' if detected == 'english' else 'hindi'
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    print("Testing language_detector.py\n")
+    for utterance in ["What tests do I need?", "मुझे कौन से टेस्ट करवाने चाहिए?",
+                      "Mujhe kaun se test karwane hai?", "Hemoglobin test kab hota hai?", "GTT"]:
+        print(f"  {utterance!r}: {detect_language(utterance)}")
@@ -0,0 +1,227 @@
+"""
+Pregnancy-week slot extraction from speech and chat.
+Understands weeks ("20 weeks", "बीस हफ्ते", "week twenty"), months ("five
+months", "paanch mahine", "पांचवां महीना") and the last menstrual period ("my
+last period was in March", "LMP 12/03/2026"), in English, Hindi and Hinglish.
+Numbers are normalised to digits first (see formatters), then a few patterns
+compiled at import pick out the slot.
+"""
+
+import re
+from datetime import date
+
+from .formatters import fold, normalize_numerals
+
+MIN_WEEK = 1
+MAX_WEEK = 42
+
+# Nobody knows they are pregnant before week 4: a bare "2" or "last period 2
+# weeks ago" is not a pregnancy week
+MIN_KNOWN_WEEK = 4
+
+# Average weeks in a calendar month (30.44 / 7)
+WEEKS_PER_MONTH = 4.345
+
+# Day of the month assumed when a caller names only the month of their LMP
+DEFAULT_LMP_DAY = 15
+
+WEEK_UNITS = ['week', 'weeks', 'wk', 'wks', 'hafte', 'hafta', 'hafton', 'saptah', 'हफ्ते', 'हफ्ता', 'हफ्तों',
+              'सप्ताह']
+MONTH_UNITS = ['month', 'months', 'mahine', 'mahina', 'mahino', 'mahinay', 'mahene', 'maah', 'महीने', 'महीना',
+               'महीनों', 'महिने', 'माह']
+# Calendar months, as said in English and Hindi
+MONTH_NAMES = {
+    1: 'january jan जनवरी', 2: 'february feb फरवरी', 3: 'march mar मार्च', 4: 'april apr अप्रैल अप्रेल',
+    5: 'may मई', 6: 'june jun जून', 7: 'july jul जुलाई', 8: 'august aug अगस्त',
+    9: 'september sept sep सितंबर सितम्बर', 10: 'october oct अक्टूबर अक्तूबर',
+    11: 'november nov नवंबर नवम्बर', 12: 'december dec दिसंबर दिसम्बर'
+}
+# "last period", "LMP", "pichhli mahwari", "आखिरी माहवारी"
+LMP_CUES = r'(?:\blmp\b|(?:last|previous|pichh?l[ie]|aakhri|akhri|आखिरी|अंतिम|पिछली|पिछले)\s+(?:\S+\s+){0,2}?' \
+           r'(?:periods?|menstrual|menses|mc|mahwari|mahavari|masik|माहवारी|मासिक|पीरियड|पीरियड्स))'
+# The caller speaking about their own pregnancy ("I am", "mera", "मुझे",
+# "पांचवां महीना चल रहा है"), lowercase and folded already ...
+SELF_CUES = r"(?<!\S)(?:i\s+am|i'm|im|main|mai|mera|meri|mere|mujhe|mujhko|hum|hamara|hamari|मैं|मेरा|मेरी|मेरे|" \
+            r"मुझे|हम|हमारा|हमारी|pregnant|garbhvati|गर्भवती|chal\s+raha|chal\s+rahi|चल\s+रहा|चल\s+रही)(?!\S)"
+# ... and not about someone else's or a stage in general
+OTHER_CUES = r"(?<!\S)(?:she|her|sister|behen|bahan|bhabhi|friend|dost|wife|biwi|patni|daughter|beti|" \
+             r"unka|unki|uska|uski|बहन|भाभी|दोस्त|पत्नी|बेटी|उनका|उनकी|उसका|उसकी)(?!\S)"
+
+
+def _alternation(words):
+    """Regex alternation of folded words, longest first."""
+    return '(?:' + '|'.join(re.escape(word) for word in sorted({fold(w) for w in words}, key=len, reverse=True)) + ')'
+
+
+_WEEKS = _alternation(WEEK_UNITS)
+_MONTHS = _alternation(MONTH_UNITS)
+_MONTH_NUMBERS = {fold(name): number for number, names in MONTH_NAMES.items() for name in names.split()}
+_MONTH_NAME = '(' + _alternation(_MONTH_NUMBERS) + ')'
+_ORDINAL = r'(?:st|nd|rd|th)'
+# "2 weeks ago", "do mahine pehle": how long since something, not how far along
+_AGO = r'(?:ago|back|before|pehle|pahle|पहले)'
+_NOT_AGO = r'(?!\S)(?!\s+' + _AGO + r'(?!\S))'
+
+_WEEK_PATTERNS = (
+    re.compile(r'(?<![\d.])(\d{1,2})\s*' + _ORDINAL + r'?\s*' + _WEEKS + _NOT_AGO),
+    re.compile(r'(?<!\S)' + _WEEKS + r'\s*(?:number\s*|no\s*)?(\d{1,2})(?![\d.])'),
+)
+_MONTH_PATTERN = re.compile(r'(?<![\d.])(\d{1,2}(?:\.5)?)\s*(' + _ORDINAL + r')?\s*' + _MONTHS + _NOT_AGO)
+_LMP_AGO = re.compile(r'(?<![\d.])(\d{1,2}(?:\.5)?)\s*(?:(' + _WEEKS + r')|' + _MONTHS + r')\s+' + _AGO + r'(?!\S)')
+_LMP_CUE = re.compile(fold(LMP_CUES))
+_LMP_DAY_MONTH = re.compile(r'(?<!\d)(?:(\d{1,2})\s*' + _ORDINAL + r'?\s*(?:of\s+)?)?' + _MONTH_NAME +
+                            r'(?!\S)(?:\s*(\d{1,2})' + _ORDINAL + r'?(?![\d.]))?(?:\s*(\d{4}))?')
+_LMP_NUMERIC = re.compile(r'(?<!\d)(\d{1,2})[/.\-](\d{1,2})(?:[/.\-](\d{2}|\d{4}))?(?!\d)')
+_BARE_NUMBER = re.compile(r'^\D*?(\d{1,2})(?![\d.]|' + _ORDINAL + r')\D*$')
+_SELF_CUE = re.compile(SELF_CUES)
+_OTHER_CUE = re.compile(OTHER_CUES)
+
+
+def is_valid_week(week):
+    return week is not None and MIN_WEEK <= week <= MAX_WEEK
+
+
+def weeks_from_months(months, ordinal=False):
+    """
+    Pregnancy week for a duration in months.
+
+    Args:
+        months (float): "5 months" = 5 completed months
+        ordinal (bool): "5th month": somewhere in month 5, taken as its middle
+    """
+    return int(round((months - 0.5 if ordinal else months) * WEEKS_PER_MONTH))
+
+
+def weeks_since(lmp, today):
+    """Completed weeks of pregnancy dated from the first day of the last period."""
+    return (today - lmp).days // 7
+
+
+def _lmp_date(day, month, year, today):
+    """Most recent date with that day and month (this year or last) unless the year was said."""
+    if year is None:
+        year = today.year
+        if (month, day or DEFAULT_LMP_DAY) > (today.month, today.day):
+            year -= 1
+    elif year < 100:
+        year += 2000
+    try:
+        return date(year, month, day or DEFAULT_LMP_DAY)
+    except ValueError:
+        return None
+
+
+def _week_from_lmp(text, today):
+    match = _LMP_AGO.search(text)
+    if match:
+        amount = float(match.group(1))
+        return int(amount) if match.group(2) else weeks_from_months(amount)
+    match = _LMP_NUMERIC.search(text)
+    if match:
+        day, month = int(match.group(1)), int(match.group(2))
+        year = int(match.group(3)) if match.group(3) else None
+        lmp = _lmp_date(day, month, year, today) if 1 <= month <= 12 else None
+    else:
+        match = _LMP_DAY_MONTH.search(text)
+        if not match:
+            return None
+        day = match.group(1) or match.group(3)
+        year = int(match.group(4)) if match.group(4) else None
+        lmp = _lmp_date(int(day) if day else None, _MONTH_NUMBERS[match.group(2)], year, today)
+    return weeks_since(lmp, today) if lmp is not None else None
+
+
+def extract_week_slot(text, expecting_week=False, today=None):
+    """
+    Pull the pregnancy week out of an utterance.
+
+    Args:
+        text (str): Utterance (speech transcript or chat message)
+        expecting_week (bool): True if the caller was just asked for the week,
+            so a bare number ("twenty", "बीस") is taken as the answer
+        today (date): Reference date for LMP answers (defaults to today)
+
+    Returns:
+        dict: {'pregnancy_week': int, 'week_source': 'weeks', 'months', 'lmp'
+            or 'number', 'about_caller': bool}, or {} when there is no
+            (plausible) week. 'about_caller' is True for the caller's own
+            stage (an LMP, an answer to the week question, "I am 20 weeks",
+            "mera paanchva mahina"), False for a week asked about ("tests
+            in the 7th month", "my sister is 30 weeks")
+    """
+    if not text:
+        return {}
+    normalized = normalize_numerals(text)
+    week = source = None
+
+    if _LMP_CUE.search(normalized):
+        week, source = _week_from_lmp(normalized, today or date.today()), 'lmp'
+    if week is None:
+        for pattern in _WEEK_PATTERNS:
+            match = pattern.search(normalized)
+            if match:
+                week, source = int(match.group(1)), 'weeks'
+                break
+    if week is None:
+        match = _MONTH_PATTERN.search(normalized)
+        if match and float(match.group(1)) <= 10:
+            week, source = weeks_from_months(float(match.group(1)), bool(match.group(2))), 'months'
+    if week is None and expecting_week:
+        match = _BARE_NUMBER.match(normalized)
+        # "which one?" is not week 1
+        if match and int(match.group(1)) >= MIN_KNOWN_WEEK:
+            week, source = int(match.group(1)), 'number'
+
+    if not is_valid_week(week) or (source == 'lmp' and week < MIN_KNOWN_WEEK):
+        return {}
+    about_caller = source in ('lmp', 'number') or expecting_week or \
+        (_SELF_CUE.search(normalized) is not None and _OTHER_CUE.search(normalized) is None)
+    return {'pregnancy_week': week, 'week_source': source, 'about_caller': about_caller}
+
+
+def extract_pregnancy_week(text, expecting_week=False, today=None):
+    """
+    Pregnancy week in an utterance (see extract_week_slot).
+
+    Returns:
+        int or None: Week between 1 and 42
+    """
+    return extract_week_slot(text, expecting_week, today).get('pregnancy_week')
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import json
+    import statistics
+    import time
+    from pathlib import Path
+
+    print("Testing validators.py\n")
+    today = date(2026, 10, 19)
+    samples = [
+        ("I am five months pregnant", False), ("बीस हफ्ते", False), ("my last period was in March", False),
+        ("20 weeks", False), ("week twenty two", False), ("saadhe paanch mahine", False),
+        ("पांचवां महीना चल रहा है", False), ("Mujhe chhe mahine ho gaye", False), ("LMP 12/03/2026", False),
+        ("last period 5th of August", False), ("pichhli mahwari जून में आई थी", False), ("twenty", True),
+        ("चौबीस", True), ("What tests do I need?", True), ("which one", True), ("second trimester tests", False),
+        ("I had pain two weeks ago", False), ("last period was two months ago", False),
+        ("last period 2 weeks ago", False), ("Which tests happen in the 7th month?", False),
+        ("My sister is 30 weeks pregnant", False), ("What tests will I need at 28 weeks?", False)
+    ]
+    for text, expecting in samples:
+        print(f"  {text!r:38} expecting={expecting!s:5} -> {extract_week_slot(text, expecting, today)}")
+
+    # Time per utterance over the fixture transcripts plus the samples above
+    fixtures = Path(__file__).parent.parent.parent / 'tests' / 'fixtures' / 'sample_calls.json'
+    with open(fixtures, encoding='utf-8') as f:
+        calls = json.load(f)['calls']
+    utterances = [turn.get('speech', turn.get('message')) for call in calls for turn in call['turns']]
+    utterances += [text for text, _ in samples]
+    timings = []
+    for _ in range(200):
+        for text in utterances:
+            start = time.perf_counter()
+            extract_week_slot(text, True, today)
+            timings.append((time.perf_counter() - start) * 1e6)
+    print(f"\n  {statistics.median(timings):.1f} us median, {sorted(timings)[int(len(timings) * 0.99)]:.1f} us p99 "
+          f"per utterance ({len(utterances)} utterances)")
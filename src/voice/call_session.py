@@ -0,0 +1,185 @@
+"""
+Call state carried in signed tokens instead of process memory.
+The little a voice turn needs (language, week, name, turn count, dialogue
+state, a question waiting for the week, a short summary) is packed into a
+compact binary token, HMAC-signed together with the CallSid, and put in the
+URLs the TwiML sends Twilio back to. Any worker on any node can then decode
+the call's state from the next webhook without a shared store. Tokens are
+signed, not encrypted: they hold nothing Twilio does not already see.
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import struct
+import time
+
+from ..analytics.metrics import metrics
+from ..conversation.dialogue_manager import INITIAL_STATE, STATES
+
+TOKEN_VERSION = 1
+LANGUAGES = ('english', 'hindi')
+
+# version, issued at (unix seconds), language, dialogue state, week (0 = unknown), turns
+_HEADER = struct.Struct('>BIBBBH')
+_MAC_BYTES = 12
+
+# Secrets from the environment must be at least this long (HMAC-SHA256 key
+# strength) and not a value copied from an example file
+MIN_SECRET_BYTES = 32
+PLACEHOLDER_SECRETS = frozenset({'change-me', 'changeme', 'secret', 'your_secret', 'your-secret'})
+
+# Longest UTF-8 encoding kept for each text field (cut at a character boundary)
+TEXT_FIELDS = (('name', 40), ('pending_question', 160), ('summary', 120))
+
+
+def _pack_text(value, limit):
+    data = (value or '').encode('utf-8')[:limit]
+    # Drop a multi-byte character cut in half
+    data = data.decode('utf-8', 'ignore').encode('utf-8')
+    return bytes((len(data),)) + data
+
+
+class SessionCodec:
+    def __init__(self, secret, previous_secrets=(), max_age=4 * 3600):
+        """
+        Args:
+            secret (str): Signs new tokens
+            previous_secrets (list): Still accepted when verifying, so the
+                secret can be rotated during live calls
+            max_age (float): Seconds a token stays valid after it was issued
+        """
+        if not secret:
+            raise ValueError('A session token secret is required')
+        self.keys = [key.encode('utf-8') for key in (secret, *previous_secrets) if key]
+        self.max_age = max_age
+
+    @classmethod
+    def from_env(cls):
+        """
+        Codec from CALL_SESSION_SECRET(S), or None if session tokens are off.
+
+        Raises:
+            ValueError: If tokens are on and a secret is missing, a
+                placeholder or shorter than MIN_SECRET_BYTES (anyone who
+                can guess it can forge call state)
+        """
+        if os.getenv('CALL_SESSION_TOKENS', 'false').lower() != 'true':
+            return None
+        secret = os.getenv('CALL_SESSION_SECRET', '').strip()
+        previous = [key.strip() for key in os.getenv('CALL_SESSION_PREVIOUS_SECRETS', '').split(',') if key.strip()]
+        keys = [('CALL_SESSION_SECRET', secret)] + [('CALL_SESSION_PREVIOUS_SECRETS', key) for key in previous]
+        for name, key in keys:
+            if key.lower() in PLACEHOLDER_SECRETS or len(key.encode('utf-8')) < MIN_SECRET_BYTES:
+                raise ValueError(f"{name} must be a random secret of at least {MIN_SECRET_BYTES} bytes "
+                                 f"when CALL_SESSION_TOKENS=true (see .env.example)")
+        return cls(secret, previous, max_age=float(os.getenv('CALL_SESSION_MAX_AGE', 4 * 3600)))
+
+    def _mac(self, key, call_sid, payload):
+        return hmac.new(key, call_sid.encode('utf-8') + payload, hashlib.sha256).digest()[:_MAC_BYTES]
+
+    def encode(self, call_sid, context, now=None):
+        """
+        Pack a call context into a URL-safe token.
+
+        Args:
+            call_sid (str): The token is only valid for this call
+            context (dict): Call context (language, pregnancy_week, name,
+                turns, dialogue_state, pending_question, summary)
+
+        Returns:
+            str: Token (base64url, no padding)
+        """
+        language = context.get('language', 'english')
+        state = context.get('dialogue_state', INITIAL_STATE)
+        payload = _HEADER.pack(
+            TOKEN_VERSION,
+            int(now if now is not None else time.time()),
+            LANGUAGES.index(language) if language in LANGUAGES else 0,
+            STATES.index(state) if state in STATES else STATES.index(INITIAL_STATE),
+            min(context.get('pregnancy_week') or 0, 255),
+            min(context.get('turns', 0), 65535)
+        ) + b''.join(_pack_text(context.get(field), limit) for field, limit in TEXT_FIELDS)
+        token = payload + self._mac(self.keys[0], call_sid, payload)
+        return base64.urlsafe_b64encode(token).rstrip(b'=').decode('ascii')
+
+    def decode(self, call_sid, token, now=None):
+        """
+        Verify a token and unpack the call context it carries.
+
+        Returns:
+            dict or None: Context, or None if the token is malformed, signed
+                with an unknown key, for another call, expired or from an
+                unknown version
+        """
+        outcome, context = self._decode(call_sid, token, now)
+        metrics.inc('call_session_tokens_total', help_text='Call session tokens decoded, by outcome',
+                    outcome=outcome)
+        return context
+
+    def _decode(self, call_sid, token, now):
+        try:
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        except (ValueError, TypeError):
+            return 'malformed', None
+        payload, mac = raw[:-_MAC_BYTES], raw[-_MAC_BYTES:]
+        if len(payload) < _HEADER.size:
+            return 'malformed', None
+        if not any(hmac.compare_digest(mac, self._mac(key, call_sid, payload)) for key in self.keys):
+            return 'bad_signature', None
+
+        version, issued, language, state, week, turns = _HEADER.unpack_from(payload)
+        if version != TOKEN_VERSION:
+            return 'unknown_version', None
+        if (now if now is not None else time.time()) - issued > self.max_age:
+            return 'expired', None
+
+        context = {
+            'language': LANGUAGES[language] if language < len(LANGUAGES) else 'english',
+            'dialogue_state': STATES[state] if state < len(STATES) else INITIAL_STATE,
+            'pregnancy_week': week or None,
+            'turns': turns
+        }
+        offset = _HEADER.size
+        for field, _ in TEXT_FIELDS:
+            if offset >= len(payload):
+                return 'malformed', None
+            length = payload[offset]
+            value = payload[offset + 1:offset + 1 + length].decode('utf-8', 'replace')
+            offset += 1 + length
+            if value:
+                context[field] = value
+        context.setdefault('name', 'there')
+        return 'ok', context
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import json
+    import statistics
+
+    print("Testing call_session.py\n")
+    codec = SessionCodec('dev-secret')
+    context = {'language': 'hindi', 'pregnancy_week': 22, 'name': 'Priya', 'turns': 3,
+               'dialogue_state': 'awaiting_week', 'pending_question': 'मुझे कौन सी जांच करानी है?',
+               'summary': 'Asked about the sugar test'}
+    token = codec.encode('CA123', context)
+    print(f"  token ({len(token)} chars): {token}")
+    print(f"  decoded: {codec.decode('CA123', token)}")
+    print(f"  other call: {codec.decode('CA999', token)}")
+    print(f"  tampered: {codec.decode('CA123', token[:-3] + ('A' if token[-3] != 'A' else 'B') + token[-2:])}")
+    print(f"  expired: {codec.decode('CA123', codec.encode('CA123', context, now=time.time() - 5 * 3600))}")
+    rotated = SessionCodec('new-secret', ['dev-secret'])
+    print(f"  after rotation: {rotated.decode('CA123', token) is not None}")
+    print(f"  JSON of the same state: {len(json.dumps(context, ensure_ascii=False).encode('utf-8'))} bytes, "
+          f"token payload: {len(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))} bytes")
+
+    for label, run in (('encode', lambda: codec.encode('CA123', context)),
+                       ('decode', lambda: codec.decode('CA123', token))):
+        samples = []
+        for _ in range(20000):
+            start = time.perf_counter()
+            run()
+            samples.append((time.perf_counter() - start) * 1e6)
+        print(f"  {label}: {statistics.median(samples):.2f} us median")
@@ -4,6 +4,7 @@ Uses Twilio's built-in speech recognition and TTS.
 """
 
 from twilio.twiml.voice_response import VoiceResponse, Gather
+from urllib.parse import urlencode
 import os
 
 
@@ -11,9 +12,31 @@ class TwilioVoiceHandler:
     def __init__(self):
         self.default_language = 'en-IN'  # English (India)
         self.hindi_language = 'hi-IN'     # Hindi (India)
+        # Twilio posts interim transcripts here while the caller is still
+        # speaking; set VOICE_PARTIAL_RESULT_CALLBACK empty to turn it off
+        self.partial_result_callback = os.getenv('VOICE_PARTIAL_RESULT_CALLBACK', '/voice/partial')
+
+    def _partial_results(self, query=None):
+        """Gather attributes for the partial result callback (none if disabled)."""
+        if not self.partial_result_callback:
+            return {}
+        return {
+            'partial_result_callback': self._url(self.partial_result_callback, query),
+            'partial_result_callback_method': 'POST'
+        }
+
+    @staticmethod
+    def _url(path, query=None):
+        """
+        A URL Twilio calls back, with the call's query parameters (turn number,
+        session token) so the next webhook carries them.
+        """
+        if not query:
+            return path
+        return f"{path}{'&' if '?' in path else '?'}{urlencode(query)}"
         
-    def welcome_message(self, language='english'):
-        """Generate welcome message for incoming call."""
+    def welcome_message(self, language='english', query=None):
+        """Generate welcome message for incoming call (query: see _url)."""
         response = VoiceResponse()
         
         if language == 'hindi':
@@ -34,7 +57,8 @@ class TwilioVoiceHandler:
         # Gather user's speech input
         gather = Gather(
             input='speech',
-            action='/voice/process',
+            action=self._url('/voice/process', query),
+            **self._partial_results(query),
             method='POST',
             language=voice_lang,
             speech_timeout='auto',
@@ -81,13 +105,14 @@ class TwilioVoiceHandler:
         
         return str(response)
     
-    def generate_response(self, chatbot_response, language='english'):
+    def generate_response(self, chatbot_response, language='english', query=None):
         """
         Convert chatbot text response to speech.
         
         Args:
             chatbot_response (str): Text response from chatbot
             language (str): 'english' or 'hindi'
+            query (dict): Parameters for the callback URLs (see _url)
         
         Returns:
             str: TwiML response
@@ -101,7 +126,8 @@ class TwilioVoiceHandler:
         # Ask if they want to continue
         gather = Gather(
             input='speech',
-            action='/voice/process',
+            action=self._url('/voice/process', query),
+            **self._partial_results(query),
             method='POST',
             language=voice_lang,
             speech_timeout='auto',
@@ -125,14 +151,93 @@ class TwilioVoiceHandler:
         
         return str(response)
     
-    def _ask_to_repeat(self, language='english'):
-        """Ask user to repeat their question."""
+    def escalation_response(self, message, language='english', query=None):
+        """
+        Urgent referral for a danger sign: say the advice twice, then let the
+        caller ask something else.
+
+        Args:
+            message (str): Escalation advice
+            language (str): 'english' or 'hindi'
+            query (dict): Parameters for the callback URLs (see _url)
+
+        Returns:
+            str: TwiML response
+        """
+        response = VoiceResponse()
+        voice_lang = self.hindi_language if language == 'hindi' else self.default_language
+
+        response.say(message, language=voice_lang, voice='Polly.Aditi')
+        response.pause(length=1)
+        response.say(message, language=voice_lang, voice='Polly.Aditi')
+
+        gather = Gather(
+            input='speech',
+            action=self._url('/voice/process', query),
+            **self._partial_results(query),
+            method='POST',
+            language=voice_lang,
+            speech_timeout='auto'
+        )
+
+        if language == 'hindi':
+            gather.say("क्या आपका कोई और सवाल है?", language=voice_lang)
+        else:
+            gather.say("Do you have another question?", language=voice_lang)
+
+        response.append(gather)
+        response.hangup()
+
+        return str(response)
+
+    def ask(self, message, language='english', query=None):
+        """
+        Ask the caller something and listen for the answer (no "another
+        question?" prompt, unlike generate_response).
+
+        Args:
+            message (str): Question to say
+            language (str): 'english' or 'hindi'
+            query (dict): Parameters for the callback URLs (see _url)
+
+        Returns:
+            str: TwiML response
+        """
+        response = VoiceResponse()
+        voice_lang = self.hindi_language if language == 'hindi' else self.default_language
+
+        gather = Gather(
+            input='speech',
+            action=self._url('/voice/process', query),
+            **self._partial_results(query),
+            method='POST',
+            language=voice_lang,
+            speech_timeout='auto'
+        )
+        gather.say(message, language=voice_lang, voice='Polly.Aditi')
+
+        response.append(gather)
+        response.redirect(self._url('/voice/continue', query))
+
+        return str(response)
+
+    def goodbye(self, message, language='english'):
+        """Say a closing message and hang up."""
+        response = VoiceResponse()
+        voice_lang = self.hindi_language if language == 'hindi' else self.default_language
+        response.say(message, language=voice_lang)
+        response.hangup()
+        return str(response)
+
+    def _ask_to_repeat(self, language='english', query=None):
+        """Ask user to repeat their question (query: see _url)."""
         response = VoiceResponse()
         voice_lang = self.hindi_language if language == 'hindi' else self.default_language
         
         gather = Gather(
             input='speech',
-            action='/voice/process',
+            action=self._url('/voice/process', query),
+            **self._partial_results(query),
             method='POST',
             language=voice_lang,
             speech_timeout='auto'
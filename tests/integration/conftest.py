@@ -0,0 +1,36 @@
+"""
+Fixtures for the integration tests: the Flask app on a scratch database, with
+the background writers and speculation off and the deterministic model stub
+from scripts/benchmark_replay.py in place of Claude.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+os.environ.setdefault('CALL_LOG_ENABLED', 'false')
+os.environ.setdefault('CONFIG_HOT_RELOAD', 'false')
+os.environ.setdefault('SPECULATION_ENABLED', 'false')
+os.environ.setdefault('PROFILER_ENABLED', 'false')
+_scratch = tempfile.mkdtemp()
+os.environ.setdefault('DATABASE_PATH', os.path.join(_scratch, 'test.db'))
+os.environ.setdefault('USAGE_LOG_DIR', os.path.join(_scratch, 'usage'))
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'scripts'))
+
+
+@pytest.fixture(scope='session')
+def app_module():
+    from benchmark_replay import StubClaudeClient
+    from src import app as app_module
+
+    app_module.test_screening.client = StubClaudeClient()
+    return app_module
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
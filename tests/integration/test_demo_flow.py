@@ -0,0 +1,23 @@
+"""
+Chat API flow tests through the Flask app.
+"""
+
+
+def test_api_test_lists_every_chat_endpoint(client):
+    endpoints = client.get('/api/test').get_json()['endpoints']
+    assert endpoints['chat'].startswith('/api/chat ')
+    assert endpoints['chat_batch'].startswith('/api/chat/batch ')
+
+
+def test_chat_batch_answers_each_item(client):
+    items = [
+        {'user_id': 'partner-1', 'message': 'What tests do I need?', 'context': {'pregnancy_week': 20}},
+        {'user_id': 'partner-2', 'message': 'मुझे कौन से टेस्ट करवाने चाहिए?',
+         'context': {'pregnancy_week': 30, 'language': 'hindi'}},
+        {'user_id': 'partner-3'}
+    ]
+    body = client.post('/api/chat/batch', json={'items': items}).get_json()
+    results = body['results']
+    assert [bool(result.get('response')) for result in results[:2]] == [True, True]
+    assert results[2]['status'] == 400
+    assert body['failed'] == 1
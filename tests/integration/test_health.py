@@ -0,0 +1,21 @@
+"""
+Readiness reported by /health.
+"""
+
+import pytest
+
+
+@pytest.mark.parametrize('preload, status, code', [
+    (False, 'cold', 200),
+    (False, 'warming', 503),
+    (True, 'cold', 503),
+    (True, 'warming', 503),
+    (True, 'ready', 200)
+])
+def test_health_reports_ready_only_after_warmup(app_module, client, monkeypatch, preload, status, code):
+    monkeypatch.setattr(app_module, 'SERVER_PRELOAD', preload)
+    monkeypatch.setitem(app_module.warmup_state, 'status', status)
+    response = client.get('/health')
+    assert response.status_code == code
+    if code == 503:
+        assert response.get_json()['status'] == ('warming_up' if status == 'warming' else 'cold')
@@ -0,0 +1,209 @@
+"""
+Twilio webhook tests through the Flask app.
+"""
+
+import re
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.voice.call_session import SessionCodec
+
+OUR_NUMBER = '+15550000000'
+USER_NUMBER = '+919800000001'
+
+
+@pytest.fixture
+def session_tokens(app_module, monkeypatch):
+    codec = SessionCodec('test-secret')
+    monkeypatch.setattr(app_module, 'session_codec', codec)
+    return codec
+
+
+def test_outbound_call_context_uses_the_number_called(app_module, session_tokens):
+    token = session_tokens.encode('CA-out', {'language': 'english', 'pregnancy_week': 24, 'turns': 1})
+    values = {'CallSid': 'CA-out', 'Direction': 'outbound-api', 'From': OUR_NUMBER, 'To': USER_NUMBER}
+    with app_module.app.test_request_context(f'/voice/process?s={token}', method='POST', data=values):
+        context = app_module._call_context('CA-out')
+    assert context['phone'] == USER_NUMBER
+    assert context['pregnancy_week'] == 24
+
+
+def test_inbound_call_context_uses_the_caller(app_module, session_tokens):
+    token = session_tokens.encode('CA-in', {'language': 'english', 'turns': 1})
+    values = {'CallSid': 'CA-in', 'Direction': 'inbound', 'From': USER_NUMBER, 'To': OUR_NUMBER}
+    with app_module.app.test_request_context(f'/voice/process?s={token}', method='POST', data=values):
+        assert app_module._call_context('CA-in')['phone'] == USER_NUMBER
+
+
+def test_outbound_call_saves_the_week_for_the_user(app_module, client, session_tokens):
+    token = session_tokens.encode('CA-out-week', {'language': 'english', 'turns': 1})
+    response = client.post(f'/voice/process?s={token}', data={
+        'CallSid': 'CA-out-week', 'Direction': 'outbound-api', 'From': OUR_NUMBER, 'To': USER_NUMBER,
+        'SpeechResult': 'I am 26 weeks pregnant', 'Confidence': '0.9'
+    })
+    assert response.status_code == 200
+    stored = app_module.queries.get_user_context(app_module.db, USER_NUMBER)
+    assert stored is not None and stored['pregnancy_week'] == 26
+    assert app_module.queries.get_user_context(app_module.db, OUR_NUMBER) is None
+
+
+# Dialer reconciliation against scripts/fake_twilio.py
+
+ACCOUNT_SID = 'AC' + '0' * 32
+
+
+@pytest.fixture
+def fake_twilio():
+    from fake_twilio import FakeTwilioState, start_fake_twilio
+
+    server, api_base = start_fake_twilio(state=FakeTwilioState(latency_ms=0, jitter_ms=0, seed=1, cps=1000,
+                                                               mps=1000, ring_ms=60000))
+    yield server.state, api_base
+    server.shutdown()
+
+
+@pytest.fixture
+def sms_sender(fake_twilio, tmp_path):
+    from src.integrations.sms_service import BulkSMSSender
+
+    sender = BulkSMSSender(ACCOUNT_SID, 'token', OUR_NUMBER, checkpoint_path=str(tmp_path / 'sms.db'),
+                           rate_per_sec=1000, max_concurrency=4, api_base=fake_twilio[1])
+    yield sender
+    sender.close()
+
+
+@pytest.fixture
+def dialer(fake_twilio, tmp_path):
+    from src.integrations.twilio_client import ReminderCallDialer
+
+    dialer = ReminderCallDialer(ACCOUNT_SID, 'token', OUR_NUMBER, checkpoint_path=str(tmp_path / 'calls.db'),
+                                rate_per_sec=1000, max_concurrency=4, voice_url='http://localhost/voice/incoming',
+                                api_base=fake_twilio[1])
+    yield dialer
+    dialer.close()
+
+
+def test_sms_accepted_despite_500_is_not_sent_twice(fake_twilio, sms_sender):
+    from src.integrations.sms_service import SENT
+
+    state, _ = fake_twilio
+    state.accepted_error_rate = 1.0
+    key, status, sid, _ = sms_sender._send_one('k1', USER_NUMBER, 'Your GTT is due this week')
+    assert status == SENT
+    assert len(state.messages) == 1 and sid == state.messages[0]['sid']
+
+
+def test_sms_reconcile_finds_queued_message_on_a_later_page(fake_twilio, sms_sender):
+    state, _ = fake_twilio
+    since = time.time()
+    target = state.store_message(ACCOUNT_SID, {'To': USER_NUMBER, 'From': OUR_NUMBER, 'Body': 'Reminder'})
+    for i in range(1100):
+        state.store_message(ACCOUNT_SID, {'To': USER_NUMBER, 'From': OUR_NUMBER, 'Body': f"Other {i}"})
+    # Queued: no date_sent yet, so a DateSent filter would miss it
+    assert target['date_sent'] is None
+    assert sms_sender._find_existing(USER_NUMBER, 'Reminder', since) == target['sid']
+    assert sms_sender._find_existing(USER_NUMBER, 'Never sent', since) is None
+
+
+def test_sms_resume_marks_in_doubt_message_sent(fake_twilio, sms_sender):
+    from src.integrations.sms_service import idempotency_key
+
+    state, _ = fake_twilio
+    key = idempotency_key('c1', USER_NUMBER, 'Reminder')
+    sms_sender.checkpoint.add('c1', [(key, USER_NUMBER, 'Reminder')])
+    sms_sender.checkpoint.claim('c1', 10)
+    # The crashed run's message reached Twilio
+    state.store_message(ACCOUNT_SID, {'To': USER_NUMBER, 'From': OUR_NUMBER, 'Body': 'Reminder'})
+    summary = sms_sender.send_campaign('c1', [(USER_NUMBER, 'Reminder')])
+    assert summary['reconciled'] == 1 and summary['sent_this_run'] == 0
+    assert state.duplicates() == 0
+
+
+def test_call_created_despite_500_is_not_dialled_twice(fake_twilio, dialer):
+    from src.integrations.twilio_client import LIVE
+
+    state, _ = fake_twilio
+    state.accepted_error_rate = 1.0
+    _, status, sid, _ = dialer._dial('k1', USER_NUMBER, 'hindi')
+    assert status == LIVE
+    assert list(state.calls) == [sid]
+
+
+def test_call_reconcile_matches_only_calls_since_the_claim(fake_twilio, dialer):
+    from src.integrations.twilio_client import call_key
+
+    state, _ = fake_twilio
+    earlier = state.create_call(ACCOUNT_SID, {'To': USER_NUMBER, 'From': OUR_NUMBER})
+    earlier['date_created'] = 'Mon, 01 Jun 2026 08:00:00 +0000'
+    key = call_key('c1', USER_NUMBER)
+    dialer.checkpoint.add('c1', [(key, USER_NUMBER, 'english')])
+    dialer.checkpoint.claim('c1', 10, time.time())
+    assert dialer._reconcile('c1') == 1
+    assert dialer.checkpoint.counts('c1') == {'pending': 1}
+
+    dialer.checkpoint.claim('c1', 10, time.time())
+    queued = state.create_call(ACCOUNT_SID, {'To': USER_NUMBER, 'From': OUR_NUMBER})
+    assert dialer._reconcile('c1') == 1
+    assert dialer.checkpoint.counts('c1') == {'live': 1}
+    assert [row[1] for row in dialer.checkpoint.live('c1')] == [queued['sid']]
+
+
+def test_status_callback_discards_speculative_session(app_module, client, monkeypatch):
+    discarded = []
+    monkeypatch.setattr(app_module, 'speculator', SimpleNamespace(discard=discarded.append))
+    client.post('/voice/status', data={'CallSid': 'CA-ringing', 'CallStatus': 'in-progress'})
+    response = client.post('/voice/status', data={'CallSid': 'CA-done', 'CallStatus': 'completed',
+                                                  'Direction': 'inbound'})
+    assert response.status_code == 204
+    assert discarded == ['CA-done']
+
+
+def _action_query(twiml):
+    action = re.search(r'action="([^"]+)"', twiml).group(1).replace('&amp;', '&')
+    return action.split('?', 1)[1]
+
+
+def test_prerendered_prompts_carry_the_turn_number(client):
+    call = {'CallSid': 'CA-repeat', 'From': USER_NUMBER, 'To': OUR_NUMBER, 'Direction': 'inbound'}
+    welcome = client.post('/voice/incoming', data=call).get_data(as_text=True)
+    assert _action_query(welcome) == 'turn=0'
+
+    unclear = dict(call, SpeechResult='tests', Confidence='0.1')
+    first = client.post(f"/voice/process?{_action_query(welcome)}", data=unclear).get_data(as_text=True)
+    assert _action_query(first) == 'turn=1'
+    # The caller mumbles the same words again: a new turn, not a replayed retry
+    second = client.post(f"/voice/process?{_action_query(first)}", data=unclear).get_data(as_text=True)
+    assert _action_query(second) == 'turn=2'
+    retry = client.post(f"/voice/process?{_action_query(first)}", data=unclear).get_data(as_text=True)
+    assert retry == second
+
+
+def test_escalation_twiml_carries_the_turn_number(client):
+    call = {'CallSid': 'CA-danger', 'From': USER_NUMBER, 'To': OUR_NUMBER, 'Direction': 'inbound'}
+    client.post('/voice/incoming', data=call)
+    twiml = client.post('/voice/process?turn=0', data=dict(call, SpeechResult='I am bleeding a lot',
+                                                            Confidence='0.9')).get_data(as_text=True)
+    assert '108' in twiml
+    assert _action_query(twiml) == 'turn=1'
+
+
+def test_tampered_token_falls_back_to_the_stored_call(app_module, client, session_tokens):
+    call = {'CallSid': 'CA-tamper', 'From': USER_NUMBER, 'To': OUR_NUMBER, 'Direction': 'inbound',
+            'language': 'hindi'}
+    client.post('/voice/incoming', data=call)
+    token = session_tokens.encode('CA-tamper', {'language': 'english', 'turns': 1})
+    forged = token[:-2] + ('AA' if token[-2:] != 'AA' else 'BB')
+    with app_module.app.test_request_context(f'/voice/process?s={forged}', method='POST', data=call):
+        context = app_module._call_context('CA-tamper')
+    # The stored call, not the forged token's English
+    assert context['language'] == 'hindi'
+
+
+def test_escalation_in_a_language_without_prerendered_twiml(client):
+    call = {'CallSid': 'CA-tamil', 'From': USER_NUMBER, 'To': OUR_NUMBER, 'Direction': 'inbound'}
+    client.post('/voice/incoming?language=tamil', data=call)
+    twiml = client.post('/voice/process?turn=0', data=dict(call, SpeechResult='I am bleeding',
+                                                           Confidence='0.9')).get_data(as_text=True)
+    assert 'Call 108' in twiml
@@ -0,0 +1,80 @@
+"""
+Unit tests for src/analytics: token usage accounting (the per-day budget is
+shared by every worker through the app database) and the call logger.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.analytics.call_logger import CallLogger, read_call_logs
+from src.analytics.usage_tracker import UsageTracker
+from src.database.init_db import Database, init_db
+
+BUDGETS = {'per_day_tokens': 1000}
+REQUEST = {'input_tokens': 300, 'output_tokens': 100}
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'usage.db')
+    init_db(Database(path))
+    return path
+
+
+def worker(db_path):
+    return UsageTracker(log_dir=None).share_days(Database(db_path))
+
+
+def test_per_day_budget_counts_every_worker(db_path):
+    first, second = worker(db_path), worker(db_path)
+    first.record({'call': 'CA1'}, 'test_screening', 'english', [REQUEST, REQUEST])
+    second.record({'call': 'CA2'}, 'test_screening', 'hindi', [REQUEST])
+    # Each worker alone is under the limit until they sync
+    assert first.check({}, BUDGETS) is None and second.check({}, BUDGETS) is None
+    first.flush()
+    second.flush()
+    first.sync_days()
+    assert first.check({}, BUDGETS) == 'fallback'
+    assert second.check({}, BUDGETS) == 'fallback'
+
+
+def test_per_day_budget_survives_a_restart(db_path):
+    before = worker(db_path)
+    before.record({'call': 'CA1'}, 'test_screening', 'english', [REQUEST, REQUEST, REQUEST])
+    before.flush()
+    after = worker(db_path).start()
+    try:
+        assert after.check({}, BUDGETS) == 'fallback'
+    finally:
+        after.close()
+
+
+def test_unshared_tracker_keeps_its_own_total():
+    tracker = UsageTracker(log_dir=None)
+    tracker.record({'call': 'CA1'}, 'test_screening', 'english', [REQUEST] * 3)
+    assert tracker.check({}, BUDGETS) == 'fallback'
+
+
+# Call logger
+
+def _log(logger, i):
+    return logger.log_turn(f"CA{i % 50}", 'What tests do I need?', 0.9, 'test_screening', 12.5, False)
+
+
+def test_call_logger_counts_every_turn_from_many_threads(tmp_path):
+    logger = CallLogger(log_dir=str(tmp_path), max_queue_size=100000, flush_interval=0.05).start()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert all(pool.map(lambda i: _log(logger, i), range(20000)))
+    logger.close()
+    stats = logger.stats()
+    assert stats['enqueued'] == stats['written'] == 20000 and stats['dropped'] == 0
+    assert sum(1 for _ in read_call_logs(str(tmp_path))) == 20000
+
+
+def test_call_logger_drops_and_counts_when_full(tmp_path):
+    # Not started: nothing drains the queue
+    logger = CallLogger(log_dir=str(tmp_path), max_queue_size=10)
+    results = [_log(logger, i) for i in range(15)]
+    assert results.count(False) == 5
+    assert logger.stats()['enqueued'] == 10 and logger.stats()['dropped'] == 5
@@ -0,0 +1,98 @@
+"""
+Unit tests for call state carried in signed session tokens.
+"""
+
+import base64
+import time
+
+import pytest
+
+from src.voice.call_session import SessionCodec
+
+CONTEXT = {'language': 'hindi', 'pregnancy_week': 22, 'name': 'Priya', 'turns': 3,
+           'dialogue_state': 'awaiting_week', 'pending_question': 'मुझे कौन सी जांच करानी है?',
+           'summary': 'Asked about the sugar test'}
+
+
+@pytest.fixture
+def codec():
+    return SessionCodec('test-secret', max_age=3600)
+
+
+def _flip(token, index):
+    raw = bytearray(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    raw[index] ^= 0x01
+    return base64.urlsafe_b64encode(bytes(raw)).rstrip(b'=').decode('ascii')
+
+
+def test_round_trip(codec):
+    assert codec.decode('CA1', codec.encode('CA1', CONTEXT)) == CONTEXT
+
+
+@pytest.mark.parametrize('index', [0, 5, 9, 20, -1])
+def test_tampered_token_is_rejected(codec, index):
+    assert codec.decode('CA1', _flip(codec.encode('CA1', CONTEXT), index)) is None
+
+
+def test_token_for_another_call_is_rejected(codec):
+    assert codec.decode('CA2', codec.encode('CA1', CONTEXT)) is None
+
+
+def test_expired_token_is_rejected(codec):
+    now = time.time()
+    token = codec.encode('CA1', CONTEXT, now=now - 3601)
+    assert codec.decode('CA1', token, now=now) is None
+    assert codec.decode('CA1', codec.encode('CA1', CONTEXT, now=now - 3500), now=now) is not None
+
+
+@pytest.mark.parametrize('token', ['', 'not base64 !', 'AAAA', 'A' * 200])
+def test_malformed_token_is_rejected(codec, token):
+    assert codec.decode('CA1', token) is None
+
+
+def test_secret_rotation(codec):
+    token = codec.encode('CA1', CONTEXT)
+    rotated = SessionCodec('new-secret', previous_secrets=['test-secret'])
+    assert rotated.decode('CA1', token) == CONTEXT
+    assert SessionCodec('new-secret').decode('CA1', token) is None
+    # New tokens are signed with the new secret only
+    assert codec.decode('CA1', rotated.encode('CA1', CONTEXT)) is None
+
+
+def test_long_text_is_cut_at_a_character_boundary(codec):
+    context = dict(CONTEXT, pending_question='जांच ' * 100)
+    decoded = codec.decode('CA1', codec.encode('CA1', context))
+    assert decoded['pending_question'] and '�' not in decoded['pending_question']
+    assert len(decoded['pending_question'].encode('utf-8')) <= 160
+
+
+def test_secret_is_required():
+    with pytest.raises(ValueError):
+        SessionCodec('')
+
+
+STRONG_SECRET = 'x' * 32
+
+
+@pytest.mark.parametrize('secret, previous', [
+    ('', ''),
+    ('change-me', ''),
+    ('short-secret', ''),
+    (STRONG_SECRET, 'change-me')
+])
+def test_weak_secrets_are_refused(monkeypatch, secret, previous):
+    monkeypatch.setenv('CALL_SESSION_TOKENS', 'true')
+    monkeypatch.setenv('CALL_SESSION_SECRET', secret)
+    monkeypatch.setenv('CALL_SESSION_PREVIOUS_SECRETS', previous)
+    with pytest.raises(ValueError):
+        SessionCodec.from_env()
+
+
+def test_codec_from_env(monkeypatch):
+    monkeypatch.setenv('CALL_SESSION_TOKENS', 'true')
+    monkeypatch.setenv('CALL_SESSION_SECRET', STRONG_SECRET)
+    monkeypatch.setenv('CALL_SESSION_PREVIOUS_SECRETS', '')
+    codec = SessionCodec.from_env()
+    assert codec.decode('CA1', codec.encode('CA1', CONTEXT)) == CONTEXT
+    monkeypatch.setenv('CALL_SESSION_TOKENS', 'false')
+    assert SessionCodec.from_env() is None
@@ -0,0 +1,69 @@
+"""
+Unit tests for the dialogue manager: which weeks an utterance may write to
+the caller's context.
+"""
+
+import pytest
+
+from src.conversation.dialogue_manager import AWAITING_WEEK, DialogueManager
+
+
+class RecordingUseCase:
+    name = 'recording'
+
+    def __init__(self):
+        self.weeks = []
+
+    def handle(self, user_input, context, turn_info=None):
+        signals = (turn_info or {}).get('signals', {})
+        self.weeks.append(signals.get('asked_week') or context.get('pregnancy_week'))
+        return 'answer'
+
+
+@pytest.fixture
+def use_case():
+    return RecordingUseCase()
+
+
+@pytest.fixture
+def dialogue(use_case):
+    return DialogueManager(use_case, concurrency='none')
+
+
+@pytest.mark.parametrize('text, asked', [
+    ('What tests will I need at 28 weeks?', 28),
+    ('My sister is 30 weeks pregnant, which tests does she need?', 30)
+])
+def test_a_known_week_is_not_overwritten(dialogue, use_case, text, asked):
+    context = {'pregnancy_week': 12, 'language': 'english'}
+    result = dialogue.handle_turn(text, context)
+    assert result.action == 'answer'
+    assert context['pregnancy_week'] == 12 and not result.context_changed
+    # Answered for the week asked about, this turn only
+    assert use_case.weeks == [asked]
+    assert result.signals['knowledge']['pregnancy_week'] == asked
+
+
+def test_the_answer_to_the_week_question_is_adopted(dialogue, use_case):
+    context = {'pregnancy_week': 12, 'language': 'english', 'dialogue_state': AWAITING_WEEK,
+               'pending_question': 'What tests do I need?'}
+    result = dialogue.handle_turn('I am 20 weeks pregnant', context)
+    assert result.action == 'answer_pending'
+    assert context['pregnancy_week'] == 20 and result.context_changed
+    assert use_case.weeks == [20]
+
+
+def test_an_unknown_week_is_taken_from_the_utterance(dialogue, use_case):
+    context = {'language': 'english'}
+    result = dialogue.handle_turn('I am 20 weeks pregnant, what tests do I need?', context)
+    assert result.action == 'answer'
+    assert context['pregnancy_week'] == 20 and result.context_changed
+
+
+@pytest.mark.parametrize('text', ['Which tests happen in the 7th month?', 'What tests are done at 28 weeks?'])
+def test_a_week_asked_about_is_not_adopted_when_none_is_known(dialogue, use_case, text):
+    context = {'language': 'english'}
+    result = dialogue.handle_turn(text, context)
+    assert result.action == 'answer'
+    assert 'pregnancy_week' not in context and not result.context_changed
+    assert use_case.weeks == [28]
@@ -0,0 +1,56 @@
+"""
+Unit tests for the users table: the LMP is stored once and the pregnancy
+week is worked out from it.
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from src.database import queries
+from src.database.init_db import Database, init_db
+from src.database.models import user_to_context
+
+TODAY = date(2026, 6, 1)
+
+
+@pytest.fixture
+def db():
+    return init_db(Database(':memory:'))
+
+
+def test_week_advances_from_the_stored_lmp(db):
+    queries.save_user(db, '+911', {'pregnancy_week': 20, 'language': 'hindi', 'name': 'Asha'})
+    row = queries.get_user(db, '+911')
+    assert user_to_context(row, today=date.today())['pregnancy_week'] == 20
+    assert user_to_context(row, today=date.today() + timedelta(weeks=3))['pregnancy_week'] == 23
+
+
+def test_saving_the_same_week_keeps_the_lmp():
+    lmp = TODAY - timedelta(weeks=20)
+    context = {'pregnancy_week': 22, 'lmp_date': lmp.isoformat(), 'name': 'Asha'}
+    # Two weeks later the derived week is 22: the LMP must not move
+    row = queries.context_row('+911', context, today=TODAY + timedelta(weeks=2))
+    assert row[4] == lmp.isoformat()
+
+
+def test_a_new_week_re_estimates_the_lmp():
+    context = {'pregnancy_week': 25, 'lmp_date': (TODAY - timedelta(weeks=20)).isoformat()}
+    row = queries.context_row('+911', context, today=TODAY)
+    assert row[3] == 25
+    assert row[4] == (TODAY - timedelta(weeks=25)).isoformat()
+
+
+def test_save_user_round_trip_does_not_push_the_lmp(db):
+    queries.save_user(db, '+912', {'pregnancy_week': 12, 'language': 'english', 'name': 'Meera'})
+    lmp = queries.get_user(db, '+912')['lmp_date']
+    context = queries.get_user_context(db, '+912')
+    context['name'] = 'Meera K'
+    queries.save_user(db, '+912', context)
+    assert queries.get_user(db, '+912')['lmp_date'] == lmp
+    assert context['lmp_date'] == lmp
+
+
+def test_rows_without_lmp_use_the_stored_week(db):
+    queries.save_user(db, '+913', {'language': 'english'})
+    assert queries.get_user_context(db, '+913')['pregnancy_week'] is None
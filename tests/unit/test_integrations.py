@@ -0,0 +1,92 @@
+"""
+Unit tests for Twilio webhook deduplication.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.integrations.twilio_webhooks import WebhookDeduplicator, request_key
+
+PARAMS = {'CallSid': 'CA1', 'SpeechResult': 'What tests do I need?', 'Confidence': '0.91', 'turn': '2'}
+
+
+def test_request_key_covers_every_parameter():
+    assert request_key(dict(PARAMS)) == request_key(dict(reversed(list(PARAMS.items()))))
+    assert request_key(dict(PARAMS, turn='3')) != request_key(PARAMS)
+    assert request_key(dict(PARAMS, SpeechResult='Is it safe?')) != request_key(PARAMS)
+    assert request_key(PARAMS).startswith('CA1:')
+
+
+def test_concurrent_duplicates_are_computed_once():
+    dedupe = WebhookDeduplicator(ttl=5.0)
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(2.0)
+        return '<Response/>', 200
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        first = pool.submit(dedupe.run, 'CA1:x', compute)
+        started.wait(2.0)
+        duplicates = [pool.submit(dedupe.run, 'CA1:x', compute) for _ in range(2)]
+        time.sleep(0.02)
+        release.set()
+        responses = [first.result()] + [future.result() for future in duplicates]
+    assert len(calls) == 1
+    assert responses == [('<Response/>', 200)] * 3
+    assert dedupe.stats()['first'] == 1 and dedupe.stats()['joined'] == 2
+
+
+def test_late_retry_is_replayed_until_the_ttl():
+    dedupe = WebhookDeduplicator(ttl=0.05)
+    calls = []
+    compute = lambda: calls.append(1) or len(calls)
+    assert dedupe.run('CA1:x', compute) == 1
+    assert dedupe.run('CA1:x', compute) == 1
+    assert dedupe.stats()['replayed'] == 1
+    time.sleep(0.06)
+    assert dedupe.run('CA1:x', compute) == 2
+
+
+def test_failed_request_is_not_replayed():
+    dedupe = WebhookDeduplicator()
+
+    def fail():
+        raise RuntimeError('model timeout')
+
+    with pytest.raises(RuntimeError):
+        dedupe.run('CA1:x', fail)
+    assert dedupe.run('CA1:x', lambda: 'ok') == 'ok'
+
+
+def test_duplicate_recomputes_after_waiting_too_long():
+    dedupe = WebhookDeduplicator(max_wait=0.02)
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(2.0)
+        return 'first'
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        first = pool.submit(dedupe.run, 'CA1:x', slow)
+        started.wait(2.0)
+        assert dedupe.run('CA1:x', lambda: 'own') == 'own'
+        release.set()
+        assert first.result() == 'first'
+    assert dedupe.stats()['recomputed'] == 1
+
+
+def test_entries_are_capped():
+    dedupe = WebhookDeduplicator(max_entries=2)
+    for i in range(5):
+        dedupe.run(f"CA1:{i}", lambda: 'ok')
+    assert dedupe.stats()['entries'] <= 3
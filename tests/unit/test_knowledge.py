@@ -0,0 +1,146 @@
+"""
+Unit tests for the knowledge modules: danger-sign detection against the
+labelled utterances in tests/fixtures/danger_signs.json, and the FAQ bank.
+"""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from src.knowledge.faq import MIN_SCORE, FAQBank, find_answer
+from src.knowledge.risk_assessment import DangerSignDetector, clauses
+
+FIXTURES = Path(__file__).parent.parent / 'fixtures' / 'danger_signs.json'
+
+with open(FIXTURES, encoding='utf-8') as f:
+    CASES = json.load(f)
+
+
+@pytest.fixture(scope='module')
+def detector():
+    return DangerSignDetector()
+
+
+@pytest.mark.parametrize('case', CASES['positives'], ids=lambda case: case['text'])
+def test_danger_sign_detected(detector, case):
+    assert case['category'] in detector.detect(case['text'])
+
+
+@pytest.mark.parametrize('case', CASES['negatives'], ids=lambda case: case['text'])
+def test_no_escalation(detector, case):
+    assert detector.detect(case['text']) == []
+
+
+@pytest.mark.parametrize('text', [
+    'I have no headache and no blurred vision',
+    'My headache is not severe',
+    'no spotting at all',
+    'सिरदर्द नहीं है',
+    'khoon nahi aa raha'
+])
+def test_negation_cancels_terms(detector, text):
+    assert detector.detect(text) == []
+
+
+def test_negated_terms_are_not_matched(detector):
+    assert detector.matched_groups('I have no headache and no blurred vision') == {}
+    assert detector.matched_groups('My headache is not severe') == {'headache': 'english'}
+
+
+def test_negation_is_scoped_to_its_clause(detector):
+    assert detector.detect('No pain, but bleeding since morning') == ['bleeding']
+    assert detector.detect('no fever but I have a severe headache') == ['severe_headache']
+
+
+def test_negation_cue_inside_a_term_is_not_a_negation(detector):
+    assert detector.detect('The baby is not moving') == ['reduced_fetal_movement']
+    assert detector.detect('मुझे धुंधला दिखाई नहीं देता') == ['blurred_vision']
+
+
+@pytest.mark.parametrize('text', ['not much bleeding', 'Is bleeding normal?', 'Is this headache normal with blurry vision?'])
+def test_little_or_normal_do_not_negate(detector, text):
+    assert detector.detect(text) != []
+
+
+def test_a_sign_that_started_again_is_reported(detector):
+    assert detector.detect('bleeding stopped yesterday but started again today') == ['bleeding']
+    assert detector.detect('bleeding stopped yesterday') == []
+    # "again" about another sign does not bring back the negated one
+    assert detector.detect('no bleeding but I have a headache again') == []
+
+
+def test_blood_only_counts_where_it_means_bleeding(detector):
+    assert detector.detect('I have a little blood on my pad') == ['bleeding']
+    assert detector.detect('Why do they check my blood group?') == []
+
+
+def test_severity_must_be_near_the_head_pain(detector):
+    assert detector.detect('I have a headache and my back pain is severe since the fall') == []
+    assert detector.detect('severe headache since morning') == ['severe_headache']
+    assert detector.detect('sir mein bahut dard hai') == ['severe_headache']
+
+
+def test_clauses_split_on_punctuation_and_break_words():
+    assert clauses('No pain, but bleeding. Week 30') == [' no pain ', ' bleeding ', ' week 30 ']
+    # A decimal point does not end a clause
+    assert clauses('weight is 62.5 kg') == [' weight is 62 5 kg ']
+
+
+# FAQ bank
+
+FAQ_ENTRIES = [
+    {'id': 'gtt_what', 'status': 'approved', 'questions': ['What is the GTT?', 'What is the glucose tolerance test?'],
+     'answers': {'english': 'GTT answer', 'hindi': 'जीटीटी जवाब'}},
+    {'id': 'gtt_when', 'status': 'approved', 'weeks': [1, 28], 'questions': ['When is the GTT?'],
+     'answers': {'english': 'Between 24 and 28 weeks'}},
+    {'id': 'gtt_when_late', 'status': 'approved', 'weeks': [29, 42], 'questions': ['When is the GTT?'],
+     'answers': {'english': 'Ask your doctor whether it was done'}},
+    {'id': 'draft', 'status': 'draft', 'questions': ['Is the HIV test compulsory?'],
+     'answers': {'english': 'Not reviewed yet'}}
+]
+
+
+@pytest.fixture(scope='module')
+def bank():
+    return FAQBank(FAQ_ENTRIES)
+
+
+def test_faq_exact_hit_ignores_case_stopwords_and_plurals(bank):
+    match = bank.match('what is the gtt', week=20)
+    assert (match['id'], match['method'], match['score']) == ('gtt_what', 'exact', 1.0)
+    assert bank.match('What are the GTTs?', week=20)['method'] == 'exact'
+
+
+def test_faq_bm25_hit_above_min_score(bank):
+    # Same words, another order: no exact hit, full BM25 coverage
+    match = bank.match('The GTT, what is it?', week=20)
+    assert (match['id'], match['method']) == ('gtt_what', 'bm25')
+    # A rewording in the shipped bank
+    match = find_answer('group b strep kya hota hai', 20)
+    assert (match['id'], match['method']) == ('gbs_what', 'bm25')
+    assert MIN_SCORE <= match['score'] < 1.0
+    assert find_answer('group b strep kya hota hai', 20, min_score=0.99) is None
+
+
+def test_faq_partial_overlap_is_below_min_score(bank):
+    assert bank.match('what is glucose tolerance', week=20) is None
+    assert bank.match('what is glucose tolerance', week=20, min_score=0.5)['id'] == 'gtt_what'
+
+
+def test_faq_mixed_question_falls_through():
+    assert find_answer('what is the GTT? I also have heavy bleeding', 20) is None
+
+
+def test_faq_answer_for_the_stage_and_language(bank):
+    assert bank.match('When is the GTT?', week=20)['id'] == 'gtt_when'
+    assert bank.match('When is the GTT?', week=32)['id'] == 'gtt_when_late'
+    # Entries limited to some weeks need the week
+    assert bank.match('When is the GTT?') is None
+    assert bank.match('What is the GTT?', language='hindi')['answer'] == 'जीटीटी जवाब'
+    # English when the entry has no answer in the caller's language
+    assert bank.match('When is the GTT?', week=20, language='hindi')['answer'] == 'Between 24 and 28 weeks'
+
+
+def test_faq_only_serves_approved_entries(bank):
+    assert bank.match('Is the HIV test compulsory?') is None
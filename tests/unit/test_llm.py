@@ -0,0 +1,209 @@
+"""
+Unit tests for src/llm: admission control, the circuit breakers and prompt
+templates.
+"""
+
+import threading
+import time
+
+import pytest
+
+from src.llm.admission import AdmissionController
+from src.llm.claude_client import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, is_failure
+from src.llm.prompts import PromptError, PromptTemplate
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.001)
+
+
+# Admission control
+
+def test_admission_sheds_when_the_queue_is_full():
+    controller = AdmissionController(max_concurrent=1, max_queue=0)
+    assert controller.acquire('CA1') is None
+    assert controller.acquire('CA2') == 'queue_full'
+    controller.release('CA1')
+    assert controller.acquire('CA2') is None
+    assert controller.stats()['shed_queue_full'] == 1
+
+
+def test_admission_sheds_after_the_queue_wait():
+    controller = AdmissionController(max_concurrent=1, max_queue=4, max_wait=0.02)
+    assert controller.acquire('CA1') is None
+    assert controller.acquire('CA2') == 'timeout'
+    stats = controller.stats()
+    assert stats['shed_timeout'] == 1 and stats['queued'] == 0 and stats['in_flight'] == 1
+
+
+def test_admission_limits_slots_per_caller():
+    controller = AdmissionController(max_concurrent=4, per_caller=1, max_wait=0.02)
+    assert controller.acquire('CA1') is None
+    assert controller.acquire('CA1') == 'timeout'
+    assert controller.acquire('CA2') is None
+
+
+def test_anonymous_requests_are_not_serialized():
+    controller = AdmissionController(max_concurrent=4, per_caller=1, max_wait=0.02)
+    assert [controller.acquire(None) for _ in range(4)] == [None] * 4
+    assert controller.stats()['in_flight'] == 4
+
+
+def test_speculative_calls_only_use_spare_capacity():
+    controller = AdmissionController(max_concurrent=3, speculative_headroom=2)
+    assert controller.acquire('CA1', speculative=True) is None
+    assert controller.acquire('CA2', speculative=True) == 'speculative'
+    controller.release('CA1', speculative=True)
+    assert controller.stats()['in_flight'] == 0
+
+
+def test_waiting_callers_are_served_round_robin():
+    controller = AdmissionController(max_concurrent=1, max_queue=8, per_caller=8, max_wait=5.0)
+    assert controller.acquire('holder') is None
+    granted = []
+
+    def turn(caller, label):
+        assert controller.acquire(caller) is None
+        granted.append((caller, label))
+
+    threads = []
+    for caller, label in (('CA-A', 1), ('CA-A', 2), ('CA-A', 3), ('CA-B', 1)):
+        thread = threading.Thread(target=turn, args=(caller, label))
+        thread.start()
+        threads.append(thread)
+        # Queue in a known order
+        _wait_for(lambda: controller.stats()['queued'] == len(threads))
+
+    holder = 'holder'
+    for count in range(1, 5):
+        controller.release(holder)
+        _wait_for(lambda: len(granted) == count)
+        holder = granted[-1][0]
+    controller.release(holder)
+    for thread in threads:
+        thread.join()
+    # FIFO would serve all of CA-A before CA-B
+    assert granted == [('CA-A', 1), ('CA-B', 1), ('CA-A', 2), ('CA-A', 3)]
+
+
+# Circuit breaker
+
+def _breaker(**settings):
+    defaults = {'window_seconds': 30, 'min_requests': 4, 'error_rate': 0.5, 'slow_call_seconds': 1,
+                'slow_rate': 0.5, 'cooldown_seconds': 0.05}
+    defaults.update(settings)
+    return CircuitBreaker('test', defaults)
+
+
+def test_breaker_stays_closed_below_min_requests():
+    breaker = _breaker()
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record(True, 0.1)
+    assert breaker.state == CLOSED
+
+
+def test_breaker_opens_on_error_rate_and_short_circuits():
+    breaker = _breaker()
+    for failed in (False, True, False, True):
+        breaker.allow()
+        breaker.record(failed, 0.1)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.short_circuited == 1
+
+
+def test_breaker_opens_on_slow_rate():
+    breaker = _breaker()
+    for seconds in (0.1, 2.0, 2.0, 0.1):
+        breaker.allow()
+        breaker.record(False, seconds)
+    assert breaker.state == OPEN
+
+
+def test_breaker_forgets_outcomes_outside_the_window():
+    breaker = _breaker(window_seconds=0.05)
+    for _ in range(3):
+        breaker.record(True, 0.1)
+    time.sleep(0.06)
+    breaker.record(True, 0.1)
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()['requests'] == 1
+
+
+def _tripped():
+    breaker = _breaker()
+    for _ in range(4):
+        breaker.record(True, 0.1)
+    assert breaker.state == OPEN
+    time.sleep(0.06)
+    return breaker
+
+
+def test_breaker_half_open_lets_one_probe_through():
+    breaker = _tripped()
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    breaker.record(False, 0.1)
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_breaker_failed_probe_reopens():
+    breaker = _tripped()
+    assert breaker.allow()
+    breaker.record(True, 0.1)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+
+def test_breaker_slow_probe_reopens():
+    breaker = _tripped()
+    assert breaker.allow()
+    breaker.record(False, 2.0)
+    assert breaker.state == OPEN
+
+
+def test_breaker_abandoned_probe_frees_the_slot():
+    breaker = _tripped()
+    assert breaker.allow()
+    breaker.abandon()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+
+
+def test_breaker_ignores_requests_admitted_before_it_opened():
+    breaker = _breaker(cooldown_seconds=30)
+    for _ in range(4):
+        breaker.record(True, 0.1)
+    breaker.record(False, 0.1)
+    assert breaker.state == OPEN and not breaker.allow()
+
+
+def test_only_api_side_errors_count_as_failures():
+    assert not is_failure({'error': None})
+    assert not is_failure({'error': 'invalid request', 'status': 400})
+    assert is_failure({'error': 'rate limited', 'status': 429})
+    assert is_failure({'error': 'overloaded', 'status': 529})
+    assert is_failure({'error': 'timeout', 'status': None})
+
+
+# Prompt templates
+
+def test_prompt_renders_like_str_format():
+    source = "Hello {user_name}, week {pregnancy_week}. Keep {{braces}}."
+    template = PromptTemplate('greeting', source, ['user_name', 'pregnancy_week', 'language'])
+    values = {'user_name': 'Priya', 'pregnancy_week': 20, 'language': 'hindi'}
+    assert template.render(**values) == source.format_map(values) == "Hello Priya, week 20. Keep {braces}."
+    with pytest.raises(KeyError):
+        template.render(user_name='Priya')
+
+
+@pytest.mark.parametrize('source', ["Hello {user.__class__}", "{0}", "{user!r}", "{week:02d}", "{unknown}", "{"])
+def test_prompt_rejects_anything_but_declared_plain_names(source):
+    with pytest.raises(PromptError):
+        PromptTemplate('bad', source, ['user', 'week'])
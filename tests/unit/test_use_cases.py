@@ -0,0 +1,45 @@
+"""
+Unit tests for the test screening use case: questions the FAQ bank answers
+never reach the model.
+"""
+
+import pytest
+
+# Imported as a module: pytest would try to collect a Test* class
+from src.use_cases import test_screening
+
+
+@pytest.fixture
+def use_case(monkeypatch):
+    monkeypatch.setenv('ANTHROPIC_API_KEY', 'test-key')
+    use_case = test_screening.TestScreeningUseCase()
+
+    def no_model_call(*args, **kwargs):
+        raise AssertionError('the model was called')
+
+    monkeypatch.setattr(use_case, '_generate_response', no_model_call)
+    return use_case
+
+
+@pytest.mark.parametrize('question, week, faq_id', [
+    ('What is the GTT?', 20, 'gtt_what'),
+    ('group b strep kya hota hai', 36, 'gbs_what'),
+    # Answered the same at every week, so no week is needed
+    ('Is the HIV test compulsory?', None, 'hiv_compulsory')
+])
+def test_faq_answer_returns_before_the_model(use_case, question, week, faq_id):
+    turn_info = {}
+    answer = use_case.handle(question, {'pregnancy_week': week, 'language': 'english'}, turn_info)
+    assert answer and turn_info['faq'] == faq_id
+    assert 'faq_lookup' in turn_info['stages']
+
+
+def test_faq_answer_in_the_callers_language(use_case):
+    turn_info = {}
+    answer = use_case.handle('What is the GTT?', {'pregnancy_week': 20, 'language': 'hindi'}, turn_info)
+    assert turn_info['faq'] == 'gtt_what' and not answer.isascii()
+
+
+def test_mixed_question_goes_to_the_model(use_case):
+    with pytest.raises(AssertionError, match='the model was called'):
+        use_case.handle('what is the GTT? I also have heavy bleeding', {'pregnancy_week': 20, 'language': 'english'})
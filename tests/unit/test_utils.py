@@ -0,0 +1,115 @@
+"""
+Unit tests for src/utils: the pregnancy-week slot (numeral normalisation
+and extract_week_slot) and configuration hot reload.
+"""
+
+import os
+import shutil
+from datetime import date
+
+import pytest
+
+from src.utils.config import CONFIG_DIR, ConfigStore
+from src.utils.formatters import normalize_numerals
+from src.utils.validators import extract_week_slot
+
+TODAY = date(2026, 10, 19)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('five months', '5 months'),
+    ('बीस हफ्ते', '20 हफ्ते'),
+    ('saadhe paanch mahine', '5.5 mahine'),
+    ('two weeks ago', '2 weeks ago'),
+    ('do mahine pehle', '2 mahine pehle'),
+    ('I am twenty two weeks', 'i am 22 weeks'),
+    # "do" is also "do" in English; only a unit makes it a number
+    ('what do I do', 'what do i do')
+])
+def test_normalize_numerals(text, expected):
+    assert normalize_numerals(text) == expected
+
+
+@pytest.mark.parametrize('text, week, source', [
+    ('I am five months pregnant', 22, 'months'),
+    ('बीस हफ्ते', 20, 'weeks'),
+    ('saadhe paanch mahine', 24, 'months'),
+    ('week twenty two', 22, 'weeks'),
+    ('last period was two months ago', 9, 'lmp'),
+    ('do mahine pehle meri last period aayi thi', 9, 'lmp'),
+    ('LMP 12/03/2026', 31, 'lmp')
+])
+def test_week_slot(text, week, source):
+    slot = extract_week_slot(text, today=TODAY)
+    assert (slot['pregnancy_week'], slot['week_source']) == (week, source)
+
+
+@pytest.mark.parametrize('text', [
+    'I had pain two weeks ago',
+    'do mahine pehle',
+    # An LMP two weeks ago is not a pregnancy anyone knows about yet
+    'last period 2 weeks ago'
+])
+def test_durations_are_not_weeks(text):
+    assert extract_week_slot(text, expecting_week=True, today=TODAY) == {}
+
+
+def test_bare_number_only_when_expecting_the_week():
+    assert extract_week_slot('twenty', today=TODAY) == {}
+    assert extract_week_slot('twenty', expecting_week=True, today=TODAY)['pregnancy_week'] == 20
+    assert extract_week_slot('बीस', expecting_week=True, today=TODAY)['week_source'] == 'number'
+    assert extract_week_slot('which one', expecting_week=True, today=TODAY) == {}
+
+
+@pytest.mark.parametrize('text, about_caller', [
+    ('I am five months pregnant', True),
+    ('Mera paanchva mahina chal raha hai', True),
+    ('पांचवां महीना चल रहा है', True),
+    ('my last period was in March', True),
+    ('Which tests happen in the 7th month?', False),
+    ('What tests will I need at 28 weeks?', False),
+    ('My sister is 30 weeks pregnant', False)
+])
+def test_only_the_callers_own_stage_is_about_them(text, about_caller):
+    assert extract_week_slot(text, today=TODAY)['about_caller'] is about_caller
+
+
+def test_answers_to_the_week_question_are_about_the_caller():
+    assert extract_week_slot('28 weeks', expecting_week=True, today=TODAY)['about_caller'] is True
+
+
+# Configuration hot reload
+
+@pytest.fixture
+def config_dir(tmp_path):
+    shutil.copytree(CONFIG_DIR, tmp_path / 'config')
+    return tmp_path / 'config'
+
+
+def _touch_later(path):
+    # Reloads are keyed on mtime and size; do not rely on the clock moving
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_prompt_edit_is_picked_up(config_dir):
+    store = ConfigStore(config_dir)
+    before = store.get().prompt('system_prompt').render(language='hindi')
+    prompt_file = config_dir / 'prompts' / 'system_prompt.txt'
+    prompt_file.write_text(prompt_file.read_text(encoding='utf-8') + "\nReply in {language} only.\n",
+                           encoding='utf-8')
+    _touch_later(prompt_file)
+    assert store.refresh() is True
+    assert store.get().version == 2
+    after = store.get().prompt('system_prompt').render(language='hindi')
+    assert after.startswith(before) and after.endswith("Reply in hindi only.")
+    assert store.refresh() is False
+
+
+def test_invalid_edit_keeps_the_current_config(config_dir):
+    store = ConfigStore(config_dir)
+    prompt_file = config_dir / 'prompts' / 'system_prompt.txt'
+    prompt_file.write_text("Broken {placeholder}", encoding='utf-8')
+    _touch_later(prompt_file)
+    assert store.refresh() is False
+    assert store.get().version == 1 and 'placeholder' in store.last_error